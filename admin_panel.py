@@ -693,6 +693,7 @@ def api_stats():
             'listings': listing_count,
             'cache_keys': cache_stats['active_keys'],
             'cache_expired': cache_stats['expired_keys'],
+            'db_pool': db_enhanced.get_pool_status(),
         })
     
     except Exception as e:
@@ -20,11 +20,13 @@ import db_enhanced
 from security import SecurityConfig
 from error_handling import ErrorHandler, log_errors, safe_execute, DatabaseError
 from error_recovery import start_error_recovery, stop_error_recovery, handle_error, get_system_status
+from notification_worker import start_notification_workers
+from price_alert_stream import start_price_alert_stream
 from utils import logger, get_chrome_diagnostics, get_client_ip
 from observability import log_event, log_alert, log_http_request, log_http_response
 # Import new modules
 from rate_limiter import rate_limit, add_rate_limit_headers
-from cache_manager import cache_get, cache_set, cache_clear, cache_user_data, get_cache
+from cache_manager import cache_get, cache_set, cache_clear, cache_user_data, get_cache, user_cache_tag
 from admin_panel import admin_bp
 from security_middleware import security_before_request, security_after_request, get_security_stats
 from honeypot_routes import create_honeypot_routes, get_honeypot_stats
@@ -33,7 +35,8 @@ from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 from subscriptions import SubscriptionManager, StripeManager, get_all_tiers, format_price
 from subscription_middleware import (
     require_subscription_tier, require_feature, check_keyword_limit, 
-    check_refresh_interval, check_platform_access, add_subscription_context
+    check_refresh_interval, check_platform_access, add_subscription_context,
+    get_resolved_subscription, invalidate_subscription_cache
 )
 from email_verification import (
     generate_verification_token, generate_password_reset_token,
@@ -385,7 +388,7 @@ def load_user(user_id):
         if user_row:
             user = User(user_row.username, user_row.password, user_row.role)
             # Cache user object for 5 minutes
-            cache_set(cache_key, user, ttl=300)
+            cache_set(cache_key, user, ttl=300, tags=(user_cache_tag(user_id),))
             return user
         if user_data:
             logger.error(
@@ -423,8 +426,7 @@ def _apply_subscription_interval(settings):
     
     try:
         if getattr(current_user, "is_authenticated", False):
-            subscription = db_enhanced.get_user_subscription(current_user.id)
-            tier = subscription.get('tier', 'free')
+            _, tier = get_resolved_subscription(current_user.id)
         else:
             tier = 'free'
         
@@ -448,7 +450,7 @@ def get_user_settings():
         cached_settings = cache_get(cache_key)
         if cached_settings:
             settings = _apply_subscription_interval(cached_settings)
-            cache_set(cache_key, settings, ttl=300)
+            cache_set(cache_key, settings, ttl=300, tags=(user_cache_tag(current_user.id),))
             return settings
         
         settings = ErrorHandler.handle_database_error(db_enhanced.get_settings, current_user.id)
@@ -461,7 +463,7 @@ def get_user_settings():
         
         settings = _apply_subscription_interval(settings)
         
-        cache_set(cache_key, settings, ttl=300)
+        cache_set(cache_key, settings, ttl=300, tags=(user_cache_tag(current_user.id),))
         return settings
     except Exception as e:
         logger.error(f"Error getting user settings: {e}")
@@ -516,7 +518,7 @@ def get_listings_from_db(limit=200):
             except Exception:
                 logger.debug("Failed to log premium impression for listing %s", item.get('id'))
     # Cache for 2 minutes
-    cache_set(cache_key, listings, ttl=120)
+    cache_set(cache_key, listings, ttl=120, tags=(user_cache_tag(user_id),) if user_id else ())
     return listings
 
 
@@ -739,6 +741,7 @@ def health_check():
         security_logger_status = "running" if _security_logger_running else "stopped"
         activity_logger_status = "running" if db_enhanced._activity_logger_running else "stopped"
         realtime_health = get_realtime_health()
+        pool_status = db_enhanced.get_pool_status()
 
         overall_status = "healthy"
         if realtime_health.get("status") != "ok":
@@ -748,7 +751,22 @@ def health_check():
             "status": overall_status,
             "timestamp": datetime.now().isoformat(),
             "checks": {
-                "database": {"status": "connected"},
+                "database": {
+                    "status": "connected",
+                    # Detailed histograms and top holders are on the admin stats API
+                    "pool": {
+                        key: pool_status.get(key)
+                        for key in (
+                            "backend", "min_size", "max_size", "open_connections",
+                            "in_use_connections", "waiting_requests", "peak_connections",
+                            "exhaustion_count",
+                        )
+                    },
+                    "checkout_wait_ms": {
+                        key: pool_status.get("checkout_wait", {}).get(key)
+                        for key in ("avg_ms", "max_ms")
+                    },
+                },
                 "realtime": realtime_health,
                 "background_threads": {
                     "security_logger": security_logger_status,
@@ -5995,7 +6013,7 @@ def stripe_webhook():
                         stripe_customer_id=customer_id,
                         stripe_subscription_id=subscription_id
                     )
-                    cache_set(f"settings:{username_meta}", None, ttl=0)
+                    invalidate_subscription_cache(username_meta)
 
                     db_enhanced.log_subscription_event(
                         username=username_meta,
@@ -6033,7 +6051,7 @@ def stripe_webhook():
                         stripe_subscription_id=subscription.get('stripe_subscription_id')
                     )
                     
-                    cache_set(f"settings:{username}", None, ttl=0)
+                    invalidate_subscription_cache(username)
                     
                     db_enhanced.log_subscription_event(
                         username=username,
@@ -6058,7 +6076,7 @@ def stripe_webhook():
                 username = subscription['username']
                 try:
                     db_enhanced.cancel_subscription(username)
-                    cache_set(f"settings:{username}", None, ttl=0)
+                    invalidate_subscription_cache(username)
                     db_enhanced.log_subscription_event(
                         username=username,
                         tier='free',
@@ -6355,14 +6373,19 @@ def api_price_distribution():
         days = request.args.get('days', 30, type=int)
         bins = request.args.get('bins', 10, type=int)
         keyword = request.args.get('keyword')
+        mode = request.args.get('mode', 'equal')
         
         # Validate parameters
         if days <= 0 or days > 365:
             return jsonify({"error": "Days must be between 1 and 365"}), 400
         if bins <= 0 or bins > 50:
             return jsonify({"error": "Bins must be between 1 and 50"}), 400
+        if mode not in ('equal', 'quantile'):
+            return jsonify({"error": "Mode must be 'equal' or 'quantile'"}), 400
         
-        distribution = db_enhanced.get_price_distribution(days, bins, keyword, current_user.id)
+        distribution = db_enhanced.get_price_distribution(
+            days, bins, keyword, current_user.id, quantiles=(mode == 'quantile')
+        )
         if not distribution:
             distribution = []
         return jsonify({"distribution": distribution})
@@ -7412,6 +7435,18 @@ def initialize_error_recovery():
 # Initialize error recovery when app starts
 initialize_error_recovery()
 
+# Deliver queued new-listing notifications off the scraper threads
+try:
+    start_notification_workers()
+except Exception as e:
+    logger.error(f"Failed to start notification workers: {e}")
+
+# Evaluate price alerts as listings are ingested
+try:
+    start_price_alert_stream()
+except Exception as e:
+    logger.error(f"Failed to start price alert stream: {e}")
+
 # Note: Database connections and error recovery stay alive for the worker process lifetime
 # Gunicorn/systemd will handle cleanup when the process is terminated
 # DO NOT use @app.teardown_appcontext as it fires after EVERY request, not just on shutdown
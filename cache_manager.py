@@ -1,95 +1,329 @@
-# cache_manager.py - Simple in-memory caching for improved performance
-from datetime import datetime, timedelta
+# cache_manager.py - Bounded in-memory caching (with an optional Redis tier) for improved performance
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from functools import wraps
 from threading import Lock
 from utils import logger
 
 
-class CacheManager:
-    """Thread-safe in-memory cache manager"""
-    
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '10000'))
+CACHE_SHARDS = 16
+# Share cached values between gunicorn workers through the realtime Redis connection
+CACHE_REDIS_ENABLED = os.getenv('CACHE_REDIS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# Values pulled from the shared tier are kept locally only briefly, as a
+# backstop in case a broadcast tag invalidation is missed
+SECOND_TIER_LOCAL_TTL = 30
+# Realtime bus event telling every worker to drop its local copies of a tag
+CACHE_INVALIDATION_EVENT = "cache.invalidate"
+
+_MISSING = object()
+
+
+class _CacheShard:
+    """One LRU-ordered slice of the cache, guarded by its own lock."""
+
+    __slots__ = ('entries', 'lock')
+
     def __init__(self):
-        self.cache = {}
+        self.entries = OrderedDict()  # key -> (value, expires_at, tags)
         self.lock = Lock()
-        self.default_ttl = 300  # 5 minutes default TTL
-    
+
+
+class RedisCacheTier:
+    """
+    Second cache tier stored in Redis, shared by every worker.
+
+    Values are stored as JSON, never pickled, so whoever can write to Redis
+    cannot make a worker run code; values JSON cannot represent (tuples
+    come back as lists) stay in the local tier only.
+    """
+
+    KEY_PREFIX = 'cache:'
+    TAG_PREFIX = 'cache-tag:'
+
+    def _call(self, operation, handler, default=None):
+        import websocket_manager
+        if not websocket_manager.redis_enabled:
+            return default
+        return websocket_manager._with_redis(f"cache_{operation}", handler, default=default)
+
     def get(self, key):
+        raw = self._call('get', lambda client: client.get(self.KEY_PREFIX + key))
+        if raw is None:
+            return _MISSING
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return _MISSING
+
+    def set(self, key, value, ttl, tags=()):
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError):
+            logger.debug(f"Not sharing cache key {key}: value is not JSON serializable")
+            return
+
+        def _store(client):
+            pipe = client.pipeline()
+            pipe.set(self.KEY_PREFIX + key, payload, ex=max(1, int(ttl)))
+            for tag in tags:
+                pipe.sadd(self.TAG_PREFIX + tag, key)
+                pipe.expire(self.TAG_PREFIX + tag, max(1, int(ttl)))
+            return pipe.execute()
+
+        self._call('set', _store)
+
+    def delete(self, *keys):
+        if keys:
+            self._call('delete', lambda client: client.delete(*[self.KEY_PREFIX + key for key in keys]))
+
+    def invalidate_tag(self, tag):
+        def _invalidate(client):
+            keys = client.smembers(self.TAG_PREFIX + tag)
+            pipe = client.pipeline()
+            if keys:
+                pipe.delete(*[self.KEY_PREFIX + key for key in keys])
+            pipe.delete(self.TAG_PREFIX + tag)
+            return pipe.execute()
+
+        self._call('invalidate', _invalidate)
+
+    def clear(self):
+        def _clear(client):
+            keys = list(client.scan_iter(match=self.KEY_PREFIX + '*'))
+            keys += list(client.scan_iter(match=self.TAG_PREFIX + '*'))
+            if keys:
+                client.delete(*keys)
+
+        self._call('clear', _clear)
+
+
+class CacheManager:
+    """
+    Thread-safe, bounded in-memory cache.
+
+    Entries live in lock-sharded LRU maps holding at most ``max_entries``
+    in total; the least recently used entry in a shard is evicted when it
+    fills up. Entries can carry tags so related keys are invalidated
+    together without scanning. An optional ``second_tier`` (Redis) is read on
+    local misses and written through on every set.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, shards=CACHE_SHARDS, second_tier=None):
+        self.default_ttl = 300  # 5 minutes default TTL
+        self.max_entries = max_entries
+        self._shards = [_CacheShard() for _ in range(shards)]
+        self._shard_capacity = max(1, max_entries // shards)
+        self._tags = {}  # tag -> set of keys
+        self._tags_lock = Lock()
+        self.second_tier = second_tier
+        self._stats_lock = Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'expirations': 0,
+                       'invalidations': 0, 'second_tier_hits': 0}
+
+    def _shard(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _count(self, stat, amount=1):
+        with self._stats_lock:
+            self._stats[stat] += amount
+
+    def _untag(self, key, tags):
+        if not tags:
+            return
+        with self._tags_lock:
+            for tag in tags:
+                keys = self._tags.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tags[tag]
+
+    def get(self, key, default=None):
         """Get value from cache if it exists and hasn't expired"""
-        with self.lock:
-            if key in self.cache:
-                value, expiry = self.cache[key]
-                if datetime.now() < expiry:
-                    logger.debug(f"Cache hit for key: {key}")
+        shard = self._shard(key)
+        expired_tags = None
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is not None:
+                value, expires_at, tags = entry
+                if time.monotonic() < expires_at:
+                    shard.entries.move_to_end(key)
+                    self._count('hits')
                     return value
-                else:
-                    # Expired, remove it
-                    del self.cache[key]
-                    logger.debug(f"Cache expired for key: {key}")
-            return None
-    
-    def set(self, key, value, ttl=None):
-        """Set value in cache with TTL (time to live in seconds)"""
+                # Expired, remove it
+                del shard.entries[key]
+                expired_tags = tags
+        if entry is not None:
+            self._count('expirations')
+            self._untag(key, expired_tags)
+
+        if self.second_tier is not None:
+            value = self.second_tier.get(key)
+            if value is not _MISSING:
+                self._count('second_tier_hits')
+                self._count('hits')
+                self._store(key, value, SECOND_TIER_LOCAL_TTL, ())
+                return value
+
+        self._count('misses')
+        return default
+
+    def set(self, key, value, ttl=None, tags=()):
+        """Set value in cache with TTL (time to live in seconds); a TTL of 0 or less deletes the key"""
         ttl = ttl if ttl is not None else self.default_ttl
-        expiry = datetime.now() + timedelta(seconds=ttl)
-        
-        with self.lock:
-            self.cache[key] = (value, expiry)
-            logger.debug(f"Cache set for key: {key} (TTL: {ttl}s)")
-    
+        if ttl <= 0:
+            self.delete(key)
+            return
+        tags = tuple(tags)
+        self._store(key, value, ttl, tags)
+        self._count('sets')
+        if self.second_tier is not None:
+            self.second_tier.set(key, value, ttl, tags)
+
+    def _store(self, key, value, ttl, tags):
+        shard = self._shard(key)
+        evicted = []
+        with shard.lock:
+            previous = shard.entries.pop(key, None)
+            shard.entries[key] = (value, time.monotonic() + ttl, tags)
+            while len(shard.entries) > self._shard_capacity:
+                evicted.append(shard.entries.popitem(last=False))
+        if previous is not None and previous[2] != tags:
+            self._untag(key, previous[2])
+        if tags:
+            with self._tags_lock:
+                for tag in tags:
+                    self._tags.setdefault(tag, set()).add(key)
+        for evicted_key, (_, _, evicted_tags) in evicted:
+            self._untag(evicted_key, evicted_tags)
+        if evicted:
+            self._count('evictions', len(evicted))
+
+    def get_or_set(self, key, loader, ttl=None, tags=()):
+        """Return the cached value for ``key``, calling ``loader()`` and caching its result on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value, ttl, tags)
+        return value
+
     def delete(self, key):
         """Delete a specific key from cache"""
-        with self.lock:
-            if key in self.cache:
-                del self.cache[key]
-                logger.debug(f"Cache deleted for key: {key}")
-    
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.pop(key, None)
+        if entry is not None:
+            self._untag(key, entry[2])
+        if self.second_tier is not None:
+            self.second_tier.delete(key)
+
+    def invalidate_tag(self, tag, broadcast=True):
+        """
+        Delete every key stored with ``tag``.
+
+        With ``broadcast`` (the default) the shared tier is cleared too and the
+        other workers are told to drop their local copies; the realtime bus
+        handler passes ``broadcast=False`` when applying such a message.
+        """
+        with self._tags_lock:
+            keys = self._tags.pop(tag, set())
+        for key in keys:
+            shard = self._shard(key)
+            with shard.lock:
+                entry = shard.entries.pop(key, None)
+            if entry is not None:
+                self._untag(key, entry[2])
+        if keys:
+            self._count('invalidations', len(keys))
+        if broadcast:
+            if self.second_tier is not None:
+                self.second_tier.invalidate_tag(tag)
+            _broadcast_invalidation(tag)
+        logger.debug(f"Invalidated {len(keys)} cache keys tagged {tag}")
+        return len(keys)
+
     def clear(self):
         """Clear all cache"""
-        with self.lock:
-            self.cache.clear()
-            logger.info("Cache cleared")
-    
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+        with self._tags_lock:
+            self._tags.clear()
+        if self.second_tier is not None:
+            self.second_tier.clear()
+        logger.info("Cache cleared")
+
     def clear_pattern(self, pattern):
-        """Clear all keys matching a pattern"""
-        with self.lock:
-            keys_to_delete = [k for k in self.cache.keys() if pattern in k]
-            for key in keys_to_delete:
-                del self.cache[key]
-            logger.debug(f"Cleared {len(keys_to_delete)} cache keys matching pattern: {pattern}")
-    
+        """Clear all keys containing ``pattern`` (scans every key; prefer tags and invalidate_tag)"""
+        deleted = 0
+        for shard in self._shards:
+            with shard.lock:
+                keys_to_delete = [k for k in shard.entries if pattern in k]
+                removed = [(k, shard.entries.pop(k)) for k in keys_to_delete]
+            for key, entry in removed:
+                self._untag(key, entry[2])
+            if self.second_tier is not None:
+                self.second_tier.delete(*keys_to_delete)
+            deleted += len(removed)
+        logger.debug(f"Cleared {deleted} cache keys matching pattern: {pattern}")
+
     def get_stats(self):
         """Get cache statistics"""
-        with self.lock:
-            total_keys = len(self.cache)
-            expired_keys = 0
-            now = datetime.now()
-            
-            for key, (value, expiry) in self.cache.items():
-                if expiry < now:
-                    expired_keys += 1
-            
-            return {
-                'total_keys': total_keys,
-                'expired_keys': expired_keys,
-                'active_keys': total_keys - expired_keys
-            }
-    
+        now = time.monotonic()
+        total_keys = 0
+        expired_keys = 0
+        for shard in self._shards:
+            with shard.lock:
+                total_keys += len(shard.entries)
+                expired_keys += sum(1 for _, expires_at, _ in shard.entries.values() if expires_at <= now)
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        with self._tags_lock:
+            tag_count = len(self._tags)
+        stats.update({
+            'total_keys': total_keys,
+            'expired_keys': expired_keys,
+            'active_keys': total_keys - expired_keys,
+            'max_entries': self.max_entries,
+            'tags': tag_count,
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0.0,
+            'second_tier': 'redis' if self.second_tier is not None else None,
+        })
+        return stats
+
     def cleanup_expired(self):
         """Remove all expired entries from cache"""
-        with self.lock:
-            now = datetime.now()
-            expired_keys = [k for k, (v, exp) in self.cache.items() if exp < now]
-            
-            for key in expired_keys:
-                del self.cache[key]
-            
-            if expired_keys:
-                logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
-            
-            return len(expired_keys)
+        now = time.monotonic()
+        removed = []
+        for shard in self._shards:
+            with shard.lock:
+                expired_keys = [k for k, (_, expires_at, _) in shard.entries.items() if expires_at <= now]
+                removed.extend((k, shard.entries.pop(k)[2]) for k in expired_keys)
+        for key, tags in removed:
+            self._untag(key, tags)
+        if removed:
+            self._count('expirations', len(removed))
+            logger.info(f"Cleaned up {len(removed)} expired cache entries")
+        return len(removed)
+
+
+def _broadcast_invalidation(tag):
+    """Ask every worker to invalidate ``tag`` through the realtime Redis bus, if it is up"""
+    try:
+        import websocket_manager
+    except ImportError:
+        return
+    if websocket_manager.redis_enabled:
+        websocket_manager._publish_event(CACHE_INVALIDATION_EVENT, {"tag": tag})
 
 
 # Global cache instance
-_cache = CacheManager()
+_cache = CacheManager(second_tier=RedisCacheTier() if CACHE_REDIS_ENABLED else None)
 
 
 def get_cache():
@@ -104,9 +338,9 @@ def cache_get(key):
     return get_cache().get(key)
 
 
-def cache_set(key, value, ttl=None):
+def cache_set(key, value, ttl=None, tags=()):
     """Set value in cache"""
-    return get_cache().set(key, value, ttl)
+    return get_cache().set(key, value, ttl, tags)
 
 
 def cache_delete(key):
@@ -119,41 +353,64 @@ def cache_clear():
     return get_cache().clear()
 
 
+def user_cache_tag(username):
+    """Tag carried by every cache entry that belongs to ``username``"""
+    return f"user:{username}"
+
+
 def cache_user_data(username):
     """Clear all cached data for a specific user"""
-    get_cache().clear_pattern(f"user:{username}")
+    get_cache().invalidate_tag(user_cache_tag(username))
+
+
+def request_memo(key, loader):
+    """
+    Memoize ``loader()`` for the rest of the current Flask request.
+
+    Outside a request context the loader is simply called.
+    """
+    try:
+        from flask import g, has_app_context
+    except ImportError:  # pragma: no cover - flask is always installed with the app
+        return loader()
+    if not has_app_context():
+        return loader()
+    memo = g.setdefault('_request_memo', {})
+    if key not in memo:
+        memo[key] = loader()
+    return memo[key]
 
 
 # Decorator for caching function results
 
-from functools import wraps
+def _arguments_key(args, kwargs):
+    """Stable, bounded-length key for a call's arguments."""
+    raw = repr((args, sorted(kwargs.items())))
+    if len(raw) <= 64:
+        return raw
+    return hashlib.sha1(raw.encode('utf-8', 'backslashreplace')).hexdigest()
 
 
-def cached(key_prefix, ttl=300):
+def cached(key_prefix, ttl=300, tags=None):
     """
     Decorator to cache function results
-    
+
     Usage:
-        @cached('listings', ttl=60)
+        @cached('listings', ttl=60, tags=lambda user_id: [user_cache_tag(user_id)])
         def get_listings(user_id):
             return expensive_database_call(user_id)
+
+    ``tags`` receives the call's arguments and returns the tags to store the
+    result under.
     """
     def decorator(f):
+        name = f"{f.__module__}.{f.__qualname__}"
+
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Build cache key from function name and arguments
-            cache_key = f"{key_prefix}:{f.__name__}:{str(args)}:{str(kwargs)}"
-            
-            # Try to get from cache
-            result = cache_get(cache_key)
-            if result is not None:
-                return result
-            
-            # Call function and cache result
-            result = f(*args, **kwargs)
-            cache_set(cache_key, result, ttl)
-            
-            return result
-        
+            cache_key = f"{key_prefix}:{name}:{_arguments_key(args, kwargs)}"
+            entry_tags = tags(*args, **kwargs) if tags else ()
+            return get_cache().get_or_set(cache_key, lambda: f(*args, **kwargs), ttl, entry_tags)
+
         return decorated_function
     return decorator
@@ -6,6 +6,8 @@ from db_enhanced import (
     init_db,
     close_database,
     get_pool,
+    connection_scope,
+    unit_of_work,
     
     # User management
     get_user_by_username,
@@ -80,6 +82,23 @@ from db_enhanced import (
     
     # Listings
     save_listing,
+    save_listings_batch,
+    enqueue_notifications,
+    claim_notification_batch,
+    mark_notifications_sent,
+    mark_notification_failed,
+    release_stale_notifications,
+    get_notification_outbox_stats,
+    get_notification_subscriptions,
+    get_listings_after,
+    get_max_listing_id,
+    get_worker_checkpoint,
+    set_worker_checkpoint,
+    refresh_listing_daily_stats,
+    claim_price_alert_trigger,
+    get_all_saved_searches,
+    advance_saved_searches,
+    enqueue_listing_notification,
     get_listings,
     get_listing_count,
     
@@ -238,6 +257,8 @@ __all__ = [
     'init_db',
     'close_database',
     'get_pool',
+    'connection_scope',
+    'unit_of_work',
     'get_user_by_username',
     'get_user_by_email',
     'create_user_db',
@@ -267,6 +288,23 @@ __all__ = [
     'export_user_data',
     'purge_user_data',
     'save_listing',
+    'save_listings_batch',
+    'enqueue_notifications',
+    'claim_notification_batch',
+    'mark_notifications_sent',
+    'mark_notification_failed',
+    'release_stale_notifications',
+    'get_notification_outbox_stats',
+    'get_notification_subscriptions',
+    'get_listings_after',
+    'get_max_listing_id',
+    'get_worker_checkpoint',
+    'set_worker_checkpoint',
+    'refresh_listing_daily_stats',
+    'claim_price_alert_trigger',
+    'get_all_saved_searches',
+    'advance_saved_searches',
+    'enqueue_listing_notification',
     'get_listings',
     'get_listing_count',
     'save_listing_analytics',
@@ -4,21 +4,27 @@ import re
 import threading
 import time
 import os
+import sys
 import json
 import secrets
 import string
 import statistics
+import bisect
 import hashlib
 import uuid
 from collections import defaultdict
 from copy import deepcopy
 from datetime import date, datetime, timedelta
 from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
 from queue import Queue, Empty
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 from error_handling import ErrorHandler, log_errors, DatabaseError
 from utils import logger
+from keyword_extraction import get_keyword_matcher, normalize_keywords
 from observability import log_event, log_alert
+from cache_manager import get_cache, user_cache_tag
 
 # Database configuration - supports both SQLite and PostgreSQL
 DATABASE_URL = os.getenv('DATABASE_URL', '')
@@ -592,26 +598,44 @@ def _convert_insert_or_syntax(statement):
     
     return statement
 
+# Most statements are static strings executed over and over, so translations
+# are memoized; dynamically built SQL simply cycles through the LRU.
+SQL_TRANSLATION_CACHE_SIZE = 2048
+
+_SQL_TYPE_REPLACEMENTS = (
+    ("INTEGER PRIMARY KEY AUTOINCREMENT", "SERIAL PRIMARY KEY"),
+    ("DATETIME", "TIMESTAMP"),
+    ("BOOLEAN DEFAULT 0", "BOOLEAN DEFAULT FALSE"),
+    ("BOOLEAN DEFAULT 1", "BOOLEAN DEFAULT TRUE"),
+    ("BOOLEAN DEFAULT '0'", "BOOLEAN DEFAULT FALSE"),
+    ("BOOLEAN DEFAULT '1'", "BOOLEAN DEFAULT TRUE"),
+    ("BOOLEAN DEFAULT \"0\"", "BOOLEAN DEFAULT FALSE"),
+    ("BOOLEAN DEFAULT \"1\"", "BOOLEAN DEFAULT TRUE"),
+    ("REAL", "DOUBLE PRECISION"),
+)
+_ADD_COLUMN_RE = re.compile(r"ADD COLUMN(?!\s+IF\s+NOT\s+EXISTS)", re.IGNORECASE)
+_QUOTED_SQL_RE = re.compile(r"('(?:''|[^'])*'|\"(?:\"\"|[^\"])*\")")
+
+
 def _prepare_sql(statement):
     """Translate SQLite-specific SQL to PostgreSQL-compatible SQL when needed."""
     if not USE_POSTGRES or not isinstance(statement, str):
         return statement
+    return _translate_sql(statement)
 
-    replacements = [
-        ("INTEGER PRIMARY KEY AUTOINCREMENT", "SERIAL PRIMARY KEY"),
-        ("DATETIME", "TIMESTAMP"),
-        ("BOOLEAN DEFAULT 0", "BOOLEAN DEFAULT FALSE"),
-        ("BOOLEAN DEFAULT 1", "BOOLEAN DEFAULT TRUE"),
-        ("BOOLEAN DEFAULT '0'", "BOOLEAN DEFAULT FALSE"),
-        ("BOOLEAN DEFAULT '1'", "BOOLEAN DEFAULT TRUE"),
-        ("BOOLEAN DEFAULT \"0\"", "BOOLEAN DEFAULT FALSE"),
-        ("BOOLEAN DEFAULT \"1\"", "BOOLEAN DEFAULT TRUE"),
-        ("REAL", "DOUBLE PRECISION"),
-    ]
 
+def get_sql_translation_cache_info():
+    """Hit/miss counters for the PostgreSQL SQL translation cache."""
+    return _translate_sql.cache_info()._asdict()
+
+
+@lru_cache(maxsize=SQL_TRANSLATION_CACHE_SIZE)
+def _translate_sql(statement: str) -> str:
+    """Rewrite one SQLite statement for PostgreSQL (pure; memoized by text)."""
     converted = statement
-    for old, new in replacements:
-        converted = converted.replace(old, new)
+    for old, new in _SQL_TYPE_REPLACEMENTS:
+        if old in converted:
+            converted = converted.replace(old, new)
     
     # Handle INSERT OR IGNORE / INSERT OR REPLACE - these need special handling
     # because they require rewriting the entire INSERT statement
@@ -622,16 +646,11 @@ def _prepare_sql(statement):
 
     stripped = converted.lstrip()
     if stripped.upper().startswith("ALTER TABLE"):
-        converted = re.sub(
-            r"ADD COLUMN(?!\s+IF\s+NOT\s+EXISTS)",
-            "ADD COLUMN IF NOT EXISTS",
-            converted,
-            flags=re.IGNORECASE
-        )
+        converted = _ADD_COLUMN_RE.sub("ADD COLUMN IF NOT EXISTS", converted)
 
     if "?" in converted:
         # Replace SQLite-style positional placeholders with psycopg2 ones.
-        parts = re.split(r"('(?:''|[^'])*'|\"(?:\"\"|[^\"])*\")", converted)
+        parts = _QUOTED_SQL_RE.split(converted)
         for idx, part in enumerate(parts):
             if idx % 2 == 0:  # outside quoted strings
                 parts[idx] = part.replace("?", "%s")
@@ -675,6 +694,20 @@ def _to_datetime_string(value):
     return value
 
 
+# Settings, subscriptions and servers are read on almost every request.
+# Those reads are served from the shared cache for a short TTL, and every
+# writer of those rows invalidates the owning user's tag (or the servers tag).
+# User rows carry the password hash, role and active flag and are never cached.
+HOT_READ_CACHE_TTL = 30
+_GLOBAL_SETTINGS_CACHE_TAG = "settings:global"
+_SERVERS_CACHE_TAG = "servers"
+
+
+def _invalidate_user_cache(username) -> None:
+    """Drop cached settings and subscription rows after ``username`` changes."""
+    get_cache().invalidate_tag(user_cache_tag(username) if username else _GLOBAL_SETTINGS_CACHE_TAG)
+
+
 def _user_row_to_dict(row: Tuple[Any, ...]) -> Dict[str, Any]:
     """Convert a raw users row into a normalized dictionary."""
     if not row:
@@ -1071,8 +1104,12 @@ class _PostgresConnectionWrapper:
 
 
 # Connection pool configuration - optimized for production
-POOL_SIZE = 5  # Reduced pool size for better memory management
+POOL_SIZE = int(os.getenv('POOL_SIZE', '5'))  # Upper bound; pools grow lazily up to this
+POOL_MIN_SIZE = min(int(os.getenv('POOL_MIN_SIZE', '2')), POOL_SIZE)  # Connections kept open when idle
+POOL_IDLE_TIMEOUT = float(os.getenv('POOL_IDLE_TIMEOUT', '300'))  # Seconds before surplus idle connections are closed
 CONNECTION_TIMEOUT = 10  # Reduced timeout for faster failure detection
+# Pooled connections are only pinged when idle this long or after an error
+CONNECTION_HEALTH_CHECK_IDLE_SECONDS = 30
 
 # Async activity logging queue to prevent blocking on login
 _activity_log_queue = Queue(maxsize=2000)
@@ -1155,24 +1192,327 @@ def stop_activity_logger():
     logger.info("Activity logger background thread stopped")
 
 
+# Connection held by the innermost connection_scope() of the current thread/task
+_connection_scope: ContextVar[Optional[Tuple[Any, Any]]] = ContextVar("db_connection_scope", default=None)
+
+
+def _scoped_connection(pool):
+    """Return the connection a connection_scope() holds from ``pool``, if any."""
+    scope = _connection_scope.get()
+    if scope is not None and scope[0] is pool:
+        return scope[1]
+    return None
+
+
+class _ConnectionHealth:
+    """Tracks when pooled connections were last used and which ones saw an error."""
+
+    def __init__(self, idle_seconds=CONNECTION_HEALTH_CHECK_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._last_used: Dict[int, float] = {}
+        self._suspect: Set[int] = set()
+
+    def needs_check(self, conn) -> bool:
+        key = id(conn)
+        if key in self._suspect:
+            return True
+        last_used = self._last_used.get(key)
+        return last_used is None or time.monotonic() - last_used > self.idle_seconds
+
+    def checked_in(self, conn, failed=False) -> None:
+        key = id(conn)
+        self._last_used[key] = time.monotonic()
+        if failed:
+            self._suspect.add(key)
+        else:
+            self._suspect.discard(key)
+
+    def forget(self, conn) -> None:
+        self._last_used.pop(id(conn), None)
+        self._suspect.discard(id(conn))
+
+
+class _Histogram:
+    """Fixed-bucket latency histogram in milliseconds."""
+
+    BOUNDS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        count = sum(self.counts)
+        buckets = {f"le_{bound}ms": n for bound, n in zip(self.BOUNDS_MS, self.counts)}
+        buckets["gt_10000ms"] = self.counts[-1]
+        return {
+            "count": count,
+            "avg_ms": round(self.total_ms / count, 3) if count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class _PoolMetrics:
+    """Checkout wait/hold histograms and per-call-site holder totals for a pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait = _Histogram()
+        self.hold = _Histogram()
+        self._holders: Dict[str, List[float]] = {}
+
+    def record(self, call_site: str, waited: float, held: float) -> None:
+        with self._lock:
+            self.wait.observe(waited)
+            self.hold.observe(held)
+            entry = self._holders.get(call_site)
+            if entry is None:
+                entry = self._holders[call_site] = [0, 0.0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += held
+            entry[2] = max(entry[2], held)
+            entry[3] += waited
+
+    def top_holders(self, limit: int = 10) -> List[Dict[str, Any]]:
+        with self._lock:
+            ranked = sorted(self._holders.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {
+                "call_site": site,
+                "checkouts": int(count),
+                "total_hold_ms": round(total * 1000.0, 3),
+                "max_hold_ms": round(longest * 1000.0, 3),
+                "avg_wait_ms": round(waited * 1000.0 / count, 3) if count else 0.0,
+            }
+            for site, (count, total, longest, waited) in ranked
+        ]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            wait, hold = self.wait.snapshot(), self.hold.snapshot()
+        return {"checkout_wait": wait, "hold_time": hold, "top_holders": self.top_holders()}
+
+
+class _PooledSlots:
+    """
+    Elastic checkout queue shared by the SQLite and PostgreSQL pools.
+
+    Keeps ``min_size`` connections open, opens more on demand up to
+    ``max_size``, hands returned connections to waiters in arrival order and
+    closes surplus connections that sit idle longer than ``idle_timeout``.
+    ``get`` raises ``queue.Empty`` when no connection frees up in time.
+    """
+
+    def __init__(self, create, destroy, min_size=POOL_MIN_SIZE, max_size=POOL_SIZE,
+                 idle_timeout=POOL_IDLE_TIMEOUT):
+        self._create = create
+        self._destroy = destroy
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle: List[Tuple[Any, float]] = []  # used as a stack: most recently returned last
+        self._waiters: List[List[Any]] = []  # FIFO of [event, connection]
+        self._size = 0
+        self._last_reap = time.monotonic()
+        self.peak_size = 0
+        self.created = 0
+        self.reaped = 0
+        self.waits = 0
+        self.exhaustions = 0
+
+    def fill(self) -> None:
+        """Open connections until ``min_size`` are available."""
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            self.put(conn)
+
+    def _open(self):
+        conn = self._create()
+        with self._lock:
+            self.created += 1
+            self.peak_size = max(self.peak_size, self._size)
+        return conn
+
+    def get(self, timeout=None):
+        with self._lock:
+            if self._idle and not self._waiters:
+                return self._idle.pop()[0]
+            if self._size < self.max_size:
+                self._size += 1
+                waiter = None
+            else:
+                waiter = [threading.Event(), None]
+                self._waiters.append(waiter)
+                self.waits += 1
+        if waiter is None:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+        if not waiter[0].wait(timeout):
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    self.exhaustions += 1
+                    raise Empty
+        return waiter[1]
+
+    def put(self, conn) -> None:
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.pop(0)
+                waiter[1] = conn
+                waiter[0].set()
+                return
+            self._idle.append((conn, time.monotonic()))
+        self._reap_idle()
+
+    def discard(self, conn) -> None:
+        """Close a checked-out connection for good, opening a replacement if someone is waiting."""
+        with self._lock:
+            self._size -= 1
+            replace = bool(self._waiters) and self._size < self.max_size
+            if replace:
+                self._size += 1
+        try:
+            self._destroy(conn)
+        except Exception as e:
+            logger.debug(f"Error closing discarded connection: {e}")
+        if replace:
+            try:
+                self.put(self._open())
+            except Exception as e:
+                with self._lock:
+                    self._size -= 1
+                logger.error(f"Could not open replacement connection: {e}")
+
+    def _reap_idle(self) -> None:
+        now = time.monotonic()
+        if now - self._last_reap < min(self.idle_timeout, 30):
+            return
+        stale = []
+        with self._lock:
+            self._last_reap = now
+            while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+                stale.append(self._idle.pop(0)[0])
+                self._size -= 1
+            self.reaped += len(stale)
+        for conn in stale:
+            try:
+                self._destroy(conn)
+            except Exception as e:
+                logger.debug(f"Error closing idle connection: {e}")
+
+    def drain_idle(self) -> List[Any]:
+        """Remove and return every idle connection; the caller must ``put`` or ``discard`` each one."""
+        with self._lock:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+        return idle
+
+    def close_all(self) -> None:
+        for conn in self.drain_idle():
+            self.discard(conn)
+
+    def reset(self) -> None:
+        """Forget every connection after the owner has closed them all itself."""
+        with self._lock:
+            self._idle.clear()
+            self._size = 0
+
+    def qsize(self) -> int:
+        return len(self._idle)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "open_connections": self._size,
+                "idle_connections": len(self._idle),
+                "in_use_connections": self._size - len(self._idle),
+                "waiting_requests": len(self._waiters),
+                "peak_connections": self.peak_size,
+                "connections_created": self.created,
+                "connections_reaped": self.reaped,
+                "checkouts_waited": self.waits,
+                "exhaustion_count": self.exhaustions,
+            }
+
+
+def _checkout_call_site() -> str:
+    """Name the function that asked the pool for a connection."""
+    frame = sys._getframe(2)
+    while frame is not None and (
+        frame.f_code.co_filename == _CONTEXTLIB_FILE or frame.f_code.co_name in _POOL_INTERNAL_FRAMES
+    ):
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+
+_POOL_INTERNAL_FRAMES = frozenset({"get_connection", "connection_scope"})
+_CONTEXTLIB_FILE = sys.modules[contextmanager.__module__].__file__
+
+
 class DatabaseConnectionPool:
     """Thread-safe connection pool for SQLite"""
     
-    def __init__(self, database, pool_size=POOL_SIZE):
+    def __init__(self, database, pool_size=POOL_SIZE, min_size=POOL_MIN_SIZE,
+                 idle_timeout=POOL_IDLE_TIMEOUT):
         self.database = database
         self.pool_size = pool_size
-        self.pool = Queue(maxsize=pool_size)
         self.all_connections = []
         self.lock = threading.Lock()
+        self.health = _ConnectionHealth()
+        self.metrics = _PoolMetrics()
+        self.pool = _PooledSlots(self._open_pooled, self._close_pooled, min_size=min_size,
+                                 max_size=pool_size, idle_timeout=idle_timeout)
         self._initialize_pool()
     
     def _initialize_pool(self):
         """Initialize the connection pool"""
-        for _ in range(self.pool_size):
-            conn = self._create_connection()
-            self.pool.put(conn)
+        self.pool.fill()
+        logger.info(
+            f"Initialized database connection pool with {self.pool.min_size} connections "
+            f"(grows to {self.pool_size})"
+        )
+
+    def _open_pooled(self):
+        conn = self._create_connection()
+        self.health.checked_in(conn)
+        with self.lock:
             self.all_connections.append(conn)
-        logger.info(f"Initialized database connection pool with {self.pool_size} connections")
+        return conn
+
+    def _close_pooled(self, conn):
+        self.health.forget(conn)
+        with self.lock:
+            if conn in self.all_connections:
+                self.all_connections.remove(conn)
+        conn.close()
     
     def _create_connection(self):
         """Create a new database connection with optimal settings"""
@@ -1199,42 +1539,84 @@ class DatabaseConnectionPool:
         return conn
     
     @contextmanager
-    def get_connection(self):
-        """Get a connection from the pool (context manager)"""
+    def get_connection(self, timeout=CONNECTION_TIMEOUT, call_site=None):
+        """
+        Get a connection from the pool (context manager).
+
+        Inside a connection_scope() the scope's connection is reused instead
+        of checking out another one. Connections are only pinged before use
+        when they have been idle or their last use raised a database error.
+        Wait and hold times are recorded against ``call_site`` (by default
+        the calling function).
+        """
+        shared = _scoped_connection(self)
+        if shared is not None:
+            yield shared
+            return
+
+        call_site = call_site or _checkout_call_site()
         conn = None
+        failed = False
+        requested_at = time.monotonic()
+        checked_out_at = requested_at
         try:
-            conn = self.pool.get(timeout=CONNECTION_TIMEOUT)
-            # Test the connection before yielding
-            try:
-                conn.execute("SELECT 1").fetchone()
-            except sqlite3.OperationalError as e:
-                if "database is locked" in str(e).lower():
-                    # Create a new connection if the pooled one is locked
-                    logger.warning("Pooled connection is locked, creating new connection")
-                    conn.close()
-                    conn = self._create_connection()
-                else:
-                    # For other errors, close and create new connection
-                    logger.warning(f"Connection test failed: {e}, creating new connection")
-                    conn.close()
-                    conn = self._create_connection()
+            conn = self.pool.get(timeout=timeout)
+            checked_out_at = time.monotonic()
+            if self.health.needs_check(conn):
+                try:
+                    conn.execute("SELECT 1").fetchone()
+                except sqlite3.Error as e:
+                    if "database is locked" in str(e).lower():
+                        # Create a new connection if the pooled one is locked
+                        logger.warning("Pooled connection is locked, creating new connection")
+                    else:
+                        # For other errors, close and create new connection
+                        logger.warning(f"Connection test failed: {e}, creating new connection")
+                    conn = self._replace_connection(conn)
             yield conn
         except Empty:
             logger.error("Connection pool exhausted - consider increasing pool size")
             raise DatabaseError("Database connection pool exhausted")
+        except sqlite3.Error:
+            failed = True
+            raise
         finally:
             if conn:
+                self.metrics.record(call_site, checked_out_at - requested_at, time.monotonic() - checked_out_at)
                 try:
-                    # Ensure connection is in a good state before returning to pool
-                    conn.execute("SELECT 1").fetchone()
+                    # Never hand the next caller a half-finished transaction
+                    if conn.in_transaction:
+                        conn.rollback()
+                    self.health.checked_in(conn, failed=failed)
                     self.pool.put(conn)
-                except sqlite3.OperationalError:
-                    # If connection is bad, close it and don't return to pool
-                    logger.warning("Removing bad connection from pool")
-                    conn.close()
+                except sqlite3.Error:
+                    # If connection is bad, replace it so the pool keeps its size
+                    logger.warning("Replacing bad connection in pool")
+                    try:
+                        self.pool.put(self._replace_connection(conn))
+                    except Exception as e:
+                        logger.error(f"Could not replace bad connection: {e}")
+                        self.pool.discard(conn)
+
+    def _replace_connection(self, conn):
+        """Close ``conn`` and swap a fresh connection in for it."""
+        self.health.forget(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        new_conn = self._create_connection()
+        self.health.checked_in(new_conn)
+        with self.lock:
+            if conn in self.all_connections:
+                self.all_connections[self.all_connections.index(conn)] = new_conn
+            else:
+                self.all_connections.append(new_conn)
+        return new_conn
     
     def close_all(self):
         """Close all connections in the pool"""
+        self.pool.reset()
         with self.lock:
             for conn in self.all_connections:
                 try:
@@ -1243,41 +1625,81 @@ class DatabaseConnectionPool:
                     logger.error(f"Error closing connection: {e}")
             self.all_connections.clear()
             logger.info("Closed all database connections")
+
+    def stats(self):
+        """Pool sizing counters plus checkout wait/hold metrics."""
+        return {**self.pool.stats(), **self.metrics.snapshot()}
+
+
 # PostgreSQL connection pool class
 class PostgreSQLConnectionPool:
     """Thread-safe connection pool for PostgreSQL"""
     
-    def __init__(self, database_url, pool_size=POOL_SIZE):
-        from psycopg2.pool import ThreadedConnectionPool
-        import threading
+    def __init__(self, database_url, pool_size=POOL_SIZE, min_size=POOL_MIN_SIZE,
+                 idle_timeout=POOL_IDLE_TIMEOUT):
+        import psycopg2
         self.database_url = database_url
         self.pool_size = pool_size
         self.lock = threading.Lock()
         self.all_connections = []
+        self.health = _ConnectionHealth()
+        self.metrics = _PoolMetrics()
+        self._connect = psycopg2.connect
         try:
-            self.pool = ThreadedConnectionPool(1, pool_size, database_url)
+            self.pool = _PooledSlots(self._open_pooled, self._close_pooled, min_size=max(1, min_size),
+                                     max_size=pool_size, idle_timeout=idle_timeout)
+            self.pool.fill()
             logger.info(f"Initialized PostgreSQL connection pool with {pool_size} max connections")
         except Exception as e:
             logger.error(f"Failed to create PostgreSQL connection pool: {e}")
             raise DatabaseError(f"Failed to initialize PostgreSQL pool: {e}")
+
+    def _open_pooled(self):
+        conn = self._connect(self.database_url)
+        self.health.checked_in(conn)
+        with self.lock:
+            self.all_connections.append(conn)
+        return conn
+
+    def _close_pooled(self, conn):
+        self.health.forget(conn)
+        with self.lock:
+            if conn in self.all_connections:
+                self.all_connections.remove(conn)
+        if not conn.closed:
+            conn.close()
     
     @contextmanager
-    def get_connection(self, timeout=CONNECTION_TIMEOUT):
-        """Get a connection from the pool (context manager)"""
-        from psycopg2.pool import PoolError
+    def get_connection(self, timeout=CONNECTION_TIMEOUT, call_site=None):
+        """
+        Get a connection from the pool (context manager).
+
+        Inside a connection_scope() the scope's connection is reused instead
+        of checking out another one. Connections are only pinged before use
+        when they have been idle or their last use raised a database error.
+        Wait and hold times are recorded against ``call_site`` (by default
+        the calling function).
+        """
+        import psycopg2
+
+        shared = _scoped_connection(self)
+        if shared is not None:
+            yield shared
+            return
 
         if timeout is None:
             timeout = CONNECTION_TIMEOUT
 
+        call_site = call_site or _checkout_call_site()
         conn = None
         proxy = None
         start_time = time.time()
+        requested_at = time.monotonic()
 
         while True:
             try:
-                conn = self.pool.getconn()
-                if conn is None:
-                    raise DatabaseError("Failed to get connection from PostgreSQL pool")
+                remaining = max(0.0, timeout - (time.time() - start_time))
+                conn = self.pool.get(timeout=remaining)
 
                 # Align transaction behavior with SQLite autocommit mode
                 if hasattr(conn, "autocommit") and not conn.autocommit:
@@ -1286,31 +1708,25 @@ class PostgreSQLConnectionPool:
                 proxy = _PostgresConnectionWrapper(conn)
 
                 # Test connection viability
-                cursor = proxy.cursor()
-                try:
-                    cursor.execute("SELECT 1")
-                    cursor.fetchone()
-                finally:
-                    try:
-                        cursor.close()
-                    except Exception:
-                        pass
-                break
-            except PoolError as pool_error:
-                if timeout > 0 and (time.time() - start_time) < timeout:
-                    time.sleep(0.1)
-                    continue
-                logger.error(f"PostgreSQL connection pool exhausted: {pool_error}")
-                raise DatabaseError(f"PostgreSQL connection failed: {pool_error}")
-            except Exception as e:
-                if conn:
+                if conn.closed:
+                    raise DatabaseError("Pooled PostgreSQL connection is closed")
+                if self.health.needs_check(conn):
+                    cursor = proxy.cursor()
                     try:
-                        self.pool.putconn(conn, close=True)
-                    except Exception:
+                        cursor.execute("SELECT 1")
+                        cursor.fetchone()
+                    finally:
                         try:
-                            conn.close()
+                            cursor.close()
                         except Exception:
                             pass
+                break
+            except Empty:
+                logger.error("PostgreSQL connection pool exhausted - consider raising POOL_SIZE")
+                raise DatabaseError("PostgreSQL connection failed: connection pool exhausted")
+            except Exception as e:
+                if conn:
+                    self.pool.discard(conn)
                     conn = None
 
                 if timeout > 0 and (time.time() - start_time) < timeout:
@@ -1323,32 +1739,36 @@ class PostgreSQLConnectionPool:
         if proxy is None:
             proxy = _PostgresConnectionWrapper(conn)
 
+        failed = False
+        checked_out_at = time.monotonic()
         try:
             yield proxy
+        except psycopg2.Error:
+            failed = True
+            raise
         finally:
             raw_conn = proxy._connection if proxy else conn
             if raw_conn:
-                try:
-                    self.pool.putconn(raw_conn)
-                except Exception as e:
-                    logger.error(f"Error returning connection to pool: {e}")
-                    try:
-                        self.pool.putconn(raw_conn, close=True)
-                    except Exception:
-                        try:
-                            raw_conn.close()
-                        except Exception:
-                            pass
+                self.metrics.record(call_site, checked_out_at - requested_at, time.monotonic() - checked_out_at)
+                self.health.checked_in(raw_conn, failed=failed)
+                if raw_conn.closed:
+                    self.pool.discard(raw_conn)
+                else:
+                    self.pool.put(raw_conn)
     
     def close_all(self):
         """Close all connections in the pool"""
         if hasattr(self, 'pool') and self.pool:
             try:
-                self.pool.closeall()
+                self.pool.close_all()
                 logger.info("Closed all PostgreSQL connections")
             except Exception as e:
                 logger.error(f"Error closing PostgreSQL pool: {e}")
 
+    def stats(self):
+        """Pool sizing counters plus checkout wait/hold metrics."""
+        return {**self.pool.stats(), **self.metrics.snapshot()}
+
 
 # Global connection pool
 _connection_pool = None
@@ -1361,7 +1781,7 @@ def get_pool():
         if USE_POSTGRES:
             # PostgreSQL support - create PostgreSQL pool
             try:
-                from psycopg2.pool import ThreadedConnectionPool
+                import psycopg2  # noqa: F401
                 _connection_pool = PostgreSQLConnectionPool(DATABASE_URL)
                 logger.info("✅ Using PostgreSQL - user data will persist across deployments")
             except Exception as e:
@@ -1375,6 +1795,39 @@ def get_pool():
             _connection_pool = DatabaseConnectionPool(DB_FILE)
     return _connection_pool
 
+@contextmanager
+def connection_scope(call_site=None):
+    """
+    Share one pooled connection across every database call in the block.
+
+    Nested ``get_pool().get_connection()`` calls on this thread (including
+    those made by other db_enhanced functions) join the scope's connection
+    instead of checking out their own. Nested scopes join the outermost one.
+    Transactions are not implied: each function still commits its own work.
+    """
+    if _connection_scope.get() is not None:
+        yield _connection_scope.get()[1]
+        return
+    pool = get_pool()
+    with pool.get_connection(call_site=call_site) as conn:
+        token = _connection_scope.set((pool, conn))
+        try:
+            yield conn
+        finally:
+            _connection_scope.reset(token)
+
+
+def unit_of_work(func):
+    """Decorator running ``func`` and all the db calls it makes on one pooled connection."""
+    call_site = f"{func.__module__}.{func.__name__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with connection_scope(call_site=call_site):
+            return func(*args, **kwargs)
+    return wrapper
+
+
 def maintain_database():
     """Perform database maintenance to prevent locking issues"""
     try:
@@ -1401,11 +1854,14 @@ def get_pool_status():
     """Get current pool status for monitoring"""
     try:
         pool = get_pool()
+        stats = pool.stats()
         return {
+            "backend": "postgresql" if isinstance(pool, PostgreSQLConnectionPool) else "sqlite",
             "pool_size": pool.pool_size,
-            "available_connections": pool.pool.qsize(),
-            "total_connections": len(pool.all_connections),
-            "pool_utilization": f"{((pool.pool_size - pool.pool.qsize()) / pool.pool_size) * 100:.1f}%"
+            "available_connections": stats["idle_connections"],
+            "total_connections": stats["open_connections"],
+            "pool_utilization": f"{(stats['in_use_connections'] / pool.pool_size) * 100:.1f}%",
+            **stats,
         }
     except Exception as e:
         logger.error(f"Failed to get pool status: {e}")
@@ -1418,24 +1874,20 @@ def cleanup_old_connections():
         if USE_POSTGRES and isinstance(pool, PostgreSQLConnectionPool):
             logger.info("Skipping SQLite-style connection cleanup for PostgreSQL pool")
             return
-        with pool.lock:
-            # Test all connections and remove bad ones
-            good_connections = []
-            for conn in pool.all_connections:
-                try:
-                    conn.execute("SELECT 1").fetchone()
-                    good_connections.append(conn)
-                except Exception:
-                    conn.close()
-                    logger.warning("Removed bad connection from pool")
-            
-            # Rebuild the pool with good connections
-            pool.all_connections = good_connections
-            pool.pool = Queue(maxsize=pool.pool_size)
-            for conn in good_connections:
+        # Test idle connections and drop bad ones; checked-out ones are left alone
+        good_connections = 0
+        for conn in pool.pool.drain_idle():
+            try:
+                conn.execute("SELECT 1").fetchone()
                 pool.pool.put(conn)
-            
-            logger.info(f"Cleaned up connection pool, {len(good_connections)} connections remaining")
+                good_connections += 1
+            except Exception:
+                pool.pool.discard(conn)
+                logger.warning("Removed bad connection from pool")
+        # Reopen up to the configured minimum
+        pool.pool.fill()
+
+        logger.info(f"Cleaned up connection pool, {good_connections} idle connections passed checks")
     except Exception as e:
         logger.error(f"Connection cleanup failed: {e}")
 
@@ -1517,6 +1969,10 @@ def retry_db_operation(operation_func, max_retries=5, base_delay=0.1):
     return None
 
 
+# Replaced by idx_listings_user_created / idx_analytics_keyword_listing
+_SUPERSEDED_INDEXES = ("idx_listings_user_id", "idx_analytics_keyword")
+
+
 @log_errors()
 def init_db():
     """Initialize database with all required tables and indexes"""
@@ -2046,6 +2502,71 @@ def init_db():
                 ON feed_events (created_at DESC)
             """)
 
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS notification_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    channel TEXT NOT NULL,
+                    recipient TEXT NOT NULL,
+                    subject TEXT,
+                    body TEXT NOT NULL,
+                    link TEXT,
+                    listing_id INTEGER,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    claimed_at DATETIME,
+                    last_error TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    sent_at DATETIME
+                )
+            """)
+
+            c.execute("""
+                CREATE INDEX IF NOT EXISTS idx_notification_outbox_due
+                ON notification_outbox (status, next_attempt_at, id)
+            """)
+
+            c.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_notification_outbox_listing
+                ON notification_outbox (listing_id, username, channel)
+            """)
+
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS worker_checkpoints (
+                    name TEXT PRIMARY KEY,
+                    last_id INTEGER NOT NULL DEFAULT 0,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            # Per-user daily listing rollup behind the analytics endpoints;
+            # keyword '' is the all-listings row
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS listing_daily_stats (
+                    user_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    keyword TEXT NOT NULL,
+                    listing_count INTEGER NOT NULL DEFAULT 0,
+                    price_count INTEGER NOT NULL DEFAULT 0,
+                    price_sum REAL NOT NULL DEFAULT 0,
+                    price_min INTEGER,
+                    price_max INTEGER,
+                    price_sketch TEXT,
+                    hour_counts TEXT,
+                    PRIMARY KEY (user_id, day, source, keyword)
+                )
+            """)
+
+            # Listings already folded into listing_daily_stats within the
+            # late-commit window re-read below its checkpoint
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS listing_daily_stats_folded (
+                    listing_id INTEGER PRIMARY KEY
+                )
+            """)
+
             c.execute("""
                 CREATE TABLE IF NOT EXISTS moderation_actions (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -2695,9 +3216,17 @@ def init_db():
                     notify_new BOOLEAN DEFAULT 1,
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                     last_run DATETIME,
+                    last_listing_id INTEGER,
                     FOREIGN KEY (username) REFERENCES users (username) ON DELETE CASCADE
                 )
             """)
+
+            try:
+                c.execute("ALTER TABLE saved_searches ADD COLUMN last_listing_id INTEGER")
+                logger.info("Added last_listing_id column to saved_searches table")
+            except Exception as e:
+                if not _ignore_duplicate_schema_error(conn, e):
+                    raise
             
             # Price alerts
             c.execute("""
@@ -2788,14 +3317,17 @@ def init_db():
                 "CREATE INDEX IF NOT EXISTS idx_listings_created_at ON listings(created_at)",
                 "CREATE INDEX IF NOT EXISTS idx_listings_source ON listings(source)",
                 "CREATE INDEX IF NOT EXISTS idx_listings_price ON listings(price)",
-                "CREATE INDEX IF NOT EXISTS idx_listings_user_id ON listings(user_id)",
+                # Analytics access paths: per-user time windows, optionally by
+                # source, answered from the index alone (price is covered too)
+                "CREATE INDEX IF NOT EXISTS idx_listings_user_created ON listings(user_id, created_at, source, price)",
                 "CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)",
                 "CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)",
                 "CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)",
                 "CREATE INDEX IF NOT EXISTS idx_activity_username ON user_activity(username)",
                 "CREATE INDEX IF NOT EXISTS idx_activity_timestamp ON user_activity(timestamp)",
                 "CREATE INDEX IF NOT EXISTS idx_activity_action ON user_activity(action)",
-                "CREATE INDEX IF NOT EXISTS idx_analytics_keyword ON listing_analytics(keyword)",
+                "CREATE INDEX IF NOT EXISTS idx_analytics_keyword_listing ON listing_analytics(keyword, listing_id)",
+                "CREATE INDEX IF NOT EXISTS idx_analytics_listing ON listing_analytics(listing_id, keyword, source)",
                 "CREATE INDEX IF NOT EXISTS idx_analytics_date ON listing_analytics(created_at)",
                 "CREATE INDEX IF NOT EXISTS idx_trends_date ON keyword_trends(date)",
                 "CREATE INDEX IF NOT EXISTS idx_trends_keyword ON keyword_trends(keyword)",
@@ -2827,6 +3359,12 @@ def init_db():
             for index_sql in indexes:
                 c.execute(index_sql)
 
+            # Single-column indexes that are prefixes of the composites above
+            for index_name in _SUPERSEDED_INDEXES:
+                c.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+            _ensure_listing_search_index(conn, c)
+
             conn.commit()
             logger.info("Database initialized successfully with all tables and indexes")
             return True
@@ -5171,6 +5709,7 @@ def remove_channel_message_reaction(message_id: int, username: str, reaction_typ
 
     return get_channel_message_reactions(message_id, username)
 @log_errors()
+@unit_of_work
 def create_channel_message(channel_id: int, sender_id: str, body: str,
                             message_type: str = "text", rich_content: Optional[Dict[str, Any]] = None,
                             attachments: Optional[Sequence[Dict[str, Any]]] = None,
@@ -8847,14 +9386,20 @@ def get_server_by_slug(slug: str,
                        include_roles: bool = False) -> Optional[Dict[str, Any]]:
     with get_pool().get_connection() as conn:
         c = conn.cursor()
-        c.execute("""
-            SELECT id, owner_username, name, slug, description, topic_tags, visibility, icon_url, banner_url, settings, created_at, updated_at
-            FROM servers
-            WHERE slug = ?
-        """, (slug,))
-        row = c.fetchone()
-        if not row:
-            return None
+
+        # Only found servers are cached so a freshly created slug resolves at once
+        cache_key = f"db:server:{slug}"
+        row = get_cache().get(cache_key)
+        if row is None:
+            c.execute("""
+                SELECT id, owner_username, name, slug, description, topic_tags, visibility, icon_url, banner_url, settings, created_at, updated_at
+                FROM servers
+                WHERE slug = ?
+            """, (slug,))
+            row = c.fetchone()
+            if not row:
+                return None
+            get_cache().set(cache_key, tuple(row), HOT_READ_CACHE_TTL, (_SERVERS_CACHE_TAG,))
         return _compose_server_payload(c, row, viewer_username, include_channels, include_roles)
 
 
@@ -8987,6 +9532,7 @@ def _persist_server_settings(server_id: int, settings: Dict[str, Any]) -> None:
         if c.rowcount == 0:
             raise ValueError("Server not found")
         conn.commit()
+        get_cache().invalidate_tag(_SERVERS_CACHE_TAG)
 
 
 def _normalize_keyword_filter_entry(entry: Any) -> Optional[Dict[str, Any]]:
@@ -9677,6 +10223,8 @@ def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
         WHERE username = ?
     """
 
+    # Not cached: the password hash, role and active flag must never be served
+    # stale by a worker that missed a reset, demotion or deactivation
     with get_pool().get_connection() as conn:
         c = conn.cursor()
         c.execute(_prepare_sql(query), (username,))
@@ -9802,7 +10350,9 @@ def create_user_db(username: str,
                 tos_at,
             ))
         conn.commit()
+        _invalidate_user_cache(username)
 
+    _invalidate_listing_match_index(username)
     created = get_user_by_username(username)
     return created or {}
 
@@ -9836,6 +10386,7 @@ def update_user_login(username):
             WHERE username = ?
         """, (datetime.now(), username))
         conn.commit()
+        _invalidate_user_cache(username)
 
 
 @log_errors()
@@ -9858,6 +10409,7 @@ def _update_user_login_and_log_activity_sync(username, ip_address=None, user_age
             """, (username, 'login', 'User logged in', ip_address, user_agent, datetime.now()))
             
             conn.commit()
+            _invalidate_user_cache(username)
         except Exception as e:
             conn.rollback()
             raise e
@@ -9896,6 +10448,7 @@ def record_tos_agreement(username):
                 WHERE username = ?
             """, (True, datetime.now(), username))
             conn.commit()
+            _invalidate_user_cache(username)
             logger.info(f"ToS agreement recorded for user: {username}")
             return True
     except Exception as e:
@@ -9969,6 +10522,7 @@ def update_user_role(username, role):
         c = conn.cursor()
         c.execute("UPDATE users SET role = ? WHERE username = ?", (role, username))
         conn.commit()
+        _invalidate_user_cache(username)
         logger.info(f"Updated role for user {username} to {role}")
 
 
@@ -9979,6 +10533,7 @@ def deactivate_user(username):
         c = conn.cursor()
         c.execute("UPDATE users SET active = 0 WHERE username = ?", (username,))
         conn.commit()
+        _invalidate_user_cache(username)
         logger.info(f"Deactivated user: {username}")
 
 
@@ -10395,6 +10950,8 @@ def update_notification_preferences(username, email_notifications=None, sms_noti
             query = f"UPDATE users SET {', '.join(updates)} WHERE username = ?"
             c.execute(query, params)
             conn.commit()
+            _invalidate_user_cache(username)
+            _invalidate_listing_match_index(username)
             logger.info(f"Updated notification preferences for user {username}")
         else:
             logger.warning(f"No notification preferences to update for user {username}")
@@ -10433,30 +10990,35 @@ def get_users_with_notifications_enabled():
 @log_errors()
 def get_settings(username=None):
     """Get settings for a specific user, or global settings if username is None"""
-    with get_pool().get_connection() as conn:
-        c = conn.cursor()
-        if username:
-            c.execute("SELECT key, value FROM settings WHERE username = ?", (username,))
-        else:
-            c.execute("SELECT key, value FROM settings WHERE username IS NULL")
-        settings = dict(c.fetchall())
+    def _load_rows():
+        with get_pool().get_connection() as conn:
+            c = conn.cursor()
+            if username:
+                c.execute("SELECT key, value FROM settings WHERE username = ?", (username,))
+            else:
+                c.execute("SELECT key, value FROM settings WHERE username IS NULL")
+            return tuple(tuple(row) for row in c.fetchall())
 
-        # Automatically align refresh interval with subscription tier
-        try:
-            from subscriptions import SubscriptionManager  # Imported lazily to avoid circular deps
+    tag = user_cache_tag(username) if username else _GLOBAL_SETTINGS_CACHE_TAG
+    settings = dict(get_cache().get_or_set(f"db:settings:{username or ''}", _load_rows,
+                                           HOT_READ_CACHE_TTL, (tag,)))
 
-            tier = 'free'
-            if username:
-                subscription = get_user_subscription(username)
-                tier = subscription.get('tier', 'free')
+    # Automatically align refresh interval with subscription tier
+    try:
+        from subscriptions import SubscriptionManager  # Imported lazily to avoid circular deps
 
-            interval_seconds = max(1, SubscriptionManager.get_refresh_interval(tier))
-            settings['interval'] = str(interval_seconds)
-        except Exception as e:
-            logger.warning(f"Failed to apply subscription interval for {username or 'global'} settings: {e}")
-            settings.setdefault('interval', '60')
+        tier = 'free'
+        if username:
+            subscription = get_user_subscription(username)
+            tier = subscription.get('tier', 'free')
+
+        interval_seconds = max(1, SubscriptionManager.get_refresh_interval(tier))
+        settings['interval'] = str(interval_seconds)
+    except Exception as e:
+        logger.warning(f"Failed to apply subscription interval for {username or 'global'} settings: {e}")
+        settings.setdefault('interval', '60')
 
-        return settings
+    return settings
 @log_errors()
 def update_setting(key, value, username=None):
     """Update setting for a specific user, or global setting if username is None"""
@@ -10486,6 +11048,8 @@ def update_setting(key, value, username=None):
             VALUES (?, ?, ?, ?)
         """, (username, key, value, datetime.now()))
         conn.commit()
+        _invalidate_user_cache(username)
+    _invalidate_listing_match_index(username)
 # ======================
 # USER ACTIVITY LOGGING
 # ======================
@@ -11259,6 +11823,8 @@ def purge_user_data(username: str) -> None:
         c.execute("DELETE FROM users WHERE username = ?", (username,))
 
         conn.commit()
+        _invalidate_user_cache(username)
+        get_cache().invalidate_tag(_SERVERS_CACHE_TAG)
 
 
 @log_errors()
@@ -11576,14 +12142,17 @@ def check_rate_limit(username, endpoint, max_requests=60, window_minutes=1):
 
 
 @log_errors()
-def reset_rate_limit(username: str, endpoint: str) -> bool:
-    """Reset rate limiting counters for a specific user/endpoint pair."""
+def reset_rate_limit(username: str, endpoint: Optional[str] = None) -> bool:
+    """Reset rate limiting counters for a user, optionally only for one endpoint."""
     with get_pool().get_connection() as conn:
         c = conn.cursor()
-        c.execute("""
-            DELETE FROM rate_limits
-            WHERE username = ? AND endpoint = ?
-        """, (username, endpoint))
+        if endpoint is None:
+            c.execute("DELETE FROM rate_limits WHERE username = ?", (username,))
+        else:
+            c.execute("""
+                DELETE FROM rate_limits
+                WHERE username = ? AND endpoint = ?
+            """, (username, endpoint))
         deleted = c.rowcount > 0
         conn.commit()
     return deleted
@@ -12076,8 +12645,25 @@ def record_slow_mode_violation(
     )
 
 
-@log_errors()
-def log_feed_event(
+_FEED_EVENT_INSERT_SQL = """
+    INSERT INTO feed_events (
+        event_type,
+        actor_username,
+        entity_type,
+        entity_id,
+        server_slug,
+        target_username,
+        audience_type,
+        audience_id,
+        payload,
+        score,
+        created_at
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _build_feed_event_values(
     event_type: str,
     *,
     actor_username: Optional[str] = None,
@@ -12090,7 +12676,8 @@ def log_feed_event(
     payload: Optional[Dict[str, Any]] = None,
     score: Optional[float] = None,
     created_at: Optional[datetime] = None,
-) -> Dict[str, Any]:
+) -> Tuple[Any, ...]:
+    """Normalize feed event fields into a row matching _FEED_EVENT_INSERT_SQL."""
     normalized_event_type = (event_type or "").strip() or "generic"
     normalized_audience = (audience_type or "global").lower()
     if normalized_audience not in FEED_AUDIENCE_TYPES:
@@ -12123,58 +12710,57 @@ def log_feed_event(
     except (TypeError, ValueError):
         score_value = base_score
 
-    with get_pool().get_connection() as conn:
-        c = conn.cursor()
-        c.execute(
-            """
-            INSERT INTO feed_events (
-                event_type,
-                actor_username,
-                entity_type,
-                entity_id,
-                server_slug,
-                target_username,
-                audience_type,
-                audience_id,
-                payload,
-                score,
-                created_at
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-            (
-                normalized_event_type,
-                actor_value,
-                entity_type_value,
-                entity_id_value,
-                server_slug_value,
-                target_username_value,
-                normalized_audience,
-                audience_id_value,
-                payload_json,
-                score_value,
-                timestamp,
-            ),
-        )
+    return (
+        normalized_event_type,
+        actor_value,
+        entity_type_value,
+        entity_id_value,
+        server_slug_value,
+        target_username_value,
+        normalized_audience,
+        audience_id_value,
+        payload_json,
+        score_value,
+        timestamp,
+    )
+
+
+@log_errors()
+def log_feed_event(
+    event_type: str,
+    *,
+    actor_username: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[str] = None,
+    server_slug: Optional[str] = None,
+    target_username: Optional[str] = None,
+    audience_type: str = "global",
+    audience_id: Optional[str] = None,
+    payload: Optional[Dict[str, Any]] = None,
+    score: Optional[float] = None,
+    created_at: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    values = _build_feed_event_values(
+        event_type,
+        actor_username=actor_username,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        server_slug=server_slug,
+        target_username=target_username,
+        audience_type=audience_type,
+        audience_id=audience_id,
+        payload=payload,
+        score=score,
+        created_at=created_at,
+    )
+
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute(_FEED_EVENT_INSERT_SQL, values)
         event_id = c.lastrowid
         conn.commit()
 
-    return _serialize_feed_event_row(
-        (
-            event_id,
-            normalized_event_type,
-            actor_value,
-            entity_type_value,
-            entity_id_value,
-            server_slug_value,
-            target_username_value,
-            normalized_audience,
-            audience_id_value,
-            payload_json,
-            score_value,
-            timestamp,
-        )
-    )
+    return _serialize_feed_event_row((event_id,) + values)
 
 
 @log_errors()
@@ -13136,6 +13722,383 @@ def increment_listing_premium_click(listing_id: int) -> None:
                 VALUES (?, 0, 1, ?)
             """, (listing_id, datetime.now()))
         conn.commit()
+
+
+# Max bound parameters per IN (...) / multi-row VALUES chunk
+_LISTING_BATCH_CHUNK = 200
+
+_LISTING_ANALYTICS_INSERT_SQL = """
+    INSERT INTO listing_analytics (listing_id, keyword, category, price_range, source, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# Keywords tracked in listing_analytics / keyword_trends for listings whose
+# user has no keywords configured
+_ANALYTICS_CAR_KEYWORDS = ['firebird', 'camaro', 'corvette', 'mustang', 'charger', 'challenger',
+                           'trans am', 'gto', 'nova', 'chevelle', 'impala', 'monte carlo']
+_ANALYTICS_CLASSIC_KEYWORDS = frozenset(['firebird', 'camaro', 'corvette', 'trans am', 'gto', 'nova',
+                                         'chevelle', 'impala', 'monte carlo'])
+# Per-user keyword sets are reloaded after this long to pick up other processes' changes
+_ANALYTICS_KEYWORDS_TTL = 300
+_analytics_keywords_cache: Dict[str, Tuple[float, Tuple[str, ...]]] = {}
+_analytics_keywords_lock = threading.Lock()
+
+
+def _listing_price_range(price) -> str:
+    """Bucket a price into the listing_analytics price ranges (inclusive boundaries)."""
+    if price <= 5000:
+        return "Under $5K"
+    if price <= 10000:
+        return "$5K-$10K"
+    if price <= 20000:
+        return "$10K-$20K"
+    if price <= 30000:
+        return "$20K-$30K"
+    return "Over $30K"
+
+
+def _analytics_keywords_for_users(user_ids: Iterable[Optional[str]]) -> Dict[Optional[str], Tuple[str, ...]]:
+    """Resolve the configured keyword set of each user, loading uncached users in one query."""
+    now = time.monotonic()
+    resolved: Dict[Optional[str], Tuple[str, ...]] = {}
+    missing = []
+    with _analytics_keywords_lock:
+        for user_id in set(user_ids):
+            cached = _analytics_keywords_cache.get(user_id) if user_id else None
+            if cached and now - cached[0] < _ANALYTICS_KEYWORDS_TTL:
+                resolved[user_id] = cached[1]
+            elif user_id:
+                missing.append(user_id)
+            else:
+                resolved[user_id] = ()
+
+    if missing:
+        loaded: Dict[str, Any] = {}
+        try:
+            with get_pool().get_connection() as conn:
+                c = conn.cursor()
+                for i in range(0, len(missing), _LISTING_BATCH_CHUNK):
+                    chunk = missing[i:i + _LISTING_BATCH_CHUNK]
+                    placeholders = ", ".join("?" for _ in chunk)
+                    c.execute(
+                        f"SELECT username, value FROM settings WHERE key = 'keywords' AND username IN ({placeholders})",
+                        chunk,
+                    )
+                    loaded.update(dict(c.fetchall()))
+        except Exception as e:
+            logger.warning(f"Could not load analytics keywords: {e}")
+        with _analytics_keywords_lock:
+            for user_id in missing:
+                keywords = normalize_keywords(loaded.get(user_id))
+                _analytics_keywords_cache[user_id] = (now, keywords)
+                resolved[user_id] = keywords
+    return resolved
+
+
+def _invalidate_analytics_keywords(username) -> None:
+    with _analytics_keywords_lock:
+        _analytics_keywords_cache.pop(username, None)
+
+
+def _listing_analytics_rows(title, price, keywords=()) -> List[Tuple[str, str, str]]:
+    """
+    Return (keyword, category, price_range) rows for a newly saved listing.
+
+    ``keywords`` is the listing owner's configured keyword set; without one
+    the default car keyword list is used.
+    """
+    if not title or price is None:
+        return []
+    matched = get_keyword_matcher(keywords or _ANALYTICS_CAR_KEYWORDS).find(title)
+    if not matched:
+        return []
+    price_range = _listing_price_range(price)
+    if any(k in _ANALYTICS_CLASSIC_KEYWORDS for k in matched):
+        category = "Classic Cars"
+    elif keywords:
+        category = "Other"
+    else:
+        category = "Modern Cars"
+    return [(keyword, category, price_range) for keyword in matched]
+
+
+# ======================
+# NOTIFICATION OUTBOX
+# ======================
+# New-listing notifications are written to notification_outbox (in the same
+# transaction as the listing for batch ingestion) and delivered by the
+# notification_worker pool, so scraper threads never wait on SMTP/Twilio.
+
+_OUTBOX_COLUMNS = "id, username, channel, recipient, subject, body, link, listing_id, attempts, created_at"
+
+_OUTBOX_INSERT_SQL = """
+    INSERT INTO notification_outbox
+        (username, channel, recipient, subject, body, link, listing_id, status, attempts, next_attempt_at, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', 0, ?, ?)
+    ON CONFLICT DO NOTHING
+"""
+
+
+def _serialize_outbox_row(row) -> Dict[str, Any]:
+    return {
+        'id': row[0],
+        'username': row[1],
+        'channel': row[2],
+        'recipient': row[3],
+        'subject': row[4],
+        'body': row[5],
+        'link': row[6],
+        'listing_id': row[7],
+        'attempts': row[8],
+        'created_at': _to_datetime_string(row[9]),
+    }
+
+
+def _listing_outbox_rows(listing_id, title, price, link, source, users, now=None) -> List[Tuple[Any, ...]]:
+    """Build notification_outbox rows (one per user and enabled channel) for a new listing."""
+    # Import here to avoid circular imports
+    from notifications import format_listing_notification
+
+    now = now or datetime.now()
+    content = format_listing_notification(title, price, link, source or 'unknown')
+    rows = []
+    for user in users:
+        if user.get('email_notifications') and user.get('email'):
+            rows.append((user['username'], 'email', user['email'], content['email_subject'],
+                         content['email_body'], link, listing_id, now, now))
+        if user.get('sms_notifications') and user.get('phone_number'):
+            rows.append((user['username'], 'sms', user['phone_number'], None,
+                         content['sms'], link, listing_id, now, now))
+    return rows
+
+
+def _listing_notification_targets(title, price, source) -> List[Dict[str, Any]]:
+    """Users whose settings, saved searches or price alerts match a listing."""
+    # Import here to avoid circular imports
+    from match_index import get_match_index
+    return get_match_index().match_users(title, price, source)
+
+
+def _invalidate_listing_match_index(username) -> None:
+    """Reload a user's match-index subscriptions after their preferences change."""
+    _invalidate_analytics_keywords(username)
+    try:
+        from match_index import invalidate_user
+        invalidate_user(username)
+    except Exception as e:
+        logger.debug(f"Could not invalidate listing match index for {username}: {e}")
+
+
+def _publish_ingested_listings(listings) -> None:
+    """Wake the price alert stream once listings are committed."""
+    try:
+        # Import here to avoid circular imports
+        from price_alert_stream import publish_ingested_listings
+        publish_ingested_listings(listings)
+    except Exception as e:
+        logger.debug(f"Could not publish ingested listings to the price alert stream: {e}")
+
+
+def _notify_users_of_new_listing(listing_id, title, price, link, source, users=None):
+    """Queue new-listing notifications for the users the listing matches."""
+    try:
+        if users is None:
+            users = _listing_notification_targets(title, price, source)
+        rows = _listing_outbox_rows(listing_id, title, price, link, source, users)
+        if not rows:
+            return
+        with get_pool().get_connection() as conn:
+            c = conn.cursor()
+            c.executemany(_OUTBOX_INSERT_SQL, rows)
+            conn.commit()
+        logger.debug(f"Queued {len(rows)} notifications for listing {listing_id}")
+    except Exception as e:
+        logger.error(f"Error queueing notifications for listing {listing_id}: {e}")
+        # Don't fail the listing save if notifications fail
+
+
+@log_errors()
+def enqueue_listing_notification(username, listing) -> int:
+    """
+    Queue one listing notification for a single user on their enabled channels.
+
+    Returns:
+        Number of rows queued (0 if the user was already notified about it)
+    """
+    prefs = get_notification_preferences(username)
+    if not prefs:
+        return 0
+    rows = _listing_outbox_rows(
+        listing.get('id'), listing.get('title'), listing.get('price'), listing.get('link'),
+        listing.get('source'), [dict(prefs, username=username)]
+    )
+    if not rows:
+        return 0
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.executemany(_OUTBOX_INSERT_SQL, rows)
+        conn.commit()
+        return max(c.rowcount or 0, 0)
+
+
+@log_errors()
+def enqueue_notifications(notifications) -> int:
+    """
+    Add notifications to the outbox for background delivery.
+
+    Args:
+        notifications: Iterable of dicts with ``channel`` ('email' or 'sms'),
+            ``recipient`` and ``body`` plus optional ``username``, ``subject``,
+            ``link`` and ``listing_id``
+
+    Returns:
+        Number of rows queued (duplicates for the same listing/user/channel
+        are ignored)
+    """
+    now = datetime.now()
+    rows = [
+        (n.get('username'), n['channel'], n['recipient'], n.get('subject'), n['body'],
+         n.get('link'), n.get('listing_id'), now, now)
+        for n in notifications or []
+        if n.get('recipient') and n.get('body')
+    ]
+    if not rows:
+        return 0
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.executemany(_OUTBOX_INSERT_SQL, rows)
+        conn.commit()
+        return max(c.rowcount or 0, 0)
+
+
+@log_errors()
+def claim_notification_batch(channel, limit=50) -> List[Dict[str, Any]]:
+    """
+    Claim up to ``limit`` due outbox rows for one channel.
+
+    Claimed rows move to ``sending`` and their attempt counter is bumped, so
+    concurrent workers (threads or processes) never receive the same row.
+    """
+    now = datetime.now()
+    with get_pool().get_connection() as conn:
+        try:
+            if USE_POSTGRES:
+                conn.execute("BEGIN")
+                c = conn.cursor()
+                c.execute(f"""
+                    UPDATE notification_outbox
+                    SET status = 'sending', claimed_at = ?, attempts = attempts + 1
+                    WHERE id IN (
+                        SELECT id FROM notification_outbox
+                        WHERE status = 'pending' AND channel = ? AND next_attempt_at <= ?
+                        ORDER BY next_attempt_at, id
+                        LIMIT ?
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING {_OUTBOX_COLUMNS}
+                """, (now, channel, now, limit))
+                rows = sorted(c.fetchall(), key=lambda row: row[0])
+            else:
+                conn.execute("BEGIN IMMEDIATE")
+                c = conn.cursor()
+                c.execute(f"""
+                    SELECT {_OUTBOX_COLUMNS} FROM notification_outbox
+                    WHERE status = 'pending' AND channel = ? AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at, id
+                    LIMIT ?
+                """, (channel, now, limit))
+                rows = c.fetchall()
+                if rows:
+                    placeholders = ", ".join("?" for _ in rows)
+                    c.execute(f"""
+                        UPDATE notification_outbox
+                        SET status = 'sending', claimed_at = ?, attempts = attempts + 1
+                        WHERE id IN ({placeholders})
+                    """, [now] + [row[0] for row in rows])
+                    rows = [row[:8] + (row[8] + 1,) + row[9:] for row in rows]
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+    return [_serialize_outbox_row(row) for row in rows]
+
+
+@log_errors()
+def mark_notifications_sent(notification_ids) -> None:
+    """Mark claimed outbox rows as delivered."""
+    ids = list(notification_ids or [])
+    if not ids:
+        return
+    now = datetime.now()
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.executemany("""
+            UPDATE notification_outbox
+            SET status = 'sent', sent_at = ?, last_error = NULL
+            WHERE id = ?
+        """, [(now, notification_id) for notification_id in ids])
+        conn.commit()
+
+
+@log_errors()
+def mark_notification_failed(notification_id, error, retry_at=None) -> None:
+    """
+    Record a failed delivery attempt.
+
+    Args:
+        notification_id: Outbox row id
+        error: Error description stored in ``last_error``
+        retry_at: When to try again; None marks the row permanently failed
+    """
+    status = 'pending' if retry_at is not None else 'failed'
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            UPDATE notification_outbox
+            SET status = ?, next_attempt_at = COALESCE(?, next_attempt_at), claimed_at = NULL, last_error = ?
+            WHERE id = ?
+        """, (status, retry_at, str(error)[:500] if error else None, notification_id))
+        conn.commit()
+
+
+@log_errors()
+def release_stale_notifications(older_than_seconds=600) -> int:
+    """Return rows stuck in ``sending`` (e.g. after a worker crash) to the queue."""
+    cutoff = datetime.now() - timedelta(seconds=older_than_seconds)
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            UPDATE notification_outbox
+            SET status = 'pending', claimed_at = NULL
+            WHERE status = 'sending' AND claimed_at < ?
+        """, (cutoff,))
+        conn.commit()
+        return max(c.rowcount or 0, 0)
+
+
+@log_errors()
+def get_notification_outbox_stats() -> Dict[str, Any]:
+    """Return outbox row counts per status and the age of the oldest due row."""
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT status, COUNT(*) FROM notification_outbox GROUP BY status")
+        counts = {row[0]: row[1] for row in c.fetchall()}
+        c.execute("SELECT MIN(created_at) FROM notification_outbox WHERE status = 'pending'")
+        oldest = c.fetchone()[0]
+    oldest_dt = _parse_datetime(oldest)
+    return {
+        'pending': counts.get('pending', 0),
+        'sending': counts.get('sending', 0),
+        'sent': counts.get('sent', 0),
+        'failed': counts.get('failed', 0),
+        'oldest_pending_seconds': (datetime.now() - oldest_dt).total_seconds() if oldest_dt else 0,
+    }
+
+
+@unit_of_work
 def save_listing(title, price, link, image_url=None, source=None, user_id=None,
                  *, premium_placement: int = 0, premium_until: Optional[datetime] = None):
     """Save a listing to the database"""
@@ -13179,6 +14142,19 @@ def save_listing(title, price, link, image_url=None, source=None, user_id=None,
                     logger.warning(f"Failed to insert listing and couldn't find existing: {link}")
                     conn.rollback()
                     return None
+
+            # Written before the commit so rollup refreshes never see the listing without them
+            if is_new_listing:
+                try:
+                    keywords = _analytics_keywords_for_users([user_id]).get(user_id)
+                    analytics_rows = [
+                        (listing_id, keyword, category, price_range, source, now)
+                        for keyword, category, price_range in _listing_analytics_rows(title, price, keywords)
+                    ]
+                    if analytics_rows:
+                        c.executemany(_LISTING_ANALYTICS_INSERT_SQL, analytics_rows)
+                except Exception as e:
+                    logger.error(f"Error saving analytics for listing {listing_id}: {e}")
             
             conn.commit()
             
@@ -13187,35 +14163,6 @@ def save_listing(title, price, link, image_url=None, source=None, user_id=None,
             conn.rollback()
             return None
         
-        # Save analytics data if we have a valid listing ID
-        if listing_id and is_new_listing:
-            try:
-                # Extract keywords from title
-                title_lower = title.lower()
-                car_keywords = ['firebird', 'camaro', 'corvette', 'mustang', 'charger', 'challenger', 
-                               'trans am', 'gto', 'nova', 'chevelle', 'impala', 'monte carlo']
-                
-                for keyword in car_keywords:
-                    if keyword in title_lower:
-                        # Determine price range (inclusive boundaries)
-                        if price <= 5000:
-                            price_range = "Under $5K"
-                        elif price <= 10000:
-                            price_range = "$5K-$10K"
-                        elif price <= 20000:
-                            price_range = "$10K-$20K"
-                        elif price <= 30000:
-                            price_range = "$20K-$30K"
-                        else:
-                            price_range = "Over $30K"
-                        
-                        # Determine category
-                        category = "Classic Cars" if any(k in title_lower for k in ['firebird', 'camaro', 'corvette', 'trans am', 'gto', 'nova', 'chevelle', 'impala', 'monte carlo']) else "Modern Cars"
-                        
-                        save_listing_analytics(listing_id, keyword, category, price_range, source)
-            except Exception as e:
-                logger.error(f"Error saving analytics for listing {listing_id}: {e}")
-        
         if listing_id and is_new_listing:
             try:
                 listing_payload = {
@@ -13241,56 +14188,211 @@ def save_listing(title, price, link, image_url=None, source=None, user_id=None,
 
         # Send notifications for new listings
         if is_new_listing:
-            try:
-                # Import here to avoid circular imports
-                from notifications import notify_new_listing
-                
-                # Get all users with notifications enabled
-                users = get_users_with_notifications_enabled()
-                
-                # Track notification results
-                notification_results = {
-                    'total': len(users),
-                    'success': 0,
-                    'failed': 0,
-                    'failed_users': []
-                }
-                
-                # Send notifications to each user
-                for user in users:
-                    try:
-                        notify_new_listing(
-                            user_email=user['email'],
-                            user_phone=user['phone_number'],
-                            email_enabled=user['email_notifications'],
-                            sms_enabled=user['sms_notifications'],
-                            listing_title=title,
-                            listing_price=price,
-                            listing_url=link,
-                            listing_source=source or 'unknown'
-                        )
-                        notification_results['success'] += 1
-                    except Exception as e:
-                        notification_results['failed'] += 1
-                        notification_results['failed_users'].append(user['username'])
-                        logger.error(f"Error sending notification to user {user['username']}: {e}")
-                        # Continue to next user even if one fails
-                
-                # Log summary
-                if notification_results['failed'] > 0:
-                    logger.warning(f"Notification summary for listing {listing_id}: {notification_results['success']}/{notification_results['total']} succeeded. Failed for: {', '.join(notification_results['failed_users'])}")
-                else:
-                    logger.info(f"All {notification_results['success']} notifications sent successfully for listing {listing_id}")
-                        
-            except Exception as e:
-                logger.error(f"Error processing notifications for listing {listing_id}: {e}")
-                # Don't fail the listing save if notifications fail
+            _notify_users_of_new_listing(listing_id, title, price, link, source)
         
         if listing_id:
+            _publish_ingested_listings([{
+                "id": listing_id,
+                "title": title,
+                "price": price,
+                "link": link,
+                "source": source,
+                "is_new": is_new_listing,
+            }])
             return get_listing_by_id(listing_id)
         return None
 
 
+def save_listings_batch(listings, user_id=None, *, source=None, notify=True):
+    """
+    Upsert a page of scraped listings in a single transaction.
+
+    New rows, their listing_analytics rows, their listing_alert feed events
+    and their notification_outbox rows are written together; existing rows
+    are refreshed the same way save_listing refreshes them.
+
+    Args:
+        listings: Iterable of dicts with ``title``, ``price`` and ``link`` plus
+            optional ``image_url`` (or ``image``), ``source`` and ``user_id``
+        user_id: Default username credited for rows without their own
+        source: Default source for rows without their own
+        notify: Queue new-listing notifications for the users each inserted
+            row matches, in the same transaction
+
+    Returns:
+        List of listing dicts (get_listing_by_id shape plus ``is_new``), one per
+        distinct link in input order; empty list on failure
+    """
+    rows: Dict[str, Tuple[Any, ...]] = {}
+    for entry in listings or []:
+        link = (entry.get("link") or "").strip()
+        title = entry.get("title")
+        if not link or not title:
+            continue
+        rows[link] = (
+            title,
+            entry.get("price"),
+            link,
+            entry.get("image_url", entry.get("image")),
+            entry.get("source") or source,
+            entry.get("user_id") or user_id,
+        )
+    if not rows:
+        return []
+
+    links = list(rows)
+    chunks = [links[i:i + _LISTING_BATCH_CHUNK] for i in range(0, len(links), _LISTING_BATCH_CHUNK)]
+    now = datetime.now()
+    ids: Dict[str, int] = {}
+    new_links: Set[str] = set()
+
+    # Match before opening the write transaction; the index may need to load
+    targets_by_link: Dict[str, List[Dict[str, Any]]] = {}
+    if notify:
+        try:
+            for link in links:
+                title, price, _, _, row_source, _ = rows[link]
+                targets_by_link[link] = _listing_notification_targets(title, price, row_source)
+        except Exception as e:
+            logger.error(f"Error matching listing batch to users: {e}")
+            targets_by_link = {}
+
+    with get_pool().get_connection() as conn:
+        try:
+            if USE_POSTGRES:
+                conn.execute("BEGIN")
+                c = conn.cursor()
+                for chunk in chunks:
+                    values_sql = ", ".join(["(?, ?, ?, ?, ?, ?, ?)"] * len(chunk))
+                    params: List[Any] = []
+                    for link in chunk:
+                        title, price, _, image_url, row_source, row_user = rows[link]
+                        params.extend([title, price, link, image_url, row_source, now, row_user])
+                    # xmax = 0 only for tuples created by this statement, i.e. inserts
+                    c.execute(f"""
+                        INSERT INTO listings (title, price, link, image_url, source, created_at, user_id)
+                        VALUES {values_sql}
+                        ON CONFLICT (link) DO UPDATE SET
+                            title = EXCLUDED.title,
+                            price = EXCLUDED.price,
+                            image_url = EXCLUDED.image_url,
+                            source = EXCLUDED.source,
+                            created_at = EXCLUDED.created_at,
+                            user_id = COALESCE(EXCLUDED.user_id, listings.user_id)
+                        RETURNING id, link, (xmax = 0) AS inserted
+                    """, params)
+                    for listing_id, link, inserted in c.fetchall():
+                        ids[link] = listing_id
+                        if inserted:
+                            new_links.add(link)
+            else:
+                conn.execute("BEGIN IMMEDIATE")
+                c = conn.cursor()
+                existing: Dict[str, int] = {}
+                for chunk in chunks:
+                    placeholders = ", ".join("?" for _ in chunk)
+                    c.execute(f"SELECT id, link FROM listings WHERE link IN ({placeholders})", chunk)
+                    existing.update({row[1]: row[0] for row in c.fetchall()})
+
+                c.executemany("""
+                    INSERT INTO listings (title, price, link, image_url, source, created_at, user_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (link) DO NOTHING
+                """, [
+                    (title, price, link, image_url, row_source, now, row_user)
+                    for link, (title, price, _, image_url, row_source, row_user) in rows.items()
+                    if link not in existing
+                ])
+                c.executemany("""
+                    UPDATE listings
+                    SET title = ?, price = ?, image_url = ?, source = ?, created_at = ?, user_id = COALESCE(?, user_id)
+                    WHERE id = ?
+                """, [
+                    (title, price, image_url, row_source, now, row_user, existing[link])
+                    for link, (title, price, _, image_url, row_source, row_user) in rows.items()
+                    if link in existing
+                ])
+
+                ids.update(existing)
+                new_links = {link for link in links if link not in existing}
+                for chunk in chunks:
+                    pending = [link for link in chunk if link in new_links]
+                    if not pending:
+                        continue
+                    placeholders = ", ".join("?" for _ in pending)
+                    c.execute(f"SELECT id, link FROM listings WHERE link IN ({placeholders})", pending)
+                    ids.update({row[1]: row[0] for row in c.fetchall()})
+
+            analytics_rows = []
+            feed_rows = []
+            outbox_rows = []
+            analytics_keywords = _analytics_keywords_for_users(rows[link][5] for link in new_links)
+            for link in links:
+                if link not in new_links or link not in ids:
+                    continue
+                listing_id = ids[link]
+                title, price, _, image_url, row_source, row_user = rows[link]
+                for keyword, category, price_range in _listing_analytics_rows(title, price, analytics_keywords.get(row_user)):
+                    analytics_rows.append((listing_id, keyword, category, price_range, row_source, now))
+                feed_rows.append(_build_feed_event_values(
+                    "listing_alert",
+                    actor_username=row_user,
+                    entity_type="listing",
+                    entity_id=str(listing_id),
+                    audience_type="global",
+                    payload={
+                        "id": listing_id,
+                        "title": title,
+                        "price": price,
+                        "link": link,
+                        "image_url": image_url,
+                        "source": row_source,
+                        "created_at": _to_datetime_string(now),
+                    },
+                    score=4.0,
+                    created_at=now,
+                ))
+                if targets_by_link.get(link):
+                    outbox_rows.extend(_listing_outbox_rows(
+                        listing_id, title, price, link, row_source, targets_by_link[link], now
+                    ))
+
+            if analytics_rows:
+                c.executemany(_LISTING_ANALYTICS_INSERT_SQL, analytics_rows)
+            if feed_rows:
+                c.executemany(_FEED_EVENT_INSERT_SQL, feed_rows)
+            if outbox_rows:
+                c.executemany(_OUTBOX_INSERT_SQL, outbox_rows)
+
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error saving listing batch ({len(rows)} listings): {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return []
+
+    saved = []
+    for link in links:
+        if link not in ids:
+            continue
+        title, price, _, image_url, row_source, _ = rows[link]
+        saved.append({
+            "id": ids[link],
+            "title": title,
+            "price": price,
+            "link": link,
+            "image_url": image_url,
+            "source": row_source,
+            "created_at": _to_datetime_string(now),
+            "is_new": link in new_links,
+        })
+
+    _publish_ingested_listings(saved)
+    return saved
+
+
 @log_errors()
 def get_listings(limit=100, user_id=None):
     """Get listings from database, optionally filtered by user"""
@@ -13315,9 +14417,118 @@ def get_listings(limit=100, user_id=None):
         return rows
 
 
+# Full-text index over listing titles; None until checked in this process
+_listing_search_index_ready: Optional[bool] = None
+
+_LISTINGS_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS listings_fts_ai AFTER INSERT ON listings BEGIN
+        INSERT INTO listings_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS listings_fts_ad AFTER DELETE ON listings BEGIN
+        INSERT INTO listings_fts(listings_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS listings_fts_au AFTER UPDATE OF title ON listings BEGIN
+        INSERT INTO listings_fts(listings_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO listings_fts(rowid, title) VALUES (new.id, new.title);
+    END
+    """,
+]
+
+
+def _ensure_listing_search_index(conn, c) -> bool:
+    """
+    Create the listing title full-text index.
+
+    SQLite gets an external-content FTS5 table kept in sync by triggers (and
+    filled from existing rows when first created); PostgreSQL gets a
+    generated ``tsvector`` column with a GIN index. Returns False when the
+    backend cannot provide one, in which case searches fall back to LIKE.
+    """
+    global _listing_search_index_ready
+    try:
+        if USE_POSTGRES:
+            c.execute("""
+                ALTER TABLE listings ADD COLUMN IF NOT EXISTS title_tsv tsvector
+                GENERATED ALWAYS AS (to_tsvector('simple', coalesce(title, ''))) STORED
+            """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_listings_title_tsv ON listings USING GIN (title_tsv)")
+        else:
+            c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'listings_fts'")
+            existed = c.fetchone() is not None
+            c.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5(
+                    title, content='listings', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                )
+            """)
+            for trigger_sql in _LISTINGS_FTS_TRIGGERS:
+                c.execute(trigger_sql)
+            if not existed:
+                c.execute("INSERT INTO listings_fts(listings_fts) VALUES ('rebuild')")
+                logger.info("Built listings_fts full-text index")
+        _listing_search_index_ready = True
+    except Exception as e:
+        if USE_POSTGRES:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+        logger.warning(f"Listing full-text index unavailable, search falls back to LIKE scans: {e}")
+        _listing_search_index_ready = False
+    return _listing_search_index_ready
+
+
+def _has_listing_search_index(c) -> bool:
+    global _listing_search_index_ready
+    if _listing_search_index_ready is None:
+        if USE_POSTGRES:
+            c.execute("""
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'listings' AND column_name = 'title_tsv'
+            """)
+        else:
+            c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'listings_fts'")
+        _listing_search_index_ready = c.fetchone() is not None
+    return _listing_search_index_ready
+
+
+def _listing_search_groups(terms: List[str]) -> List[List[str]]:
+    """
+    Split search terms into OR-ed groups of AND-ed words.
+
+    Each comma-separated term is a group; an upper-case ``OR`` inside a term
+    starts a new group. Only word characters are kept, so the groups can be
+    rendered into FTS5 / tsquery syntax safely.
+    """
+    groups = []
+    for term in terms:
+        group: List[str] = []
+        for word in re.findall(r"\w+", term):
+            if word == "OR":
+                if group:
+                    groups.append(group)
+                group = []
+            else:
+                group.append(word.lower())
+        if group:
+            groups.append(group)
+    return groups
+
+
 @log_errors()
 def search_existing_listings(keywords, limit=100, user_id=None):
-    """Search existing listings for a user by keyword."""
+    """
+    Search existing listings for a user by keyword.
+
+    Uses the title full-text index: every word matches as a prefix, words in
+    a term must all match, and terms (comma-separated or joined by ``OR``)
+    are alternatives. Results are ranked by relevance, then newest first.
+    """
     if not keywords:
         return []
 
@@ -13335,33 +14546,70 @@ def search_existing_listings(keywords, limit=100, user_id=None):
         limit_val = 100
     limit_val = max(1, min(limit_val, 200))
 
-    normalized_terms = [term.lower() for term in terms]
-    clauses = " OR ".join("LOWER(title) LIKE ?" for _ in normalized_terms)
+    groups = _listing_search_groups(terms)
 
     with get_pool().get_connection() as conn:
         c = conn.cursor()
-        where_clauses = []
-        params: List[Any] = []
+        if not groups or not _has_listing_search_index(c):
+            return _search_listings_like(c, terms, limit_val, user_id)
 
+        params: List[Any] = []
+        if USE_POSTGRES:
+            match = " | ".join("(" + " & ".join(f"{word}:*" for word in group) + ")" for group in groups)
+            user_clause = "AND l.user_id = ?" if user_id else ""
+            query = f"""
+                SELECT l.id, l.title, l.price, l.link, l.image_url, l.source, l.created_at
+                FROM listings l, to_tsquery('simple', ?) AS q
+                WHERE l.title_tsv @@ q {user_clause}
+                ORDER BY ts_rank(l.title_tsv, q) DESC, l.created_at DESC
+                LIMIT ?
+            """
+        else:
+            match = " OR ".join("(" + " AND ".join(f'"{word}"*' for word in group) + ")" for group in groups)
+            user_clause = "AND l.user_id = ?" if user_id else ""
+            query = f"""
+                SELECT l.id, l.title, l.price, l.link, l.image_url, l.source, l.created_at
+                FROM listings_fts f
+                JOIN listings l ON l.id = f.rowid
+                WHERE listings_fts MATCH ? {user_clause}
+                ORDER BY bm25(listings_fts), l.created_at DESC
+                LIMIT ?
+            """
+        params.append(match)
         if user_id:
-            where_clauses.append("user_id = ?")
             params.append(user_id)
-
-        where_clauses.append(f"({clauses})")
-        query = """
-            SELECT id, title, price, link, image_url, source, created_at
-            FROM listings
-            WHERE {conditions}
-            ORDER BY created_at DESC
-            LIMIT ?
-        """.format(conditions=" AND ".join(where_clauses))
-
-        params.extend([f"%{term}%" for term in normalized_terms])
         params.append(limit_val)
         c.execute(query, params)
         return c.fetchall()
 
 
+def _search_listings_like(c, terms, limit_val, user_id=None):
+    """Substring search used when no full-text index is available."""
+    normalized_terms = [term.lower() for term in terms]
+    clauses = " OR ".join("LOWER(title) LIKE ?" for _ in normalized_terms)
+
+    where_clauses = []
+    params: List[Any] = []
+
+    if user_id:
+        where_clauses.append("user_id = ?")
+        params.append(user_id)
+
+    where_clauses.append(f"({clauses})")
+    query = """
+        SELECT id, title, price, link, image_url, source, created_at
+        FROM listings
+        WHERE {conditions}
+        ORDER BY created_at DESC
+        LIMIT ?
+    """.format(conditions=" AND ".join(where_clauses))
+
+    params.extend([f"%{term}%" for term in normalized_terms])
+    params.append(limit_val)
+    c.execute(query, params)
+    return c.fetchall()
+
+
 @log_errors()
 def get_listing_by_id(listing_id: int) -> Optional[Dict[str, Any]]:
     """Return a single listing by ID."""
@@ -13386,6 +14634,63 @@ def get_listing_by_id(listing_id: int) -> Optional[Dict[str, Any]]:
     }
 
 
+@log_errors()
+def get_listings_after(last_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+    """Return listings with ``id > last_id`` in id order (stream consumers)."""
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            SELECT id, title, price, link, image_url, source, created_at
+            FROM listings
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (last_id or 0, limit))
+        rows = c.fetchall()
+    return [{
+        "id": row[0],
+        "title": row[1],
+        "price": row[2],
+        "link": row[3],
+        "image_url": row[4],
+        "source": row[5],
+        "created_at": _to_datetime_string(row[6]),
+    } for row in rows]
+
+
+@log_errors()
+def get_max_listing_id() -> int:
+    """Return the highest listing id, or 0 when there are no listings."""
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT MAX(id) FROM listings")
+        row = c.fetchone()
+    return (row[0] or 0) if row else 0
+
+
+@log_errors()
+def get_worker_checkpoint(name: str) -> Optional[int]:
+    """Return the last listing id a background consumer processed, or None."""
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT last_id FROM worker_checkpoints WHERE name = ?", (name,))
+        row = c.fetchone()
+    return row[0] if row else None
+
+
+@log_errors()
+def set_worker_checkpoint(name: str, last_id: int) -> None:
+    """Persist a background consumer's progress."""
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            INSERT INTO worker_checkpoints (name, last_id, updated_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET last_id = EXCLUDED.last_id, updated_at = EXCLUDED.updated_at
+        """, (name, last_id, datetime.now()))
+        conn.commit()
+
+
 @log_errors()
 def get_listing_count(user_id=None):
     """Get total number of listings, optionally for a specific user"""
@@ -13439,9 +14744,275 @@ def save_listing_analytics(listing_id, keyword, category, price_range, source):
         conn.commit()
 
 
+# ======================
+# DAILY LISTING ROLLUP
+# ======================
+LISTING_STATS_CHECKPOINT = "listing_daily_stats"
+# Ids at or below this checkpoint are never re-read; it trails the main one
+# by LISTING_STATS_OVERLAP and starts where the main one stood when the
+# window was introduced, so listings folded before that are not re-counted
+LISTING_STATS_WINDOW_CHECKPOINT = "listing_daily_stats:window"
+# PostgreSQL SERIAL ids can commit out of order, so each refresh re-reads
+# this many ids below the checkpoint (same window as price_alert_stream)
+# and folds any not yet recorded in listing_daily_stats_folded
+LISTING_STATS_OVERLAP = 200
+_LISTING_STATS_CHUNK = 5000
+# Upper bounds of the price sketch buckets (the last bucket is open-ended);
+# they include the market-insights bucket boundaries so those are exact
+PRICE_SKETCH_EDGES = (100, 250, 500, 1000, 2500, 5000, 7500, 10000, 15000, 20000, 25000, 30000, 50000, 100000)
+_MARKET_PRICE_BUCKETS = (
+    ("Under $5K", 5000),
+    ("$5K-$10K", 10000),
+    ("$10K-$20K", 20000),
+    ("$20K-$30K", 30000),
+    ("Over $30K", None),
+)
+_listing_stats_lock = threading.Lock()
+
+_LISTING_STATS_UPSERT_SQL = """
+    INSERT INTO listing_daily_stats (
+        user_id, day, source, keyword, listing_count, price_count, price_sum,
+        price_min, price_max, price_sketch, hour_counts
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, day, source, keyword) DO UPDATE SET
+        listing_count = EXCLUDED.listing_count,
+        price_count = EXCLUDED.price_count,
+        price_sum = EXCLUDED.price_sum,
+        price_min = EXCLUDED.price_min,
+        price_max = EXCLUDED.price_max,
+        price_sketch = EXCLUDED.price_sketch,
+        hour_counts = EXCLUDED.hour_counts
+"""
+
+# keyword_trends.user_id references users, so rows for unknown users are skipped
+_KEYWORD_TRENDS_UPSERT_SQL = """
+    INSERT INTO keyword_trends (keyword, count, avg_price, date, source, user_id)
+    SELECT ?, ?, ?, ?, ?, username FROM users WHERE username = ?
+    ON CONFLICT (keyword, date, source, user_id) DO UPDATE SET
+        count = EXCLUDED.count,
+        avg_price = EXCLUDED.avg_price
+"""
+
+
+def _empty_listing_stats() -> Dict[str, Any]:
+    return {
+        "count": 0,
+        "price_count": 0,
+        "price_sum": 0,
+        "min": None,
+        "max": None,
+        "sketch": [0] * (len(PRICE_SKETCH_EDGES) + 1),
+        "hours": [0] * 24,
+    }
+
+
+def _merge_listing_stats(into: Dict[str, Any], other: Dict[str, Any]) -> None:
+    into["count"] += other["count"]
+    into["price_count"] += other["price_count"]
+    into["price_sum"] += other["price_sum"]
+    for bound, pick in (("min", min), ("max", max)):
+        if other[bound] is not None:
+            into[bound] = other[bound] if into[bound] is None else pick(into[bound], other[bound])
+    into["sketch"] = [a + b for a, b in zip(into["sketch"], other["sketch"])]
+    into["hours"] = [a + b for a, b in zip(into["hours"], other["hours"])]
+
+
+def _listing_stats_from_row(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    count, price_count, price_sum, price_min, price_max, sketch, hours = row
+    stats = _empty_listing_stats()
+    stats.update({
+        "count": count or 0,
+        "price_count": price_count or 0,
+        "price_sum": price_sum or 0,
+        "min": price_min,
+        "max": price_max,
+    })
+    if sketch:
+        stats["sketch"] = json.loads(sketch)
+    if hours:
+        stats["hours"] = json.loads(hours)
+    return stats
+
+
+def _refresh_listing_daily_stats_chunk() -> Tuple[int, int]:
+    """
+    Fold the next chunk of listings past the checkpoint into the rollup.
+
+    Returns:
+        tuple: ``(read, folded)`` listings, counting the re-read window
+    """
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            INSERT INTO worker_checkpoints (name, last_id, updated_at) VALUES (?, 0, ?)
+            ON CONFLICT (name) DO NOTHING
+        """, (LISTING_STATS_CHECKPOINT, datetime.now()))
+        try:
+            if USE_POSTGRES:
+                conn.execute("BEGIN")
+            else:
+                conn.execute("BEGIN IMMEDIATE")
+            c = conn.cursor()
+            # Serializes concurrent refreshes; the loser sees the advanced checkpoint
+            lock_clause = " FOR UPDATE" if USE_POSTGRES else ""
+            c.execute(f"SELECT last_id FROM worker_checkpoints WHERE name = ?{lock_clause}", (LISTING_STATS_CHECKPOINT,))
+            row = c.fetchone()
+            cursor = row[0] if row else 0
+            c.execute("""
+                INSERT INTO worker_checkpoints (name, last_id, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (name) DO NOTHING
+            """, (LISTING_STATS_WINDOW_CHECKPOINT, cursor, datetime.now()))
+            c.execute("SELECT last_id FROM worker_checkpoints WHERE name = ?", (LISTING_STATS_WINDOW_CHECKPOINT,))
+            floor = c.fetchone()[0]
+            start = max(cursor - LISTING_STATS_OVERLAP, floor)
+
+            c.execute("""
+                SELECT id, user_id, created_at, source, price
+                FROM listings
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            """, (start, _LISTING_STATS_CHUNK))
+            read = c.fetchall()
+            if not read:
+                conn.rollback()
+                return 0, 0
+
+            c.execute("""
+                SELECT listing_id FROM listing_daily_stats_folded
+                WHERE listing_id > ? AND listing_id <= ?
+            """, (start, cursor))
+            folded = {row[0] for row in c.fetchall()}
+            listings = [listing for listing in read if listing[0] > cursor or listing[0] not in folded]
+            new_cursor = max(cursor, read[-1][0])
+            new_floor = max(floor, new_cursor - LISTING_STATS_OVERLAP)
+            if not listings:
+                conn.rollback()
+                return len(read), 0
+
+            c.execute("""
+                SELECT listing_id, keyword
+                FROM listing_analytics
+                WHERE listing_id >= ? AND listing_id <= ? AND keyword IS NOT NULL
+            """, (listings[0][0], listings[-1][0]))
+            keywords_by_listing: Dict[int, set] = defaultdict(set)
+            for listing_id, keyword in c.fetchall():
+                keywords_by_listing[listing_id].add(keyword)
+
+            deltas: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+            for listing_id, listing_user, created_at, source, price in listings:
+                created = _parse_datetime(created_at)
+                if listing_user is None or created is None:
+                    continue  # Per-user analytics never match these rows
+                base_key = (listing_user, created.date().isoformat(), source or "")
+                for keyword in ("", *sorted(keywords_by_listing.get(listing_id, ()))):
+                    stats = deltas.get(base_key + (keyword,))
+                    if stats is None:
+                        stats = deltas[base_key + (keyword,)] = _empty_listing_stats()
+                    stats["count"] += 1
+                    stats["hours"][created.hour] += 1
+                    if price is not None:
+                        stats["price_count"] += 1
+                        stats["price_sum"] += price
+                        stats["min"] = price if stats["min"] is None else min(stats["min"], price)
+                        stats["max"] = price if stats["max"] is None else max(stats["max"], price)
+                        stats["sketch"][bisect.bisect_right(PRICE_SKETCH_EDGES, price)] += 1
+
+            rows = []
+            for key, delta in deltas.items():
+                c.execute("""
+                    SELECT listing_count, price_count, price_sum, price_min, price_max, price_sketch, hour_counts
+                    FROM listing_daily_stats
+                    WHERE user_id = ? AND day = ? AND source = ? AND keyword = ?
+                """, key)
+                existing = c.fetchone()
+                stats = delta
+                if existing:
+                    stats = _listing_stats_from_row(existing)
+                    _merge_listing_stats(stats, delta)
+                rows.append(key + (
+                    stats["count"], stats["price_count"], stats["price_sum"], stats["min"], stats["max"],
+                    json.dumps(stats["sketch"], separators=(",", ":")),
+                    json.dumps(stats["hours"], separators=(",", ":")),
+                ))
+            if rows:
+                c.executemany(_LISTING_STATS_UPSERT_SQL, rows)
+                # keyword_trends mirrors the per-keyword rollup rows
+                trend_rows = [
+                    (row[3], row[4], row[6] / row[5] if row[5] else None, row[1], row[2], row[0])
+                    for row in rows
+                    if row[3]
+                ]
+                if trend_rows:
+                    c.executemany(_KEYWORD_TRENDS_UPSERT_SQL, trend_rows)
+            c.executemany(
+                "INSERT INTO listing_daily_stats_folded (listing_id) VALUES (?)",
+                [(listing[0],) for listing in listings],
+            )
+            c.execute("DELETE FROM listing_daily_stats_folded WHERE listing_id <= ?", (new_floor,))
+            now = datetime.now()
+            c.executemany(
+                "UPDATE worker_checkpoints SET last_id = ?, updated_at = ? WHERE name = ?",
+                [(new_cursor, now, LISTING_STATS_CHECKPOINT), (new_floor, now, LISTING_STATS_WINDOW_CHECKPOINT)],
+            )
+            conn.commit()
+            return len(read), len(listings)
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+
+
+@log_errors()
+def refresh_listing_daily_stats() -> int:
+    """
+    Bring listing_daily_stats up to date with newly ingested listings.
+
+    Only listings past the ``listing_daily_stats`` worker checkpoint (less
+    the ``LISTING_STATS_OVERLAP`` late-commit window) are read, in chunks,
+    each folded into the rollup and the checkpoint in one transaction; ids
+    recorded in ``listing_daily_stats_folded`` are never counted twice.
+    Listings count on the day they were first ingested. A listing that
+    commits below the checkpoint is folded by the next refresh that finds
+    new listings.
+
+    Returns:
+        int: Listings processed
+    """
+    checkpoint = get_worker_checkpoint(LISTING_STATS_CHECKPOINT) or 0
+    if get_max_listing_id() <= checkpoint:
+        return 0
+    processed = 0
+    with _listing_stats_lock:
+        while True:
+            read, folded = _refresh_listing_daily_stats_chunk()
+            processed += folded
+            if read < _LISTING_STATS_CHUNK:
+                break
+    if processed:
+        logger.debug(f"Folded {processed} listings into listing_daily_stats")
+    return processed
+
+
+def _ensure_listing_daily_stats() -> None:
+    """Catch the rollup up before answering from it; analytics still answer on failure."""
+    try:
+        refresh_listing_daily_stats()
+    except Exception as e:
+        logger.error(f"Error refreshing listing_daily_stats: {e}")
+
+
+def _listing_stats_since(days) -> str:
+    return (datetime.now() - timedelta(days=days)).date().isoformat()
+
+
 @log_errors()
 def get_keyword_trends(days=30, keyword=None, user_id=None):
     """Get keyword trends over time"""
+    _ensure_listing_daily_stats()
     with get_pool().get_connection() as conn:
         c = conn.cursor()
         
@@ -13449,19 +15020,19 @@ def get_keyword_trends(days=30, keyword=None, user_id=None):
             c.execute("""
                 SELECT date, keyword, count, avg_price, source
                 FROM keyword_trends 
-                WHERE date >= date('now', ? || ' days')
+                WHERE date >= ?
                   AND keyword = ?
                   AND user_id = ?
                 ORDER BY date DESC
-            """, (f'-{days}', keyword, user_id))
+            """, (_listing_stats_since(days), keyword, user_id))
         else:
             c.execute("""
                 SELECT date, keyword, count, avg_price, source
                 FROM keyword_trends 
-                WHERE date >= date('now', ? || ' days')
+                WHERE date >= ?
                   AND user_id = ?
                 ORDER BY date DESC, count DESC
-            """, (f'-{days}', user_id))
+            """, (_listing_stats_since(days), user_id))
         
         rows = c.fetchall()
         return rows
@@ -13470,73 +15041,29 @@ def get_keyword_trends(days=30, keyword=None, user_id=None):
 @log_errors()
 def get_price_analytics(days=30, source=None, keyword=None, user_id=None):
     """Get price analytics over time"""
+    _ensure_listing_daily_stats()
     with get_pool().get_connection() as conn:
         c = conn.cursor()
-        
-        # Build query with optional filters
-        if keyword and source:
-            c.execute("""
-                SELECT DATE(l.created_at) as date, 
-                       COUNT(*) as count,
-                       AVG(l.price) as avg_price,
-                       MIN(l.price) as min_price,
-                       MAX(l.price) as max_price,
-                       l.source
-                FROM listings l
-                JOIN listing_analytics la ON l.id = la.listing_id
-                WHERE l.created_at >= datetime('now', ? || ' days')
-                  AND l.source = ?
-                  AND la.keyword = ?
-                  AND l.user_id = ?
-                GROUP BY DATE(l.created_at), l.source
-                ORDER BY date DESC
-            """, (f'-{days}', source, keyword, user_id))
-        elif keyword:
-            c.execute("""
-                SELECT DATE(l.created_at) as date, 
-                       COUNT(*) as count,
-                       AVG(l.price) as avg_price,
-                       MIN(l.price) as min_price,
-                       MAX(l.price) as max_price,
-                       l.source
-                FROM listings l
-                JOIN listing_analytics la ON l.id = la.listing_id
-                WHERE l.created_at >= datetime('now', ? || ' days')
-                  AND la.keyword = ?
-                  AND l.user_id = ?
-                GROUP BY DATE(l.created_at), l.source
-                ORDER BY date DESC
-            """, (f'-{days}', keyword, user_id))
-        elif source:
-            c.execute("""
-                SELECT DATE(created_at) as date, 
-                       COUNT(*) as count,
-                       AVG(price) as avg_price,
-                       MIN(price) as min_price,
-                       MAX(price) as max_price,
-                       source
-                FROM listings 
-                WHERE created_at >= datetime('now', ? || ' days')
-                  AND source = ?
-                  AND user_id = ?
-                GROUP BY DATE(created_at), source
-                ORDER BY date DESC
-            """, (f'-{days}', source, user_id))
-        else:
-            c.execute("""
-                SELECT DATE(created_at) as date, 
-                       COUNT(*) as count,
-                       AVG(price) as avg_price,
-                       MIN(price) as min_price,
-                       MAX(price) as max_price,
-                       source
-                FROM listings 
-                WHERE created_at >= datetime('now', ? || ' days')
-                  AND user_id = ?
-                GROUP BY DATE(created_at), source
-                ORDER BY date DESC
-            """, (f'-{days}', user_id))
-        
+
+        query = """
+            SELECT day as date,
+                   SUM(listing_count) as count,
+                   SUM(price_sum) / NULLIF(SUM(price_count), 0) as avg_price,
+                   MIN(price_min) as min_price,
+                   MAX(price_max) as max_price,
+                   NULLIF(source, '') as source
+            FROM listing_daily_stats
+            WHERE user_id = ?
+              AND day >= ?
+              AND keyword = ?
+        """
+        params = [user_id, _listing_stats_since(days), keyword or ""]
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        query += " GROUP BY day, source ORDER BY date DESC"
+        c.execute(query, params)
+
         rows = c.fetchall()
         return rows
 
@@ -13544,40 +15071,25 @@ def get_price_analytics(days=30, source=None, keyword=None, user_id=None):
 @log_errors()
 def get_source_comparison(days=30, keyword=None, user_id=None):
     """Compare performance across different sources"""
+    _ensure_listing_daily_stats()
     with get_pool().get_connection() as conn:
         c = conn.cursor()
-        
-        if keyword:
-            c.execute("""
-                SELECT l.source,
-                       COUNT(*) as total_listings,
-                       AVG(l.price) as avg_price,
-                       MIN(l.price) as min_price,
-                       MAX(l.price) as max_price,
-                       COUNT(DISTINCT DATE(l.created_at)) as active_days
-                FROM listings l
-                JOIN listing_analytics la ON l.id = la.listing_id
-                WHERE l.created_at >= datetime('now', ? || ' days')
-                  AND la.keyword = ?
-                  AND l.user_id = ?
-                GROUP BY l.source
-                ORDER BY total_listings DESC
-            """, (f'-{days}', keyword, user_id))
-        else:
-            c.execute("""
-                SELECT source,
-                       COUNT(*) as total_listings,
-                       AVG(price) as avg_price,
-                       MIN(price) as min_price,
-                       MAX(price) as max_price,
-                       COUNT(DISTINCT DATE(created_at)) as active_days
-                FROM listings 
-                WHERE created_at >= datetime('now', ? || ' days')
-                  AND user_id = ?
-                GROUP BY source
-                ORDER BY total_listings DESC
-            """, (f'-{days}', user_id))
-        
+
+        c.execute("""
+            SELECT NULLIF(source, '') as source,
+                   SUM(listing_count) as total_listings,
+                   SUM(price_sum) / NULLIF(SUM(price_count), 0) as avg_price,
+                   MIN(price_min) as min_price,
+                   MAX(price_max) as max_price,
+                   COUNT(DISTINCT day) as active_days
+            FROM listing_daily_stats
+            WHERE user_id = ?
+              AND day >= ?
+              AND keyword = ?
+            GROUP BY source
+            ORDER BY total_listings DESC
+        """, (user_id, _listing_stats_since(days), keyword or ""))
+
         rows = c.fetchall()
         return rows
 
@@ -13585,373 +15097,244 @@ def get_source_comparison(days=30, keyword=None, user_id=None):
 @log_errors()
 def get_keyword_analysis(days=30, limit=20, keyword=None, user_id=None):
     """Get top keywords and their performance"""
+    _ensure_listing_daily_stats()
     with get_pool().get_connection() as conn:
         c = conn.cursor()
-        
+
+        query = """
+            SELECT keyword,
+                   SUM(listing_count) as frequency,
+                   SUM(price_sum) / NULLIF(SUM(price_count), 0) as avg_price,
+                   MIN(price_min) as min_price,
+                   MAX(price_max) as max_price,
+                   COUNT(DISTINCT source) as sources_count
+            FROM listing_daily_stats
+            WHERE user_id = ?
+              AND day >= ?
+        """
+        params = [user_id, _listing_stats_since(days)]
         if keyword:
             # Return only the specified keyword
-            c.execute("""
-                SELECT la.keyword,
-                       COUNT(*) as frequency,
-                       AVG(l.price) as avg_price,
-                       MIN(l.price) as min_price,
-                       MAX(l.price) as max_price,
-                       COUNT(DISTINCT la.source) as sources_count
-                FROM listing_analytics la
-                JOIN listings l ON la.listing_id = l.id
-                WHERE la.created_at >= datetime('now', ? || ' days')
-                  AND la.keyword = ?
-                  AND l.user_id = ?
-                GROUP BY la.keyword
-            """, (f'-{days}', keyword, user_id))
+            query += " AND keyword = ? GROUP BY keyword"
+            params.append(keyword)
         else:
-            c.execute("""
-                SELECT la.keyword,
-                       COUNT(*) as frequency,
-                       AVG(l.price) as avg_price,
-                       MIN(l.price) as min_price,
-                       MAX(l.price) as max_price,
-                       COUNT(DISTINCT la.source) as sources_count
-                FROM listing_analytics la
-                JOIN listings l ON la.listing_id = l.id
-                WHERE la.created_at >= datetime('now', ? || ' days')
-                  AND l.user_id = ?
-                GROUP BY la.keyword
-                ORDER BY frequency DESC
-                LIMIT ?
-            """, (f'-{days}', user_id, limit))
-        
+            query += " AND keyword <> '' GROUP BY keyword ORDER BY frequency DESC, keyword LIMIT ?"
+            params.append(limit)
+        c.execute(query, params)
+
         rows = c.fetchall()
         return rows
 
 
 @log_errors()
-def get_hourly_activity(days=7, keyword=None, user_id=None):
-    """Get listing activity by hour of day"""
-    with get_pool().get_connection() as conn:
-        c = conn.cursor()
-        
-        if keyword:
-            c.execute("""
-                SELECT strftime('%H', l.created_at) as hour,
-                       COUNT(*) as count,
-                       l.source
-                FROM listings l
-                JOIN listing_analytics la ON l.id = la.listing_id
-                WHERE l.created_at >= datetime('now', ? || ' days')
-                  AND la.keyword = ?
-                  AND l.user_id = ?
-                GROUP BY strftime('%H', l.created_at), l.source
-                ORDER BY hour
-            """, (f'-{days}', keyword, user_id))
-        else:
-            c.execute("""
-                SELECT strftime('%H', created_at) as hour,
-                       COUNT(*) as count,
-                       source
-                FROM listings 
-                WHERE created_at >= datetime('now', ? || ' days')
-                  AND user_id = ?
-                GROUP BY strftime('%H', created_at), source
-                ORDER BY hour
-            """, (f'-{days}', user_id))
-        
-        rows = c.fetchall()
-        return rows
-@log_errors()
-def get_price_distribution(days=30, bins=10, keyword=None, user_id=None):
-    """Get price distribution data for histograms"""
+def get_hourly_activity(days=7, keyword=None, user_id=None):
+    """Get listing activity by hour of day"""
+    _ensure_listing_daily_stats()
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+
+        c.execute("""
+            SELECT NULLIF(source, ''), hour_counts
+            FROM listing_daily_stats
+            WHERE user_id = ?
+              AND day >= ?
+              AND keyword = ?
+        """, (user_id, _listing_stats_since(days), keyword or ""))
+
+        totals: Dict[Any, List[int]] = {}
+        for source, hour_counts in c.fetchall():
+            if not hour_counts:
+                continue
+            hours = totals.setdefault(source, [0] * 24)
+            for hour, count in enumerate(json.loads(hour_counts)):
+                hours[hour] += count
+
+        return [
+            (f"{hour:02d}", hours[hour], source)
+            for hour in range(24)
+            for source, hours in totals.items()
+            if hours[hour]
+        ]
+
+
+def _price_bin(start, end, count, **extra):
+    entry = {
+        'range': f"${start:.0f}-${end:.0f}" if start != end else f"${start:.0f}",
+        'count': count,
+        'start': start,
+        'end': end,
+    }
+    entry.update(extra)
+    return entry
+
+
+def _quantile(sorted_values, fraction):
+    """Linear-interpolated quantile of an already sorted list."""
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+@log_errors()
+def get_price_distribution(days=30, bins=10, keyword=None, user_id=None, quantiles=False):
+    """
+    Get price distribution data for histograms.
+
+    Equal-width bins are counted in one aggregate query: the price bounds
+    and each row's bucket are computed in SQL (``width_bucket`` on
+    PostgreSQL, an integer bucket expression on SQLite), so the cost does not
+    grow with the number of bins. With ``quantiles=True`` the prices are read
+    once and split into equal-count bins (deciles for 10 bins, so the edges
+    are p10 ... p90); each bin also carries its upper ``percentile``.
+
+    Returns:
+        list: One dict per bin with ``range``, ``count``, ``start`` and ``end``
+    """
     # Validate bins parameter to prevent division by zero
     if bins <= 0:
         logger.warning(f"Invalid bins parameter: {bins}, using default of 10")
         bins = 10
-    
+
+    cutoff = datetime.now() - timedelta(days=days)
+    join = ""
+    filters = ["l.created_at >= ?", "l.price > 0", "l.user_id = ?"]
+    params: List[Any] = [cutoff, user_id]
+    if keyword:
+        join = "JOIN listing_analytics la ON l.id = la.listing_id"
+        filters.append("la.keyword = ?")
+        params.append(keyword)
+    filtered_sql = f"SELECT l.price AS price FROM listings l {join} WHERE {' AND '.join(filters)}"
+
     with get_pool().get_connection() as conn:
         c = conn.cursor()
-        
-        # Get min and max prices with optional keyword filter
-        if keyword:
-            c.execute("""
-                SELECT MIN(l.price) as min_price, MAX(l.price) as max_price
-                FROM listings l
-                JOIN listing_analytics la ON l.id = la.listing_id
-                WHERE l.created_at >= datetime('now', ? || ' days')
-                  AND l.price > 0
-                  AND la.keyword = ?
-                  AND l.user_id = ?
-            """, (f'-{days}', keyword, user_id))
+
+        if quantiles:
+            c.execute(filtered_sql, params)
+            prices = sorted(row[0] for row in c.fetchall())
+            if not prices:
+                return []
+            edges = [_quantile(prices, i / bins) for i in range(bins + 1)]
+            price_ranges = []
+            lower_index = 0
+            for i in range(bins):
+                is_last_bin = (i == bins - 1)
+                upper_index = len(prices) if is_last_bin else bisect.bisect_left(prices, edges[i + 1], lower_index)
+                price_ranges.append(_price_bin(
+                    edges[i], edges[i + 1], upper_index - lower_index,
+                    percentile=round(100 * (i + 1) / bins, 2),
+                ))
+                lower_index = upper_index
+            return price_ranges
+
+        if USE_POSTGRES:
+            # width_bucket puts the maximum in bucket bins + 1; fold it into the last bin
+            bucket_sql = "LEAST(width_bucket(f.price, b.lo, b.hi, ?), ?) - 1"
         else:
-            c.execute("""
-                SELECT MIN(price) as min_price, MAX(price) as max_price
-                FROM listings 
-                WHERE created_at >= datetime('now', ? || ' days')
-                  AND price > 0
-                  AND user_id = ?
-            """, (f'-{days}', user_id))
-        
-        result = c.fetchone()
-        if not result or not result[0] or not result[1]:
+            # Prices are positive, so CAST truncation is floor
+            bucket_sql = "MIN(CAST((f.price - b.lo) * ? / (b.hi - b.lo) AS INTEGER), ? - 1)"
+        c.execute(f"""
+            WITH filtered AS ({filtered_sql}),
+            bounds AS (SELECT MIN(price) AS lo, MAX(price) AS hi FROM filtered)
+            SELECT CASE WHEN b.hi = b.lo THEN 0 ELSE {bucket_sql} END AS bucket,
+                   COUNT(*), MIN(b.lo), MIN(b.hi)
+            FROM filtered f CROSS JOIN bounds b
+            GROUP BY 1
+        """, params + [bins, bins])
+        rows = c.fetchall()
+        if not rows:
             return []
-        
-        min_price, max_price = result
-        
+
+        min_price, max_price = rows[0][2], rows[0][3]
+        counts = {int(bucket): count for bucket, count, _, _ in rows}
+
         # Handle edge case: all listings have the same price
         if min_price == max_price:
-            return [{
-                'range': f"${min_price:.0f}",
-                'count': 1,
-                'start': min_price,
-                'end': max_price
-            }]
-        
-        # Calculate bin size (bins is already validated to be > 0)
+            return [_price_bin(min_price, max_price, counts.get(0, 0))]
+
         bin_size = (max_price - min_price) / bins
-        
-        # Additional safety check
-        if bin_size <= 0:
-            logger.warning("Invalid bin_size calculated, returning empty distribution")
-            return []
-        
-        price_ranges = []
-        for i in range(bins):
-            start = min_price + (i * bin_size)
-            end = min_price + ((i + 1) * bin_size)
-            
-            # For the last bin, include the maximum price (fix off-by-one error)
-            is_last_bin = (i == bins - 1)
-            
-            if keyword:
-                if is_last_bin:
-                    c.execute("""
-                        SELECT COUNT(*) as count
-                        FROM listings l
-                        JOIN listing_analytics la ON l.id = la.listing_id
-                        WHERE l.created_at >= datetime('now', ? || ' days')
-                          AND l.price >= ? AND l.price <= ?
-                          AND la.keyword = ?
-                          AND l.user_id = ?
-                    """, (f'-{days}', start, end, keyword, user_id))
-                else:
-                    c.execute("""
-                        SELECT COUNT(*) as count
-                        FROM listings l
-                        JOIN listing_analytics la ON l.id = la.listing_id
-                        WHERE l.created_at >= datetime('now', ? || ' days')
-                          AND l.price >= ? AND l.price < ?
-                          AND la.keyword = ?
-                          AND l.user_id = ?
-                    """, (f'-{days}', start, end, keyword, user_id))
-            else:
-                if is_last_bin:
-                    c.execute("""
-                        SELECT COUNT(*) as count
-                        FROM listings 
-                        WHERE created_at >= datetime('now', ? || ' days')
-                          AND price >= ? AND price <= ?
-                          AND user_id = ?
-                    """, (f'-{days}', start, end, user_id))
-                else:
-                    c.execute("""
-                        SELECT COUNT(*) as count
-                        FROM listings 
-                        WHERE created_at >= datetime('now', ? || ' days')
-                          AND price >= ? AND price < ?
-                          AND user_id = ?
-                    """, (f'-{days}', start, end, user_id))
-            
-            count = c.fetchone()[0]
-            price_ranges.append({
-                'range': f"${start:.0f}-${end:.0f}",
-                'count': count,
-                'start': start,
-                'end': end
-            })
-        
-        return price_ranges
+        return [
+            _price_bin(min_price + (i * bin_size), min_price + ((i + 1) * bin_size), counts.get(i, 0))
+            for i in range(bins)
+        ]
 
 
 @log_errors()
 def update_keyword_trends(user_id=None):
-    """Update keyword trends from recent listings"""
-    with get_pool().get_connection() as conn:
-        c = conn.cursor()
-        
-        # Get recent listings and extract keywords
-        if user_id:
-            c.execute("""
-                SELECT id, title, price, source, created_at, user_id
-                FROM listings 
-                WHERE created_at >= datetime('now', '-1 day')
-                  AND user_id = ?
-            """, (user_id,))
-        else:
-            c.execute("""
-                SELECT id, title, price, source, created_at, user_id
-                FROM listings 
-                WHERE created_at >= datetime('now', '-1 day')
-            """)
-        
-        listings = c.fetchall()
-        
-        # Simple keyword extraction - group by user_id
-        user_keywords = {}
-        for listing in listings:
-            listing_id, title, price, source, created_at, listing_user_id = listing
-            title_lower = title.lower()
-            
-            if listing_user_id not in user_keywords:
-                user_keywords[listing_user_id] = {}
-            
-            car_keywords = ['firebird', 'camaro', 'corvette', 'mustang', 'charger', 'challenger', 
-                           'trans am', 'gto', 'nova', 'chevelle', 'impala', 'monte carlo']
-            
-            for keyword in car_keywords:
-                if keyword in title_lower:
-                    if keyword not in user_keywords[listing_user_id]:
-                        user_keywords[listing_user_id][keyword] = {'count': 0, 'total_price': 0, 'sources': set()}
-                    user_keywords[listing_user_id][keyword]['count'] += 1
-                    user_keywords[listing_user_id][keyword]['total_price'] += price
-                    user_keywords[listing_user_id][keyword]['sources'].add(source)
-        
-        # Save keyword trends per user
-        today = datetime.now().date()
-        for listing_user_id, keywords in user_keywords.items():
-            for keyword, data in keywords.items():
-                avg_price = data['total_price'] / data['count']
-                for source in data['sources']:
-                    c.execute("""
-                        INSERT OR REPLACE INTO keyword_trends (keyword, count, avg_price, date, source, user_id)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (keyword, data['count'], avg_price, today, source, listing_user_id))
-        
-        conn.commit()
+    """
+    Bring keyword trends up to date with newly ingested listings.
+
+    keyword_trends is maintained incrementally alongside listing_daily_stats
+    (one row per user, day, source and keyword), so this only folds in the
+    listings ingested since the last refresh, for every user.
+
+    Args:
+        user_id: Accepted for API compatibility; all users are refreshed
+
+    Returns:
+        int: Listings processed
+    """
+    return refresh_listing_daily_stats()
 
 
 @log_errors()
 def get_market_insights(days=30, keyword=None, user_id=None):
     """Get comprehensive market insights"""
+    _ensure_listing_daily_stats()
+    since = _listing_stats_since(days)
     with get_pool().get_connection() as conn:
         c = conn.cursor()
-        
-        # Build query with optional keyword filter
-        if keyword:
-            # Overall stats with keyword filter
-            c.execute("""
-                SELECT COUNT(*) as total_listings,
-                       AVG(l.price) as avg_price,
-                       MIN(l.price) as min_price,
-                       MAX(l.price) as max_price,
-                       COUNT(DISTINCT l.source) as sources_count
-                FROM listings l
-                JOIN listing_analytics la ON l.id = la.listing_id
-                WHERE l.created_at >= datetime('now', ? || ' days')
-                  AND la.keyword = ?
-                  AND l.user_id = ?
-            """, (f'-{days}', keyword, user_id))
-        else:
-            # Overall stats without filter
-            c.execute("""
-                SELECT COUNT(*) as total_listings,
-                       AVG(price) as avg_price,
-                       MIN(price) as min_price,
-                       MAX(price) as max_price,
-                       COUNT(DISTINCT source) as sources_count
-                FROM listings 
-                WHERE created_at >= datetime('now', ? || ' days')
-                  AND user_id = ?
-            """, (f'-{days}', user_id))
-        
+
+        # Overall stats, optionally for a single keyword
+        c.execute("""
+            SELECT COALESCE(SUM(listing_count), 0) as total_listings,
+                   SUM(price_sum) / NULLIF(SUM(price_count), 0) as avg_price,
+                   MIN(price_min) as min_price,
+                   MAX(price_max) as max_price,
+                   COUNT(DISTINCT NULLIF(source, '')) as sources_count
+            FROM listing_daily_stats
+            WHERE user_id = ?
+              AND day >= ?
+              AND keyword = ?
+        """, (user_id, since, keyword or ""))
+
         overall_stats = c.fetchone()
-        
+
         # Top performing keywords
-        if keyword:
-            c.execute("""
-                SELECT la.keyword, COUNT(*) as count, AVG(l.price) as avg_price
-                FROM listing_analytics la
-                JOIN listings l ON la.listing_id = l.id
-                WHERE la.created_at >= datetime('now', ? || ' days')
-                  AND la.keyword = ?
-                  AND l.user_id = ?
-                GROUP BY la.keyword
-                LIMIT 5
-            """, (f'-{days}', keyword, user_id))
-        else:
-            c.execute("""
-                SELECT la.keyword, COUNT(*) as count, AVG(l.price) as avg_price
-                FROM listing_analytics la
-                JOIN listings l ON la.listing_id = l.id
-                WHERE la.created_at >= datetime('now', ? || ' days')
-                  AND l.user_id = ?
-                GROUP BY la.keyword
-                ORDER BY count DESC
-                LIMIT 5
-            """, (f'-{days}', user_id))
-        
-        top_keywords_rows = c.fetchall()
-        
-        # Source performance
-        if keyword:
-            c.execute("""
-                SELECT l.source, COUNT(*) as count, AVG(l.price) as avg_price
-                FROM listings l
-                JOIN listing_analytics la ON l.id = la.listing_id
-                WHERE l.created_at >= datetime('now', ? || ' days')
-                  AND la.keyword = ?
-                  AND l.user_id = ?
-                GROUP BY l.source
-                ORDER BY count DESC
-            """, (f'-{days}', keyword, user_id))
-        else:
-            c.execute("""
-                SELECT source, COUNT(*) as count, AVG(price) as avg_price
-                FROM listings 
-                WHERE created_at >= datetime('now', ? || ' days')
-                  AND user_id = ?
-                GROUP BY source
-                ORDER BY count DESC
-            """, (f'-{days}', user_id))
-        
-        source_rows = c.fetchall()
+        keyword_clause = "keyword = ?" if keyword else "keyword <> ''"
+        c.execute(f"""
+            SELECT keyword,
+                   SUM(listing_count) as count,
+                   SUM(price_sum) / NULLIF(SUM(price_count), 0) as avg_price
+            FROM listing_daily_stats
+            WHERE user_id = ?
+              AND day >= ?
+              AND {keyword_clause}
+            GROUP BY keyword
+            ORDER BY count DESC, keyword
+            LIMIT 5
+        """, (user_id, since, keyword) if keyword else (user_id, since))
 
-        # Price distribution buckets
-        if keyword:
-            c.execute("""
-                SELECT
-                    CASE
-                        WHEN l.price < 5000 THEN 'Under $5K'
-                        WHEN l.price < 10000 THEN '$5K-$10K'
-                        WHEN l.price < 20000 THEN '$10K-$20K'
-                        WHEN l.price < 30000 THEN '$20K-$30K'
-                        ELSE 'Over $30K'
-                    END AS bucket,
-                    COUNT(*) as count
-                FROM listings l
-                JOIN listing_analytics la ON la.listing_id = l.id
-                WHERE l.created_at >= datetime('now', ? || ' days')
-                  AND la.keyword = ?
-                  AND l.user_id = ?
-                GROUP BY bucket
-                ORDER BY bucket
-            """, (f'-{days}', keyword, user_id))
-        else:
-            c.execute("""
-                SELECT
-                    CASE
-                        WHEN price < 5000 THEN 'Under $5K'
-                        WHEN price < 10000 THEN '$5K-$10K'
-                        WHEN price < 20000 THEN '$10K-$20K'
-                        WHEN price < 30000 THEN '$20K-$30K'
-                        ELSE 'Over $30K'
-                    END AS bucket,
-                    COUNT(*) as count
-                FROM listings
-                WHERE created_at >= datetime('now', ? || ' days')
-                  AND user_id = ?
-                GROUP BY bucket
-                ORDER BY bucket
-            """, (f'-{days}', user_id))
+        top_keywords_rows = c.fetchall()
 
-        price_rows = c.fetchall()
+        # Source performance and the price sketches behind the distribution
+        c.execute("""
+            SELECT NULLIF(source, ''), listing_count, price_sum, price_count, price_sketch
+            FROM listing_daily_stats
+            WHERE user_id = ?
+              AND day >= ?
+              AND keyword = ?
+        """, (user_id, since, keyword or ""))
+
+        by_source: Dict[Any, List[float]] = {}
+        sketch = [0] * (len(PRICE_SKETCH_EDGES) + 1)
+        for source, listing_count, price_sum, price_count, price_sketch in c.fetchall():
+            totals = by_source.setdefault(source, [0, 0, 0])
+            totals[0] += listing_count or 0
+            totals[1] += price_sum or 0
+            totals[2] += price_count or 0
+            if price_sketch:
+                sketch = [a + b for a, b in zip(sketch, json.loads(price_sketch))]
 
         top_keywords = [
             {
@@ -13965,20 +15348,31 @@ def get_market_insights(days=30, keyword=None, user_id=None):
 
         source_performance = [
             {
-                "source": row[0] or "unknown",
-                "count": int(row[1] or 0),
-                "average_price": float(row[2]) if row[2] is not None else None,
+                "source": source or "unknown",
+                "count": int(count),
+                "average_price": float(price_sum) / price_count if price_count else None,
             }
-            for row in source_rows
+            for source, (count, price_sum, price_count) in sorted(
+                by_source.items(), key=lambda item: item[1][0], reverse=True
+            )
         ]
 
+        # Sketch buckets nest inside the market buckets, so the counts are exact
+        bucket_counts: Dict[str, int] = defaultdict(int)
+        for index, count in enumerate(sketch):
+            upper = PRICE_SKETCH_EDGES[index] if index < len(PRICE_SKETCH_EDGES) else None
+            for label, limit in _MARKET_PRICE_BUCKETS:
+                if limit is None or (upper is not None and upper <= limit):
+                    bucket_counts[label] += count
+                    break
+
         price_distribution = [
             {
-                "bucket": row[0] or "Unknown",
-                "count": int(row[1] or 0),
+                "bucket": label,
+                "count": count,
             }
-            for row in price_rows
-            if row[0]
+            for label, count in sorted(bucket_counts.items())
+            if count
         ]
 
         return {
@@ -14234,42 +15628,48 @@ def get_seller_listing_stats(username):
 @log_errors()
 def get_user_subscription(username):
     """Get user's subscription information"""
-    with get_pool().get_connection() as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT tier, status, stripe_customer_id, stripe_subscription_id, 
-                   current_period_start, current_period_end, cancel_at_period_end,
-                   created_at, updated_at
-            FROM subscriptions
-            WHERE username = ?
-        """, (username,))
-        
-        row = c.fetchone()
+    # Only stored subscriptions are cached so a new one is seen at once
+    cache_key = f"db:subscription:{username}"
+    row = get_cache().get(cache_key)
+    if row is None:
+        with get_pool().get_connection() as conn:
+            c = conn.cursor()
+            c.execute("""
+                SELECT tier, status, stripe_customer_id, stripe_subscription_id, 
+                       current_period_start, current_period_end, cancel_at_period_end,
+                       created_at, updated_at
+                FROM subscriptions
+                WHERE username = ?
+            """, (username,))
+            row = c.fetchone()
         if row:
-            return {
-                'tier': row[0],
-                'status': row[1],
-                'stripe_customer_id': row[2],
-                'stripe_subscription_id': row[3],
-                'current_period_start': row[4],
-                'current_period_end': row[5],
-                'cancel_at_period_end': row[6],
-                'created_at': row[7],
-                'updated_at': row[8]
-            }
-        
-        # Return default free tier if no subscription found
+            row = tuple(row)
+            get_cache().set(cache_key, row, HOT_READ_CACHE_TTL, (user_cache_tag(username),))
+    if row:
         return {
-            'tier': 'free',
-            'status': 'active',
-            'stripe_customer_id': None,
-            'stripe_subscription_id': None,
-            'current_period_start': None,
-            'current_period_end': None,
-            'cancel_at_period_end': False,
-            'created_at': None,
-            'updated_at': None
+            'tier': row[0],
+            'status': row[1],
+            'stripe_customer_id': row[2],
+            'stripe_subscription_id': row[3],
+            'current_period_start': row[4],
+            'current_period_end': row[5],
+            'cancel_at_period_end': row[6],
+            'created_at': row[7],
+            'updated_at': row[8]
         }
+    
+    # Return default free tier if no subscription found
+    return {
+        'tier': 'free',
+        'status': 'active',
+        'stripe_customer_id': None,
+        'stripe_subscription_id': None,
+        'current_period_start': None,
+        'current_period_end': None,
+        'cancel_at_period_end': False,
+        'created_at': None,
+        'updated_at': None
+    }
 
 
 @log_errors()
@@ -14308,6 +15708,7 @@ def create_or_update_subscription(username, tier, status='active', stripe_custom
         c.execute("UPDATE users SET subscription_tier = ? WHERE username = ?", (tier, username))
         
         conn.commit()
+        _invalidate_user_cache(username)
         return True
 
 
@@ -14414,6 +15815,7 @@ def cancel_subscription(username):
         c.execute("UPDATE users SET subscription_tier = 'free' WHERE username = ?", (username,))
         
         conn.commit()
+        _invalidate_user_cache(username)
         return True
 
 
@@ -14573,6 +15975,7 @@ def verify_email_token(token):
         """, (username,))
         
         conn.commit()
+        _invalidate_user_cache(username)
         logger.info(f"Email verified for user: {username}")
         return True, username
 
@@ -14667,6 +16070,7 @@ def verify_email_code(username: str, code: str) -> Tuple[bool, str]:
         """, (username,))
 
         conn.commit()
+        _invalidate_user_cache(username)
         logger.info(f"Email verified via code for user: {username}")
         return True, username
 
@@ -14738,6 +16142,7 @@ def reset_user_password(username, new_password_hash):
             WHERE username = ?
         """, (new_password_hash, username))
         conn.commit()
+        _invalidate_user_cache(username)
         logger.info(f"Password reset for user: {username}")
         return True
 
@@ -14946,6 +16351,7 @@ def create_saved_search(username, name, keywords=None, min_price=None, max_price
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (username, name, keywords, min_price, max_price, sources, location, radius, notify_new))
         conn.commit()
+        _invalidate_listing_match_index(username)
         return c.lastrowid
 def get_saved_searches(username):
     """Get all saved searches for a user"""
@@ -15015,6 +16421,49 @@ def get_saved_search_by_id(search_id: int, username: Optional[str] = None) -> Op
     }
 
 
+@log_errors()
+def get_all_saved_searches() -> List[Dict[str, Any]]:
+    """Get every saved search in one query (background runners)."""
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            SELECT id, username, name, keywords, min_price, max_price, sources,
+                   notify_new, last_run, last_listing_id
+            FROM saved_searches
+            ORDER BY id
+        """)
+        rows = c.fetchall()
+    return [{
+        'id': row[0],
+        'username': row[1],
+        'name': row[2],
+        'keywords': row[3],
+        'min_price': row[4],
+        'max_price': row[5],
+        'sources': row[6],
+        'notify_new': row[7],
+        'last_run': _to_datetime_string(row[8]),
+        'last_listing_id': row[9],
+    } for row in rows]
+
+
+@log_errors()
+def advance_saved_searches(search_ids, last_listing_id: int) -> None:
+    """Record a run for several saved searches and move their high-water mark."""
+    ids = list(search_ids or [])
+    if not ids:
+        return
+    now = datetime.now()
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.executemany("""
+            UPDATE saved_searches
+            SET last_run = ?, last_listing_id = ?
+            WHERE id = ?
+        """, [(now, last_listing_id, search_id) for search_id in ids])
+        conn.commit()
+
+
 @log_errors()
 def delete_saved_search(search_id, username):
     """Delete a saved search"""
@@ -15025,6 +16474,7 @@ def delete_saved_search(search_id, username):
             WHERE id = ? AND username = ?
         """, (search_id, username))
         conn.commit()
+        _invalidate_listing_match_index(username)
         return c.rowcount > 0
 
 
@@ -15055,6 +16505,7 @@ def create_price_alert(username, keywords, threshold_price, alert_type='under'):
             VALUES (?, ?, ?, ?)
         """, (username, keywords, threshold_price, alert_type))
         conn.commit()
+        _invalidate_listing_match_index(username)
         return c.lastrowid
 
 
@@ -15092,6 +16543,7 @@ def delete_price_alert(alert_id, username):
             WHERE id = ? AND username = ?
         """, (alert_id, username))
         conn.commit()
+        _invalidate_listing_match_index(username)
         return c.rowcount > 0
 
 
@@ -15106,6 +16558,7 @@ def toggle_price_alert(alert_id, username):
             WHERE id = ? AND username = ?
         """, (alert_id, username))
         conn.commit()
+        _invalidate_listing_match_index(username)
         return c.rowcount > 0
 
 
@@ -15122,6 +16575,26 @@ def update_price_alert_triggered(alert_id):
         conn.commit()
 
 
+@log_errors()
+def claim_price_alert_trigger(alert_id, cooldown_seconds=3600) -> bool:
+    """
+    Atomically mark a price alert triggered unless it fired within the cooldown.
+
+    Returns:
+        bool: True if the caller won the trigger and should notify
+    """
+    now = datetime.now()
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            UPDATE price_alerts
+            SET last_triggered = ?
+            WHERE id = ? AND active = 1 AND (last_triggered IS NULL OR last_triggered < ?)
+        """, (now, alert_id, now - timedelta(seconds=cooldown_seconds)))
+        conn.commit()
+        return c.rowcount > 0
+
+
 @log_errors()
 def get_active_price_alerts():
     """Get all active price alerts"""
@@ -15144,6 +16617,87 @@ def get_active_price_alerts():
         } for row in rows]
 
 
+@log_errors()
+def get_notification_subscriptions(username=None) -> Dict[str, Any]:
+    """
+    Load everything the listing match index needs in four queries.
+
+    Only active users with email or SMS notifications enabled are included.
+
+    Args:
+        username: Restrict to one user (incremental index rebuild)
+
+    Returns:
+        dict with ``users`` (get_users_with_notifications_enabled rows),
+        ``settings`` ({username: {key: value}} for keywords/min_price/max_price),
+        ``saved_searches`` (rows with notify_new set) and ``price_alerts``
+        (active alerts)
+    """
+    user_filter = " AND username = ?" if username else ""
+    params = (username,) if username else ()
+    with get_pool().get_connection() as conn:
+        c = conn.cursor()
+        c.execute(f"""
+            SELECT username, email, phone_number, email_notifications, sms_notifications
+            FROM users
+            WHERE active = 1 AND (email_notifications = 1 OR sms_notifications = 1){user_filter}
+        """, params)
+        users = [
+            {
+                'username': row[0],
+                'email': row[1],
+                'phone_number': row[2],
+                'email_notifications': bool(row[3]),
+                'sms_notifications': bool(row[4])
+            }
+            for row in c.fetchall()
+        ]
+
+        c.execute(f"""
+            SELECT username, key, value
+            FROM settings
+            WHERE username IS NOT NULL AND key IN ('keywords', 'min_price', 'max_price'){user_filter}
+        """, params)
+        settings: Dict[str, Dict[str, str]] = {}
+        for row_username, key, value in c.fetchall():
+            settings.setdefault(row_username, {})[key] = value
+
+        c.execute(f"""
+            SELECT id, username, name, keywords, min_price, max_price, sources
+            FROM saved_searches
+            WHERE notify_new = 1{user_filter}
+        """, params)
+        saved_searches = [{
+            'id': row[0],
+            'username': row[1],
+            'name': row[2],
+            'keywords': row[3],
+            'min_price': row[4],
+            'max_price': row[5],
+            'sources': row[6]
+        } for row in c.fetchall()]
+
+        c.execute(f"""
+            SELECT id, username, keywords, threshold_price, alert_type
+            FROM price_alerts
+            WHERE active = 1{user_filter}
+        """, params)
+        price_alerts = [{
+            'id': row[0],
+            'username': row[1],
+            'keywords': row[2],
+            'threshold_price': row[3],
+            'alert_type': row[4]
+        } for row in c.fetchall()]
+
+    return {
+        'users': users,
+        'settings': settings,
+        'saved_searches': saved_searches,
+        'price_alerts': price_alerts,
+    }
+
+
 # ======================
 # VISITOR ANALYTICS
 # ======================
@@ -15381,12 +16935,31 @@ def get_visitor_hourly_counts(hours: int = 72) -> List[Dict[str, Any]]:
         } for row in rows]
 
 
+def _stop_background_consumers():
+    """Stop in-process workers that poll the database, if they were started."""
+    for module_name, stop_name in (
+        ("price_alert_stream", "stop_price_alert_stream"),
+        ("notification_worker", "stop_notification_workers"),
+    ):
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        try:
+            getattr(module, stop_name)()
+        except Exception as e:
+            logger.warning(f"Failed to stop {module_name}: {e}")
+
+
 def close_database():
     """Close all database connections"""
     global _connection_pool
+    # Stop background consumers before their connections are closed
+    _stop_background_consumers()
     if _connection_pool:
         _connection_pool.close_all()
         _connection_pool = None
+    # Cached rows belong to the database that was just closed
+    get_cache().clear()
     
     # Stop the activity logger
     stop_activity_logger()
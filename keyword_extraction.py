@@ -0,0 +1,76 @@
+"""Keyword extraction for listing analytics.
+
+A ``KeywordMatcher`` compiles a set of keyword phrases into one regex
+alternation, so tagging a title is a single pass over it instead of one
+substring check per phrase. Matching is case-insensitive substring matching,
+the same rule the match index and the scrapers apply to user keywords:
+``matcher.find("1969 Camaro SS")`` returns every configured phrase that
+occurs in the title, including phrases nested inside a longer one
+("trans" inside "trans am").
+
+Matchers are cached per distinct phrase set, so users sharing a keyword
+configuration share the compiled automaton.
+
+Usage:
+    from keyword_extraction import get_keyword_matcher
+    keywords = get_keyword_matcher(("camaro", "trans am")).find(title)
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple
+
+MATCHER_CACHE_SIZE = 1024
+
+
+def normalize_keywords(raw: Any) -> Tuple[str, ...]:
+    """Lowercased, de-duplicated, sorted phrases from a comma string or iterable."""
+    if not raw:
+        return ()
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    phrases = {str(k).strip().lower() for k in raw}
+    return tuple(sorted(p for p in phrases if p))
+
+
+class KeywordMatcher:
+    """Find which of a fixed set of phrases occur in a piece of text."""
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases: Tuple[str, ...] = normalize_keywords(list(phrases))
+        # Longest first so the alternation prefers "trans am" over "trans";
+        # the lookahead lets matches overlap so every start position is tried
+        ordered = sorted(self.phrases, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))") if ordered else None
+        # A match also implies every shorter phrase it contains
+        self._implied: Dict[str, Tuple[str, ...]] = {
+            phrase: tuple(other for other in self.phrases if other != phrase and other in phrase)
+            for phrase in self.phrases
+        }
+
+    def find(self, text: str) -> List[str]:
+        """Return the phrases occurring in ``text``, in sorted order."""
+        if self._pattern is None or not text:
+            return []
+        found = set()
+        for match in self._pattern.finditer(text.lower()):
+            phrase = match.group(1)
+            if phrase not in found:
+                found.add(phrase)
+                found.update(self._implied[phrase])
+        return sorted(found)
+
+    def __bool__(self) -> bool:
+        return bool(self.phrases)
+
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def _cached_matcher(phrases: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(phrases)
+
+
+def get_keyword_matcher(phrases: Any) -> KeywordMatcher:
+    """Get the shared compiled matcher for a phrase set."""
+    return _cached_matcher(normalize_keywords(phrases))
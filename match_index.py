@@ -0,0 +1,384 @@
+"""In-memory index matching new listings to interested users.
+
+Every notification-enabled user contributes subscriptions from three places:
+their scraper settings (keywords + price range), saved searches with
+``notify_new`` set, and active price alerts. Each subscription is posted
+under the longest token of each of its keyword phrases and under every
+price bucket its range overlaps, so matching a listing only touches the
+postings for the title's tokens in the listing's price bucket and then
+verifies those candidates exactly. Cost is proportional to the number of
+candidate subscriptions, not to the number of users.
+
+The index rebuilds one user at a time when ``invalidate_user`` is called
+(db_enhanced does this whenever settings, saved searches, price alerts or
+notification preferences change) and does a full rebuild every
+``FULL_REBUILD_SECONDS`` to pick up changes made by other processes.
+
+Usage:
+    from match_index import get_match_index
+    users = get_match_index().match_users(title, price, source)
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import weakref
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from utils import logger
+
+# ======================
+# CONFIGURATION
+# ======================
+# Lower bounds of the price buckets. A listing lands in exactly one bucket;
+# a subscription is posted in every bucket its price range overlaps.
+PRICE_BUCKETS = (0, 500, 1000, 2500, 5000, 10000, 20000, 35000, 50000, 100000)
+UNPRICED_BUCKET = -1
+
+FULL_REBUILD_SECONDS = 300
+
+# Same defaults scrapers.common.load_settings applies to users without settings
+DEFAULT_SETTINGS = {"keywords": "Firebird,Camaro,Corvette", "min_price": "1000", "max_price": "30000"}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_WILDCARD = ""
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens of ``text``."""
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def _split_keywords(raw: Any) -> Tuple[str, ...]:
+    if not raw:
+        return ()
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    phrases = {str(k).strip().lower() for k in raw}
+    return tuple(sorted(p for p in phrases if p))
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _price_bucket(price: float) -> int:
+    return max(bisect_right(PRICE_BUCKETS, price) - 1, 0)
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """One reason a user wants to hear about a listing."""
+
+    kind: str  # 'settings', 'saved_search' or 'price_alert'
+    ref_id: Any  # saved search / price alert id, username for settings
+    username: str
+    phrases: Tuple[str, ...]  # empty = any title
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    strict: bool = False  # price alerts compare with < / >
+    accepts_unpriced: bool = True
+    sources: FrozenSet[str] = frozenset()
+
+    def price_ok(self, price: Optional[float]) -> bool:
+        if price is None:
+            return self.accepts_unpriced
+        if self.min_price is not None and (price <= self.min_price if self.strict else price < self.min_price):
+            return False
+        if self.max_price is not None and (price >= self.max_price if self.strict else price > self.max_price):
+            return False
+        return True
+
+    def matches(self, title_lower: str, price: Optional[float], source: Optional[str]) -> bool:
+        if self.sources and (source or "").lower() not in self.sources:
+            return False
+        if not self.price_ok(price):
+            return False
+        return not self.phrases or any(phrase in title_lower for phrase in self.phrases)
+
+    def buckets(self) -> List[int]:
+        low = _price_bucket(self.min_price) if self.min_price is not None else 0
+        high = _price_bucket(self.max_price) if self.max_price is not None else len(PRICE_BUCKETS) - 1
+        buckets = list(range(low, high + 1))
+        if self.accepts_unpriced:
+            buckets.append(UNPRICED_BUCKET)
+        return buckets
+
+    def index_keys(self) -> Set[str]:
+        keys = set()
+        for phrase in self.phrases:
+            tokens = tokenize(phrase)
+            keys.add(max(tokens, key=len) if tokens else _WILDCARD)
+        return keys or {_WILDCARD}
+
+
+def saved_search_subscription(search: Dict[str, Any], **overrides: Any) -> Subscription:
+    """Subscription for a saved search row (keyword/price/source filters)."""
+    fields = dict(
+        kind="saved_search",
+        ref_id=search.get("id"),
+        username=search.get("username"),
+        phrases=_split_keywords(search.get("keywords")),
+        min_price=_as_number(search.get("min_price")) or None,
+        max_price=_as_number(search.get("max_price")) or None,
+        sources=frozenset(s.strip().lower() for s in (search.get("sources") or "").split(",") if s.strip()),
+    )
+    fields.update(overrides)
+    return Subscription(**fields)
+
+
+def build_subscriptions(data: Dict[str, Any]) -> Dict[str, List[Subscription]]:
+    """
+    Turn db_enhanced.get_notification_subscriptions output into subscriptions per user.
+
+    Settings subscriptions (with load_settings defaults) are only built when
+    ``data`` has a ``settings`` key, so loaders can index alerts alone.
+    """
+    enabled = {user["username"] for user in data.get("users", [])}
+    subs: Dict[str, List[Subscription]] = {username: [] for username in enabled}
+
+    for username in (enabled if "settings" in data else ()):
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update({k: v for k, v in data.get("settings", {}).get(username, {}).items() if v not in (None, "")})
+        phrases = _split_keywords(settings["keywords"])
+        if phrases:
+            subs[username].append(Subscription(
+                kind="settings",
+                ref_id=username,
+                username=username,
+                phrases=phrases,
+                min_price=_as_number(settings["min_price"]),
+                max_price=_as_number(settings["max_price"]),
+                accepts_unpriced=False,
+            ))
+
+    for search in data.get("saved_searches", []):
+        if search["username"] in enabled:
+            subs[search["username"]].append(saved_search_subscription(search))
+
+    for alert in data.get("price_alerts", []):
+        username = alert["username"]
+        threshold = _as_number(alert.get("threshold_price"))
+        phrases = _split_keywords(alert.get("keywords"))
+        if username not in enabled or threshold is None or not phrases:
+            continue
+        under = alert.get("alert_type", "under") == "under"
+        subs[username].append(Subscription(
+            kind="price_alert",
+            ref_id=alert["id"],
+            username=username,
+            phrases=phrases,
+            min_price=None if under else threshold,
+            max_price=threshold if under else None,
+            strict=True,
+            accepts_unpriced=False,
+        ))
+
+    return subs
+
+
+class ListingMatchIndex:
+    """Token -> price bucket -> subscriptions posting index."""
+
+    def __init__(self, loader=None, full_rebuild_seconds: float = FULL_REBUILD_SECONDS):
+        self._loader = loader
+        self.full_rebuild_seconds = full_rebuild_seconds
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, Set[Subscription]]] = {}
+        self._max_key_len = 0  # bounds the title substrings worth probing
+        self._by_user: Dict[str, List[Subscription]] = {}
+        self._users: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Set[str] = set()
+        self._built_at: Optional[float] = None
+        self._stats = {"full_rebuilds": 0, "user_rebuilds": 0, "matches": 0, "candidates": 0}
+        _registry.add(self)
+
+    @classmethod
+    def from_subscriptions(cls, subscriptions: Iterable[Subscription]) -> "ListingMatchIndex":
+        """Build a fixed index (never reloaded or invalidated) over the given subscriptions."""
+        index = cls(loader=lambda username=None: {}, full_rebuild_seconds=float("inf"))
+        by_user: Dict[str, List[Subscription]] = {}
+        for sub in subscriptions:
+            by_user.setdefault(sub.username, []).append(sub)
+        with index._lock:
+            for username, subs in by_user.items():
+                index._add_locked(username, subs)
+            index._built_at = time.monotonic()
+        _registry.discard(index)
+        return index
+
+    def _load(self, username: Optional[str] = None) -> Dict[str, Any]:
+        if self._loader is not None:
+            return self._loader(username)
+        # Import here to avoid circular imports
+        from db_enhanced import get_notification_subscriptions
+        return get_notification_subscriptions(username)
+
+    # ======================
+    # MAINTENANCE
+    # ======================
+    def rebuild(self) -> None:
+        """Rebuild the whole index from the database."""
+        data = self._load()
+        subs = build_subscriptions(data)
+        with self._lock:
+            self._postings = {}
+            self._max_key_len = 0
+            self._by_user = {}
+            self._users = {user["username"]: user for user in data.get("users", [])}
+            for username, user_subs in subs.items():
+                self._add_locked(username, user_subs)
+            self._dirty.clear()
+            self._built_at = time.monotonic()
+            self._stats["full_rebuilds"] += 1
+        logger.debug(f"Listing match index rebuilt: {self.size()} subscriptions for {len(subs)} users")
+
+    def invalidate_user(self, username: Optional[str]) -> None:
+        """Mark one user's subscriptions stale; they are reloaded before the next match."""
+        if not username:
+            return
+        with self._lock:
+            if self._built_at is not None:
+                self._dirty.add(username)
+
+    def _refresh_user(self, username: str) -> None:
+        data = self._load(username)
+        subs = build_subscriptions(data)
+        with self._lock:
+            self._remove_locked(username)
+            self._users.pop(username, None)
+            for user in data.get("users", []):
+                self._users[user["username"]] = user
+            if username in subs:
+                self._add_locked(username, subs[username])
+            self._stats["user_rebuilds"] += 1
+
+    def _ensure_fresh(self) -> None:
+        with self._lock:
+            stale = self._built_at is None or time.monotonic() - self._built_at > self.full_rebuild_seconds
+            dirty = set(self._dirty)
+            self._dirty.clear()
+        if stale:
+            self.rebuild()
+            return
+        for username in dirty:
+            self._refresh_user(username)
+
+    def _add_locked(self, username: str, subs: Iterable[Subscription]) -> None:
+        subs = list(subs)
+        self._by_user[username] = subs
+        for sub in subs:
+            buckets = sub.buckets()
+            for key in sub.index_keys():
+                self._max_key_len = max(self._max_key_len, len(key))
+                by_bucket = self._postings.setdefault(key, {})
+                for bucket in buckets:
+                    by_bucket.setdefault(bucket, set()).add(sub)
+
+    def _remove_locked(self, username: str) -> None:
+        for sub in self._by_user.pop(username, []):
+            buckets = sub.buckets()
+            for key in sub.index_keys():
+                by_bucket = self._postings.get(key)
+                if not by_bucket:
+                    continue
+                for bucket in buckets:
+                    slot = by_bucket.get(bucket)
+                    if slot is not None:
+                        slot.discard(sub)
+                        if not slot:
+                            del by_bucket[bucket]
+                if not by_bucket:
+                    del self._postings[key]
+
+    # ======================
+    # MATCHING
+    # ======================
+    def match(self, title: str, price: Any = None, source: Optional[str] = None) -> List[Subscription]:
+        """Return every subscription matching the listing."""
+        self._ensure_fresh()
+        title_lower = (title or "").lower()
+        price_value = _as_number(price)
+        bucket = UNPRICED_BUCKET if price_value is None else _price_bucket(price_value)
+
+        with self._lock:
+            # A phrase is posted under its longest token, and a phrase that
+            # occurs in the title has that token inside one of the title's
+            # tokens ("camaro" in "camaros" or "chevycamaro"), so probing every
+            # substring up to the longest posted key finds every candidate.
+            probe_keys = {_WILDCARD}
+            for token in set(tokenize(title_lower)):
+                for start in range(len(token)):
+                    stop = min(len(token), start + self._max_key_len)
+                    probe_keys.update(token[start:end] for end in range(start + 1, stop + 1))
+
+            candidates: Set[Subscription] = set()
+            for key in probe_keys:
+                slot = self._postings.get(key, {}).get(bucket)
+                if slot:
+                    candidates.update(slot)
+            self._stats["matches"] += 1
+            self._stats["candidates"] += len(candidates)
+
+        return [sub for sub in candidates if sub.matches(title_lower, price_value, source)]
+
+    def match_users(self, title: str, price: Any = None, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return the notification targets for a listing.
+
+        Returns:
+            list: get_users_with_notifications_enabled-shaped dicts, one per
+            matching user, sorted by username
+        """
+        usernames = {sub.username for sub in self.match(title, price, source)}
+        with self._lock:
+            return [self._users[name] for name in sorted(usernames) if name in self._users]
+
+    # ======================
+    # STATS
+    # ======================
+    def size(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._by_user.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "users": len(self._by_user),
+                "subscriptions": sum(len(subs) for subs in self._by_user.values()),
+                "index_keys": len(self._postings),
+                "pending_user_rebuilds": len(self._dirty),
+            })
+        return stats
+
+
+_index: Optional[ListingMatchIndex] = None
+_index_lock = threading.Lock()
+# Every live index, so one invalidate_user call reaches all of them
+_registry: "weakref.WeakSet[ListingMatchIndex]" = weakref.WeakSet()
+
+
+def get_match_index() -> ListingMatchIndex:
+    """Get the process-wide listing match index."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ListingMatchIndex()
+    return _index
+
+
+def invalidate_user(username: Optional[str]) -> None:
+    """Mark a user's subscriptions stale in every index built in this process."""
+    for index in list(_registry):
+        index.invalidate_user(username)
@@ -0,0 +1,251 @@
+"""Background delivery of queued notifications.
+
+Scrapers write new-listing notifications to the ``notification_outbox`` table
+(see ``db_enhanced.save_listings_batch``) instead of sending them inline. A
+small pool of worker threads drains the outbox:
+
+* rows are claimed in per-channel batches, so concurrent workers (or several
+  app processes) never deliver the same row twice;
+* every email batch is sent over a single ``email_utils.smtp_connection``
+  and every SMS batch over a single Twilio client;
+* failed rows are retried with exponential backoff and marked ``failed``
+  after ``MAX_ATTEMPTS``.
+
+Usage:
+    from notification_worker import start_notification_workers
+    start_notification_workers()
+"""
+
+from __future__ import annotations
+
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import db_enhanced
+from email_utils import EmailConfigurationError, is_email_configured, smtp_connection
+from notifications import build_email_message, get_sms_client, is_blocked_email, send_sms_message
+from utils import logger
+
+# ======================
+# CONFIGURATION
+# ======================
+WORKER_COUNT = int(os.getenv("NOTIFICATION_WORKERS", "2"))
+BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "50"))
+POLL_INTERVAL = float(os.getenv("NOTIFICATION_POLL_INTERVAL", "2"))
+MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+# Rows left in 'sending' longer than this are assumed orphaned by a crash
+STALE_CLAIM_SECONDS = 600
+
+CHANNELS = ("email", "sms")
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before the next attempt after ``attempts`` failures."""
+    return min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+
+
+class NotificationDispatcher:
+    """Pool of threads delivering outbox rows in batches."""
+
+    def __init__(self, worker_count: int = WORKER_COUNT, batch_size: int = BATCH_SIZE,
+                 poll_interval: float = POLL_INTERVAL):
+        self.worker_count = max(1, worker_count)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._last_stale_sweep = 0.0
+        self._stats = {"batches": 0, "sent": 0, "retried": 0, "failed": 0}
+
+    # ======================
+    # LIFECYCLE
+    # ======================
+    def start(self) -> None:
+        with self._lock:
+            if self.is_running():
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._worker_loop, daemon=True, name=f"notification_worker_{i}")
+                for i in range(self.worker_count)
+            ]
+            for thread in self._threads:
+                thread.start()
+        logger.info(f"Notification workers started ({self.worker_count} threads)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            if not self._threads:
+                return
+            self._stop.set()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout=timeout)
+        logger.info("Notification workers stopped")
+
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._maybe_release_stale()
+                if not self.run_once():
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                logger.error(f"Notification worker error: {e}")
+                self._stop.wait(self.poll_interval * 5)
+
+    def _maybe_release_stale(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_stale_sweep < STALE_CLAIM_SECONDS / 2:
+                return
+            self._last_stale_sweep = now
+        released = db_enhanced.release_stale_notifications(STALE_CLAIM_SECONDS)
+        if released:
+            logger.warning(f"Re-queued {released} notifications orphaned in 'sending'")
+
+    # ======================
+    # DELIVERY
+    # ======================
+    def run_once(self) -> int:
+        """Claim and deliver one batch per channel. Returns rows processed."""
+        processed = 0
+        for channel in CHANNELS:
+            batch = db_enhanced.claim_notification_batch(channel, self.batch_size)
+            if not batch:
+                continue
+            if channel == "email":
+                self._deliver_email_batch(batch)
+            else:
+                self._deliver_sms_batch(batch)
+            processed += len(batch)
+            self._bump("batches")
+        return processed
+
+    def _deliver_email_batch(self, batch: List[Dict[str, Any]]) -> None:
+        if not is_email_configured():
+            self._fail_all(batch, "Email credentials not configured", retry=False)
+            return
+
+        sent: List[int] = []
+        pending = list(batch)
+        try:
+            with smtp_connection() as server:
+                while pending:
+                    row = pending.pop(0)
+                    if is_blocked_email(row["recipient"]):
+                        self._fail(row, "Blocked test/fake email domain", retry=False)
+                        continue
+                    try:
+                        server.send_message(build_email_message(
+                            row["recipient"], row["subject"] or "", row["body"], row["link"]
+                        ))
+                        sent.append(row["id"])
+                    except smtplib.SMTPServerDisconnected:
+                        pending.insert(0, row)
+                        raise
+                    except smtplib.SMTPRecipientsRefused as e:
+                        self._fail(row, e, retry=False)
+                    except Exception as e:
+                        self._fail(row, e)
+        except (smtplib.SMTPException, EmailConfigurationError, OSError) as e:
+            # Connection-level failure: everything not yet sent is retried
+            logger.error(f"❌ SMTP batch failed after {len(sent)} of {len(batch)} emails: {e}")
+            self._fail_all(pending, e)
+        finally:
+            self._mark_sent(sent)
+
+    def _deliver_sms_batch(self, batch: List[Dict[str, Any]]) -> None:
+        client = get_sms_client()
+        if client is None:
+            self._fail_all(batch, "SMS not configured", retry=False)
+            return
+
+        sent: List[int] = []
+        try:
+            for row in batch:
+                try:
+                    send_sms_message(client, row["recipient"], row["body"])
+                    sent.append(row["id"])
+                except Exception as e:
+                    self._fail(row, e)
+        finally:
+            self._mark_sent(sent)
+
+    def _mark_sent(self, ids: List[int]) -> None:
+        if ids:
+            db_enhanced.mark_notifications_sent(ids)
+            self._bump("sent", len(ids))
+
+    def _fail_all(self, rows: List[Dict[str, Any]], error: Any, retry: bool = True) -> None:
+        for row in rows:
+            self._fail(row, error, retry=retry)
+
+    def _fail(self, row: Dict[str, Any], error: Any, retry: bool = True) -> None:
+        attempts = row.get("attempts") or 1
+        if retry and attempts < MAX_ATTEMPTS:
+            retry_at = datetime.now() + timedelta(seconds=retry_delay(attempts))
+            db_enhanced.mark_notification_failed(row["id"], error, retry_at=retry_at)
+            self._bump("retried")
+        else:
+            db_enhanced.mark_notification_failed(row["id"], error)
+            self._bump("failed")
+            logger.warning(f"Notification {row['id']} to {row['recipient']} ({row['channel']}) failed: {error}")
+
+    # ======================
+    # STATS
+    # ======================
+    def _bump(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += amount
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["running"] = self.is_running()
+        stats["workers"] = self.worker_count
+        return stats
+
+
+_dispatcher: Optional[NotificationDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    """Get the process-wide notification dispatcher."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = NotificationDispatcher()
+    return _dispatcher
+
+
+def start_notification_workers() -> None:
+    """Start draining the notification outbox in the background."""
+    get_dispatcher().start()
+
+
+def stop_notification_workers() -> None:
+    """Stop the notification worker threads."""
+    if _dispatcher is not None:
+        _dispatcher.stop()
+
+
+def get_notification_worker_stats() -> Dict[str, Any]:
+    """Return worker counters merged with outbox status counts."""
+    stats = get_dispatcher().get_stats()
+    try:
+        stats["outbox"] = db_enhanced.get_notification_outbox_stats()
+    except Exception as e:
+        logger.debug(f"Could not read notification outbox stats: {e}")
+    return stats
@@ -33,6 +33,104 @@ except ImportError:
     logger.warning("Twilio not installed. SMS notifications will be disabled. Install with: pip install twilio")
 
 
+# Fake/test domains that never receive mail
+BLOCKED_EMAIL_DOMAINS = {'example.com', 'ex.com', 'test.com', 'localhost', 'email.com'}
+
+
+def is_blocked_email(to_email):
+    """Return True if the address belongs to a fake/test domain."""
+    if not to_email or '@' not in to_email:
+        return False
+    return to_email.split('@')[-1].lower() in BLOCKED_EMAIL_DOMAINS
+
+
+def build_email_message(
+    to_email,
+    subject,
+    message_body,
+    listing_url=None,
+    *,
+    heading=None,
+    button_text=None,
+    footer_note=None,
+):
+    """
+    Build the multipart (plain text + HTML) notification email.
+
+    Takes the same arguments as send_email_notification and returns the
+    MIMEMultipart message without sending it, so callers holding an open
+    SMTP connection can send several messages over it.
+    """
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = f"{SMTP_FROM_NAME} <{SMTP_FROM_EMAIL}>"
+    msg['To'] = to_email
+
+    action_url = listing_url
+    text_content = message_body
+    if action_url:
+        text_content += f"\n\nOpen link: {action_url}"
+
+    safe_heading = html.escape(heading or ("🔔 New Listing Found!" if action_url else subject))
+    safe_message = html.escape(message_body).replace('\n', '<br>')
+
+    if button_text is None and action_url:
+        button_text = "View Listing"
+
+    button_html = ""
+    if action_url and button_text:
+        button_html = (
+            f'<a href="{html.escape(action_url, quote=True)}" class="button">'
+            f'{html.escape(button_text)}'
+            "</a>"
+        )
+
+    footer_note = footer_note or "You're receiving this because you enabled email notifications in Botifex."
+    footer_html = html.escape(footer_note)
+
+    html_content = f"""
+    <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ background-color: #4CAF50; color: white; padding: 20px; text-align: center; border-radius: 5px 5px 0 0; }}
+                .content {{ background-color: #f9f9f9; padding: 20px; border: 1px solid #ddd; }}
+                .listing-details {{ background-color: white; padding: 15px; margin: 15px 0; border-left: 4px solid #4CAF50; }}
+                .button {{ display: inline-block; background-color: #4CAF50; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; margin: 15px 0; }}
+                .footer {{ text-align: center; color: #888; font-size: 12px; padding: 15px; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>{safe_heading}</h1>
+                </div>
+                <div class="content">
+                    <div class="listing-details">
+                        {safe_message}
+                    </div>
+                    {button_html}
+                </div>
+                <div class="footer">
+                    <p>{footer_html}</p>
+                    <p>To manage your notification preferences, log in to your Botifex dashboard.</p>
+                    <p style="margin-top: 10px; color: #888;">
+                        Need help? Contact us: <a href="mailto:Botifex2025@gmail.com" style="color: #4CAF50;">Botifex2025@gmail.com</a> | (208) 681-6169
+                    </p>
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+
+    part1 = MIMEText(text_content, 'plain')
+    part2 = MIMEText(html_content, 'html')
+    msg.attach(part1)
+    msg.attach(part2)
+    return msg
+
+
 @log_errors()
 def send_email_notification(
     to_email,
@@ -64,81 +162,20 @@ def send_email_notification(
         return False
 
     # Skip sending to fake/test email domains
-    BLOCKED_DOMAINS = {'example.com', 'ex.com', 'test.com', 'localhost', 'email.com'}
-    if to_email:
-        email_domain = to_email.split('@')[-1].lower() if '@' in to_email else ''
-        if email_domain in BLOCKED_DOMAINS:
-            logger.debug(f"Skipping email to test/fake domain: {to_email}")
-            return False
+    if is_blocked_email(to_email):
+        logger.debug(f"Skipping email to test/fake domain: {to_email}")
+        return False
 
     try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = f"{SMTP_FROM_NAME} <{SMTP_FROM_EMAIL}>"
-        msg['To'] = to_email
-
-        action_url = listing_url
-        text_content = message_body
-        if action_url:
-            text_content += f"\n\nOpen link: {action_url}"
-
-        safe_heading = html.escape(heading or ("🔔 New Listing Found!" if action_url else subject))
-        safe_message = html.escape(message_body).replace('\n', '<br>')
-
-        if button_text is None and action_url:
-            button_text = "View Listing"
-
-        button_html = ""
-        if action_url and button_text:
-            button_html = (
-                f'<a href="{html.escape(action_url, quote=True)}" class="button">'
-                f'{html.escape(button_text)}'
-                "</a>"
-            )
-
-        footer_note = footer_note or "You're receiving this because you enabled email notifications in Botifex."
-        footer_html = html.escape(footer_note)
-
-        html_content = f"""
-        <html>
-            <head>
-                <style>
-                    body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                    .header {{ background-color: #4CAF50; color: white; padding: 20px; text-align: center; border-radius: 5px 5px 0 0; }}
-                    .content {{ background-color: #f9f9f9; padding: 20px; border: 1px solid #ddd; }}
-                    .listing-details {{ background-color: white; padding: 15px; margin: 15px 0; border-left: 4px solid #4CAF50; }}
-                    .button {{ display: inline-block; background-color: #4CAF50; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; margin: 15px 0; }}
-                    .footer {{ text-align: center; color: #888; font-size: 12px; padding: 15px; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>{safe_heading}</h1>
-                    </div>
-                    <div class="content">
-                        <div class="listing-details">
-                            {safe_message}
-                        </div>
-                        {button_html}
-                    </div>
-                    <div class="footer">
-                        <p>{footer_html}</p>
-                        <p>To manage your notification preferences, log in to your Botifex dashboard.</p>
-                        <p style="margin-top: 10px; color: #888;">
-                            Need help? Contact us: <a href="mailto:Botifex2025@gmail.com" style="color: #4CAF50;">Botifex2025@gmail.com</a> | (208) 681-6169
-                        </p>
-                    </div>
-                </div>
-            </body>
-        </html>
-        """
-
-        part1 = MIMEText(text_content, 'plain')
-        part2 = MIMEText(html_content, 'html')
-        msg.attach(part1)
-        msg.attach(part2)
+        msg = build_email_message(
+            to_email,
+            subject,
+            message_body,
+            listing_url,
+            heading=heading,
+            button_text=button_text,
+            footer_note=footer_note,
+        )
 
         with smtp_connection() as server:
             server.send_message(msg)
@@ -157,6 +194,44 @@ def send_email_notification(
         return False
 
 
+def get_sms_client():
+    """
+    Return a Twilio client, or None when SMS is unavailable/unconfigured.
+
+    The client can be reused for several send_sms_message calls.
+    """
+    if not TWILIO_AVAILABLE:
+        logger.warning("Twilio library not available. Cannot send SMS notifications.")
+        return None
+
+    if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_FROM_NUMBER:
+        logger.warning("Twilio credentials not configured. Skipping SMS notification.")
+        return None
+
+    return Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+
+
+def send_sms_message(client, to_phone, message):
+    """
+    Send one SMS over an existing Twilio client.
+
+    Raises whatever Twilio raises so callers can decide whether to retry.
+
+    Returns:
+        str: Message SID
+    """
+    # Truncate message if too long (SMS limit is typically 160 chars)
+    if len(message) > 160:
+        message = message[:157] + "..."
+
+    sms = client.messages.create(
+        body=message,
+        from_=TWILIO_FROM_NUMBER,
+        to=to_phone
+    )
+    return sms.sid
+
+
 @log_errors()
 def send_sms_notification(to_phone, message):
     """
@@ -169,29 +244,13 @@ def send_sms_notification(to_phone, message):
     Returns:
         bool: True if SMS sent successfully, False otherwise
     """
-    if not TWILIO_AVAILABLE:
-        logger.warning("Twilio library not available. Cannot send SMS notifications.")
-        return False
-    
-    if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_FROM_NUMBER:
-        logger.warning("Twilio credentials not configured. Skipping SMS notification.")
+    client = get_sms_client()
+    if client is None:
         return False
     
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        
-        # Truncate message if too long (SMS limit is typically 160 chars)
-        if len(message) > 160:
-            message = message[:157] + "..."
-        
-        # Send SMS
-        sms = client.messages.create(
-            body=message,
-            from_=TWILIO_FROM_NUMBER,
-            to=to_phone
-        )
-        
-        logger.info(f"✅ SMS notification sent to {to_phone} (SID: {sms.sid})")
+        sid = send_sms_message(client, to_phone, message)
+        logger.info(f"✅ SMS notification sent to {to_phone} (SID: {sid})")
         return True
         
     except Exception as e:
@@ -199,6 +258,34 @@ def send_sms_notification(to_phone, message):
         return False
 
 
+def format_listing_notification(listing_title, listing_price, listing_url, listing_source):
+    """
+    Render the new-listing email subject/body and SMS text.
+
+    Returns:
+        dict: {'email_subject': str, 'email_body': str, 'sms': str}
+    """
+    price_str = f"${listing_price:,}" if listing_price else "Price not listed"
+    source = (listing_source or 'unknown').upper()
+
+    email_body = f"""
+A new listing matching your search criteria has been found!
+
+Title: {listing_title}
+Price: {price_str}
+Source: {source}
+
+This listing was just posted and matches your saved preferences.
+    """.strip()
+
+    return {
+        'email_subject': f"🔔 New Listing: {listing_title}",
+        'email_body': email_body,
+        # Keep SMS short and concise
+        'sms': f"New {source}: {listing_title} - {price_str}. {listing_url}",
+    }
+
+
 @log_errors()
 def notify_new_listing(user_email, user_phone, email_enabled, sms_enabled, listing_title, listing_price, listing_url, listing_source):
     """
@@ -218,37 +305,22 @@ def notify_new_listing(user_email, user_phone, email_enabled, sms_enabled, listi
         dict: Status of notifications sent {'email': bool, 'sms': bool}
     """
     results = {'email': False, 'sms': False}
-    
-    # Format price
-    price_str = f"${listing_price:,}" if listing_price else "Price not listed"
+    content = format_listing_notification(listing_title, listing_price, listing_url, listing_source)
     
     # Send email notification if enabled
     if email_enabled and user_email:
-        email_subject = f"🔔 New Listing: {listing_title}"
-        email_body = f"""
-A new listing matching your search criteria has been found!
-
-Title: {listing_title}
-Price: {price_str}
-Source: {listing_source.upper()}
-
-This listing was just posted and matches your saved preferences.
-        """.strip()
-        
         results['email'] = send_email_notification(
             to_email=user_email,
-            subject=email_subject,
-            message_body=email_body,
+            subject=content['email_subject'],
+            message_body=content['email_body'],
             listing_url=listing_url
         )
     
     # Send SMS notification if enabled
     if sms_enabled and user_phone:
-        # Keep SMS short and concise
-        sms_message = f"New {listing_source.upper()}: {listing_title} - {price_str}. {listing_url}"
         results['sms'] = send_sms_notification(
             to_phone=user_phone,
-            message=sms_message
+            message=content['sms']
         )
     
     return results
@@ -326,8 +398,12 @@ def test_sms_configuration():
 
 # Export configuration check functions
 __all__ = [
+    'build_email_message',
     'send_email_notification',
+    'get_sms_client',
+    'send_sms_message',
     'send_sms_notification',
+    'format_listing_notification',
     'notify_new_listing',
     'send_welcome_email',
     'test_email_configuration',
@@ -0,0 +1,268 @@
+"""Event-driven price alert evaluation.
+
+Price alerts used to be checked by a worker that polled the newest 100
+listings every five minutes and compared every alert with every listing.
+Now alerts are evaluated against the stream of listing ids:
+
+* ingestion (``db_enhanced.save_listing`` / ``save_listings_batch``) wakes
+  the stream as soon as a page is committed, so alerts fire within seconds;
+* the stream reads every listing with ``id`` above a persisted checkpoint
+  (``worker_checkpoints``), so no listing is skipped during bursts and a
+  restarted process catches up from where it stopped;
+* each listing is matched against a prebuilt ``match_index`` holding only
+  active price alerts, so cost follows the number of matching alerts;
+* refreshed (re-priced) listings are pushed to the stream directly.
+
+``db_enhanced.claim_price_alert_trigger`` enforces the one-trigger-per-hour
+cooldown atomically, so several processes can run the stream safely.
+
+Usage:
+    from price_alert_stream import start_price_alert_stream
+    start_price_alert_stream()
+"""
+
+from __future__ import annotations
+
+import threading
+from queue import Empty, Full, Queue
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import db_enhanced
+from match_index import ListingMatchIndex
+from utils import logger
+
+# ======================
+# CONFIGURATION
+# ======================
+CHECKPOINT_NAME = "price_alerts"
+ALERT_COOLDOWN_SECONDS = 3600
+PAGE_SIZE = 500
+# Upper bound on how long new listings wait when no ingestion wake-up arrives
+# (e.g. they were written by another process)
+IDLE_WAIT_SECONDS = 15
+# PostgreSQL SERIAL ids can commit out of order, so ids just below the
+# checkpoint are re-read and any not yet evaluated are picked up. The
+# overlap never reaches below the checkpoint this process started from.
+CURSOR_OVERLAP = 200
+QUEUE_SIZE = 5000
+
+
+def _load_price_alerts(username: Optional[str] = None) -> Dict[str, Any]:
+    """match_index loader indexing active price alerts only."""
+    alerts = db_enhanced.get_active_price_alerts() or []
+    if username:
+        alerts = [alert for alert in alerts if alert["username"] == username]
+    return {
+        "users": [{"username": name} for name in {alert["username"] for alert in alerts}],
+        "price_alerts": alerts,
+    }
+
+
+class PriceAlertStream:
+    """Evaluates price alerts for newly ingested listings."""
+
+    def __init__(self, index: Optional[ListingMatchIndex] = None,
+                 cooldown_seconds: int = ALERT_COOLDOWN_SECONDS, page_size: int = PAGE_SIZE):
+        self.index = index or ListingMatchIndex(loader=_load_price_alerts)
+        self.cooldown_seconds = cooldown_seconds
+        self.page_size = page_size
+        self._updates: Queue = Queue(maxsize=QUEUE_SIZE)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pass_lock = threading.Lock()
+        self._recent_ids: Set[int] = set()
+        self._start_cursor: Optional[int] = None
+        self._stats = {"listings": 0, "triggers": 0, "updates": 0, "dropped_updates": 0}
+
+    # ======================
+    # EVALUATION
+    # ======================
+    def evaluate(self, listings: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Fire every price alert the listings match.
+
+        Returns:
+            list: One dict per fired alert with ``alert_id``, ``username`` and ``listing``
+        """
+        triggered = []
+        for listing in listings:
+            self._stats["listings"] += 1
+            for sub in self.index.match(listing.get("title"), listing.get("price"), listing.get("source")):
+                if sub.kind != "price_alert":
+                    continue
+                if not db_enhanced.claim_price_alert_trigger(sub.ref_id, self.cooldown_seconds):
+                    continue
+                logger.info(f"🚨 Price alert triggered for {sub.username}: {listing.get('title')} @ ${listing.get('price')}")
+                self._deliver(sub, listing)
+                triggered.append({"alert_id": sub.ref_id, "username": sub.username, "listing": listing})
+        self._stats["triggers"] += len(triggered)
+        return triggered
+
+    def _deliver(self, sub, listing: Dict[str, Any]) -> None:
+        keywords = ", ".join(sub.phrases)
+        threshold = sub.max_price if sub.max_price is not None else sub.min_price
+        try:
+            # The outbox ignores a listing the user was already notified about
+            db_enhanced.enqueue_listing_notification(sub.username, listing)
+        except Exception as e:
+            logger.error(f"Error queueing price alert notification for {sub.username}: {e}")
+
+        try:
+            from websocket_manager import notify_price_alert_triggered
+            notify_price_alert_triggered(sub.username, {
+                "keywords": keywords,
+                "threshold_price": threshold,
+                "listing": listing,
+            })
+        except Exception:
+            pass  # WebSocket might not be available
+
+    # ======================
+    # STREAM
+    # ======================
+    def catch_up(self) -> int:
+        """
+        Evaluate every listing past the checkpoint, advancing it page by page.
+
+        The first run in a fresh database starts at the current newest listing
+        rather than replaying history.
+
+        Returns:
+            int: Listings evaluated
+        """
+        with self._pass_lock:
+            cursor = db_enhanced.get_worker_checkpoint(CHECKPOINT_NAME)
+            if cursor is None:
+                cursor = db_enhanced.get_max_listing_id()
+                db_enhanced.set_worker_checkpoint(CHECKPOINT_NAME, cursor)
+                self._start_cursor = cursor
+                return 0
+            if self._start_cursor is None:
+                self._start_cursor = cursor
+
+            evaluated = 0
+            position = max(cursor - CURSOR_OVERLAP, self._start_cursor)
+            while not self._stop.is_set():
+                page = db_enhanced.get_listings_after(position, self.page_size)
+                if not page:
+                    break
+                fresh = [listing for listing in page if listing["id"] not in self._recent_ids]
+                if fresh:
+                    self.evaluate(fresh)
+                    self._recent_ids.update(listing["id"] for listing in fresh)
+                    evaluated += len(fresh)
+                position = page[-1]["id"]
+                if position > cursor:
+                    cursor = position
+                    db_enhanced.set_worker_checkpoint(CHECKPOINT_NAME, cursor)
+                if len(page) < self.page_size:
+                    break
+
+            floor = cursor - CURSOR_OVERLAP
+            self._recent_ids = {listing_id for listing_id in self._recent_ids if listing_id > floor}
+            return evaluated
+
+    def publish(self, listings: Iterable[Dict[str, Any]]) -> None:
+        """
+        Called after ingestion commits.
+
+        New rows are picked up through the checkpoint; refreshed rows (which
+        keep their id) are queued so a price drop can still fire an alert.
+        """
+        for listing in listings:
+            if listing.get("is_new", True):
+                continue
+            try:
+                self._updates.put_nowait(listing)
+            except Full:
+                self._stats["dropped_updates"] += 1
+        self._wake.set()
+
+    def _drain_updates(self) -> int:
+        updates = []
+        while True:
+            try:
+                updates.append(self._updates.get_nowait())
+            except Empty:
+                break
+        if updates:
+            self.evaluate(updates)
+            self._stats["updates"] += len(updates)
+        return len(updates)
+
+    def run_once(self) -> int:
+        """One stream pass: queued updates, then everything past the checkpoint."""
+        return self._drain_updates() + self.catch_up()
+
+    # ======================
+    # LIFECYCLE
+    # ======================
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="price_alert_stream")
+        self._thread.start()
+        logger.info("Price alert stream started")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is None:
+            return
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        logger.info("Price alert stream stopped")
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Price alert stream error: {e}")
+            self._wake.wait(IDLE_WAIT_SECONDS)
+            self._wake.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats.update({
+            "running": self.is_running(),
+            "queued_updates": self._updates.qsize(),
+            "index": self.index.get_stats(),
+        })
+        return stats
+
+
+_stream: Optional[PriceAlertStream] = None
+_stream_lock = threading.Lock()
+
+
+def get_price_alert_stream() -> PriceAlertStream:
+    """Get the process-wide price alert stream."""
+    global _stream
+    if _stream is None:
+        with _stream_lock:
+            if _stream is None:
+                _stream = PriceAlertStream()
+    return _stream
+
+
+def start_price_alert_stream() -> None:
+    """Start evaluating price alerts in the background."""
+    get_price_alert_stream().start()
+
+
+def stop_price_alert_stream() -> None:
+    """Stop the background price alert stream."""
+    if _stream is not None:
+        _stream.stop()
+
+
+def publish_ingested_listings(listings: Iterable[Dict[str, Any]]) -> None:
+    """Wake the running stream after ingestion; no-op when it is not running here."""
+    if _stream is not None and _stream.is_running():
+        _stream.publish(listings)
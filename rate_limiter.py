@@ -1,4 +1,7 @@
 # rate_limiter.py - Rate limiting middleware for handling high-traffic scenarios
+import os
+import threading
+import time
 from functools import wraps
 from flask import request, jsonify, g
 from flask_login import current_user
@@ -19,6 +22,144 @@ RATE_LIMITS = {
 }
 
 
+# Windows at least this long (login, registration, checkout) keep their counters
+# in the database so they survive restarts and are shared by every worker.
+DB_WINDOW_THRESHOLD_MINUTES = int(os.getenv('RATE_LIMIT_DB_WINDOW_MINUTES', '5'))
+
+
+class InMemoryRateLimitBackend:
+    """
+    Per-worker token buckets.
+
+    Each (username, endpoint) bucket holds up to ``max_requests`` tokens and
+    refills continuously over ``window_minutes``, so bursts are capped at the
+    limit and the sustained rate matches the configured window.
+
+    Also documents the interface every rate limit backend implements: a
+    ``name``, ``hit`` and ``reset``.
+    """
+
+    name = "memory"
+
+    def __init__(self, clock=time.monotonic, sweep_interval=60.0):
+        self._clock = clock
+        self._buckets = {}  # (username, endpoint) -> [tokens, updated_at, window_seconds]
+        self._lock = threading.Lock()
+        self._sweep_interval = sweep_interval
+        self._last_sweep = clock()
+
+    def hit(self, username, endpoint, max_requests, window_minutes):
+        """Record one request. Returns ``(is_allowed, remaining_requests)``."""
+        if max_requests <= 0:
+            return False, 0
+        now = self._clock()
+        window_seconds = max(window_minutes * 60.0, 1.0)
+        key = (username, endpoint)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = float(max_requests)
+            else:
+                elapsed = now - bucket[1]
+                tokens = min(float(max_requests), bucket[0] + elapsed * max_requests / window_seconds)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = [tokens, now, window_seconds]
+            if now - self._last_sweep >= self._sweep_interval:
+                self._sweep(now)
+        return allowed, int(tokens)
+
+    def _sweep(self, now):
+        """Drop buckets that have been idle long enough to be full again."""
+        self._last_sweep = now
+        stale = [key for key, (_, updated_at, window) in self._buckets.items() if now - updated_at >= window]
+        for key in stale:
+            del self._buckets[key]
+
+    def reset(self, username, endpoint=None):
+        """Forget counters for ``username`` (optionally only for ``endpoint``)."""
+        with self._lock:
+            for key in [key for key in self._buckets if key[0] == username and endpoint in (None, key[1])]:
+                del self._buckets[key]
+        return True
+
+
+class RedisRateLimitBackend:
+    """
+    Fixed-window counters shared by every worker through the realtime Redis
+    connection. Falls back to ``fallback`` while Redis is unavailable.
+    """
+
+    name = "redis"
+    KEY_PREFIX = "ratelimit"
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def hit(self, username, endpoint, max_requests, window_minutes):
+        import websocket_manager
+
+        window_seconds = max(int(window_minutes * 60), 1)
+        window_index = int(time.time() // window_seconds)
+        key = f"{self.KEY_PREFIX}:{endpoint}:{username}:{window_index}"
+
+        def _increment(client):
+            pipe = client.pipeline()
+            pipe.incr(key)
+            pipe.expire(key, window_seconds)
+            return pipe.execute()[0]
+
+        count = websocket_manager._with_redis("rate_limit", _increment)
+        if count is None:
+            return self.fallback.hit(username, endpoint, max_requests, window_minutes)
+        count = int(count)
+        if count > max_requests:
+            return False, 0
+        return True, max_requests - count
+
+    def reset(self, username, endpoint=None):
+        import websocket_manager
+
+        pattern = f"{self.KEY_PREFIX}:{endpoint or '*'}:{username}:*"
+
+        def _delete(client):
+            keys = list(client.scan_iter(match=pattern))
+            if keys:
+                client.delete(*keys)
+            return True
+
+        websocket_manager._with_redis("rate_limit_reset", _delete)
+        return self.fallback.reset(username, endpoint)
+
+
+class DatabaseRateLimitBackend:
+    """Counters persisted in the ``rate_limits`` table."""
+
+    name = "database"
+
+    def hit(self, username, endpoint, max_requests, window_minutes):
+        return db_enhanced.check_rate_limit(username, endpoint, max_requests, window_minutes)
+
+    def reset(self, username, endpoint=None):
+        return db_enhanced.reset_rate_limit(username, endpoint)
+
+
+_memory_backend = InMemoryRateLimitBackend()
+_shared_backend = RedisRateLimitBackend(_memory_backend)
+_database_backend = DatabaseRateLimitBackend()
+
+
+def get_rate_limit_backend(window_minutes):
+    """Pick where counters for a window of ``window_minutes`` are kept."""
+    if window_minutes >= DB_WINDOW_THRESHOLD_MINUTES:
+        return _database_backend
+    import websocket_manager
+    if websocket_manager.redis_enabled:
+        return _shared_backend
+    return _memory_backend
+
+
 def get_rate_limit_key(endpoint_type):
     """Generate rate limit key based on user and endpoint type"""
     if current_user.is_authenticated:
@@ -86,10 +227,10 @@ def rate_limit(endpoint_type, max_requests=None, window_minutes=1):
                 username = client_ip  # Use client IP for non-authenticated users
             
             # Check rate limit
-            is_allowed, remaining = db_enhanced.check_rate_limit(
-                username, 
-                endpoint_type, 
-                requests_limit, 
+            is_allowed, remaining = get_rate_limit_backend(window_minutes).hit(
+                username,
+                endpoint_type,
+                requests_limit,
                 window_minutes
             )
             
@@ -130,7 +271,8 @@ def add_rate_limit_headers(response):
 def reset_user_rate_limits(username):
     """Reset all rate limits for a user (admin function)"""
     try:
-        db_enhanced.reset_rate_limit(username)
+        for backend in (_shared_backend, _database_backend):
+            backend.reset(username)
         logger.info(f"Admin reset rate limits for user: {username}")
         return True
     except Exception as e:
@@ -0,0 +1,191 @@
+"""Incremental saved-search runner.
+
+The old worker queried saved searches user by user and re-read the newest 50
+listings for every single search. This runner does one pass per cycle:
+
+* all saved searches are loaded in one query and the due ones selected;
+* searches with identical criteria (keywords, price range, sources) are
+  collapsed into one subscription in a throwaway ``match_index``;
+* the listings past the lowest high-water mark among due searches are read
+  once, in id order, and matched against that index;
+* each search only reports listings past its own ``last_listing_id`` and
+  then has its mark moved to the newest listing seen. PostgreSQL SERIAL ids
+  can commit out of order, so the scan also re-reads ``CURSOR_OVERLAP`` ids
+  below each mark and reports any this process had not read when the mark
+  was set.
+
+Per-cycle cost therefore follows the number of new listings, not
+users x searches.
+
+Usage:
+    from saved_search_runner import SavedSearchRunner
+    SavedSearchRunner().run_cycle()
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import db_enhanced
+from match_index import ListingMatchIndex, Subscription, saved_search_subscription
+from utils import logger
+
+# ======================
+# CONFIGURATION
+# ======================
+CHECK_INTERVAL_SECONDS = 900
+# Same once-an-hour cadence the old worker enforced per search
+SEARCH_INTERVAL_SECONDS = 3600
+# A search without a mark starts this many listings back, like the old
+# "newest 50" scan
+INITIAL_BACKFILL = 50
+PAGE_SIZE = 500
+# Same late-commit window as price_alert_stream. The overlap never reaches
+# below the mark a search had when this process first ran it.
+CURSOR_OVERLAP = 200
+
+
+def criteria_key(search: Dict[str, Any]) -> Subscription:
+    """Subscription identifying a search's criteria; equal for identical searches."""
+    return saved_search_subscription(search, ref_id=None, username="")
+
+
+class SavedSearchRunner:
+    """Runs every due saved search against one shared delta of new listings."""
+
+    def __init__(self, search_interval_seconds: int = SEARCH_INTERVAL_SECONDS, page_size: int = PAGE_SIZE):
+        self.search_interval_seconds = search_interval_seconds
+        self.page_size = page_size
+        self._cycle = 0
+        # listing id -> cycle that first read it; search id -> cycle that set its mark
+        self._recent_ids: Dict[int, int] = {}
+        self._mark_cycles: Dict[int, int] = {}
+        self._start_marks: Dict[int, int] = {}
+
+    def _is_due(self, search: Dict[str, Any], now: datetime) -> bool:
+        last_run = search.get("last_run")
+        if not last_run:
+            return True
+        try:
+            last_run_dt = datetime.fromisoformat(str(last_run))
+        except ValueError:
+            return True
+        return (now - last_run_dt).total_seconds() >= self.search_interval_seconds
+
+    def run_cycle(self) -> Dict[str, int]:
+        """
+        Run all due saved searches once.
+
+        Returns:
+            dict: ``searches`` run, distinct ``criteria`` evaluated, ``listings``
+            scanned and ``results`` reported
+        """
+        stats = {"searches": 0, "criteria": 0, "listings": 0, "results": 0}
+        now = datetime.now()
+        all_searches = db_enhanced.get_all_saved_searches()
+        due = [search for search in all_searches if self._is_due(search, now)]
+        if not due:
+            return stats
+        self._cycle += 1
+
+        head = db_enhanced.get_max_listing_id()
+        start = max(head - INITIAL_BACKFILL, 0)
+        marks = {
+            search["id"]: search["last_listing_id"] if search.get("last_listing_id") is not None else start
+            for search in due
+        }
+        floors = {}
+        for search_id, mark in marks.items():
+            start_mark = self._start_marks.setdefault(search_id, mark)
+            floors[search_id] = max(mark - CURSOR_OVERLAP, start_mark)
+        # Marks set before this process started count as cycle 0
+        mark_cycles = {search_id: self._mark_cycles.get(search_id, 0) for search_id in marks}
+        oldest_mark_cycle = min(mark_cycles.values())
+
+        groups: Dict[Subscription, List[Dict[str, Any]]] = {}
+        for search in due:
+            groups.setdefault(criteria_key(search), []).append(search)
+        index = ListingMatchIndex.from_subscriptions(groups)
+
+        matched: Dict[Subscription, List[Dict[str, Any]]] = {}
+        position = min(floors.values())
+        while position < head:
+            page = db_enhanced.get_listings_after(position, self.page_size)
+            if not page:
+                break
+            for listing in page:
+                if listing["id"] > head:
+                    # Ingested mid-cycle; left for the next cycle
+                    break
+                if self._recent_ids.setdefault(listing["id"], self._cycle) <= oldest_mark_cycle:
+                    # Already read when every due search's mark was set
+                    continue
+                stats["listings"] += 1
+                for sub in index.match(listing.get("title"), listing.get("price"), listing.get("source")):
+                    matched.setdefault(sub, []).append(listing)
+            position = page[-1]["id"]
+            if len(page) < self.page_size:
+                break
+
+        for criteria, searches in groups.items():
+            hits = matched.get(criteria, [])
+            for search in searches:
+                floor, mark_cycle = floors[search["id"]], mark_cycles[search["id"]]
+                results = [
+                    listing for listing in hits
+                    if listing["id"] > floor and self._recent_ids[listing["id"]] > mark_cycle
+                ]
+                if results:
+                    stats["results"] += len(results)
+                    self._report(search, results)
+
+        db_enhanced.advance_saved_searches([search["id"] for search in due], head)
+        self._mark_cycles.update((search_id, self._cycle) for search_id in marks)
+        self._prune(all_searches, marks, head)
+        stats["searches"] = len(due)
+        stats["criteria"] = len(groups)
+        return stats
+
+    def _prune(self, searches: List[Dict[str, Any]], marks: Dict[int, int], head: int) -> None:
+        """Forget listing ids below every search's overlap window."""
+        current = {search["id"]: search.get("last_listing_id") for search in searches}
+        current.update({search_id: head for search_id in marks})
+        known = [mark for mark in current.values() if mark is not None]
+        floor = min(known, default=head) - CURSOR_OVERLAP
+        self._recent_ids = {listing_id: seen for listing_id, seen in self._recent_ids.items() if listing_id > floor}
+        self._start_marks = {search_id: mark for search_id, mark in self._start_marks.items() if search_id in current}
+        self._mark_cycles = {search_id: cycle for search_id, cycle in self._mark_cycles.items() if search_id in current}
+
+    def _report(self, search: Dict[str, Any], results: List[Dict[str, Any]]) -> None:
+        username = search["username"]
+        logger.info(f"💾 Saved search '{search['name']}' for {username}: {len(results)} new results")
+        if not search.get("notify_new"):
+            return
+
+        try:
+            # Notify about the newest matching listing; the outbox skips it if
+            # ingestion already notified this user
+            db_enhanced.enqueue_listing_notification(username, results[-1])
+        except Exception as e:
+            logger.error(f"Error queueing saved search notification for {username}: {e}")
+
+        try:
+            from websocket_manager import notify_saved_search_results
+            notify_saved_search_results(username, search["name"], len(results))
+        except Exception:
+            pass  # WebSocket might not be available
+
+
+def run_saved_searches(runner: Optional[SavedSearchRunner] = None) -> Dict[str, int]:
+    """Run one saved-search cycle and log a summary."""
+    try:
+        stats = (runner or SavedSearchRunner()).run_cycle()
+        logger.info(
+            f"✅ Saved search check completed: {stats['searches']} searches "
+            f"({stats['criteria']} distinct), {stats['listings']} new listings, {stats['results']} results"
+        )
+        return stats
+    except Exception as e:
+        logger.error(f"Error in saved search runner: {e}")
+        return {"searches": 0, "criteria": 0, "listings": 0, "results": 0}
@@ -5,6 +5,7 @@ from selenium.webdriver.chrome.service import Service
 from selenium import webdriver
 from webdriver_manager.chrome import ChromeDriverManager
 from utils import logger, make_chrome_driver, debug_scraper_output
+from db import save_listings_batch
 from error_handling import ErrorHandler, log_errors, ScraperError, NetworkError
 
 # PER-USER THREAD MANAGEMENT
@@ -18,7 +19,7 @@ _last_start_time = {}  # Format: {f"{user_id}_{scraper}": timestamp}
 
 # Resource limits
 MAX_SCRAPERS_PER_USER = 6  # User can run all 6 scrapers
-MAX_CONCURRENT_USERS = 100  # System-wide limit
+MAX_CONCURRENT_USERS = 100  # System-wide limit for browser (Facebook) scrapers only
 
 # Scraper recovery settings (Circuit Breaker Pattern)
 COOLDOWN_BASE = 30  # Base cooldown period in seconds
@@ -33,63 +34,85 @@ from scrapers.facebook import (
 )
 from scrapers.craigslist import (
     running_flags as cl_flags,
-    run_craigslist_scraper,
-    get_craigslist_flag_key,
+    check_craigslist,
+    send_discord_message as cl_deliver,
 )
 from scrapers.ksl import (
     running_flags as ksl_flags,
-    run_ksl_scraper,
-    get_ksl_flag_key,
+    check_ksl,
+    send_discord_message as ksl_deliver,
 )
 from scrapers.ebay import (
     running_flags as ebay_flags,
-    run_ebay_scraper,
-    get_ebay_flag_key,
+    check_ebay,
+    send_discord_message as ebay_deliver,
 )
 from scrapers.poshmark import (
     running_flags as poshmark_flags,
-    run_poshmark_scraper,
-    get_poshmark_flag_key,
+    check_poshmark,
+    send_discord_message as poshmark_deliver,
 )
 from scrapers.mercari import (
     running_flags as mercari_flags,
-    run_mercari_scraper,
-    get_mercari_flag_key,
+    check_mercari,
+    send_discord_message as mercari_deliver,
 )
+from scrapers.shared_scheduler import SharedScrapeScheduler
+from scrapers.async_engine import get_engine
+from scrapers.seen_store import get_url_filter_stats
 
 # ----------------------------
 # RESOURCE MANAGEMENT
 # ----------------------------
 def get_active_scraper_count(user_id):
     """Count how many scrapers user has running"""
-    if user_id not in _threads:
-        return 0
-    return sum(1 for thread in _threads[user_id].values() if thread.is_alive())
+    count = sum(1 for scheduler in _shared_schedulers.values() if scheduler.is_subscribed(user_id))
+    if user_id in _threads:
+        count += sum(1 for thread in _threads[user_id].values() if thread.is_alive())
+    return count
+
+def _shared_subscriber_ids():
+    """Users subscribed to at least one shared HTTP scraper."""
+    user_ids = set()
+    for scheduler in _shared_schedulers.values():
+        user_ids.update(scheduler.subscribers())
+    return user_ids
+
+def get_total_browser_users():
+    """Count users with a live browser-driven (Facebook) scraper thread"""
+    return sum(
+        1 for user_threads in _threads.values()
+        if "facebook" in user_threads and user_threads["facebook"].is_alive()
+    )
 
 def get_total_active_users():
     """Count total users with active scrapers"""
-    active_users = 0
+    active_users = _shared_subscriber_ids()
     for user_id, user_threads in _threads.items():
         if any(thread.is_alive() for thread in user_threads.values()):
-            active_users += 1
-    return active_users
+            active_users.add(user_id)
+    return len(active_users)
 
 def get_total_active_scrapers():
     """Count total scrapers across all users"""
-    total = 0
+    total = sum(len(scheduler.subscribers()) for scheduler in _shared_schedulers.values())
     for user_threads in _threads.values():
         total += sum(1 for thread in user_threads.values() if thread.is_alive())
     return total
 
-def can_start_scraper(user_id):
-    """Check if user can start another scraper"""
+def can_start_scraper(user_id, browser=False):
+    """Check if user can start another scraper.
+
+    HTTP scrapers share one fetch per distinct query, so only the
+    per-user limit applies to them; the system-wide cap is kept for
+    browser scrapers, which still hold a Chrome driver per user.
+    """
     user_count = get_active_scraper_count(user_id)
-    total_users = get_total_active_users()
     
     if user_count >= MAX_SCRAPERS_PER_USER:
         return False, f"Maximum {MAX_SCRAPERS_PER_USER} scrapers already running"
     
-    if total_users >= MAX_CONCURRENT_USERS:
+    if browser and get_total_browser_users() >= MAX_CONCURRENT_USERS:
         return False, f"System at capacity ({MAX_CONCURRENT_USERS} users)"
     
     return True, None
@@ -189,8 +212,8 @@ def _track_scraper_error(site_name, user_id):
     cooldown = COOLDOWN_BASE * (2 ** min(error_count - 1, 5))
     return True, error_count, cooldown
 
-def _handle_scraper_exception(site_name, user_id, exception, context=""):
-    """Handle scraper exceptions with circuit breaker pattern."""
+def _record_scraper_exception(site_name, user_id, exception, context=""):
+    """Record a scraper exception and return (can_continue, error_count, cooldown)."""
     key = f"{user_id}_{site_name}"
     error_message = f"{context}: {str(exception)}" if context else str(exception)
     
@@ -213,6 +236,14 @@ def _handle_scraper_exception(site_name, user_id, exception, context=""):
             logger.critical(f"{site_name} scraper disabled for user {user_id} after {error_count} errors")
         except:
             pass
+    
+    return can_continue, error_count, cooldown
+
+def _handle_scraper_exception(site_name, user_id, exception, context=""):
+    """Handle scraper exceptions with circuit breaker pattern."""
+    can_continue, error_count, cooldown = _record_scraper_exception(site_name, user_id, exception, context)
+    
+    if not can_continue:
         return False
     
     print(f"Applying {cooldown}s cooldown for {site_name} (user: {user_id}, error {error_count}/{MAX_ERRORS_PER_HOUR})", 
@@ -221,6 +252,66 @@ def _handle_scraper_exception(site_name, user_id, exception, context=""):
     
     return True
 
+# ============================
+# SHARED HTTP SCRAPER SCHEDULING
+# ============================
+def _on_shared_fetch_error(site_name, user_ids, exception):
+    """Charge a failed shared fetch to every subscriber and return the group cooldown."""
+    cooldown = 0
+    for user_id in user_ids:
+        can_continue, _, user_cooldown = _record_scraper_exception(
+            site_name, user_id, exception, "shared fetch error"
+        )
+        if not can_continue:
+            _shared_schedulers[site_name].unsubscribe(user_id)
+        cooldown = max(cooldown, user_cooldown)
+    return cooldown or COOLDOWN_BASE
+
+# One scheduler per HTTP site: each distinct (location, radius, keywords) query
+# is fetched once per interval and fanned out to every subscribed user. The
+# schedulers run as coroutines on the shared async engine, so idle users cost
+# no threads; fetches are bounded per site by SITE_CONCURRENCY.
+_shared_schedulers = {
+    site: SharedScrapeScheduler(
+        site, check_fn, deliver_fn, flags,
+        on_error=_on_shared_fetch_error,
+        batch_fn=save_listings_batch,
+    )
+    for site, check_fn, deliver_fn, flags in (
+        ("craigslist", check_craigslist, cl_deliver, cl_flags),
+        ("ksl", check_ksl, ksl_deliver, ksl_flags),
+        ("ebay", check_ebay, ebay_deliver, ebay_flags),
+        ("poshmark", check_poshmark, poshmark_deliver, poshmark_flags),
+        ("mercari", check_mercari, mercari_deliver, mercari_flags),
+    )
+}
+
+def _start_shared(site_name, label, user_id):
+    """Subscribe a user to the shared scheduler for an HTTP site."""
+    scheduler = _shared_schedulers[site_name]
+    if scheduler.is_subscribed(user_id):
+        logger.warning(f"{label} scraper already running for user {user_id}")
+        return False
+    
+    can_start, reason = can_start_scraper(user_id)
+    if not can_start:
+        logger.warning(f"Cannot start {label} scraper for {user_id}: {reason}")
+        return False
+    
+    scheduler.subscribe(user_id)
+    logger.info(f"✅ Started {label} scraper for user {user_id}")
+    return True
+
+def _stop_shared(site_name, label, user_id):
+    """Unsubscribe a user from the shared scheduler for an HTTP site."""
+    if _shared_schedulers[site_name].unsubscribe(user_id):
+        logger.info(f"🛑 Stopped {label} scraper for user {user_id}")
+    return True
+
+def get_shared_scheduler_stats():
+    """Per-site subscriber, distinct query and fetch counters."""
+    return {site: scheduler.get_stats() for site, scheduler in _shared_schedulers.items()}
+
 # ============================
 # FACEBOOK SCRAPER THREADS
 # ============================
@@ -231,7 +322,7 @@ def start_facebook(user_id):
         logger.warning(f"Facebook scraper already running for user {user_id}")
         return False
     
-    can_start, reason = can_start_scraper(user_id)
+    can_start, reason = can_start_scraper(user_id, browser=True)
     if not can_start:
         logger.warning(f"Cannot start Facebook scraper for {user_id}: {reason}")
         return False
@@ -301,269 +392,64 @@ def is_facebook_running(user_id):
     return _threads[user_id]["facebook"].is_alive()
 
 # ============================
-# CRAIGSLIST SCRAPER THREADS
+# CRAIGSLIST SCRAPER
 # ============================
 def start_craigslist(user_id):
-    _init_user_structures(user_id)
-    
-    if "craigslist" in _threads[user_id] and _threads[user_id]["craigslist"].is_alive():
-        logger.warning(f"Craigslist scraper already running for user {user_id}")
-        return False
-    
-    can_start, reason = can_start_scraper(user_id)
-    if not can_start:
-        logger.warning(f"Cannot start Craigslist scraper for {user_id}: {reason}")
-        return False
-    
-    flag_key = get_craigslist_flag_key(user_id)
-    cl_flags[flag_key] = True
-    
-    def target():
-        try:
-            run_craigslist_scraper(flag_name="craigslist", user_id=user_id)
-        except RecursionError as e:
-            _handle_scraper_exception("craigslist", user_id, e, "recursion error")
-        except Exception as e:
-            _handle_scraper_exception("craigslist", user_id, e, "thread error")
-        finally:
-            _cleanup_user(user_id)
-    
-    t = threading.Thread(target=target, daemon=True, name=f"craigslist_scraper_{user_id}")
-    _threads[user_id]["craigslist"] = t
-    t.start()
-    logger.info(f"✅ Started Craigslist scraper for user {user_id}")
-    return True
+    return _start_shared("craigslist", "Craigslist", user_id)
 
 def stop_craigslist(user_id):
-    if user_id not in _threads or "craigslist" not in _threads[user_id]:
-        return True
-    
-    flag_key = get_craigslist_flag_key(user_id)
-    cl_flags[flag_key] = False
-    t = _threads[user_id]["craigslist"]
-    if t:
-        t.join(timeout=5)
-    
-    _cleanup_user(user_id)
-    logger.info(f"🛑 Stopped Craigslist scraper for user {user_id}")
-    return True
+    return _stop_shared("craigslist", "Craigslist", user_id)
 
 def is_craigslist_running(user_id):
-    if user_id not in _threads or "craigslist" not in _threads[user_id]:
-        return False
-    return _threads[user_id]["craigslist"].is_alive()
+    return _shared_schedulers["craigslist"].is_subscribed(user_id)
 
 # ============================
-# KSL SCRAPER THREADS
+# KSL SCRAPER
 # ============================
 def start_ksl(user_id):
-    _init_user_structures(user_id)
-    
-    if "ksl" in _threads[user_id] and _threads[user_id]["ksl"].is_alive():
-        logger.warning(f"KSL scraper already running for user {user_id}")
-        return False
-    
-    can_start, reason = can_start_scraper(user_id)
-    if not can_start:
-        logger.warning(f"Cannot start KSL scraper for {user_id}: {reason}")
-        return False
-    
-    flag_key = get_ksl_flag_key(user_id)
-    ksl_flags[flag_key] = True
-    
-    def target():
-        try:
-            run_ksl_scraper(flag_name="ksl", user_id=user_id)
-        except RecursionError as e:
-            _handle_scraper_exception("ksl", user_id, e, "recursion error")
-        except Exception as e:
-            _handle_scraper_exception("ksl", user_id, e, "thread error")
-        finally:
-            _cleanup_user(user_id)
-    
-    t = threading.Thread(target=target, daemon=True, name=f"ksl_scraper_{user_id}")
-    _threads[user_id]["ksl"] = t
-    t.start()
-    logger.info(f"✅ Started KSL scraper for user {user_id}")
-    return True
+    return _start_shared("ksl", "KSL", user_id)
 
 def stop_ksl(user_id):
-    if user_id not in _threads or "ksl" not in _threads[user_id]:
-        return True
-    
-    flag_key = get_ksl_flag_key(user_id)
-    ksl_flags[flag_key] = False
-    t = _threads[user_id]["ksl"]
-    if t:
-        t.join(timeout=5)
-    
-    _cleanup_user(user_id)
-    logger.info(f"🛑 Stopped KSL scraper for user {user_id}")
-    return True
+    return _stop_shared("ksl", "KSL", user_id)
 
 def is_ksl_running(user_id):
-    if user_id not in _threads or "ksl" not in _threads[user_id]:
-        return False
-    return _threads[user_id]["ksl"].is_alive()
+    return _shared_schedulers["ksl"].is_subscribed(user_id)
 
 # ============================
-# EBAY SCRAPER THREADS
+# EBAY SCRAPER
 # ============================
 def start_ebay(user_id):
-    _init_user_structures(user_id)
-    
-    if "ebay" in _threads[user_id] and _threads[user_id]["ebay"].is_alive():
-        logger.warning(f"eBay scraper already running for user {user_id}")
-        return False
-    
-    can_start, reason = can_start_scraper(user_id)
-    if not can_start:
-        logger.warning(f"Cannot start eBay scraper for {user_id}: {reason}")
-        return False
-    
-    flag_key = get_ebay_flag_key(user_id)
-    ebay_flags[flag_key] = True
-    
-    def target():
-        try:
-            run_ebay_scraper(flag_name="ebay", user_id=user_id)
-        except RecursionError as e:
-            _handle_scraper_exception("ebay", user_id, e, "recursion error")
-        except Exception as e:
-            _handle_scraper_exception("ebay", user_id, e, "thread error")
-        finally:
-            _cleanup_user(user_id)
-    
-    t = threading.Thread(target=target, daemon=True, name=f"ebay_scraper_{user_id}")
-    _threads[user_id]["ebay"] = t
-    t.start()
-    logger.info(f"✅ Started eBay scraper for user {user_id}")
-    return True
+    return _start_shared("ebay", "eBay", user_id)
 
 def stop_ebay(user_id):
-    if user_id not in _threads or "ebay" not in _threads[user_id]:
-        return True
-    
-    flag_key = get_ebay_flag_key(user_id)
-    ebay_flags[flag_key] = False
-    t = _threads[user_id]["ebay"]
-    if t:
-        t.join(timeout=5)
-    
-    _cleanup_user(user_id)
-    logger.info(f"🛑 Stopped eBay scraper for user {user_id}")
-    return True
+    return _stop_shared("ebay", "eBay", user_id)
 
 def is_ebay_running(user_id):
-    if user_id not in _threads or "ebay" not in _threads[user_id]:
-        return False
-    return _threads[user_id]["ebay"].is_alive()
+    return _shared_schedulers["ebay"].is_subscribed(user_id)
 
 # ============================
-# POSHMARK SCRAPER THREADS
+# POSHMARK SCRAPER
 # ============================
 def start_poshmark(user_id):
-    _init_user_structures(user_id)
-    
-    if "poshmark" in _threads[user_id] and _threads[user_id]["poshmark"].is_alive():
-        logger.warning(f"Poshmark scraper already running for user {user_id}")
-        return False
-    
-    can_start, reason = can_start_scraper(user_id)
-    if not can_start:
-        logger.warning(f"Cannot start Poshmark scraper for {user_id}: {reason}")
-        return False
-    
-    flag_key = get_poshmark_flag_key(user_id)
-    poshmark_flags[flag_key] = True
-    
-    def target():
-        try:
-            run_poshmark_scraper(flag_name="poshmark", user_id=user_id)
-        except RecursionError as e:
-            _handle_scraper_exception("poshmark", user_id, e, "recursion error")
-        except Exception as e:
-            _handle_scraper_exception("poshmark", user_id, e, "thread error")
-        finally:
-            _cleanup_user(user_id)
-    
-    t = threading.Thread(target=target, daemon=True, name=f"poshmark_scraper_{user_id}")
-    _threads[user_id]["poshmark"] = t
-    t.start()
-    logger.info(f"✅ Started Poshmark scraper for user {user_id}")
-    return True
+    return _start_shared("poshmark", "Poshmark", user_id)
 
 def stop_poshmark(user_id):
-    if user_id not in _threads or "poshmark" not in _threads[user_id]:
-        return True
-    
-    flag_key = get_poshmark_flag_key(user_id)
-    poshmark_flags[flag_key] = False
-    t = _threads[user_id]["poshmark"]
-    if t:
-        t.join(timeout=5)
-    
-    _cleanup_user(user_id)
-    logger.info(f"🛑 Stopped Poshmark scraper for user {user_id}")
-    return True
+    return _stop_shared("poshmark", "Poshmark", user_id)
 
 def is_poshmark_running(user_id):
-    if user_id not in _threads or "poshmark" not in _threads[user_id]:
-        return False
-    return _threads[user_id]["poshmark"].is_alive()
+    return _shared_schedulers["poshmark"].is_subscribed(user_id)
 
 # ============================
-# MERCARI SCRAPER THREADS
+# MERCARI SCRAPER
 # ============================
 def start_mercari(user_id):
-    _init_user_structures(user_id)
-    
-    if "mercari" in _threads[user_id] and _threads[user_id]["mercari"].is_alive():
-        logger.warning(f"Mercari scraper already running for user {user_id}")
-        return False
-    
-    can_start, reason = can_start_scraper(user_id)
-    if not can_start:
-        logger.warning(f"Cannot start Mercari scraper for {user_id}: {reason}")
-        return False
-    
-    flag_key = get_mercari_flag_key(user_id)
-    mercari_flags[flag_key] = True
-    
-    def target():
-        try:
-            run_mercari_scraper(flag_name="mercari", user_id=user_id)
-        except RecursionError as e:
-            _handle_scraper_exception("mercari", user_id, e, "recursion error")
-        except Exception as e:
-            _handle_scraper_exception("mercari", user_id, e, "thread error")
-        finally:
-            _cleanup_user(user_id)
-    
-    t = threading.Thread(target=target, daemon=True, name=f"mercari_scraper_{user_id}")
-    _threads[user_id]["mercari"] = t
-    t.start()
-    logger.info(f"✅ Started Mercari scraper for user {user_id}")
-    return True
+    return _start_shared("mercari", "Mercari", user_id)
 
 def stop_mercari(user_id):
-    if user_id not in _threads or "mercari" not in _threads[user_id]:
-        return True
-    
-    flag_key = get_mercari_flag_key(user_id)
-    mercari_flags[flag_key] = False
-    t = _threads[user_id]["mercari"]
-    if t:
-        t.join(timeout=5)
-    
-    _cleanup_user(user_id)
-    logger.info(f"🛑 Stopped Mercari scraper for user {user_id}")
-    return True
+    return _stop_shared("mercari", "Mercari", user_id)
 
 def is_mercari_running(user_id):
-    if user_id not in _threads or "mercari" not in _threads[user_id]:
-        return False
-    return _threads[user_id]["mercari"].is_alive()
+    return _shared_schedulers["mercari"].is_subscribed(user_id)
 
 # ============================
 # GLOBAL CLEANUP FUNCTIONS
@@ -581,7 +467,7 @@ def stop_all_scrapers(user_id=None):
         _cleanup_user(user_id)
     else:
         logger.info("🛑 Stopping all scrapers for all users...")
-        for uid in list(_threads.keys()):
+        for uid in set(_threads.keys()) | _shared_subscriber_ids():
             stop_all_scrapers(uid)
     
     logger.info("✅ All scrapers stopped")
@@ -620,11 +506,15 @@ def get_scraper_health(user_id):
 def get_system_stats():
     """Get system-wide statistics."""
     return {
-        "total_users": len(_threads),
+        "total_users": len(set(_threads.keys()) | _shared_subscriber_ids()),
         "active_users": get_total_active_users(),
         "total_scrapers": get_total_active_scrapers(),
+        "browser_users": get_total_browser_users(),
         "max_concurrent_users": MAX_CONCURRENT_USERS,
-        "max_scrapers_per_user": MAX_SCRAPERS_PER_USER
+        "max_scrapers_per_user": MAX_SCRAPERS_PER_USER,
+        "shared_schedulers": get_shared_scheduler_stats(),
+        "async_engine": get_engine().get_stats(),
+        "url_filters": get_url_filter_stats(),
     }
 
 # ============================
@@ -0,0 +1,202 @@
+"""Event-loop scheduler that dispatches scrape work onto a thread pool.
+
+Scrape loops spend nearly all of their time waiting for the next interval.
+Their scheduling runs as coroutines on a single background event loop, so an
+idle loop costs a few KB instead of an OS thread stack. The fetches themselves
+are not asynchronous: each site's fetch/parse step (blocking requests /
+curl_cffi cascade plus lxml/BeautifulSoup parsing) runs on a shared thread
+pool behind a per-site semaphore. Thread count is therefore bounded by the
+sum of the per-site limits, not by the number of scrape loops.
+
+Usage:
+    from scrapers.async_engine import get_engine
+
+    engine = get_engine()
+    future = engine.spawn(my_coroutine())
+
+    # inside a coroutine running on the engine:
+    results = await engine.run_blocking("craigslist", check_craigslist, ...)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils import logger
+
+# ======================
+# CONFIGURATION
+# ======================
+# Maximum concurrent fetch/parse calls per site. Keeps outbound request
+# pressure on each marketplace bounded regardless of how many loops exist.
+SITE_CONCURRENCY = {
+    "craigslist": 4,
+    "ebay": 4,
+    "ksl": 3,
+    "poshmark": 2,
+    "mercari": 2,
+    "default": 3,
+}
+
+# Extra workers for blocking calls that are not tied to a site (settings
+# reloads, seen-listing writes).
+GENERAL_WORKERS = int(os.getenv("SCRAPER_ENGINE_GENERAL_WORKERS", "4"))
+
+
+class AsyncScrapeEngine:
+    """Single background event loop with bounded per-site blocking work."""
+
+    def __init__(self, site_concurrency: Optional[Dict[str, int]] = None):
+        self.site_concurrency = dict(site_concurrency or SITE_CONCURRENCY)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._start_lock = threading.Lock()
+        self._ready = threading.Event()
+
+        self._stats_lock = threading.Lock()
+        self._in_flight: Dict[str, int] = {}
+        self._peak_in_flight: Dict[str, int] = {}
+        self._completed: Dict[str, int] = {}
+
+    # ======================
+    # LIFECYCLE
+    # ======================
+    def ensure_started(self) -> asyncio.AbstractEventLoop:
+        """Start the event loop thread if it is not already running."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self._loop
+
+            self._ready.clear()
+            workers = sum(v for k, v in self.site_concurrency.items() if k != "default")
+            workers += self.site_concurrency.get("default", 0) + GENERAL_WORKERS
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape_worker")
+            self._loop = asyncio.new_event_loop()
+            self._semaphores = {}
+            self._thread = threading.Thread(target=self._run_loop, daemon=True, name="scrape_event_loop")
+            self._thread.start()
+        self._ready.wait(timeout=5)
+        return self._loop
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(self._ready.set)
+        logger.info("Async scrape engine started")
+        try:
+            self._loop.run_forever()
+        finally:
+            try:
+                pending = asyncio.all_tasks(self._loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            finally:
+                self._loop.close()
+                logger.info("Async scrape engine stopped")
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the event loop and worker pool."""
+        with self._start_lock:
+            loop, thread, executor = self._loop, self._thread, self._executor
+            self._thread = None
+        if loop is not None and thread is not None and thread.is_alive():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=timeout)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ======================
+    # SCHEDULING
+    # ======================
+    def spawn(self, coro: Awaitable[Any]) -> Future:
+        """Schedule a coroutine on the engine from any thread."""
+        loop = self.ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def _semaphore(self, site_name: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(site_name)
+        if semaphore is None:
+            limit = self.site_concurrency.get(site_name, self.site_concurrency.get("default", 3))
+            semaphore = asyncio.Semaphore(limit)
+            self._semaphores[site_name] = semaphore
+        return semaphore
+
+    async def run_blocking(self, site_name: Optional[str], fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking call on the worker pool.
+
+        Args:
+            site_name: Site whose concurrency limit applies, or None for
+                general work that is not rate limited per site
+            fn: Blocking callable
+            *args, **kwargs: Passed through to ``fn``
+
+        Returns:
+            The callable's return value
+        """
+        loop = asyncio.get_running_loop()
+        call = partial(fn, *args, **kwargs)
+        if site_name is None:
+            return await loop.run_in_executor(self._executor, call)
+
+        async with self._semaphore(site_name):
+            self._track(site_name, 1)
+            try:
+                return await loop.run_in_executor(self._executor, call)
+            finally:
+                self._track(site_name, -1)
+
+    # ======================
+    # STATS
+    # ======================
+    def _track(self, site_name: str, delta: int) -> None:
+        with self._stats_lock:
+            current = self._in_flight.get(site_name, 0) + delta
+            self._in_flight[site_name] = current
+            if delta > 0:
+                self._peak_in_flight[site_name] = max(self._peak_in_flight.get(site_name, 0), current)
+            else:
+                self._completed[site_name] = self._completed.get(site_name, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return loop state and per-site in-flight / completed counters."""
+        tasks = 0
+        if self._loop is not None and self.is_running():
+            try:
+                tasks = len(asyncio.all_tasks(self._loop))
+            except RuntimeError:
+                tasks = 0
+        with self._stats_lock:
+            return {
+                "running": self.is_running(),
+                "tasks": tasks,
+                "site_concurrency": dict(self.site_concurrency),
+                "in_flight": dict(self._in_flight),
+                "peak_in_flight": dict(self._peak_in_flight),
+                "completed": dict(self._completed),
+            }
+
+
+_engine: Optional[AsyncScrapeEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> AsyncScrapeEngine:
+    """Get the process-wide scrape engine."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AsyncScrapeEngine()
+    return _engine
@@ -3,18 +3,22 @@ Common utilities for all scrapers.
 Consolidates duplicate code and provides shared functionality.
 Optimized for performance without external dependencies.
 """
+import hashlib
 import random
 import time
 import json
 import threading
 import urllib.parse
 import re
+import sqlite3
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
-from http.cookiejar import LWPCookieJar
 import requests
 from bs4 import BeautifulSoup, FeatureNotFound
+from lxml import etree
+from lxml import html as lxml_html
 from error_handling import ScraperError
 from utils import logger
 from functools import lru_cache
@@ -27,6 +31,8 @@ except ImportError:  # pragma: no cover - fallback for older BeautifulSoup versi
         pass
 
 from scrapers import anti_blocking
+from scrapers.cookie_store import get_cookie_store
+from scrapers.seen_store import SeenListings, get_seen_backend, open_seen_listings
 
 # Import new stealth infrastructure with fallbacks
 _SMART_REQUEST_AVAILABLE = False
@@ -153,9 +159,13 @@ _seen_listings_locks = {}
 # Recursion guards for scrapers
 _recursion_guards = threading.local()
 
-# Session cache for persistent connections
+# Session cache for persistent connections. _session_lock only guards the
+# dicts; creating and warming a session holds that key's own lock instead.
 _session_cache = {}
 _session_lock = threading.Lock()
+_session_creation_locks: Dict[str, threading.Lock] = {}
+_session_stats = {"created": 0, "reused": 0, "creation_seconds": 0.0, "max_creation_seconds": 0.0}
+# Legacy per-(site, user) LWP files, imported into the cookie store on first load
 _SESSION_COOKIE_DIR = Path(".session_cookies")
 
 # Compiled URL normalization patterns (cache for better performance)
@@ -168,6 +178,11 @@ _JSON_LD_SCRIPT_RE = re.compile(
     r"<script[^>]+type=[\"']application/(?:ld\+json|json)[\"'][^>]*>(.*?)</script>",
     re.IGNORECASE | re.DOTALL,
 )
+# Same pattern for raw response bytes, so JSON-LD is found without decoding or a DOM
+_JSON_LD_SCRIPT_BYTES_RE = re.compile(
+    rb"<script[^>]+type=[\"']application/(?:ld\+json|json)[\"'][^>]*>(.*?)</script>",
+    re.IGNORECASE | re.DOTALL,
+)
 
 # Price cleanup regex
 _PRICE_CLEAN_RE = re.compile(r"[^0-9.]")
@@ -550,7 +565,7 @@ def parse_html_with_fallback(
 
     Args:
         markup: The HTML markup to parse, as str or bytes.
-        parser_order: Parsers to try in order. Defaults to ('html.parser', 'lxml').
+        parser_order: Parsers to try in order. Defaults to ('lxml', 'html.parser').
         encodings: Optional list of encodings to try when decoding bytes.
         raw_bytes: Optional raw bytes for re-decoding attempts.
         soup_builder: Callable used to create the soup object (defaults to BeautifulSoup).
@@ -565,7 +580,7 @@ def parse_html_with_fallback(
     if markup is None:
         raise ScraperError("No markup supplied for parsing")
 
-    parser_sequence: Tuple[str, ...] = tuple(parser_order or ("html.parser", "lxml"))
+    parser_sequence: Tuple[str, ...] = tuple(parser_order or ("lxml", "html.parser"))
     if not parser_sequence:
         raise ScraperError("No HTML parsers configured for fallback parsing")
 
@@ -647,6 +662,57 @@ def parse_html_with_fallback(
     raise ScraperError(f"Failed to parse HTML with available parsers: {error_detail}")
 
 
+def parse_html_fast(markup: Union[str, bytes, bytearray, None], site_name: Optional[str] = None):
+    """
+    Build an lxml DOM straight from the response body.
+
+    Pass ``response.content`` rather than ``response.text``: lxml detects the
+    charset from the markup itself, which skips requests' charset guessing.
+
+    Returns:
+        lxml root element, or None when lxml rejects the markup (callers then
+        fall back to ``parse_html_with_fallback``).
+    """
+    if not markup:
+        return None
+    try:
+        return lxml_html.document_fromstring(markup)
+    except (etree.ParserError, ValueError) as exc:
+        logger.debug(f"{site_name or 'scraper'}: lxml fast parse failed: {exc}")
+        return None
+
+
+def compile_selectors(selectors: Dict[str, str]) -> Dict[str, etree.XPath]:
+    """Precompile named XPath selectors once at import instead of on every page."""
+    return {name: etree.XPath(expression) for name, expression in selectors.items()}
+
+
+def xpath_class(class_name: str) -> str:
+    """XPath predicate matching a whole CSS class token, like ``.class_name`` in CSS."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+def first_text(node, *selectors: etree.XPath) -> Optional[str]:
+    """Whitespace-normalized text of the first match, trying compiled selectors in priority order."""
+    for selector in selectors:
+        for match in selector(node):
+            text = match if isinstance(match, str) else match.text_content()
+            text = " ".join(text.split())
+            if text:
+                return text
+    return None
+
+
+def first_attribute(node, *selectors: etree.XPath) -> Optional[str]:
+    """First non-empty string matched by compiled attribute selectors (``.../@href``), in priority order."""
+    for selector in selectors:
+        for match in selector(node):
+            value = str(match).strip()
+            if value:
+                return value
+    return None
+
+
 # ======================
 # SESSION MANAGEMENT
 # ======================
@@ -664,17 +730,14 @@ def _session_cookie_path(site_name: str, username: Optional[str]) -> Path:
 
 
 def _load_session_cookies(session: requests.Session, site_name: str, username: Optional[str]) -> int:
-    """Restore cookies from disk into the provided session."""
+    """Restore persisted cookies into the provided session."""
     try:
-        cookie_path = _session_cookie_path(site_name, username)
-        if not cookie_path.exists():
-            return 0
-        jar = LWPCookieJar(str(cookie_path))
-        jar.load(ignore_discard=True, ignore_expires=False)
-        restored = 0
-        for cookie in jar:
-            session.cookies.set_cookie(cookie)
-            restored += 1
+        restored = get_cookie_store().load(
+            session.cookies,
+            site_name,
+            _sanitize_username(username),
+            legacy_file=_session_cookie_path(site_name, username),
+        )
         if restored:
             logger.debug(f"{site_name}: restored {restored} cookies (user={username})")
         return restored
@@ -684,23 +747,11 @@ def _load_session_cookies(session: requests.Session, site_name: str, username: O
 
 
 def _save_session_cookies(session: Optional[requests.Session], site_name: str, username: Optional[str]) -> None:
-    """Persist session cookies to disk for reuse across runs."""
+    """Schedule session cookies to be persisted by the cookie store's next flush."""
     if session is None:
         return
     try:
-        cookies = list(session.cookies)
-        cookie_path = _session_cookie_path(site_name, username)
-        if not cookies:
-            if cookie_path.exists():
-                cookie_path.unlink(missing_ok=True)
-                logger.debug(f"{site_name}: cleared persisted cookies (user={username})")
-            return
-        _SESSION_COOKIE_DIR.mkdir(parents=True, exist_ok=True)
-        jar = LWPCookieJar(str(cookie_path))
-        for cookie in cookies:
-            jar.set_cookie(cookie)
-        jar.save(ignore_discard=True, ignore_expires=True)
-        logger.debug(f"{site_name}: persisted {len(cookies)} cookies (user={username})")
+        get_cookie_store().mark_dirty(session.cookies, site_name, _sanitize_username(username))
     except Exception as exc:
         logger.debug(f"{site_name}: failed to persist cookies for user {username}: {exc}")
 
@@ -708,18 +759,43 @@ def _save_session_cookies(session: Optional[requests.Session], site_name: str, u
 def _delete_session_cookies(site_name: str, username: Optional[str]) -> None:
     """Remove any persisted cookies for the given site/user combination."""
     try:
-        cookie_path = _session_cookie_path(site_name, username)
-        if cookie_path.exists():
-            cookie_path.unlink(missing_ok=True)
-            logger.debug(f"{site_name}: deleted cookie cache (user={username})")
+        get_cookie_store().delete(site_name, _sanitize_username(username))
+        _session_cookie_path(site_name, username).unlink(missing_ok=True)
+        logger.debug(f"{site_name}: deleted cookie cache (user={username})")
     except Exception as exc:
         logger.debug(f"{site_name}: failed to delete cookie cache for user {username}: {exc}")
 
 
+def _warm_up_session(session, site_name, initialize_url) -> bool:
+    """Visit ``initialize_url`` so the session picks up the site's cookies."""
+    try:
+        headers = get_realistic_headers(site_name=site_name)
+        logger.debug(f"Initializing {site_name} session by visiting homepage ({initialize_url})...")
+        response = session.get(initialize_url, headers=headers, timeout=15)
+        if response.status_code == 200:
+            logger.debug(f"{site_name} session initialized successfully")
+            return True
+        logger.warning(f"{site_name} session initialization returned status {response.status_code}")
+    except Exception as e:
+        logger.warning(f"Failed to initialize {site_name} session: {e}")
+    return False
+
+
+def _close_quietly(session) -> None:
+    try:
+        session.close()
+    except Exception:
+        pass
+
+
 def get_session(site_name, initialize_url=None, force_new=False, username=None):
     """
     Get or create a persistent session for a scraper site.
     
+    Creation is single-flight per (site, user): concurrent callers for the
+    same key wait for one warm-up, while lookups for every other key carry on
+    without waiting on its network round trip.
+    
     Args:
         site_name: Name of the scraper site (e.g., 'craigslist', 'ebay')
         initialize_url: Optional URL to visit to initialize the session
@@ -731,58 +807,76 @@ def get_session(site_name, initialize_url=None, force_new=False, username=None):
     """
     cache_key = _session_cache_key(site_name, username)
     with _session_lock:
-        if force_new and cache_key in _session_cache:
-            try:
-                _session_cache[cache_key].close()
-            except Exception:
-                pass
-            _session_cache.pop(cache_key, None)
-
-        if cache_key not in _session_cache:
-            session = requests.Session()
-            session.headers.update({
-                "Connection": "keep-alive",
-                "Pragma": "no-cache",
-                "Cache-Control": "no-cache"
-            })
-            _load_session_cookies(session, site_name, username)
+        session = _session_cache.get(cache_key)
+        if session is not None and not force_new:
+            _session_stats["reused"] += 1
+            return session
+        creation_lock = _session_creation_locks.setdefault(cache_key, threading.Lock())
+
+    warmed = False
+    with creation_lock:
+        with _session_lock:
+            cached = _session_cache.get(cache_key)
+            if cached is not None and (not force_new or cached is not session):
+                # Another caller created (or replaced) it while we waited
+                _session_stats["reused"] += 1
+                return cached
+            stale = _session_cache.pop(cache_key, None)
+        if stale is not None:
+            _close_quietly(stale)
+
+        started = time.perf_counter()
+        session = requests.Session()
+        session.headers.update({
+            "Connection": "keep-alive",
+            "Pragma": "no-cache",
+            "Cache-Control": "no-cache"
+        })
+        _load_session_cookies(session, site_name, username)
+
+        # Initialize session by visiting homepage if provided
+        if initialize_url:
+            warmed = _warm_up_session(session, site_name, initialize_url)
+            _save_session_cookies(session, site_name, username)
+
+        elapsed = time.perf_counter() - started
+        with _session_lock:
             _session_cache[cache_key] = session
-            
-            # Initialize session by visiting homepage if provided
-            if initialize_url:
-                try:
-                    headers = get_realistic_headers(site_name=site_name)
-                    logger.debug(f"Initializing {site_name} session by visiting homepage ({initialize_url})...")
-                    response = session.get(initialize_url, headers=headers, timeout=15)
-                    if response.status_code == 200:
-                        logger.debug(f"{site_name} session initialized successfully")
-                        # Small delay to mimic human behavior
-                        time.sleep(random.uniform(0.5, 1.5))
-                    else:
-                        logger.warning(f"{site_name} session initialization returned status {response.status_code}")
-                except Exception as e:
-                    logger.warning(f"Failed to initialize {site_name} session: {e}")
-                finally:
-                    _save_session_cookies(session, site_name, username)
-        
-        return _session_cache[cache_key]
+            _session_stats["created"] += 1
+            _session_stats["creation_seconds"] += elapsed
+            _session_stats["max_creation_seconds"] = max(_session_stats["max_creation_seconds"], elapsed)
+
+    if warmed:
+        # Small delay to mimic human behavior, outside every lock
+        time.sleep(random.uniform(0.5, 1.5))
+    return session
+
+
+def get_session_pool_stats() -> Dict[str, Any]:
+    """Session pool counters: sessions created vs reused and warm-up latency."""
+    with _session_lock:
+        stats = dict(_session_stats)
+        stats["sessions"] = len(_session_cache)
+    lookups = stats["created"] + stats["reused"]
+    stats["reuse_ratio"] = round(stats["reused"] / lookups, 4) if lookups else 0.0
+    stats["avg_creation_ms"] = round(stats["creation_seconds"] / stats["created"] * 1000, 1) if stats["created"] else 0.0
+    stats["max_creation_ms"] = round(stats.pop("max_creation_seconds") * 1000, 1)
+    del stats["creation_seconds"]
+    return stats
 
 
 def clear_session(site_name, username=None):
     """Clear/reset the session for a scraper site."""
+    cache_key = _session_cache_key(site_name, username)
     with _session_lock:
-        cache_key = _session_cache_key(site_name, username)
-        if cache_key in _session_cache:
-            try:
-                _session_cache[cache_key].close()
-            except:
-                pass
-            del _session_cache[cache_key]
-            if username:
-                logger.debug(f"Cleared session for {site_name} (user={username})")
-            else:
-                logger.debug(f"Cleared session for {site_name}")
-        _delete_session_cookies(site_name, username)
+        session = _session_cache.pop(cache_key, None)
+    if session is not None:
+        _close_quietly(session)
+        if username:
+            logger.debug(f"Cleared session for {site_name} (user={username})")
+        else:
+            logger.debug(f"Cleared session for {site_name}")
+    _delete_session_cookies(site_name, username)
 
 
 def reset_session(site_name, initialize_url=None, username=None):
@@ -806,18 +900,9 @@ def initialize_session(site_name, base_url, username=None):
         username: Optional username for per-user session separation
     """
     session = get_session(site_name, username=username)
-    try:
-        headers = get_realistic_headers(site_name=site_name)
-        logger.debug(f"Initializing {site_name} session by visiting homepage...")
-        response = session.get(base_url, headers=headers, timeout=15)
-        if response.status_code == 200:
-            logger.debug(f"{site_name} session initialized successfully")
-            # Small delay to mimic human behavior
-            time.sleep(random.uniform(0.5, 1.5))
-        else:
-            logger.warning(f"{site_name} session initialization returned status {response.status_code}")
-    except Exception as e:
-        logger.warning(f"Failed to initialize {site_name} session: {e}")
+    if _warm_up_session(session, site_name, base_url):
+        # Small delay to mimic human behavior
+        time.sleep(random.uniform(0.5, 1.5))
 
 
 # ======================
@@ -856,10 +941,149 @@ def check_rate_limit(response, site_name):
     if response.status_code == 403:
         logger.warning(f"{site_name} returned 403 (possible bot detection)")
         return True, 30  # Wait 30 seconds
-    
+
     return False, 0
 
 
+# ======================
+# RESPONSE FINGERPRINT CACHE
+# ======================
+RESPONSE_CACHE_MAX_ENTRIES = 2048
+# Cache-busting query parameters that scrapers randomize on every request
+_CACHE_BUSTER_PARAMS = frozenset({"_"})
+
+# Markup that changes on every render without the listings changing
+_VOLATILE_MARKUP_RE = re.compile(
+    rb"""\s(?:nonce|integrity|data-request-id|data-reactid)=["'][^"']*["']"""
+    rb"""|<input[^>]+name=["'][^"']*(?:csrf|token)[^"']*["'][^>]*>"""
+    rb"""|<meta[^>]+name=["'][^"']*(?:csrf|token)[^"']*["'][^>]*>""",
+    re.IGNORECASE,
+)
+_WHITESPACE_BYTES_RE = re.compile(rb"\s+")
+
+
+def fingerprint_content(content: Union[bytes, str, None]) -> str:
+    """Hash a page body with per-render noise (nonces, CSRF tokens, whitespace) stripped."""
+    if content is None:
+        content = b""
+    elif isinstance(content, str):
+        content = content.encode("utf-8", "replace")
+    normalized = _WHITESPACE_BYTES_RE.sub(b" ", _VOLATILE_MARKUP_RE.sub(b"", content))
+    return hashlib.sha1(normalized).hexdigest()
+
+
+class ResponseFingerprintCache:
+    """
+    Conditional-GET validators and page fingerprints per (site, URL, user).
+
+    Entries are only written by ``remember_response`` once a scraper has fully
+    processed a page, so a fetch that failed half-way is never mistaken for
+    one that was already handled.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict[str, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"not_modified": 0, "unchanged": 0, "changed": 0}
+
+    @staticmethod
+    def key(site_name: str, url: str, username: Optional[str] = None) -> Tuple[str, str, str]:
+        """Cache key with the query string sorted, since scrapers randomize parameter order."""
+        parts = urllib.parse.urlsplit(url)
+        params = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        query = urllib.parse.urlencode(sorted(p for p in params if p[0] not in _CACHE_BUSTER_PARAMS))
+        return site_name, urllib.parse.urlunsplit(parts._replace(query=query, fragment="")), _sanitize_username(username)
+
+    def get(self, key) -> Optional[Dict[str, Optional[str]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return dict(entry)
+        return None
+
+    def conditional_headers(self, key) -> Dict[str, str]:
+        """``If-None-Match``/``If-Modified-Since`` headers for the last processed response."""
+        entry = self.get(key)
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, key, fingerprint: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        with self._lock:
+            self._entries[key] = {"fingerprint": fingerprint, "etag": etag, "last_modified": last_modified}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        checks = stats["not_modified"] + stats["unchanged"] + stats["changed"]
+        stats["skip_rate"] = round((stats["not_modified"] + stats["unchanged"]) / checks, 4) if checks else 0.0
+        return stats
+
+
+_response_cache = ResponseFingerprintCache()
+
+
+def get_response_cache() -> ResponseFingerprintCache:
+    """Get the global response fingerprint cache"""
+    return _response_cache
+
+
+def response_unchanged(response) -> bool:
+    """
+    Return True when ``response`` matches the page processed on the previous
+    fetch of the same (site, URL, user): a 304 reply to a conditional GET, or
+    an identical fingerprint. Scrapers return early without parsing then.
+    """
+    key = getattr(response, "fingerprint_key", None)
+    if not isinstance(key, tuple):
+        return False
+    if getattr(response, "not_modified", False):
+        _response_cache.record("not_modified")
+        return True
+    entry = _response_cache.get(key)
+    if entry and entry.get("fingerprint") == getattr(response, "fingerprint", None):
+        _response_cache.record("unchanged")
+        return True
+    _response_cache.record("changed")
+    return False
+
+
+def remember_response(response) -> None:
+    """Record ``response`` as processed so the next identical fetch can be skipped."""
+    key = getattr(response, "fingerprint_key", None)
+    if not isinstance(key, tuple) or getattr(response, "not_modified", False):
+        return
+    headers = getattr(response, "headers", None) or {}
+    _response_cache.store(
+        key,
+        getattr(response, "fingerprint", None) or fingerprint_content(getattr(response, "content", b"")),
+        etag=headers.get("ETag"),
+        last_modified=headers.get("Last-Modified"),
+    )
+
+
 # ======================
 # FALLBACK REQUEST STRATEGIES
 # ======================
@@ -943,6 +1167,7 @@ def make_request_with_cascade(
     username: Optional[str] = None,
     validate_response: bool = True,
     fallback_chain: Optional[List[RequestStrategy]] = None,
+    conditional: bool = True,
     **kwargs,
 ):
     """
@@ -950,6 +1175,10 @@ def make_request_with_cascade(
     
     Tries each strategy in the fallback chain until one succeeds.
     Enhanced with better logging and timing.
+
+    With ``conditional`` the request carries the validators of the last
+    processed response for the same (site, URL, user), and the returned
+    response is tagged for ``response_unchanged``/``remember_response``.
     
     Args:
         url: URL to request
@@ -961,6 +1190,7 @@ def make_request_with_cascade(
         username: Optional username for per-user session isolation
         validate_response: Whether to validate response structure
         fallback_chain: Custom fallback chain, or use default for site
+        conditional: Send If-None-Match/If-Modified-Since and fingerprint the response
         **kwargs: Additional arguments to pass to requests.get()
         
     Returns:
@@ -981,6 +1211,7 @@ def make_request_with_cascade(
                     logger.debug(f"{site_name}: Strategy '{strategy.name}' transformed URL")
                 except Exception:
                     request_url = url
+            fingerprint_key = _response_cache.key(site_name, request_url, username) if conditional else None
             
             # Get appropriate session
             current_session = session
@@ -999,6 +1230,8 @@ def make_request_with_cascade(
             
             # Merge custom headers
             headers.update(strategy.custom_headers)
+            if fingerprint_key is not None:
+                headers.update(_response_cache.conditional_headers(fingerprint_key))
             
             # Get proxy if strategy requires
             proxy = None
@@ -1035,8 +1268,11 @@ def make_request_with_cascade(
             # DIAGNOSTIC LOGGING - always log response details
             logger.info(f"{site_name}: [{strategy.name}] status={response.status_code}, size={content_len}B, time={response_time:.2f}s")
             
+            # A 304 reply to our validators has no body to validate
+            not_modified = fingerprint_key is not None and response.status_code == 304
+            
             # Only do soft validation - let the scraper try to parse
-            if validate_response:
+            if validate_response and not not_modified:
                 is_valid, reason = validate_response_structure(response, site_name)
                 if not is_valid and "high_confidence" in reason:
                     # Only reject on high-confidence blocks
@@ -1050,7 +1286,7 @@ def make_request_with_cascade(
                     continue
             
             # Check for blocks - but be lenient
-            block_info = detect_block_type(response, site_name)
+            block_info = None if not_modified else detect_block_type(response, site_name)
             if block_info and block_info.get("severity") == "high":
                 logger.warning(f"{site_name}: Strategy '{strategy.name}' detected high-severity block: {block_info['type']}")
                 anti_blocking.record_block(site_name, block_info["type"], block_info.get("cooldown_hint"))
@@ -1067,6 +1303,10 @@ def make_request_with_cascade(
                 anti_blocking.mark_proxy_success(proxy, response_time)
             if current_session:
                 _save_session_cookies(current_session, site_name, username)
+            if fingerprint_key is not None:
+                response.fingerprint_key = fingerprint_key
+                response.not_modified = not_modified
+                response.fingerprint = None if not_modified else fingerprint_content(response.content)
             
             logger.info(f"{site_name}: Request succeeded with strategy '{strategy.name}'")
             
@@ -1449,7 +1689,7 @@ def is_new_listing(link, seen_listings, site_name):
     
     Args:
         link: URL of the listing
-        seen_listings: Dictionary of seen listings
+        seen_listings: SeenListings view (or plain dict) of seen listings
         site_name: Name of the scraper site
         
     Returns:
@@ -1461,6 +1701,11 @@ def is_new_listing(link, seen_listings, site_name):
         logger.debug(f"URL normalization failed for {link}, treating as new")
         return True
     
+    # Fast path: an indexed lookup of the URL hash, compared as epoch seconds
+    if isinstance(seen_listings, SeenListings):
+        last_seen_epoch = seen_listings.last_seen_epoch(normalized_link)
+        return last_seen_epoch is None or time.time() - last_seen_epoch > 86400
+    
     lock = get_seen_listings_lock(site_name)
     
     # Fast path: check if not in dict (common case for new listings)
@@ -1475,58 +1720,63 @@ def is_new_listing(link, seen_listings, site_name):
     return time_diff > 86400  # 24 hours
 
 
+def _seen_scope(username=None, filename=None):
+    """Store scope for a user (or an explicit legacy filename)."""
+    if filename:
+        return Path(filename).stem
+    return _sanitize_username(username)
+
+
 def save_seen_listings(seen_listings, site_name, filename=None, username=None):
     """
-    Save seen listings with timestamps to JSON.
+    Persist seen listings to the seen store.
+    
+    A SeenListings view only writes the URLs marked since its last save; a
+    plain dict is written in full.
     
     Args:
-        seen_listings: Dictionary of seen listings
+        seen_listings: SeenListings view or dictionary of seen listings
         site_name: Name of the scraper site
-        filename: Optional explicit filename override
+        filename: Optional explicit legacy filename override
         username: Optional username for per-user isolation
     """
-    filename = _build_seen_filename(site_name, username=username, filename=filename)
-    
     try:
-        lock = get_seen_listings_lock(site_name)
-        with lock:
-            Path(filename).write_text(
-                json.dumps({k: v.isoformat() for k, v in seen_listings.items()}, indent=2),
-                encoding="utf-8"
-            )
-        logger.debug(f"Saved seen listings to {filename}")
-    except (OSError, PermissionError) as e:
-        logger.error(f"File system error saving seen listings for {site_name}: {e}")
+        if isinstance(seen_listings, SeenListings):
+            written = seen_listings.flush()
+        else:
+            lock = get_seen_listings_lock(site_name)
+            with lock:
+                items = list(seen_listings.items())
+            view = SeenListings(get_seen_backend(), site_name, _seen_scope(username, filename))
+            for url, seen_at in items:
+                view.mark(url, seen_at)
+            written = view.flush()
+        logger.debug(f"Saved {written} seen listings for {site_name}")
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"Storage error saving seen listings for {site_name}: {e}")
     except Exception as e:
         logger.error(f"Error saving seen listings for {site_name}: {e}")
 
 
 def load_seen_listings(site_name, filename=None, username=None):
     """
-    Load seen listings from JSON file.
+    Open seen listings from the seen store.
+    
+    Nothing is read up front; lookups go to the store as listings are
+    checked. A legacy JSON file for this site and user is imported once.
     
     Args:
         site_name: Name of the scraper site
-        filename: Optional custom filename (defaults to {site_name}_seen.json)
+        filename: Optional custom legacy filename (defaults to {site_name}_seen.json)
         username: Optional username for per-user isolation
         
     Returns:
-        Dictionary of seen listings
+        SeenListings view of seen listings (empty dict if the store is unavailable)
     """
-    filename = _build_seen_filename(site_name, username=username, filename=filename)
+    legacy_file = _build_seen_filename(site_name, username=username, filename=filename)
     
     try:
-        text = Path(filename).read_text(encoding="utf-8")
-        data = json.loads(text) if text else {}
-        seen_listings = {k: datetime.fromisoformat(v) for k, v in data.items()}
-        logger.debug(f"Loaded {len(seen_listings)} seen listings from {filename}")
-        return seen_listings
-    except FileNotFoundError:
-        logger.info(f"Seen listings file not found: {filename}, starting fresh")
-        return {}
-    except (json.JSONDecodeError, ValueError) as e:
-        logger.error(f"Invalid JSON in seen listings file for {site_name}: {e}")
-        return {}
+        return open_seen_listings(site_name, _seen_scope(username, filename), legacy_file=legacy_file)
     except Exception as e:
         logger.error(f"Error loading seen listings for {site_name}: {e}")
         return {}
@@ -1693,29 +1943,50 @@ def _collect_json_ld_items(payload: Any, results: List[Dict[str, Any]], seen_url
             _collect_json_ld_items(value, results, seen_urls)
 
 
-def extract_json_ld_items(html_text: str) -> List[Dict[str, Any]]:
-    """Extract listing-like items from any JSON-LD scripts embedded in HTML."""
-
-    if not html_text:
-        return []
+def iter_json_scripts(markup: Union[str, bytes, None]):
+    """
+    Yield the raw contents of JSON/JSON-LD ``<script>`` blocks.
 
-    results: List[Dict[str, Any]] = []
-    seen_urls: set = set()
+    Works on bytes as well as text, so callers can scan ``response.content``
+    before (or instead of) decoding and building a DOM.
+    """
+    if not markup:
+        return
+    if isinstance(markup, (bytes, bytearray)):
+        if b"application/" not in markup:
+            return
+        pattern, comment_open, comment_close = _JSON_LD_SCRIPT_BYTES_RE, b"<!--", b"-->"
+    else:
+        if "application/" not in markup:
+            return
+        pattern, comment_open, comment_close = _JSON_LD_SCRIPT_RE, "<!--", "-->"
 
-    for match in _JSON_LD_SCRIPT_RE.finditer(html_text):
+    for match in pattern.finditer(markup):
         script_content = match.group(1).strip()
         if not script_content:
             continue
 
         # Remove HTML comment wrappers if present
-        if script_content.startswith("<!--"):
+        if script_content.startswith(comment_open):
             script_content = script_content[4:]
-        if script_content.endswith("-->"):
+        if script_content.endswith(comment_close):
             script_content = script_content[:-3]
+        yield script_content
+
+
+def extract_json_ld_items(html_text: Union[str, bytes]) -> List[Dict[str, Any]]:
+    """Extract listing-like items from any JSON-LD scripts embedded in HTML (text or raw bytes)."""
+
+    if not html_text:
+        return []
+
+    results: List[Dict[str, Any]] = []
+    seen_urls: set = set()
 
+    for script_content in iter_json_scripts(html_text):
         try:
             data = json.loads(script_content)
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, UnicodeDecodeError):
             # Some scripts may contain multiple JSON objects separated by newlines
             # Attempt to load line-by-line as a fallback
             fragments = []
@@ -1725,7 +1996,7 @@ def extract_json_ld_items(html_text: str) -> List[Dict[str, Any]]:
                     continue
                 try:
                     fragments.append(json.loads(line))
-                except json.JSONDecodeError:
+                except (json.JSONDecodeError, UnicodeDecodeError):
                     fragments = []
                     break
             if not fragments:
@@ -0,0 +1,358 @@
+"""Batched, debounced persistence for scraper session cookies.
+
+Session cookies used to be written to one LWP cookie file per site and user
+after every successful request, which put a small synchronous disk write in
+the request hot path. This module keeps them in a single SQLite table
+instead:
+
+* ``mark_dirty`` only records that a session's jar changed; the jar is
+  snapshotted and written later, so many requests cost one write;
+* a daemon thread flushes every dirty jar in one transaction every
+  ``COOKIE_FLUSH_INTERVAL_SECONDS``, and again at interpreter exit;
+* each jar is a single row replaced in a WAL-mode transaction, so a crash
+  leaves either the old or the new cookies, never a torn file. Setting
+  ``COOKIE_FLUSH_INTERVAL_SECONDS=0`` writes synchronously like the old
+  files did.
+
+Legacy ``.lwp`` files are imported once, the first time their jar is loaded,
+and renamed to ``*.migrated``.
+
+``COOKIE_STORE_BACKEND=memory`` keeps cookies in process (tests, throwaway
+runs); any object implementing the ``MemoryCookieBackend`` methods can be
+installed with ``set_cookie_store``.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.cookiejar import Cookie, LWPCookieJar
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils import logger
+
+# ======================
+# CONFIGURATION
+# ======================
+COOKIE_STORE_BACKEND = os.getenv("COOKIE_STORE_BACKEND", "sqlite").lower()
+COOKIE_STORE_PATH = os.getenv("COOKIE_STORE_PATH", "session_cookies.db")
+COOKIE_FLUSH_INTERVAL_SECONDS = float(os.getenv("COOKIE_FLUSH_INTERVAL_SECONDS", "5"))
+
+_COOKIE_FIELDS = (
+    "version", "name", "value", "port", "port_specified", "domain", "domain_specified",
+    "domain_initial_dot", "path", "path_specified", "secure", "expires", "discard",
+    "comment", "comment_url", "rfc2109",
+)
+
+
+def serialize_cookies(cookies: Iterable[Cookie]) -> str:
+    """Encode cookies (including session-only ones) as a JSON list."""
+    rows = []
+    for cookie in cookies:
+        row = {field: getattr(cookie, field) for field in _COOKIE_FIELDS}
+        row["rest"] = dict(cookie._rest)
+        rows.append(row)
+    return json.dumps(rows, separators=(",", ":"))
+
+
+def deserialize_cookies(payload: str, now: Optional[float] = None) -> List[Cookie]:
+    """Decode ``serialize_cookies`` output, dropping cookies that have expired."""
+    now = time.time() if now is None else now
+    cookies = []
+    for row in json.loads(payload):
+        cookie = Cookie(**{field: row.get(field) for field in _COOKIE_FIELDS}, rest=row.get("rest") or {})
+        if not cookie.is_expired(now):
+            cookies.append(cookie)
+    return cookies
+
+
+def _snapshot(jar, attempts: int = 3) -> List[Cookie]:
+    """List a jar that request threads may be updating while we read it."""
+    for attempt in range(attempts):
+        try:
+            return list(jar)
+        except RuntimeError:
+            # "dictionary changed size during iteration"; retry
+            if attempt == attempts - 1:
+                raise
+    return []
+
+
+# ======================
+# BACKENDS
+# ======================
+class MemoryCookieBackend:
+    """In-process backend; also documents the interface every backend implements."""
+
+    def __init__(self):
+        self._data: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, site: str, scope: str) -> Optional[str]:
+        return self._data.get((site, scope))
+
+    def write_many(self, rows: Iterable[Tuple[str, str, Optional[str]]]) -> None:
+        """Replace each ``(site, scope)`` jar; a ``None`` payload deletes it."""
+        with self._lock:
+            for site, scope, payload in rows:
+                if payload is None:
+                    self._data.pop((site, scope), None)
+                else:
+                    self._data[(site, scope)] = payload
+
+    def count(self) -> int:
+        return len(self._data)
+
+
+class SqliteCookieBackend:
+    """SQLite backend: one row per (site, user) jar."""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS session_cookies (
+            site TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            cookies TEXT NOT NULL,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (site, scope)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(self, path: str = COOKIE_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._conn().execute(self._SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, site: str, scope: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT cookies FROM session_cookies WHERE site = ? AND scope = ?", (site, scope)
+        ).fetchone()
+        return row[0] if row else None
+
+    def write_many(self, rows: Iterable[Tuple[str, str, Optional[str]]]) -> None:
+        """Replace each ``(site, scope)`` jar in one transaction; a ``None`` payload deletes it."""
+        rows = list(rows)
+        if not rows:
+            return
+        now = int(time.time())
+        upserts = [(site, scope, payload, now) for site, scope, payload in rows if payload is not None]
+        deletes = [(site, scope) for site, scope, payload in rows if payload is None]
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if upserts:
+                    conn.executemany(
+                        "INSERT INTO session_cookies (site, scope, cookies, updated_at) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(site, scope) DO UPDATE SET cookies = excluded.cookies, "
+                        "updated_at = excluded.updated_at",
+                        upserts,
+                    )
+                if deletes:
+                    conn.executemany("DELETE FROM session_cookies WHERE site = ? AND scope = ?", deletes)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM session_cookies").fetchone()[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ======================
+# WRITE-BEHIND STORE
+# ======================
+class CookieStore:
+    """
+    Write-behind cookie jars keyed by (site, scope).
+
+    ``mark_dirty`` keeps a reference to the live jar; the flusher snapshots
+    it at write time, so a burst of requests on one session is one row
+    write. ``delete`` and ``flush`` are serialized so a cleared session can
+    never be resurrected by a flush that was already in progress.
+    """
+
+    def __init__(self, backend, flush_interval: float = COOKIE_FLUSH_INTERVAL_SECONDS):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self._dirty: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"marked": 0, "flushes": 0, "jars_written": 0, "flush_errors": 0}
+
+    def load(self, jar, site: str, scope: str, legacy_file: Optional[Path] = None) -> int:
+        """Copy the stored cookies for ``(site, scope)`` into ``jar``; returns how many."""
+        payload = self.backend.get(site, scope)
+        if payload is not None:
+            cookies = deserialize_cookies(payload)
+        elif legacy_file is not None and legacy_file.exists():
+            cookies = self._migrate_legacy_file(site, scope, legacy_file)
+        else:
+            return 0
+        for cookie in cookies:
+            jar.set_cookie(cookie)
+        return len(cookies)
+
+    def mark_dirty(self, jar, site: str, scope: str) -> None:
+        """Schedule ``jar`` to be written on the next flush."""
+        with self._lock:
+            self._dirty[(site, scope)] = jar
+            self._stats["marked"] += 1
+        if self.flush_interval <= 0:
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def delete(self, site: str, scope: str) -> None:
+        """Drop the stored jar and any pending write for it."""
+        with self._flush_lock:
+            with self._lock:
+                self._dirty.pop((site, scope), None)
+            self.backend.write_many([(site, scope, None)])
+
+    def flush(self) -> int:
+        """Write every dirty jar in one transaction; returns how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+            if not dirty:
+                return 0
+            rows = []
+            for (site, scope), jar in dirty.items():
+                cookies = _snapshot(jar)
+                rows.append((site, scope, serialize_cookies(cookies) if cookies else None))
+            try:
+                self.backend.write_many(rows)
+            except Exception:
+                with self._lock:
+                    self._stats["flush_errors"] += 1
+                    for key, jar in dirty.items():
+                        self._dirty.setdefault(key, jar)
+                raise
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["jars_written"] += len(rows)
+            return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._dirty)
+        stats["writes_saved"] = max(stats["marked"] - stats["jars_written"] - stats["pending"], 0)
+        return stats
+
+    def close(self) -> None:
+        """Stop the flusher thread and write whatever is still pending."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _ensure_flusher(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="cookie-store-flusher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Failed to flush session cookies: {e}")
+
+    def _migrate_legacy_file(self, site: str, scope: str, legacy_file: Path) -> List[Cookie]:
+        """Import a legacy LWP cookie file into the store once."""
+        try:
+            legacy = LWPCookieJar(str(legacy_file))
+            legacy.load(ignore_discard=True, ignore_expires=False)
+            cookies = list(legacy)
+            self.backend.write_many([(site, scope, serialize_cookies(cookies) if cookies else None)])
+            legacy_file.rename(legacy_file.with_name(legacy_file.name + ".migrated"))
+            logger.info(f"Migrated {len(cookies)} cookies from {legacy_file}")
+            return cookies
+        except Exception as e:
+            logger.debug(f"Failed to migrate cookie file {legacy_file}: {e}")
+            return []
+
+
+# ======================
+# STORE ACCESS
+# ======================
+_store: Optional[CookieStore] = None
+_store_lock = threading.Lock()
+
+
+def get_cookie_store() -> CookieStore:
+    """Get the process-wide cookie store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if COOKIE_STORE_BACKEND == "memory":
+                    backend = MemoryCookieBackend()
+                else:
+                    backend = SqliteCookieBackend(COOKIE_STORE_PATH)
+                _store = CookieStore(backend)
+    return _store
+
+
+def set_cookie_store(store: Optional[CookieStore]) -> None:
+    """Install a store (e.g. one over a ``MemoryCookieBackend`` in tests)."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def flush_cookie_store() -> int:
+    """Write pending cookie jars now; registered to run at interpreter exit."""
+    store = _store
+    if store is None:
+        return 0
+    try:
+        return store.flush()
+    except Exception as e:
+        logger.error(f"Failed to flush session cookies: {e}")
+        return 0
+
+
+atexit.register(flush_cookie_store)
+
+
+__all__ = [
+    "CookieStore",
+    "MemoryCookieBackend",
+    "SqliteCookieBackend",
+    "deserialize_cookies",
+    "flush_cookie_store",
+    "get_cookie_store",
+    "serialize_cookies",
+    "set_cookie_store",
+]
@@ -7,7 +7,8 @@ from datetime import datetime
 import urllib.parse
 import json
 import re
-from lxml import html
+from xml.etree import ElementTree as ET
+from lxml import etree
 from utils import debug_scraper_output, logger
 from db import save_listing
 from error_handling import ErrorHandler, log_errors, ScraperError, NetworkError
@@ -20,7 +21,8 @@ from scrapers.common import (
     log_parse_attempt, get_seen_listings_lock, extract_json_ld_items, 
     reset_session, validate_response_structure, detect_block_type,
     is_zero_results_page, RequestStrategy, smart_scrape_request,
-    is_smart_request_available,
+    is_smart_request_available, response_unchanged, remember_response,
+    parse_html_fast,
 )
 from scrapers.metrics import ScraperMetrics
 from scrapers import anti_blocking
@@ -89,10 +91,34 @@ CRAIGSLIST_FALLBACK_CHAIN = [
 ]
 
 
+def _rss_listings(root):
+    """Convert the ``<item>`` elements of a parsed RSS feed into listing dicts."""
+    items = []
+    for item in root.findall(".//item"):
+        title = (item.findtext("title") or "").strip()
+        link = (item.findtext("link") or "").strip()
+        
+        if not title or not link:
+            continue
+        
+        # Extract price from title or description
+        price_val = None
+        description = item.findtext("description") or ""
+        price_match = re.search(r"\$[\d,]+", title + " " + description)
+        if price_match:
+            price_val = _parse_price_text(price_match.group())
+        
+        items.append({
+            "title": title,
+            "link": link,
+            "price": price_val,
+            "image": None,  # RSS doesn't typically include images
+        })
+    return items
+
+
 def _fetch_rss_fallback(full_url: str, session, base_domain: str, username=None):
     """Fetch listings from RSS feed as fallback."""
-    from xml.etree import ElementTree as ET
-    
     rss_url = _transform_to_rss(full_url)
     logger.debug(f"Craigslist: Attempting RSS fallback from {rss_url}")
     
@@ -111,33 +137,11 @@ def _fetch_rss_fallback(full_url: str, session, base_domain: str, username=None)
         return []
     
     try:
-        root = ET.fromstring(response.text)
+        results = _rss_listings(ET.fromstring(response.text))
     except ET.ParseError as exc:
         logger.warning(f"Craigslist RSS parse error: {exc}")
         return []
     
-    results = []
-    for item in root.findall(".//item"):
-        title = (item.findtext("title") or "").strip()
-        link = (item.findtext("link") or "").strip()
-        
-        if not title or not link:
-            continue
-        
-        # Extract price from title or description
-        price_val = None
-        description = item.findtext("description") or ""
-        price_match = re.search(r"\$[\d,]+", title + " " + description)
-        if price_match:
-            price_val = _parse_price_text(price_match.group())
-        
-        results.append({
-            "title": title,
-            "link": link,
-            "price": price_val,
-            "image": None,
-        })
-    
     logger.debug(f"Craigslist RSS fallback recovered {len(results)} items")
     return results
 
@@ -229,6 +233,165 @@ def _parse_price_text(price_text):
         return None
 
 
+# Precompiled XPath selectors for the parse path, tried in order until one matches
+_POST_STRATEGIES = [
+    (1, "cl-static-search-result class", etree.XPath('//li[@class="cl-static-search-result"]')),
+    (2, "result-row class pattern", etree.XPath('//li[contains(@class, "result-row")]')),
+    (3, "generic search-result class", etree.XPath('//li[contains(@class, "search-result")]')),
+    (4, "ol.results li elements", etree.XPath('//ol[contains(@class, "results")]//li')),
+    (5, "div.cl-search-result", etree.XPath('//div[contains(@class, "cl-search-result")]')),
+    (6, "any li with data-pid", etree.XPath('//li[@data-pid]')),
+    (7, "article elements", etree.XPath('//article[contains(@class, "result")]')),
+    (8, "div.result-info containers", etree.XPath('//div[contains(@class, "result-info")]')),
+]
+_LISTING_LINKS_XPATH = etree.XPath('//a[contains(@href, "/post/") or contains(@href, "/d/")]')
+_ANCHOR_XPATHS = [etree.XPath(selector) for selector in (
+    ".//a[@class='titlestring']",
+    ".//a[contains(@class, 'result-title')]",
+    ".//a[contains(@class, 'title')]",
+    ".//a[contains(@href, '/post/') or contains(@href, '/d/')]",
+    ".//a[@href]",
+    ".//h2/a | .//h3/a",
+    ".//a[contains(@href, 'craigslist.org')]",
+)]
+_TITLE_XPATHS = [etree.XPath(selector) for selector in (
+    ".//span[contains(@class, 'title')]",
+    ".//h2",
+    ".//h3",
+    ".//div[contains(@class, 'title')]",
+    ".//p[contains(@class, 'title')]",
+)]
+_PRICE_XPATHS = [etree.XPath(selector) for selector in (
+    ".//span[contains(@class, 'price')]/text()",
+    ".//div[contains(@class, 'price')]/text()",
+    ".//span[contains(text(), '$')]",
+    ".//div[contains(text(), '$')]",
+    ".//*[contains(@class, 'price')]//text()",
+)]
+_IMAGE_XPATHS = [etree.XPath(selector) for selector in (
+    ".//img[@src]/@src",
+    ".//img[@data-src]/@data-src",
+    ".//img[@data-lazy]/@data-lazy",
+    ".//img/@src",
+)]
+
+
+def _extract_from_listing_links(tree):
+    """Extract posts from listing links as fallback."""
+    link_elements = _LISTING_LINKS_XPATH(tree)
+    if not link_elements:
+        return []
+    posts_found = []
+    seen_links = set()
+    for link_elem in link_elements:
+        href = link_elem.get('href', '')
+        if href and href not in seen_links:
+            seen_links.add(href)
+            parent = link_elem.getparent()
+            if parent is not None and parent not in posts_found:
+                posts_found.append(parent)
+    return posts_found
+
+
+def _find_posts(tree):
+    """Return the result elements of a search page, trying each selector strategy in order."""
+    if not hasattr(tree, 'xpath'):
+        return []
+    strategies = _POST_STRATEGIES + [(9, "links with href containing /post/", _extract_from_listing_links)]
+    for method_num, description, strategy in strategies:
+        log_parse_attempt(SITE_NAME, method_num, description)
+        try:
+            posts = strategy(tree)
+            if posts:
+                logger.debug(f"Craigslist: Found {len(posts)} posts using method {method_num} ({description})")
+                return posts
+        except Exception as e:
+            logger.debug(f"Craigslist: Method {method_num} failed: {e}")
+    return []
+
+
+def _post_listing(post):
+    """Extract ``{"title", "link", "price", "image"}`` from a result element, or None."""
+    if not hasattr(post, 'xpath'):
+        return None
+
+    # Enhanced anchor and title extraction with multiple fallbacks
+    link = None
+    title = None
+    anchor = None
+    for selector in _ANCHOR_XPATHS:
+        try:
+            anchor = selector(post)
+            if anchor:
+                break
+        except Exception:
+            continue
+
+    if anchor:
+        link = anchor[0].get('href')
+        # Try multiple title extraction methods
+        title_sources = [
+            anchor[0].get('title'),
+            anchor[0].get('aria-label'),
+            (anchor[0].text_content() or "").strip() if hasattr(anchor[0], 'text_content') else None,
+            post.get("title"),
+            post.get("aria-label"),
+        ]
+        for title_source in title_sources:
+            if title_source and isinstance(title_source, str) and title_source.strip():
+                title = title_source.strip()
+                break
+
+        # Try finding title in nearby elements if still missing
+        if not title:
+            for selector in _TITLE_XPATHS:
+                try:
+                    title_elem = selector(post)
+                    if title_elem and hasattr(title_elem[0], 'text_content'):
+                        title_candidate = title_elem[0].text_content().strip()
+                        if title_candidate:
+                            title = title_candidate
+                            break
+                except Exception:
+                    continue
+
+    if not link or not title:
+        return None
+
+    # Enhanced price extraction with multiple fallbacks
+    price_val = None
+    for selector in _PRICE_XPATHS:
+        try:
+            price_elem = selector(post)
+            if price_elem:
+                price_val = _parse_price_text(price_elem[0])
+                if price_val is not None:
+                    break
+        except Exception:
+            continue
+
+    # Enhanced image extraction with multiple fallbacks
+    image_url = None
+    for selector in _IMAGE_XPATHS:
+        try:
+            img_elem = selector(post)
+            if img_elem:
+                image_url = img_elem[0]
+                if image_url.startswith('//'):
+                    image_url = f"https:{image_url}"
+                elif image_url and not image_url.startswith('http'):
+                    image_url = "https://images.craigslist.org" + image_url
+                # Validate image URL
+                if image_url and validate_image_url(image_url):
+                    break
+                else:
+                    image_url = None
+        except Exception:
+            continue
+
+    return {"title": title, "link": link, "price": price_val, "image": image_url}
+
+
 def _parse_json_listings(tree):
     listings = []
     scripts = tree.xpath('//script[@type="application/ld+json"]/text()')
@@ -318,8 +481,9 @@ def resolve_listing_link(raw_link, base_domain):
 # ======================
 # MAIN SCRAPER FUNCTION
 # ======================
-def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
-    settings = load_settings(username=user_id)
+def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None, settings=None, deliver=None):
+    settings = settings or load_settings(username=user_id)
+    deliver = deliver or send_discord_message
     keywords = settings["keywords"]
     min_price = settings["min_price"]
     max_price = settings["max_price"]
@@ -331,7 +495,9 @@ def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key
     flag_key = flag_key or _flag_key(flag_name, user_id)
     user_key = _user_key(user_id)
     if user_seen is None:
-        user_seen = seen_listings.setdefault(user_key, {})
+        user_seen = seen_listings.get(user_key)
+        if user_seen is None:
+            user_seen = seen_listings.setdefault(user_key, load_seen_listings(SITE_NAME, username=user_id))
     
     # Use metrics tracking
     with ScraperMetrics(SITE_NAME) as metrics:
@@ -424,6 +590,12 @@ def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key
             
             if strategy_used:
                 logger.debug(f"Craigslist: Request succeeded using strategy '{strategy_used}'")
+
+            if response_unchanged(response):
+                logger.info(f"Craigslist: Results page unchanged since last check. Next check in {check_interval}s...")
+                metrics.success = True
+                metrics.listings_found = 0
+                return []
             
             # Check if response is RSS/XML (when RSS strategy succeeded)
             response_text = response.text if hasattr(response, 'text') else ""
@@ -431,31 +603,8 @@ def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key
             
             if is_rss_response:
                 logger.info("Craigslist: Detected RSS response, parsing as XML")
-                from xml.etree import ElementTree as ET
                 try:
-                    root = ET.fromstring(response_text)
-                    rss_items = []
-                    for item in root.findall(".//item"):
-                        title = (item.findtext("title") or "").strip()
-                        link = (item.findtext("link") or "").strip()
-                        description = item.findtext("description") or ""
-                        
-                        if not title or not link:
-                            continue
-                        
-                        # Extract price from title or description
-                        price_val = None
-                        price_match = re.search(r"\$[\d,]+", title + " " + description)
-                        if price_match:
-                            price_val = _parse_price_text(price_match.group())
-                        
-                        rss_items.append({
-                            "title": title,
-                            "link": link,
-                            "price": price_val,
-                            "image": None,  # RSS doesn't typically include images
-                        })
-                    
+                    rss_items = _rss_listings(ET.fromstring(response_text))
                     logger.info(f"Craigslist: RSS parsing found {len(rss_items)} items")
                     
                     # Process RSS items with filtering
@@ -485,7 +634,7 @@ def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key
                         with seen_lock:
                             user_seen[normalized_link] = datetime.now()
                         
-                        send_discord_message(title, link, price_val, None, user_id=user_id)
+                        deliver(title, link, price_val, None, user_id=user_id)
                         results.append({
                             "title": title,
                             "link": link,
@@ -502,6 +651,7 @@ def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key
                         metrics.success = True
                         metrics.listings_found = 0
                     
+                    remember_response(response)
                     debug_scraper_output("Craigslist", results)
                     return results
                 except ET.ParseError as e:
@@ -532,14 +682,13 @@ def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key
                 logger.info(f"Craigslist: No listings match criteria. Next check in {check_interval}s...")
                 metrics.success = True
                 metrics.listings_found = 0
+                remember_response(response)
                 return []
             
-            # Use robust HTML parsing - try lxml first, fallback to BeautifulSoup
-            tree = None
-            try:
-                tree = html.fromstring(response.text)
-            except Exception as parse_error:
-                logger.warning(f"Craigslist: lxml parsing failed, trying BeautifulSoup: {parse_error}")
+            # Use robust HTML parsing - lxml straight from the raw bytes, fallback to BeautifulSoup
+            tree = parse_html_fast(response.content, site_name=SITE_NAME)
+            if tree is None:
+                logger.warning("Craigslist: lxml parsing failed, trying BeautifulSoup")
                 from bs4 import BeautifulSoup
                 soup = BeautifulSoup(response.text, 'html.parser')
                 # Convert BeautifulSoup to lxml tree for consistency
@@ -551,52 +700,12 @@ def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key
                     tree = soup
             
             # Try multiple XPath patterns for robustness - expanded with better fallbacks
-            posts = []
-            parse_strategies = [
-                (1, "cl-static-search-result class", lambda: tree.xpath('//li[@class="cl-static-search-result"]') if hasattr(tree, 'xpath') else []),
-                (2, "result-row class pattern", lambda: tree.xpath('//li[contains(@class, "result-row")]') if hasattr(tree, 'xpath') else []),
-                (3, "generic search-result class", lambda: tree.xpath('//li[contains(@class, "search-result")]') if hasattr(tree, 'xpath') else []),
-                (4, "ol.results li elements", lambda: tree.xpath('//ol[contains(@class, "results")]//li') if hasattr(tree, 'xpath') else []),
-                (5, "div.cl-search-result", lambda: tree.xpath('//div[contains(@class, "cl-search-result")]') if hasattr(tree, 'xpath') else []),
-                (6, "any li with data-pid", lambda: tree.xpath('//li[@data-pid]') if hasattr(tree, 'xpath') else []),
-                (7, "article elements", lambda: tree.xpath('//article[contains(@class, "result")]') if hasattr(tree, 'xpath') else []),
-                (8, "div.result-info containers", lambda: tree.xpath('//div[contains(@class, "result-info")]') if hasattr(tree, 'xpath') else []),
-                (9, "links with href containing /post/", lambda: _extract_from_listing_links(tree)),
-            ]
-            
-            for method_num, description, strategy in parse_strategies:
-                log_parse_attempt(SITE_NAME, method_num, description)
-                try:
-                    posts = strategy()
-                    if posts:
-                        logger.debug(f"Craigslist: Found {len(posts)} posts using method {method_num} ({description})")
-                        break
-                except Exception as e:
-                    logger.debug(f"Craigslist: Method {method_num} failed: {e}")
-                    continue
-            
-            def _extract_from_listing_links(tree):
-                """Extract posts from listing links as fallback."""
-                if not hasattr(tree, 'xpath'):
-                    return []
-                link_elements = tree.xpath('//a[contains(@href, "/post/") or contains(@href, "/d/")]')
-                if not link_elements:
-                    return []
-                posts_found = []
-                seen_links = set()
-                for link_elem in link_elements:
-                    href = link_elem.get('href', '')
-                    if href and href not in seen_links:
-                        seen_links.add(href)
-                        parent = link_elem.getparent()
-                        if parent is not None and parent not in posts_found:
-                            posts_found.append(parent)
-                return posts_found
+            posts = _find_posts(tree)
 
             json_ld_items = []
             if not posts:
                 log_parse_attempt(SITE_NAME, 8, "JSON-LD itemListElement fallback")
-                json_ld_items = extract_json_ld_items(response.text)
+                json_ld_items = extract_json_ld_items(response.content)
                 if not json_ld_items:
                     # Log HTML snippet for debugging (first 2000 chars)
                     html_snippet = response.text[:2000].replace('\n', ' ').replace('\r', ' ')
@@ -656,7 +765,7 @@ def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key
                 with seen_lock:
                     user_seen[normalized_link] = datetime.now()
 
-                send_discord_message(title, link, normalized_price, image_url, user_id=user_id)
+                deliver(title, link, normalized_price, image_url, user_id=user_id)
                 results.append({
                     "title": title,
                     "link": link,
@@ -667,118 +776,9 @@ def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key
             if posts:
                 for post in posts:
                     try:
-                        link = None
-                        title = None
-
-                        # Enhanced anchor and title extraction with multiple fallbacks
-                        link = None
-                        title = None
-                        
-                        # Try multiple anchor patterns
-                        anchor_selectors = [
-                            ".//a[@class='titlestring']",
-                            ".//a[contains(@class, 'result-title')]",
-                            ".//a[contains(@class, 'title')]",
-                            ".//a[contains(@href, '/post/') or contains(@href, '/d/')]",
-                            ".//a[@href]",
-                            ".//h2/a | .//h3/a",
-                            ".//a[contains(@href, 'craigslist.org')]",
-                        ]
-                        
-                        anchor = None
-                        for selector in anchor_selectors:
-                            try:
-                                anchor = post.xpath(selector) if hasattr(post, 'xpath') else []
-                                if anchor:
-                                    break
-                            except Exception:
-                                continue
-                        
-                        if anchor:
-                            link = anchor[0].get('href')
-                            # Try multiple title extraction methods
-                            title_sources = [
-                                anchor[0].get('title'),
-                                anchor[0].get('aria-label'),
-                                (anchor[0].text_content() or "").strip() if hasattr(anchor[0], 'text_content') else None,
-                                post.get("title") if hasattr(post, 'get') else None,
-                                post.get("aria-label") if hasattr(post, 'get') else None,
-                            ]
-                            for title_source in title_sources:
-                                if title_source and isinstance(title_source, str) and title_source.strip():
-                                    title = title_source.strip()
-                                    break
-                            
-                            # Try finding title in nearby elements if still missing
-                            if not title and hasattr(post, 'xpath'):
-                                title_selectors = [
-                                    ".//span[contains(@class, 'title')]",
-                                    ".//h2",
-                                    ".//h3",
-                                    ".//div[contains(@class, 'title')]",
-                                    ".//p[contains(@class, 'title')]",
-                                ]
-                                for selector in title_selectors:
-                                    try:
-                                        title_elem = post.xpath(selector)
-                                        if title_elem and hasattr(title_elem[0], 'text_content'):
-                                            title_candidate = title_elem[0].text_content().strip()
-                                            if title_candidate:
-                                                title = title_candidate
-                                                break
-                                    except Exception:
-                                        continue
-
-                        if not link or not title:
-                            continue
-
-                        # Enhanced price extraction with multiple fallbacks
-                        price_val = None
-                        if hasattr(post, 'xpath'):
-                            price_selectors = [
-                                ".//span[contains(@class, 'price')]/text()",
-                                ".//div[contains(@class, 'price')]/text()",
-                                ".//span[contains(text(), '$')]",
-                                ".//div[contains(text(), '$')]",
-                                ".//*[contains(@class, 'price')]//text()",
-                            ]
-                            for selector in price_selectors:
-                                try:
-                                    price_elem = post.xpath(selector)
-                                    if price_elem:
-                                        price_val = _parse_price_text(price_elem[0])
-                                        if price_val is not None:
-                                            break
-                                except Exception:
-                                    continue
-
-                        # Enhanced image extraction with multiple fallbacks
-                        image_url = None
-                        if hasattr(post, 'xpath'):
-                            img_selectors = [
-                                ".//img[@src]/@src",
-                                ".//img[@data-src]/@data-src",
-                                ".//img[@data-lazy]/@data-lazy",
-                                ".//img/@src",
-                            ]
-                            for selector in img_selectors:
-                                try:
-                                    img_elem = post.xpath(selector)
-                                    if img_elem:
-                                        image_url = img_elem[0]
-                                        if image_url.startswith('//'):
-                                            image_url = f"https:{image_url}"
-                                        elif image_url and not image_url.startswith('http'):
-                                            image_url = "https://images.craigslist.org" + image_url
-                                        # Validate image URL
-                                        if image_url and validate_image_url(image_url):
-                                            break
-                                        else:
-                                            image_url = None
-                                except Exception:
-                                    continue
-
-                        handle_candidate(title, link, price_val, image_url)
+                        listing = _post_listing(post)
+                        if listing:
+                            handle_candidate(listing["title"], listing["link"], listing["price"], listing["image"])
                     except Exception as e:
                         logger.warning(f"Error parsing a Craigslist post: {e}")
             else:
@@ -809,6 +809,7 @@ def check_craigslist(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key
                 metrics.success = True
                 metrics.listings_found = 0
 
+            remember_response(response)
             debug_scraper_output("Craigslist", results)
             return results
 
@@ -19,7 +19,8 @@ from scrapers.common import (
     log_parse_attempt, get_seen_listings_lock, extract_json_ld_items, 
     reset_session, validate_response_structure, detect_block_type,
     is_zero_results_page, RequestStrategy, smart_scrape_request,
-    is_smart_request_available,
+    is_smart_request_available, response_unchanged, remember_response,
+    parse_html_fast, compile_selectors, xpath_class, first_text, first_attribute,
 )
 from scrapers.metrics import ScraperMetrics
 from scrapers import anti_blocking
@@ -54,14 +55,22 @@ _BLOCK_KEYWORDS = {
     "bot protection",
 }
 
-# Enhanced selector patterns for robustness
-_ITEM_SELECTORS = [
-    ("s-item__wrapper", "div", "class"),
-    ("s-item", "li", "class"),
-    ("s-item", "div", "class"),
-    ("srp-results", "ul", "class"),
-    ("mi:1686", "div", "data-view"),
-]
+# Precompiled selectors for the lxml fast path; the BeautifulSoup strategies
+# in check_ebay remain the fallback for layouts these don't match
+_FAST_SELECTORS = compile_selectors({
+    "wrappers": f"//div[{xpath_class('s-item__wrapper')}]",
+    "items": f"//li[{xpath_class('s-item')}]",
+    "title": f".//div[{xpath_class('s-item__title')}]",
+    "title_heading": f".//h3[{xpath_class('s-item__title')}]",
+    "title_link": f".//a[{xpath_class('s-item__link')}]",
+    "link": f".//a[{xpath_class('s-item__link')}]/@href",
+    "any_link": ".//a/@href",
+    "price": f".//span[{xpath_class('s-item__price')}]",
+    "any_price": ".//span[contains(@class, 'price')] | .//div[contains(@class, 'price')]",
+    "image": f".//img[{xpath_class('s-item__image-img')}]",
+    "any_image": ".//img",
+})
+_PLACEHOLDER_IMAGE_TOKENS = ('s-l64', 's-l50', 'data:', 'placeholder', '1x1')
 
 # eBay-specific fallback chain - RSS FIRST as it's least likely to be blocked
 def _transform_to_rss(url: str) -> str:
@@ -197,6 +206,70 @@ def _parse_json_listings(soup):
     return listings
 
 
+def _fast_image_url(item):
+    for img in _FAST_SELECTORS["image"](item) + _FAST_SELECTORS["any_image"](item):
+        image_url = img.get('data-src') or img.get('data-lazy') or img.get('src') or img.get('data-original')
+        if not image_url:
+            continue
+        if image_url.startswith('//'):
+            image_url = f"https:{image_url}"
+        elif not image_url.startswith('http'):
+            continue
+        if any(token in image_url.lower() for token in _PLACEHOLDER_IMAGE_TOKENS):
+            continue
+        return image_url
+    return None
+
+
+def _extract_listings_fast(tree):
+    """Read item tiles from an lxml tree with the precompiled ``_FAST_SELECTORS``."""
+    listings = []
+    items = _FAST_SELECTORS["wrappers"](tree) or _FAST_SELECTORS["items"](tree)
+    for item in items:
+        title = first_text(item, _FAST_SELECTORS["title"], _FAST_SELECTORS["title_heading"], _FAST_SELECTORS["title_link"])
+        if not title or "Shop on eBay" in title:
+            continue
+        link = first_attribute(item, _FAST_SELECTORS["link"], _FAST_SELECTORS["any_link"])
+        if not link:
+            continue
+        price_val = None
+        for price_elem in _FAST_SELECTORS["price"](item) + _FAST_SELECTORS["any_price"](item):
+            price_val = _parse_price_value(price_elem.text_content().strip())
+            if price_val is not None:
+                break
+        listings.append({
+            'title': title,
+            'link': link,
+            'price': price_val,
+            'image': _fast_image_url(item),
+        })
+    return listings
+
+
+def _parse_listings_fast(content):
+    """
+    Extract listings from a results page without BeautifulSoup.
+
+    Item tiles are read with lxml; when none match, JSON-LD is scanned
+    straight from the response bytes. Returns an empty list when neither
+    works, so the caller falls back to the BeautifulSoup strategies.
+    """
+    tree = parse_html_fast(content, site_name=SITE_NAME)
+    listings = _extract_listings_fast(tree) if tree is not None else []
+    if listings:
+        return listings
+
+    for entry in extract_json_ld_items(content):
+        if entry.get("title") and entry.get("url"):
+            listings.append({
+                'title': entry["title"],
+                'link': entry["url"],
+                'price': entry.get("price"),
+                'image': entry.get("image"),
+            })
+    return listings
+
+
 def _parse_rss_item_description(description_html):
     """Extract price, image, and plain text description from RSS HTML fragments."""
     if not description_html:
@@ -224,6 +297,28 @@ def _parse_rss_item_description(description_html):
     return price_val, image_url, text_content or None
 
 
+def _rss_listings(root):
+    """Convert the ``<item>`` elements of a parsed eBay RSS feed into listing dicts."""
+    items = []
+    for item in root.findall(".//item"):
+        title = (item.findtext("title") or "").strip()
+        link = (item.findtext("link") or "").strip()
+        description_html = item.findtext("description") or ""
+
+        if not title or not link:
+            continue
+
+        price_val, image_url, text_content = _parse_rss_item_description(description_html)
+        items.append({
+            "title": title,
+            "link": link,
+            "price": price_val,
+            "image": image_url,
+            "description": text_content,
+        })
+    return items
+
+
 def _fetch_rss_fallback(full_url, session, username=None):
     """
     Attempt to recover listings via the public RSS endpoint when the HTML view is blocked.
@@ -254,29 +349,11 @@ def _fetch_rss_fallback(full_url, session, username=None):
         return []
 
     try:
-        root = ET.fromstring(rss_response.text)
+        results = _rss_listings(ET.fromstring(rss_response.text))
     except ET.ParseError as exc:
         logger.warning(f"eBay RSS fallback parse error: {exc}")
         return []
 
-    results = []
-    for item in root.findall(".//item"):
-        title = (item.findtext("title") or "").strip()
-        link = (item.findtext("link") or "").strip()
-        description_html = item.findtext("description") or ""
-
-        if not title or not link:
-            continue
-
-        price_val, image_url, text_content = _parse_rss_item_description(description_html)
-        results.append({
-            "title": title,
-            "link": link,
-            "price": price_val,
-            "image": image_url,
-            "description": text_content,
-        })
-
     logger.debug(f"eBay RSS fallback recovered {len(results)} candidate items")
     return results
 
@@ -370,8 +447,9 @@ def resolve_listing_link(raw_link):
 # ======================
 # MAIN SCRAPER FUNCTION
 # ======================
-def check_ebay(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
-    settings = load_settings(username=user_id)
+def check_ebay(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None, settings=None, deliver=None):
+    settings = settings or load_settings(username=user_id)
+    deliver = deliver or send_discord_message
     keywords = settings["keywords"]
     min_price = settings["min_price"]
     max_price = settings["max_price"]
@@ -383,7 +461,9 @@ def check_ebay(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None)
     flag_key = flag_key or _flag_key(flag_name, user_id)
     user_key = _user_key(user_id)
     if user_seen is None:
-        user_seen = seen_listings.setdefault(user_key, {})
+        user_seen = seen_listings.get(user_key)
+        if user_seen is None:
+            user_seen = seen_listings.setdefault(user_key, load_seen_listings(SITE_NAME, username=user_id))
     
     # Use metrics tracking
     with ScraperMetrics(SITE_NAME) as metrics:
@@ -502,6 +582,12 @@ def check_ebay(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None)
             
             if strategy_used:
                 logger.debug(f"eBay: Request succeeded using strategy '{strategy_used}'")
+
+            if response_unchanged(response):
+                logger.info(f"eBay: Results page unchanged since last check. Next check in {check_interval}s...")
+                metrics.success = True
+                metrics.listings_found = 0
+                return []
             
             # Check if response is RSS/XML (when RSS strategy succeeded)
             response_text = response.text if hasattr(response, 'text') else ""
@@ -554,107 +640,113 @@ def check_ebay(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None)
                 logger.info(f"eBay: No listings match criteria. Next check in {check_interval}s...")
                 metrics.success = True
                 metrics.listings_found = 0
+                remember_response(response)
                 return []
             
-            # Use robust HTML parsing with fallback parsers
-            from scrapers.common import parse_html_with_fallback
-            try:
-                soup = parse_html_with_fallback(
-                    response.text,
-                    parser_order=('html.parser', 'lxml'),
-                    raw_bytes=response.content,
-                    site_name=SITE_NAME,
-                )
-            except Exception as parse_error:
-                logger.warning(f"eBay: HTML parsing failed, trying BeautifulSoup fallback: {parse_error}")
-                soup = BeautifulSoup(response.text, 'html.parser')
+            # Fast path: lxml with precompiled selectors, JSON-LD scanned from the raw bytes
+            fast_listings = [] if is_rss_response else _parse_listings_fast(response.content)
+            items = []
+            json_items = []
+            json_ld_items = []
+            if fast_listings:
+                logger.debug(f"eBay: lxml fast path found {len(fast_listings)} items")
+                json_items = fast_listings
+            else:
+                # Use robust HTML parsing with fallback parsers
+                from scrapers.common import parse_html_with_fallback
+                try:
+                    soup = parse_html_with_fallback(
+                        response.text,
+                        raw_bytes=response.content,
+                        site_name=SITE_NAME,
+                    )
+                except Exception as parse_error:
+                    logger.warning(f"eBay: HTML parsing failed, trying BeautifulSoup fallback: {parse_error}")
+                    soup = BeautifulSoup(response.text, 'html.parser')
             
-            # Helper function for extracting items from listing links
-            def _extract_from_listing_links(soup):
-                """Extract items from listing links as fallback."""
-                link_elements = soup.find_all('a', href=lambda x: x and '/itm/' in str(x) if x else False)
-                if not link_elements:
-                    return []
-                items_found = []
-                seen_links = set()
-                for link_elem in link_elements:
-                    href = link_elem.get('href', '')
-                    if href and href not in seen_links:
-                        seen_links.add(href)
-                        parent = link_elem.find_parent(['li', 'div', 'article', 'section'])
-                        if parent and parent not in items_found:
-                            items_found.append(parent)
-                return items_found
+                # Helper function for extracting items from listing links
+                def _extract_from_listing_links(soup):
+                    """Extract items from listing links as fallback."""
+                    link_elements = soup.find_all('a', href=lambda x: x and '/itm/' in str(x) if x else False)
+                    if not link_elements:
+                        return []
+                    items_found = []
+                    seen_links = set()
+                    for link_elem in link_elements:
+                        href = link_elem.get('href', '')
+                        if href and href not in seen_links:
+                            seen_links.add(href)
+                            parent = link_elem.find_parent(['li', 'div', 'article', 'section'])
+                            if parent and parent not in items_found:
+                                items_found.append(parent)
+                    return items_found
             
-            # eBay uses different HTML structures, try multiple patterns
-            # Updated for December 2024 eBay layout
-            items = []
-            parse_strategies = [
-                # Primary selectors (current eBay layout)
-                (1, "s-item__wrapper divs", lambda: soup.find_all('div', class_='s-item__wrapper')),
-                (2, "s-item list items", lambda: soup.find_all('li', class_='s-item')),
-                # New eBay GR4 framework selectors
-                (3, "data-gr4 items", lambda: soup.find_all('div', attrs={'data-gr4-click': True})),
-                (4, "section.s-item", lambda: soup.find_all('section', class_='s-item')),
-                # Generic fallbacks
-                (5, "generic s-item pattern", lambda: soup.find_all(['div', 'li', 'section'], attrs={'class': lambda x: x and 's-item' in str(x).lower() if x else False})),
-                (6, "srp-results li items", lambda: soup.select('ul.srp-results > li.s-item, div.srp-results li')),
-                (7, "items with data-view", lambda: soup.find_all('div', attrs={'data-view': lambda x: x and 'mi:' in str(x) if x else False})),
-                # Last resort - find any elements with /itm/ links
-                (8, "links with href containing /itm/", lambda: _extract_from_listing_links(soup)),
-                # Article elements (newer layout)
-                (9, "article.s-item", lambda: soup.find_all('article', attrs={'class': lambda x: x and 's-item' in str(x).lower() if x else False})),
-            ]
+                # eBay uses different HTML structures, try multiple patterns
+                # Updated for December 2024 eBay layout
+                parse_strategies = [
+                    # Primary selectors (current eBay layout)
+                    (1, "s-item__wrapper divs", lambda: soup.find_all('div', class_='s-item__wrapper')),
+                    (2, "s-item list items", lambda: soup.find_all('li', class_='s-item')),
+                    # New eBay GR4 framework selectors
+                    (3, "data-gr4 items", lambda: soup.find_all('div', attrs={'data-gr4-click': True})),
+                    (4, "section.s-item", lambda: soup.find_all('section', class_='s-item')),
+                    # Generic fallbacks
+                    (5, "generic s-item pattern", lambda: soup.find_all(['div', 'li', 'section'], attrs={'class': lambda x: x and 's-item' in str(x).lower() if x else False})),
+                    (6, "srp-results li items", lambda: soup.select('ul.srp-results > li.s-item, div.srp-results li')),
+                    (7, "items with data-view", lambda: soup.find_all('div', attrs={'data-view': lambda x: x and 'mi:' in str(x) if x else False})),
+                    # Last resort - find any elements with /itm/ links
+                    (8, "links with href containing /itm/", lambda: _extract_from_listing_links(soup)),
+                    # Article elements (newer layout)
+                    (9, "article.s-item", lambda: soup.find_all('article', attrs={'class': lambda x: x and 's-item' in str(x).lower() if x else False})),
+                ]
             
-            for method_num, description, strategy in parse_strategies:
-                log_parse_attempt(SITE_NAME, method_num, description)
-                try:
-                    items = strategy()
-                    if items:
-                        logger.debug(f"eBay: Found {len(items)} items using method {method_num} ({description})")
-                        break
-                except Exception as e:
-                    logger.debug(f"eBay: Method {method_num} failed: {e}")
-                    continue
+                for method_num, description, strategy in parse_strategies:
+                    log_parse_attempt(SITE_NAME, method_num, description)
+                    try:
+                        items = strategy()
+                        if items:
+                            logger.debug(f"eBay: Found {len(items)} items using method {method_num} ({description})")
+                            break
+                    except Exception as e:
+                        logger.debug(f"eBay: Method {method_num} failed: {e}")
+                        continue
 
-            # Try JSON-LD extraction if HTML parsing failed
-            json_items = []
-            json_ld_items = []
-            if not items:
-                log_parse_attempt(SITE_NAME, 9, "JSON-LD itemListElement")
-                json_items = [entry for entry in _parse_json_listings(soup) if entry.get('title') and entry.get('link')]
-                if not json_items:
-                    log_parse_attempt(SITE_NAME, 10, "Common JSON-LD extractor")
-                    json_ld_items = extract_json_ld_items(response.text)
-                    if not json_ld_items:
-                        # Try extracting from script tags with inline JSON
-                        log_parse_attempt(SITE_NAME, 11, "Inline JSON in script tags")
-                        for script in soup.find_all('script', type='application/json'):
-                            try:
-                                data = json.loads(script.string)
-                                if isinstance(data, dict):
-                                    items_data = data.get('items') or data.get('results') or data.get('listings', [])
-                                    if items_data:
-                                        json_items.extend([item for item in items_data if isinstance(item, dict) and item.get('title')])
-                                        break
-                            except (json.JSONDecodeError, TypeError, AttributeError):
-                                continue
+                # Try JSON-LD extraction if HTML parsing failed
+                if not items:
+                    log_parse_attempt(SITE_NAME, 9, "JSON-LD itemListElement")
+                    json_items = [entry for entry in _parse_json_listings(soup) if entry.get('title') and entry.get('link')]
+                    if not json_items:
+                        log_parse_attempt(SITE_NAME, 10, "Common JSON-LD extractor")
+                        json_ld_items = extract_json_ld_items(response.text)
+                        if not json_ld_items:
+                            # Try extracting from script tags with inline JSON
+                            log_parse_attempt(SITE_NAME, 11, "Inline JSON in script tags")
+                            for script in soup.find_all('script', type='application/json'):
+                                try:
+                                    data = json.loads(script.string)
+                                    if isinstance(data, dict):
+                                        items_data = data.get('items') or data.get('results') or data.get('listings', [])
+                                        if items_data:
+                                            json_items.extend([item for item in items_data if isinstance(item, dict) and item.get('title')])
+                                            break
+                                except (json.JSONDecodeError, TypeError, AttributeError):
+                                    continue
                         
-                        if not json_items and not json_ld_items:
-                            # Log HTML snippet for debugging
-                            html_snippet = response.text[:2000].replace('\n', ' ').replace('\r', ' ')
-                            logger.debug(f"eBay HTML snippet (first 2000 chars): {html_snippet}")
-                            # Check for common class names
-                            import re
-                            found_classes = set()
-                            for match in re.findall(r'class=["\']([^"\']+)["\']', response.text[:5000]):
-                                found_classes.update(match.split())
-                            logger.debug(f"eBay found class names: {sorted(found_classes)[:20]}")
-                            log_selector_failure(SITE_NAME, "combined selectors", "s-item patterns + JSON-LD", "listing items")
-                            logger.warning("eBay: No items found with HTML or JSON-LD selectors")
-                            metrics.success = True
-                            metrics.listings_found = 0
-                            return []
+                            if not json_items and not json_ld_items:
+                                # Log HTML snippet for debugging
+                                html_snippet = response.text[:2000].replace('\n', ' ').replace('\r', ' ')
+                                logger.debug(f"eBay HTML snippet (first 2000 chars): {html_snippet}")
+                                # Check for common class names
+                                import re
+                                found_classes = set()
+                                for match in re.findall(r'class=["\']([^"\']+)["\']', response.text[:5000]):
+                                    found_classes.update(match.split())
+                                logger.debug(f"eBay found class names: {sorted(found_classes)[:20]}")
+                                log_selector_failure(SITE_NAME, "combined selectors", "s-item patterns + JSON-LD", "listing items")
+                                logger.warning("eBay: No items found with HTML or JSON-LD selectors")
+                                metrics.success = True
+                                metrics.listings_found = 0
+                                return []
             
             logger.debug(f"Found {len(items) if items else len(json_items) if json_items else len(json_ld_items)} eBay items to process")
             
@@ -704,7 +796,7 @@ def check_ebay(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None)
                 with seen_lock:
                     user_seen[normalized_link] = datetime.now()
 
-                send_discord_message(title, link, normalized_price, image_url, user_id=user_id)
+                deliver(title, link, normalized_price, image_url, user_id=user_id)
                 results.append({
                     "title": title,
                     "link": link,
@@ -716,25 +808,7 @@ def check_ebay(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None)
             if is_rss_response:
                 logger.info("eBay: Detected RSS response, parsing as XML")
                 try:
-                    root = ET.fromstring(response_text)
-                    rss_items = []
-                    for item in root.findall(".//item"):
-                        title = (item.findtext("title") or "").strip()
-                        link = (item.findtext("link") or "").strip()
-                        description_html = item.findtext("description") or ""
-                        
-                        if not title or not link:
-                            continue
-                        
-                        price_val, image_url, text_content = _parse_rss_item_description(description_html)
-                        rss_items.append({
-                            "title": title,
-                            "link": link,
-                            "price": price_val,
-                            "image": image_url,
-                            "description": text_content,
-                        })
-                    
+                    rss_items = _rss_listings(ET.fromstring(response_text))
                     logger.info(f"eBay: RSS parsing found {len(rss_items)} items")
                     
                     for entry in rss_items:
@@ -755,6 +829,7 @@ def check_ebay(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None)
                         metrics.success = True
                         metrics.listings_found = 0
                     
+                    remember_response(response)
                     debug_scraper_output("eBay", results)
                     return results
                 except ET.ParseError as e:
@@ -879,6 +954,7 @@ def check_ebay(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None)
                 metrics.success = True
                 metrics.listings_found = 0
 
+            remember_response(response)
             debug_scraper_output("eBay", results)
             return results
 
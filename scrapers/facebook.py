@@ -2,9 +2,8 @@ import random, re, time, json
 import urllib.parse
 import threading
 from datetime import datetime
-from collections import defaultdict
 
-from lxml import html
+from lxml import etree
 from selenium.webdriver.common.by import By
 
 from utils import debug_scraper_output, logger
@@ -12,7 +11,11 @@ from db import get_settings, save_listing
 from error_handling import ErrorHandler, log_errors, ScraperError, NetworkError
 from location_utils import geocode_location
 from scrapers.metrics import ScraperMetrics
-from scrapers.common import smart_scrape_request, is_smart_request_available
+from scrapers.common import smart_scrape_request, is_smart_request_available, parse_html_fast
+from scrapers.common import (
+    load_seen_listings as common_load_seen_listings,
+    save_seen_listings as common_save_seen_listings,
+)
 
 # Import new stealth infrastructure - Facebook REQUIRES browser
 try:
@@ -45,7 +48,7 @@ LOCATION_IDS = {
 SITE_NAME = "facebook"
 BASE_URL = "https://www.facebook.com"
 
-seen_listings = defaultdict(dict)
+seen_listings = {}
 _seen_listings_lock = threading.Lock()  # Thread safety for seen_listings
 
 # ======================
@@ -147,6 +150,57 @@ def _xpath_literal(value):
             concat_parts.append('"\'"')
     return "concat(" + ", ".join(concat_parts) + ")"
 
+
+_ANCHORS_XPATH = etree.XPath("//a[@href]")
+_ANCHOR_IMAGES_XPATH = etree.XPath(".//img/@src")
+_PRICE_PATTERN = re.compile(r"\$\s?([\d,]+)")
+_BAD_IMAGE_PATTERNS = frozenset({"icon", "logo", "placeholder", "blank"})
+
+
+def _anchor_image(anchor):
+    """Return the first usable https image nested inside a listing anchor."""
+    for src in _ANCHOR_IMAGES_XPATH(anchor):
+        src_lower = src.lower()
+        if src.startswith("https://") and not any(p in src_lower for p in _BAD_IMAGE_PATTERNS):
+            return src
+    return None
+
+
+def _parse_listing_anchors(page_source):
+    """Parse rendered Marketplace markup into candidate listing dicts."""
+    tree = parse_html_fast(page_source, site_name=SITE_NAME)
+    if tree is None:
+        return []
+    return _extract_anchor_candidates(tree)
+
+
+def _extract_anchor_candidates(tree):
+    """Collect ``{"href", "link", "title", "price", "image"}`` for every link in the page."""
+    candidates = []
+    for anchor in _ANCHORS_XPATH(tree):
+        raw_href = anchor.get("href")
+        link = resolve_listing_link(raw_href)
+        title = (anchor.text_content() or "").strip()
+        if not title or not link:
+            continue
+
+        price = None
+        price_match = _PRICE_PATTERN.search(title)
+        if price_match:
+            try:
+                price = int(price_match.group(1).replace(",", ""))
+            except ValueError:
+                price = None
+
+        candidates.append({
+            "href": raw_href,
+            "link": link,
+            "title": title,
+            "price": price,
+            "image": _anchor_image(anchor),
+        })
+    return candidates
+
 def _user_key(user_id):
     """Generate a filesystem-safe key for tracking per-user state."""
     if not user_id:
@@ -175,58 +229,33 @@ def is_new_listing(link, user_id=None):
         logger.debug(f"URL normalization failed for {link}, treating as new")
         return True
     
-    user_key = _user_key(user_id)
+    user_seen = _user_seen(user_id)
     with _seen_listings_lock:
-        user_seen = seen_listings[user_key]
         last_seen = user_seen.get(normalized_link)
         if last_seen is None:
             return True
     return (datetime.now() - last_seen).total_seconds() > 86400
 
-def save_seen_listings(user_id=None, filename=None):
-    """Save seen listings to JSON."""
-    try:
-        user_key = _user_key(user_id)
-        if filename is None:
-            filename = (
-                f"{SITE_NAME}_{user_key}_seen.json" if user_key != "global" else f"{SITE_NAME}_seen.json"
-            )
-
+def _user_seen(user_id=None):
+    """Seen view for a user, opened from the shared seen store on first use."""
+    user_key = _user_key(user_id)
+    with _seen_listings_lock:
+        user_seen = seen_listings.get(user_key)
+    if user_seen is None:
+        user_seen = common_load_seen_listings(SITE_NAME, username=user_id)
         with _seen_listings_lock:
-            user_seen = seen_listings[user_key]
-            with open(filename, "w") as f:
-                json.dump({k: v.isoformat() for k, v in user_seen.items()}, f, indent=2)
-        logger.debug(f"Saved seen listings to {filename}")
-    except (OSError, PermissionError) as e:
-        logger.error(f"File system error saving seen listings: {e}")
-    except Exception as e:
-        logger.error(f"Failed to save seen listings: {e}")
+            user_seen = seen_listings.setdefault(user_key, user_seen)
+    return user_seen
+
+def save_seen_listings(user_id=None, filename=None):
+    """Save seen listings to the shared seen store."""
+    common_save_seen_listings(_user_seen(user_id), SITE_NAME, filename=filename, username=user_id)
 
 def load_seen_listings(user_id=None, filename=None):
-    """Load previously seen listings from JSON."""
-    user_key = _user_key(user_id)
-    try:
-        if filename is None:
-            filename = (
-                f"{SITE_NAME}_{user_key}_seen.json" if user_key != "global" else f"{SITE_NAME}_seen.json"
-            )
-        with open(filename, "r") as f:
-            data = json.load(f)
-        with _seen_listings_lock:
-            seen_listings[user_key] = {k: datetime.fromisoformat(v) for k, v in data.items()}
-        logger.debug(f"Loaded {len(seen_listings[user_key])} seen listings from {filename}")
-    except FileNotFoundError:
-        logger.info(f"Seen listings file not found: {filename}, starting fresh")
-        with _seen_listings_lock:
-            seen_listings[user_key] = {}
-    except (json.JSONDecodeError, ValueError) as e:
-        logger.error(f"Invalid JSON in seen listings file: {e}")
-        with _seen_listings_lock:
-            seen_listings[user_key] = {}
-    except Exception as e:
-        logger.error(f"Failed to load seen listings: {e}")
-        with _seen_listings_lock:
-            seen_listings[user_key] = {}
+    """Open seen listings from the shared seen store, importing a legacy JSON file once."""
+    user_seen = common_load_seen_listings(SITE_NAME, filename=filename, username=user_id)
+    with _seen_listings_lock:
+        seen_listings[_user_key(user_id)] = user_seen
 
 def validate_listing(title, link, price=None):
     """Validate listing data before saving."""
@@ -387,34 +416,18 @@ def check_facebook(driver, user_id=None, flag_key=None):
             human_delay(running_flags, flag_key, min_sec=3, max_sec=6)
             human_scroll(driver, running_flags, flag_key)
 
-            tree = html.fromstring(driver.page_source)
-            anchors = [a for a in tree.xpath("//a[@href]") if isinstance(a.get("href"), str)]
-
-            price_pattern = re.compile(r"\$\s?([\d,]+)")
+            candidates = _parse_listing_anchors(driver.page_source)
             keywords_lower = [k.lower() for k in keywords]
-            bad_img_patterns = {"icon", "logo", "placeholder", "blank"}
 
-            user_key = _user_key(user_id)
-            with _seen_listings_lock:
-                user_seen = seen_listings.setdefault(user_key, {})
+            user_seen = _user_seen(user_id)
 
             results = []
-            for a in anchors:
+            for candidate in candidates:
                 try:
-                    raw_href = a.get("href")
-                    link = resolve_listing_link(raw_href)
-                    title = (a.text_content() or "").strip()
-
-                    if not title or not link:
-                        continue
-
-                    price = None
-                    price_match = price_pattern.search(title)
-                    if price_match:
-                        try:
-                            price = int(price_match.group(1).replace(",", ""))
-                        except (ValueError, AttributeError):
-                            price = None
+                    raw_href = candidate["href"]
+                    link = candidate["link"]
+                    title = candidate["title"]
+                    price = candidate["price"]
 
                     if price is not None and (price < min_price or price > max_price):
                         continue
@@ -432,10 +445,12 @@ def check_facebook(driver, user_id=None, flag_key=None):
                     with _seen_listings_lock:
                         user_seen[normalized_link] = datetime.now()
 
-                    image_url = None
+                    # Images inside the anchor come straight from the parsed page;
+                    # only fall back to live driver lookups when it has none
+                    image_url = candidate["image"]
                     dom_href = raw_href.split("?", 1)[0].strip() if isinstance(raw_href, str) else None
                     try:
-                        if dom_href:
+                        if dom_href and not image_url:
                             xpath_value = _xpath_literal(dom_href)
                             parent_link = driver.find_element(By.XPATH, f"//a[@href={xpath_value}]")
                             images = parent_link.find_elements(By.TAG_NAME, "img")
@@ -443,7 +458,7 @@ def check_facebook(driver, user_id=None, flag_key=None):
                                 src = img.get_attribute("src")
                                 if src and src.startswith("https://"):
                                     src_lower = src.lower()
-                                    if not any(pattern in src_lower for pattern in bad_img_patterns):
+                                    if not any(pattern in src_lower for pattern in _BAD_IMAGE_PATTERNS):
                                         image_url = src
                                         break
 
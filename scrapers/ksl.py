@@ -4,7 +4,7 @@ import time
 import re
 from datetime import datetime
 import urllib.parse
-from lxml import html
+from lxml import etree
 from utils import debug_scraper_output, logger
 from db import save_listing
 from error_handling import ErrorHandler, log_errors, ScraperError, NetworkError
@@ -17,7 +17,8 @@ from scrapers.common import (
     log_parse_attempt, get_seen_listings_lock, extract_json_ld_items,
     reset_session, validate_response_structure, detect_block_type,
     is_zero_results_page, RequestStrategy, smart_scrape_request,
-    is_smart_request_available,
+    is_smart_request_available, response_unchanged, remember_response,
+    parse_html_fast,
 )
 from scrapers import anti_blocking
 from scrapers import health_monitor
@@ -96,11 +97,169 @@ def send_discord_message(title, link, price=None, image_url=None, user_id=None):
     except Exception as e:
         logger.error(f"⚠️ Failed to save listing for {link}: {e}")
 
+# ======================
+# PARSING
+# ======================
+# Precompiled XPath selectors, tried in order until one matches - updated for December 2024 KSL layout
+_POST_STRATEGIES = [
+    # Current KSL React-based selectors
+    (1, "listing class sections", etree.XPath('//section[contains(@class,"listing")]')),
+    (2, "listing-item divs", etree.XPath('//div[contains(@class,"listing-item") or contains(@class,"ListingItem")]')),
+    (3, "listing article elements", etree.XPath('//article[contains(@class,"listing") or contains(@class,"Listing")]')),
+    (4, "div.listing-card or card", etree.XPath('//div[contains(@class,"listing-card") or contains(@class,"ListingCard") or contains(@class,"Card")]')),
+    (5, "div.item-card", etree.XPath('//div[contains(@class,"item-card") or contains(@class,"ItemCard")]')),
+    (6, "article.item", etree.XPath('//article[contains(@class,"item") or contains(@class,"Item")]')),
+    # React data attributes
+    (7, "elements with data-testid", etree.XPath('//*[@data-testid and (contains(@data-testid,"listing") or contains(@data-testid,"item"))]')),
+    (8, "div with listing link", etree.XPath('//div[.//a[contains(@href,"/listing/") or contains(@href,"/item/")]]')),
+]
+_LISTING_LINKS_XPATH = etree.XPath('//a[contains(@href, "/item/") or contains(@href, "/listing/")]')
+_LINK_XPATHS = [etree.XPath(selector) for selector in (
+    ".//a[@class='listing-item-link']/@href",
+    ".//a[contains(@class,'listing')]/@href",
+    ".//a[contains(@href,'/item/')]/@href",
+    ".//a[contains(@href,'/listing/')]/@href",
+    ".//a/@href",
+    ".//h2/a/@href | .//h3/a/@href",
+)]
+_TITLE_XPATHS = [etree.XPath(selector) for selector in (
+    ".//h2/text()",
+    ".//h3/text()",
+    ".//div[contains(@class,'title')]//text()",
+    ".//a[@class='listing-item-link']/@title",
+    ".//a[contains(@class,'listing')]//text()",
+    ".//span[contains(@class,'title')]//text()",
+)]
+_PRICE_XPATHS = [etree.XPath(selector) for selector in (
+    ".//span[contains(@class,'price')]//text()",
+    ".//div[contains(@class,'price')]//text()",
+    ".//h3[contains(text(),'$')]//text()",
+    ".//*[contains(@class,'price')]//text()",
+    ".//*[contains(text(),'$')]/text()",
+)]
+_IMAGE_XPATHS = [etree.XPath(selector) for selector in (
+    ".//img[@data-src]/@data-src",
+    ".//img[@src]/@src",
+    ".//img[@data-lazy]/@data-lazy",
+    ".//img/@src",
+)]
+
+
+def _extract_from_listing_links(tree):
+    """Extract posts from listing links as fallback."""
+    link_elements = _LISTING_LINKS_XPATH(tree)
+    if not link_elements:
+        return []
+    posts_found = []
+    seen_links = set()
+    for link_elem in link_elements:
+        href = link_elem.get('href', '')
+        if href and href not in seen_links:
+            seen_links.add(href)
+            parent = link_elem.getparent()
+            if parent is not None and parent not in posts_found:
+                posts_found.append(parent)
+    return posts_found
+
+
+def _find_posts(tree):
+    """Return the result elements of a search page, trying each selector strategy in order."""
+    if not hasattr(tree, 'xpath'):
+        return []
+    strategies = _POST_STRATEGIES + [(9, "links with href containing /listing/", _extract_from_listing_links)]
+    for method_num, description, strategy in strategies:
+        log_parse_attempt(SITE_NAME, method_num, description)
+        try:
+            posts = strategy(tree)
+            if posts:
+                logger.debug(f"KSL: Found {len(posts)} posts using method {method_num} ({description})")
+                return posts
+        except Exception as e:
+            logger.debug(f"KSL: Method {method_num} failed: {e}")
+    return []
+
+
+def _first_match(post, selectors):
+    for selector in selectors:
+        try:
+            matches = selector(post)
+        except Exception:
+            continue
+        if matches:
+            return matches
+    return []
+
+
+def _post_listing(post):
+    """Extract ``{"title", "link", "price", "image"}`` from a result element, or None."""
+    if not hasattr(post, 'xpath'):
+        return None
+
+    # Enhanced link extraction with multiple fallbacks
+    link_elems = _first_match(post, _LINK_XPATHS)
+    link = link_elems[0] if link_elems else None
+    if not link:
+        return None
+    if not link.startswith("http"):
+        link = urllib.parse.urljoin(BASE_URL, link)
+
+    # Enhanced title extraction with multiple fallbacks
+    title = None
+    for selector in _TITLE_XPATHS:
+        try:
+            title_elems = selector(post)
+            if title_elems:
+                title = title_elems[0].strip() if isinstance(title_elems[0], str) else None
+                if title:
+                    break
+        except Exception:
+            continue
+    if not title:
+        return None
+
+    # Enhanced price extraction with multiple fallbacks
+    price_val = None
+    for selector in _PRICE_XPATHS:
+        try:
+            price_elems = selector(post)
+            if price_elems:
+                price_text = price_elems[0] if isinstance(price_elems[0], str) else str(price_elems[0])
+                try:
+                    price_val = int(price_text.replace("$", "").replace(",", "").strip())
+                    if price_val:
+                        break
+                except (ValueError, AttributeError):
+                    continue
+        except Exception:
+            continue
+
+    # Enhanced image extraction with multiple fallbacks
+    image_url = None
+    for selector in _IMAGE_XPATHS:
+        try:
+            img_elem = selector(post)
+            if img_elem:
+                image_url = img_elem[0]
+                if image_url.startswith("//"):
+                    image_url = f"https:{image_url}"
+                elif image_url and not image_url.startswith("http"):
+                    image_url = urllib.parse.urljoin(BASE_URL, image_url)
+                # Validate image URL
+                if image_url and validate_image_url(image_url):
+                    break
+                else:
+                    image_url = None
+        except Exception:
+            continue
+
+    return {"title": title, "link": link, "price": price_val, "image": image_url}
+
 # ======================
 # MAIN SCRAPER FUNCTION
 # ======================
-def check_ksl(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
-    settings = load_settings(username=user_id)
+def check_ksl(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None, settings=None, deliver=None):
+    settings = settings or load_settings(username=user_id)
+    deliver = deliver or send_discord_message
     keywords = settings["keywords"]
     min_price = settings["min_price"]
     max_price = settings["max_price"]
@@ -112,7 +271,9 @@ def check_ksl(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
     flag_key = flag_key or _flag_key(flag_name, user_id)
     user_key = _user_key(user_id)
     if user_seen is None:
-        user_seen = seen_listings.setdefault(user_key, {})
+        user_seen = seen_listings.get(user_key)
+        if user_seen is None:
+            user_seen = seen_listings.setdefault(user_key, load_seen_listings(SITE_NAME, username=user_id))
     
     # Use metrics tracking
     with ScraperMetrics(SITE_NAME) as metrics:
@@ -181,13 +342,17 @@ def check_ksl(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
             
             if strategy_used:
                 logger.debug(f"KSL: Request succeeded using strategy '{strategy_used}'")
+
+            if response_unchanged(response):
+                logger.info(f"KSL: Results page unchanged since last check. Next check in {check_interval}s...")
+                metrics.success = True
+                metrics.listings_found = 0
+                return []
             
             # Use robust HTML parsing with fallback
-            tree = None
-            try:
-                tree = html.fromstring(response.text)
-            except Exception as parse_error:
-                logger.warning(f"KSL: lxml parsing failed, trying BeautifulSoup: {parse_error}")
+            tree = parse_html_fast(response.content, site_name=SITE_NAME)
+            if tree is None:
+                logger.warning("KSL: lxml parsing failed, trying BeautifulSoup")
                 from bs4 import BeautifulSoup
                 soup = BeautifulSoup(response.text, 'html.parser')
                 try:
@@ -196,56 +361,13 @@ def check_ksl(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
                 except Exception:
                     tree = soup
             
-            # Helper function for extracting posts from listing links
-            def _extract_from_listing_links(tree):
-                """Extract posts from listing links as fallback."""
-                if not hasattr(tree, 'xpath'):
-                    return []
-                link_elements = tree.xpath('//a[contains(@href, "/item/") or contains(@href, "/listing/")]')
-                if not link_elements:
-                    return []
-                posts_found = []
-                seen_links = set()
-                for link_elem in link_elements:
-                    href = link_elem.get('href', '')
-                    if href and href not in seen_links:
-                        seen_links.add(href)
-                        parent = link_elem.getparent()
-                        if parent is not None and parent not in posts_found:
-                            posts_found.append(parent)
-                return posts_found
-            
-            # Try multiple XPath patterns for robustness - updated for December 2024 KSL layout
-            posts = []
-            parse_strategies = [
-                # Current KSL React-based selectors
-                (1, "listing class sections", lambda: tree.xpath('//section[contains(@class,"listing")]') if hasattr(tree, 'xpath') else []),
-                (2, "listing-item divs", lambda: tree.xpath('//div[contains(@class,"listing-item") or contains(@class,"ListingItem")]') if hasattr(tree, 'xpath') else []),
-                (3, "listing article elements", lambda: tree.xpath('//article[contains(@class,"listing") or contains(@class,"Listing")]') if hasattr(tree, 'xpath') else []),
-                (4, "div.listing-card or card", lambda: tree.xpath('//div[contains(@class,"listing-card") or contains(@class,"ListingCard") or contains(@class,"Card")]') if hasattr(tree, 'xpath') else []),
-                (5, "div.item-card", lambda: tree.xpath('//div[contains(@class,"item-card") or contains(@class,"ItemCard")]') if hasattr(tree, 'xpath') else []),
-                (6, "article.item", lambda: tree.xpath('//article[contains(@class,"item") or contains(@class,"Item")]') if hasattr(tree, 'xpath') else []),
-                # React data attributes
-                (7, "elements with data-testid", lambda: tree.xpath('//*[@data-testid and (contains(@data-testid,"listing") or contains(@data-testid,"item"))]') if hasattr(tree, 'xpath') else []),
-                (8, "div with listing link", lambda: tree.xpath('//div[.//a[contains(@href,"/listing/") or contains(@href,"/item/")]]') if hasattr(tree, 'xpath') else []),
-                (9, "links with href containing /listing/", lambda: _extract_from_listing_links(tree)),
-            ]
-            
-            for method_num, description, strategy in parse_strategies:
-                log_parse_attempt(SITE_NAME, method_num, description)
-                try:
-                    posts = strategy()
-                    if posts:
-                        logger.debug(f"KSL: Found {len(posts)} posts using method {method_num} ({description})")
-                        break
-                except Exception as e:
-                    logger.debug(f"KSL: Method {method_num} failed: {e}")
-                    continue
+            # Try multiple XPath patterns for robustness
+            posts = _find_posts(tree)
             
             json_ld_items = []
             if not posts:
                 log_parse_attempt(SITE_NAME, 8, "JSON-LD itemListElement fallback")
-                json_ld_items = extract_json_ld_items(response.text)
+                json_ld_items = extract_json_ld_items(response.content)
                 if not json_ld_items:
                     log_selector_failure(SITE_NAME, "json-ld", "itemListElement", "posts")
                     
@@ -267,6 +389,7 @@ def check_ksl(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
                         logger.info(f"KSL: No listings match criteria. Next check in {check_interval}s...")
                         metrics.success = True
                         metrics.listings_found = 0
+                        remember_response(response)
                         return []
 
                     logger.warning("KSL: No posts found with HTML or JSON-LD selectors")
@@ -282,79 +405,10 @@ def check_ksl(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
             
             for post in posts:
                 try:
-                    # Enhanced link extraction with multiple fallbacks
-                    link = None
-                    if hasattr(post, 'xpath'):
-                        link_selectors = [
-                            ".//a[@class='listing-item-link']/@href",
-                            ".//a[contains(@class,'listing')]/@href",
-                            ".//a[contains(@href,'/item/')]/@href",
-                            ".//a[contains(@href,'/listing/')]/@href",
-                            ".//a/@href",
-                            ".//h2/a/@href | .//h3/a/@href",
-                        ]
-                        for selector in link_selectors:
-                            try:
-                                link_elems = post.xpath(selector)
-                                if link_elems:
-                                    link = link_elems[0]
-                                    break
-                            except Exception:
-                                continue
-                    
-                    if not link:
-                        continue
-                    
-                    if not link.startswith("http"):
-                        link = urllib.parse.urljoin(BASE_URL, link)
-
-                    # Enhanced title extraction with multiple fallbacks
-                    title = None
-                    if hasattr(post, 'xpath'):
-                        title_selectors = [
-                            ".//h2/text()",
-                            ".//h3/text()",
-                            ".//div[contains(@class,'title')]//text()",
-                            ".//a[@class='listing-item-link']/@title",
-                            ".//a[contains(@class,'listing')]//text()",
-                            ".//span[contains(@class,'title')]//text()",
-                        ]
-                        for selector in title_selectors:
-                            try:
-                                title_elems = post.xpath(selector)
-                                if title_elems:
-                                    title = title_elems[0].strip() if isinstance(title_elems[0], str) else None
-                                    if title:
-                                        break
-                            except Exception:
-                                continue
-
-                    if not title:
+                    listing = _post_listing(post)
+                    if not listing:
                         continue
-
-                    # Enhanced price extraction with multiple fallbacks
-                    price_val = None
-                    if hasattr(post, 'xpath'):
-                        price_selectors = [
-                            ".//span[contains(@class,'price')]//text()",
-                            ".//div[contains(@class,'price')]//text()",
-                            ".//h3[contains(text(),'$')]//text()",
-                            ".//*[contains(@class,'price')]//text()",
-                            ".//*[contains(text(),'$')]/text()",
-                        ]
-                        for selector in price_selectors:
-                            try:
-                                price_elems = post.xpath(selector)
-                                if price_elems:
-                                    price_text = price_elems[0] if isinstance(price_elems[0], str) else str(price_elems[0])
-                                    try:
-                                        price_val = int(price_text.replace("$", "").replace(",", "").strip())
-                                        if price_val:
-                                            break
-                                    except (ValueError, AttributeError):
-                                        continue
-                            except Exception:
-                                continue
+                    title, link, price_val = listing["title"], listing["link"], listing["price"]
 
                     if price_val and (price_val < min_price or price_val > max_price):
                         continue
@@ -371,34 +425,8 @@ def check_ksl(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
                     with lock:
                         user_seen[normalized_link] = datetime.now()
 
-                    # Enhanced image extraction with multiple fallbacks
-                    image_url = None
-                    if hasattr(post, 'xpath'):
-                        img_selectors = [
-                            ".//img[@data-src]/@data-src",
-                            ".//img[@src]/@src",
-                            ".//img[@data-lazy]/@data-lazy",
-                            ".//img/@src",
-                        ]
-                        for selector in img_selectors:
-                            try:
-                                img_elem = post.xpath(selector)
-                                if img_elem:
-                                    image_url = img_elem[0]
-                                    if image_url.startswith("//"):
-                                        image_url = f"https:{image_url}"
-                                    elif image_url and not image_url.startswith("http"):
-                                        image_url = urllib.parse.urljoin(BASE_URL, image_url)
-                                    # Validate image URL
-                                    if image_url and validate_image_url(image_url):
-                                        break
-                                    else:
-                                        image_url = None
-                            except Exception:
-                                continue
-
-                    send_discord_message(title, link, price_val, image_url, user_id=user_id)
-                    results.append({"title": title, "link": link, "price": price_val, "image": image_url})
+                    deliver(title, link, price_val, listing["image"], user_id=user_id)
+                    results.append(listing)
                 except Exception as e:
                     logger.warning(f"Error parsing a KSL post: {e}")
 
@@ -445,7 +473,7 @@ def check_ksl(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
                             elif image_url.startswith("/"):
                                 image_url = urllib.parse.urljoin(BASE_URL, image_url)
 
-                        send_discord_message(title, link, price_val, image_url, user_id=user_id)
+                        deliver(title, link, price_val, image_url, user_id=user_id)
                         results.append({"title": title, "link": link, "price": price_val, "image": image_url})
                     except Exception as e:
                         logger.warning(f"Error parsing KSL JSON-LD listing: {e}")
@@ -459,6 +487,7 @@ def check_ksl(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
                 metrics.success = True
                 metrics.listings_found = 0
 
+            remember_response(response)
             debug_scraper_output("KSL", results)
             return results
 
@@ -39,6 +39,11 @@ from scrapers.common import (
     reset_session,
     smart_scrape_request,
     is_smart_request_available,
+    response_unchanged,
+    remember_response,
+    parse_html_fast,
+    compile_selectors,
+    xpath_class,
 )
 from scrapers.metrics import ScraperMetrics
 from scrapers import anti_blocking
@@ -68,6 +73,25 @@ MERCARI_FALLBACK_CHAIN = [
     RequestStrategy("fresh_mobile", use_mobile=True, fresh_session=True),
 ]
 
+# Structured data scanned straight from the response bytes by the fast path
+_JSON_LD_BYTES_RE = re.compile(
+    rb"<script[^>]+type=[\"']application/ld\+json[\"'][^>]*>(.*?)</script>", re.IGNORECASE | re.DOTALL
+)
+_NEXT_DATA_BYTES_RE = re.compile(
+    rb"<script[^>]+id=[\"']__NEXT_DATA__[\"'][^>]*>(.*?)</script>", re.IGNORECASE | re.DOTALL
+)
+
+# Precompiled selectors for the lxml fast path (strategies 1, 2 and 4 of _parse_html_results)
+_FAST_SELECTORS = compile_selectors({
+    "item_tiles": '//*[@data-testid="ItemTile" or @data-testid="item-tile"]',
+    "item_anchors": '//a[contains(@href, "/item/m")]',
+    "mer_item_tiles": f'//div[{xpath_class("merItemTile")}]',
+    "link": ".//a[@href]",
+    "title": ".//*[self::p or self::span or self::h2 or self::h3][normalize-space(text())]",
+    "price": ".//*[self::span or self::div or self::p][contains(text(), '$')]",
+    "image": ".//img",
+})
+
 # Cookie warmup endpoints - visit these to establish valid session
 WARMUP_URLS = [
     "https://www.mercari.com/",
@@ -94,6 +118,25 @@ def _warmup_session(session, username=None) -> bool:
         return False
 
 
+def _parse_api_items(data) -> List[Dict]:
+    """Convert a search API JSON payload into listing dicts."""
+    items = (
+        data.get("data", {}).get("search", {}).get("items", []) or
+        data.get("items", []) or
+        data.get("results", [])
+    )
+    return [
+        {
+            "title": item.get("name") or item.get("title"),
+            "link": f"{BASE_URL}/item/{item.get('id')}/" if item.get('id') else item.get("url"),
+            "price": _parse_price_value(item.get("price")),
+            "image": item.get("thumbnails", [{}])[0].get("url") if item.get("thumbnails") else item.get("image"),
+        }
+        for item in items
+        if isinstance(item, dict)
+    ]
+
+
 def _try_search_api(keywords: List[str], min_price: int, max_price: int, session, username=None) -> List[Dict]:
     """
     Try to fetch listings directly from Mercari's search API endpoints.
@@ -160,22 +203,7 @@ def _try_search_api(keywords: List[str], min_price: int, max_price: int, session
             
             if response.status_code == 200:
                 try:
-                    data = response.json()
-                    items = (
-                        data.get("data", {}).get("search", {}).get("items", []) or
-                        data.get("items", []) or
-                        data.get("results", [])
-                    )
-                    
-                    for item in items:
-                        if isinstance(item, dict):
-                            results.append({
-                                "title": item.get("name") or item.get("title"),
-                                "link": f"{BASE_URL}/item/{item.get('id')}/" if item.get('id') else item.get("url"),
-                                "price": _parse_price_value(item.get("price")),
-                                "image": item.get("thumbnails", [{}])[0].get("url") if item.get("thumbnails") else item.get("image"),
-                            })
-                    
+                    results = _parse_api_items(response.json())
                     if results:
                         logger.debug(f"Mercari: API endpoint returned {len(results)} items")
                         return results
@@ -333,6 +361,80 @@ def _parse_json_results(soup):
     return listings
 
 
+def _parse_json_results_fast(content):
+    """Gather listings from JSON-LD and __NEXT_DATA__ scanned out of the raw response bytes."""
+    listings = []
+    if not content:
+        return listings
+    scripts = _JSON_LD_BYTES_RE.findall(content) + _NEXT_DATA_BYTES_RE.findall(content)
+    for script in scripts:
+        try:
+            data = json.loads(script)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+        listings.extend(_extract_listings_from_json(data))
+    return listings
+
+
+def _coerce_lxml_listing(node):
+    """lxml counterpart of ``_coerce_html_listing`` used by the fast path."""
+    if node.tag == "a":
+        link_elem = node
+    else:
+        anchors = _FAST_SELECTORS["link"](node)
+        link_elem = anchors[0] if anchors else None
+    if link_elem is None or not link_elem.get("href"):
+        return None
+    link = urllib.parse.urljoin(BASE_URL, link_elem.get("href"))
+
+    title = (
+        link_elem.get("aria-label")
+        or link_elem.get("title")
+        or " ".join(link_elem.text_content().split())
+    )
+    if not title:
+        title_elems = _FAST_SELECTORS["title"](node)
+        title = " ".join(title_elems[0].text_content().split()) if title_elems else None
+
+    price_elems = _FAST_SELECTORS["price"](node)
+    price_val = _parse_price_value(price_elems[0].text_content()) if price_elems else None
+
+    image_url = None
+    img_elems = _FAST_SELECTORS["image"](node)
+    if img_elems:
+        img_elem = img_elems[0]
+        image_url = img_elem.get("src") or img_elem.get("data-src") or img_elem.get("data-original")
+        if image_url:
+            if image_url.startswith("//"):
+                image_url = f"https:{image_url}"
+            elif image_url.startswith("/"):
+                image_url = urllib.parse.urljoin(BASE_URL, image_url)
+
+    if title and link:
+        return {
+            "title": title,
+            "link": link,
+            "price": price_val,
+            "image": image_url,
+        }
+    return None
+
+
+def _parse_html_results_fast(tree):
+    """Gather listings from an lxml tree with the precompiled selectors."""
+    listings = []
+    seen_links = set()
+    for name in ("item_tiles", "item_anchors", "mer_item_tiles"):
+        for node in _FAST_SELECTORS[name](tree):
+            listing = _coerce_lxml_listing(node)
+            if listing and listing["link"] not in seen_links:
+                seen_links.add(listing["link"])
+                listings.append(listing)
+        if listings:
+            break
+    return listings
+
+
 def _coerce_html_listing(node):
     """Normalize BeautifulSoup nodes into listing dictionaries."""
     if node is None:
@@ -450,8 +552,9 @@ def send_discord_message(title, link, price=None, image_url=None, user_id=None):
         logger.error(f"⚠️ Failed to save Mercari listing for {link}: {exc}")
 
 
-def check_mercari(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None):
-    settings = load_settings(username=user_id)
+def check_mercari(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=None, settings=None, deliver=None):
+    settings = settings or load_settings(username=user_id)
+    deliver = deliver or send_discord_message
     keywords = settings["keywords"]
     min_price = settings["min_price"]
     max_price = settings["max_price"]
@@ -463,7 +566,9 @@ def check_mercari(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=No
     flag_key = flag_key or _flag_key(flag_name, user_id)
     user_key = _user_key(user_id)
     if user_seen is None:
-        user_seen = seen_listings.setdefault(user_key, {})
+        user_seen = seen_listings.get(user_key)
+        if user_seen is None:
+            user_seen = seen_listings.setdefault(user_key, load_seen_listings(SITE_NAME, username=user_id))
 
     with ScraperMetrics(SITE_NAME) as metrics:
         try:
@@ -535,7 +640,7 @@ def check_mercari(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=No
                     with lock:
                         user_seen[normalized_link] = datetime.now()
                     
-                    send_discord_message(title, link, price_val, item.get("image"), user_id=user_id)
+                    deliver(title, link, price_val, item.get("image"), user_id=user_id)
                     results.append(item)
                 
                 if results:
@@ -604,31 +709,42 @@ def check_mercari(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=No
             
             if strategy_used:
                 logger.debug(f"Mercari: Request succeeded using strategy '{strategy_used}'")
+
+            if response_unchanged(response):
+                logger.info(f"Mercari: Results page unchanged since last check. Next check in {check_interval}s...")
+                metrics.success = True
+                metrics.listings_found = 0
+                return []
             
-            # Use robust HTML parsing with fallback parsers
-            from scrapers.common import parse_html_with_fallback
-            try:
-                soup = parse_html_with_fallback(
-                    response.text,
-                    parser_order=('html.parser', 'lxml'),
-                    raw_bytes=response.content,
-                    site_name=SITE_NAME,
-                )
-            except Exception as parse_error:
-                logger.warning(f"Mercari: HTML parsing failed, trying BeautifulSoup fallback: {parse_error}")
-                soup = BeautifulSoup(response.text, 'html.parser')
+            # Fast path: structured JSON scanned from the raw bytes, tiles read with lxml
+            json_candidates = _parse_json_results_fast(response.content)
+            fast_tree = parse_html_fast(response.content, site_name=SITE_NAME)
+            html_candidates = _parse_html_results_fast(fast_tree) if fast_tree is not None else []
+
+            if not json_candidates and not html_candidates:
+                # Use robust HTML parsing with fallback parsers
+                from scrapers.common import parse_html_with_fallback
+                try:
+                    soup = parse_html_with_fallback(
+                        response.text,
+                        raw_bytes=response.content,
+                        site_name=SITE_NAME,
+                    )
+                except Exception as parse_error:
+                    logger.warning(f"Mercari: HTML parsing failed, trying BeautifulSoup fallback: {parse_error}")
+                    soup = BeautifulSoup(response.text, 'html.parser')
+                json_candidates = _parse_json_results(soup)
+                html_candidates = _parse_html_results(soup)
 
             listings_by_link = {}
 
             # Try JSON-LD extraction first (more reliable)
-            json_candidates = _parse_json_results(soup)
             for candidate in json_candidates:
                 if not candidate.get("link"):
                     continue
                 listings_by_link.setdefault(candidate["link"], candidate)
 
             # Fallback to HTML parsing
-            html_candidates = _parse_html_results(soup)
             for candidate in html_candidates:
                 if not candidate.get("link"):
                     continue
@@ -657,6 +773,7 @@ def check_mercari(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=No
                     logger.info(f"Mercari: No listings match criteria. Next check in {check_interval}s...")
                     metrics.success = True
                     metrics.listings_found = 0
+                    remember_response(response)
                     return []
                 
                 logger.warning("Mercari: No items found with HTML or JSON selectors")
@@ -706,7 +823,7 @@ def check_mercari(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=No
                         logger.debug(f"Mercari image rejected as placeholder: {image_url}")
                         image_url = None
 
-                send_discord_message(title, link, price_val, image_url, user_id=user_id)
+                deliver(title, link, price_val, image_url, user_id=user_id)
                 results.append({
                     "title": title,
                     "link": link,
@@ -723,6 +840,7 @@ def check_mercari(flag_name=SITE_NAME, user_id=None, user_seen=None, flag_key=No
                 metrics.success = True
                 metrics.listings_found = 0
 
+            remember_response(response)
             debug_scraper_output("Mercari", results)
             return results
 
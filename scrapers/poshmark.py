@@ -15,10 +15,13 @@ from scrapers.common import (
     make_request_with_cascade, reset_session, validate_response_structure,
     detect_block_type, is_zero_results_page, RequestStrategy,
     smart_scrape_request, is_smart_request_available,
+    response_unchanged, remember_response,
+    parse_html_fast, compile_selectors, xpath_class, first_text, first_attribute,
+    load_seen_listings as common_load_seen_listings,
+    save_seen_listings as common_save_seen_listings,
 )
 from scrapers import anti_blocking
 from scrapers import health_monitor
-from collections import defaultdict
 
 # Import new stealth infrastructure
 try:
@@ -64,7 +67,7 @@ def get_poshmark_flag_key(user_id=None, flag_name="poshmark"):
     return _flag_key(flag_name, user_id)
 
 
-seen_listings = defaultdict(dict)
+seen_listings = {}
 _seen_listings_lock = threading.Lock()  # Thread safety for seen_listings
 
 # ======================
@@ -102,7 +105,7 @@ def normalize_url(url):
         logger.debug(f"Error normalizing URL {url}: {e}")
         return url
 
-def is_new_listing(link, user_id=None):
+def is_new_listing(link, user_id=None, user_seen=None):
     """Return True if this listing is new or last seen more than 24h ago."""
     normalized_link = normalize_url(link)
     if not normalized_link:
@@ -111,55 +114,34 @@ def is_new_listing(link, user_id=None):
         logger.debug(f"URL normalization failed for {link}, treating as new")
         return True
     
+    if user_seen is None:
+        user_seen = _user_seen(user_id)
     with _seen_listings_lock:
-        user_key = _user_key(user_id)
-        user_seen = seen_listings[user_key]
         last_seen = user_seen.get(normalized_link)
         if last_seen is None:
             return True
     return (datetime.now() - last_seen).total_seconds() > 86400
 
-def save_seen_listings(user_id=None, filename="poshmark_seen.json"):
-    """Save seen listings with timestamps to JSON."""
-    try:
+def _user_seen(user_id=None):
+    """Seen view for a user, opened from the shared seen store on first use."""
+    user_key = _user_key(user_id)
+    with _seen_listings_lock:
+        user_seen = seen_listings.get(user_key)
+    if user_seen is None:
+        user_seen = common_load_seen_listings(SITE_NAME, username=user_id)
         with _seen_listings_lock:
-            user_key = _user_key(user_id)
-            if user_key != "global":
-                filename = f"poshmark_{user_key}_seen.json"
-            Path(filename).write_text(
-                json.dumps({k: v.isoformat() for k, v in seen_listings[user_key].items()}, indent=2),
-                encoding="utf-8"
-            )
-        logger.debug(f"Saved seen listings to {filename}")
-    except (OSError, PermissionError) as e:
-        logger.error(f"File system error saving seen listings: {e}")
-    except Exception as e:
-        logger.error(f"Error saving seen listings: {e}")
+            user_seen = seen_listings.setdefault(user_key, user_seen)
+    return user_seen
 
-def load_seen_listings(user_id=None, filename="poshmark_seen.json"):
-    """Load seen listings from JSON, if available."""
-    global seen_listings
-    try:
-        user_key = _user_key(user_id)
-        if user_key != "global":
-            filename = f"poshmark_{user_key}_seen.json"
-        text = Path(filename).read_text(encoding="utf-8")
-        data = json.loads(text) if text else {}
-        with _seen_listings_lock:
-            seen_listings[user_key] = {k: datetime.fromisoformat(v) for k, v in data.items()}
-        logger.debug(f"Loaded {len(seen_listings[user_key])} seen listings from {filename}")
-    except FileNotFoundError:
-        logger.info(f"Seen listings file not found: {filename}, starting fresh")
-        with _seen_listings_lock:
-            seen_listings[_user_key(user_id)] = {}
-    except (json.JSONDecodeError, ValueError) as e:
-        logger.error(f"Invalid JSON in seen listings file: {e}")
-        with _seen_listings_lock:
-            seen_listings[_user_key(user_id)] = {}
-    except Exception as e:
-        logger.error(f"Error loading seen listings: {e}")
-        with _seen_listings_lock:
-            seen_listings[_user_key(user_id)] = {}
+def save_seen_listings(user_id=None, filename=None):
+    """Save seen listings to the shared seen store."""
+    common_save_seen_listings(_user_seen(user_id), SITE_NAME, filename=filename, username=user_id)
+
+def load_seen_listings(user_id=None, filename=None):
+    """Open seen listings from the shared seen store, importing a legacy JSON file once."""
+    user_seen = common_load_seen_listings(SITE_NAME, filename=filename, username=user_id)
+    with _seen_listings_lock:
+        seen_listings[_user_key(user_id)] = user_seen
 
 def validate_listing(title, link, price=None):
     """Validate listing data before saving."""
@@ -212,11 +194,161 @@ def load_settings(user_id=None):
             "radius": 50
         }
 
+# ======================
+# PARSING
+# ======================
+# Precompiled selectors for the lxml fast path; the BeautifulSoup strategies
+# in check_poshmark remain the fallback for layouts these don't match
+_FAST_SELECTORS = compile_selectors({
+    "tiles": f"//div[{xpath_class('tile')}]",
+    "title_link": f".//a[{xpath_class('title')}]",
+    "title_div": f".//div[{xpath_class('title')}]",
+    "headings": "(.//h2 | .//h3 | .//h4)[1]",
+    "any_link": ".//a[@href]",
+    "title_span": ".//span[contains(translate(@class, 'TITLE', 'title'), 'title')]",
+    "link": ".//a/@href",
+    "price": (
+        f".//span[{xpath_class('price')}] | .//div[{xpath_class('price')}]"
+        " | .//span[contains(translate(@class, 'PRICE', 'price'), 'price')]"
+        " | .//div[contains(translate(@class, 'PRICE', 'price'), 'price')]"
+        " | .//*[contains(text(), '$')]"
+    ),
+    "image": ".//img",
+})
+
+
+def _absolute_link(link):
+    if link.startswith('/'):
+        return "https://poshmark.com" + link
+    if not link.startswith('http'):
+        return "https://poshmark.com/" + link.lstrip('/')
+    return link
+
+
+def _absolute_image_url(image_url):
+    if image_url and not image_url.startswith("http"):
+        if image_url.startswith('//'):
+            return 'https:' + image_url
+        if image_url.startswith('/'):
+            return "https://poshmark.com" + image_url
+    return image_url
+
+
+def _parse_price_text(price_text):
+    """Parse "$1,234" style text into an int, or None"""
+    try:
+        return int(float(price_text.replace('$', '').replace(',', '').strip()))
+    except (ValueError, AttributeError):
+        return None
+
+
+def _soup_item_listing(item):
+    """Extract a listing dict from a BeautifulSoup tile, or None when it has no title or link."""
+    # Enhanced title extraction with multiple fallbacks
+    title = None
+    title_selectors = [
+        item.find('a', class_='title'),
+        item.find('div', class_='title'),
+        item.find('h2'),
+        item.find('h3'),
+        item.find('h4'),
+        item.find('a', href=True),
+        item.find('span', class_=lambda x: x and 'title' in str(x).lower() if x else False),
+    ]
+    for title_elem in title_selectors:
+        if title_elem:
+            title_text = title_elem.get_text(strip=True) if hasattr(title_elem, 'get_text') else str(title_elem).strip()
+            if title_text:
+                title = title_text
+                break
+
+    if not title:
+        return None
+
+    # Enhanced link extraction with multiple fallbacks
+    link = None
+    link_selectors = [
+        item.find('a', href=True),
+        item.find('a', class_='title'),
+        item.find('a', class_='link'),
+    ]
+    for link_elem in link_selectors:
+        if link_elem:
+            link = link_elem.get('href')
+            if link:
+                break
+
+    if not link:
+        return None
+
+    # Enhanced price extraction with multiple fallbacks
+    price_val = None
+    price_selectors = [
+        item.find('span', class_='price'),
+        item.find('div', class_='price'),
+        item.find('span', class_=lambda x: x and 'price' in str(x).lower() if x else False),
+        item.find('div', class_=lambda x: x and 'price' in str(x).lower() if x else False),
+        item.find('*', string=lambda x: x and '$' in str(x) if x else False),
+    ]
+    for price_elem in price_selectors:
+        if price_elem:
+            price_text = price_elem.get_text(strip=True) if hasattr(price_elem, 'get_text') else str(price_elem).strip()
+            price_val = _parse_price_text(price_text) if price_text else None
+            if price_val:
+                break
+
+    image_url = None
+    img_elem = item.find('img')
+    if img_elem:
+        image_url = _absolute_image_url(img_elem.get('src') or img_elem.get('data-src'))
+
+    return {"title": title, "link": _absolute_link(link), "price": price_val, "image": image_url}
+
+
+def _parse_listings_fast(content):
+    """
+    Extract listings from a results page with lxml and the precompiled selectors.
+
+    Returns an empty list when no tiles match, so the caller falls back to
+    the BeautifulSoup strategies.
+    """
+    tree = parse_html_fast(content, site_name=SITE_NAME)
+    if tree is None:
+        return []
+    return _extract_listings_fast(tree)
+
+
+def _extract_listings_fast(tree):
+    """Read listing tiles from an lxml tree."""
+    listings = []
+    for tile in _FAST_SELECTORS["tiles"](tree):
+        title = first_text(
+            tile, _FAST_SELECTORS["title_link"], _FAST_SELECTORS["title_div"], _FAST_SELECTORS["headings"],
+            _FAST_SELECTORS["any_link"], _FAST_SELECTORS["title_span"],
+        )
+        link = first_attribute(tile, _FAST_SELECTORS["link"])
+        if not title or not link:
+            continue
+
+        price_val = None
+        for price_elem in _FAST_SELECTORS["price"](tile):
+            price_val = _parse_price_text(price_elem.text_content())
+            if price_val:
+                break
+
+        images = _FAST_SELECTORS["image"](tile)
+        image_url = _absolute_image_url(images[0].get('src') or images[0].get('data-src')) if images else None
+
+        listings.append({"title": title, "link": _absolute_link(link), "price": price_val, "image": image_url})
+    return listings
+
+
 # ======================
 # MAIN SCRAPER FUNCTION
 # ======================
-def check_poshmark(flag_name="poshmark", user_id=None, flag_key=None):
-    settings = load_settings(user_id=user_id)
+def check_poshmark(flag_name="poshmark", user_id=None, user_seen=None, flag_key=None, settings=None, deliver=None):
+    settings = settings or load_settings(user_id=user_id)
+    deliver = deliver or send_discord_message
     keywords = settings["keywords"]
     min_price = settings["min_price"]
     max_price = settings["max_price"]
@@ -238,6 +370,7 @@ def check_poshmark(flag_name="poshmark", user_id=None, flag_key=None):
     else:
         logger.warning(f"Could not geocode location '{location}', using default")
     
+    fast_listings = []
     for attempt in range(max_retries):
         try:
             # Build Poshmark search URL
@@ -298,6 +431,10 @@ def check_poshmark(flag_name="poshmark", user_id=None, flag_key=None):
             if strategy_used:
                 logger.debug(f"Poshmark: Request succeeded using strategy '{strategy_used}'")
 
+            if response_unchanged(response):
+                logger.info(f"Poshmark: Results page unchanged since last check. Next check in {check_interval}s...")
+                return []
+
             encoding_candidates = []
             if response.encoding:
                 encoding_candidates.append(response.encoding)
@@ -323,108 +460,61 @@ def check_poshmark(flag_name="poshmark", user_id=None, flag_key=None):
 
     # Process the results if we successfully got the page
     try:
-        # Enhanced item extraction with multiple selector strategies
-        # Updated for December 2024 Poshmark layout
-        items = []
-        parse_strategies = [
-            # Current Poshmark selectors
-            (1, "div.tile class", lambda: soup.find_all('div', class_='tile')),
-            (2, "div.card patterns", lambda: soup.find_all('div', attrs={'class': lambda x: x and ('card' in str(x).lower() or 'Card' in str(x)) if x else False})),
-            (3, "data-test tile", lambda: soup.select('[data-test="tile"], [data-test="listing"]')),
-            (4, "article.tile", lambda: soup.find_all('article', class_='tile')),
-            # Listing patterns
-            (5, "div.listing pattern", lambda: soup.find_all('div', attrs={'class': lambda x: x and 'listing' in str(x).lower() if x else False})),
-            (6, "div.item pattern", lambda: soup.find_all('div', attrs={'class': lambda x: x and 'item' in str(x).lower() if x else False})),
-            # Product grid items
-            (7, "div.product-card", lambda: soup.find_all('div', attrs={'class': lambda x: x and 'product' in str(x).lower() if x else False})),
-            # Links with listing paths
-            (8, "links with /listing/ in href", lambda: soup.find_all('a', href=lambda x: x and '/listing/' in str(x) if x else False)),
-            (9, "links with /closet/ in href", lambda: soup.find_all('a', href=lambda x: x and '/closet/' in str(x) if x else False)),
-            (10, "div.tile-container", lambda: soup.find_all('div', attrs={'class': lambda x: x and 'tile' in str(x).lower() if x else False})),
-        ]
+        if fast_listings:
+            logger.debug(f"Poshmark: lxml fast path found {len(fast_listings)} items")
+            listings = fast_listings
+        else:
+            # Enhanced item extraction with multiple selector strategies
+            # Updated for December 2024 Poshmark layout
+            items = []
+            parse_strategies = [
+                # Current Poshmark selectors
+                (1, "div.tile class", lambda: soup.find_all('div', class_='tile')),
+                (2, "div.card patterns", lambda: soup.find_all('div', attrs={'class': lambda x: x and ('card' in str(x).lower() or 'Card' in str(x)) if x else False})),
+                (3, "data-test tile", lambda: soup.select('[data-test="tile"], [data-test="listing"]')),
+                (4, "article.tile", lambda: soup.find_all('article', class_='tile')),
+                # Listing patterns
+                (5, "div.listing pattern", lambda: soup.find_all('div', attrs={'class': lambda x: x and 'listing' in str(x).lower() if x else False})),
+                (6, "div.item pattern", lambda: soup.find_all('div', attrs={'class': lambda x: x and 'item' in str(x).lower() if x else False})),
+                # Product grid items
+                (7, "div.product-card", lambda: soup.find_all('div', attrs={'class': lambda x: x and 'product' in str(x).lower() if x else False})),
+                # Links with listing paths
+                (8, "links with /listing/ in href", lambda: soup.find_all('a', href=lambda x: x and '/listing/' in str(x) if x else False)),
+                (9, "links with /closet/ in href", lambda: soup.find_all('a', href=lambda x: x and '/closet/' in str(x) if x else False)),
+                (10, "div.tile-container", lambda: soup.find_all('div', attrs={'class': lambda x: x and 'tile' in str(x).lower() if x else False})),
+            ]
         
-        for method_num, description, strategy in parse_strategies:
-            try:
-                items = strategy()
-                if items:
-                    logger.debug(f"Poshmark: Found {len(items)} items using method {method_num} ({description})")
-                    break
-            except Exception as e:
-                logger.debug(f"Poshmark: Method {method_num} failed: {e}")
-                continue
+            for method_num, description, strategy in parse_strategies:
+                try:
+                    items = strategy()
+                    if items:
+                        logger.debug(f"Poshmark: Found {len(items)} items using method {method_num} ({description})")
+                        break
+                except Exception as e:
+                    logger.debug(f"Poshmark: Method {method_num} failed: {e}")
+                    continue
         
-        logger.debug(f"Found {len(items)} Poshmark items to process")
+            logger.debug(f"Found {len(items)} Poshmark items to process")
+            listings = []
+            for item in items:
+                try:
+                    listing = _soup_item_listing(item)
+                except Exception as e:
+                    logger.warning(f"Error parsing a Poshmark listing: {e}")
+                    continue
+                if listing:
+                    listings.append(listing)
         
         # Pre-compile keywords for faster matching
         keywords_lower = [k.lower() for k in keywords]
-        user_key = _user_key(user_id)
+        if user_seen is None:
+            user_seen = _user_seen(user_id)
         
-        for item in items:
+        for listing in listings:
             try:
-                # Enhanced title extraction with multiple fallbacks
-                title = None
-                title_selectors = [
-                    item.find('a', class_='title'),
-                    item.find('div', class_='title'),
-                    item.find('h2'),
-                    item.find('h3'),
-                    item.find('h4'),
-                    item.find('a', href=True),
-                    item.find('span', class_=lambda x: x and 'title' in str(x).lower() if x else False),
-                ]
-                for title_elem in title_selectors:
-                    if title_elem:
-                        title_text = title_elem.get_text(strip=True) if hasattr(title_elem, 'get_text') else str(title_elem).strip()
-                        if title_text:
-                            title = title_text
-                            break
-                
-                if not title:
-                    continue
-                
-                # Enhanced link extraction with multiple fallbacks
-                link = None
-                link_selectors = [
-                    item.find('a', href=True),
-                    item.find('a', class_='title'),
-                    item.find('a', class_='link'),
-                ]
-                for link_elem in link_selectors:
-                    if link_elem:
-                        link = link_elem.get('href')
-                        if link:
-                            break
-                
-                if not link:
-                    continue
-                
-                # Make sure link is absolute (fast path check)
-                if link.startswith('/'):
-                    link = "https://poshmark.com" + link
-                elif not link.startswith('http'):
-                    link = "https://poshmark.com/" + link.lstrip('/')
-                
-                # Enhanced price extraction with multiple fallbacks
-                price_val = None
-                price_selectors = [
-                    item.find('span', class_='price'),
-                    item.find('div', class_='price'),
-                    item.find('span', class_=lambda x: x and 'price' in str(x).lower() if x else False),
-                    item.find('div', class_=lambda x: x and 'price' in str(x).lower() if x else False),
-                    item.find('*', string=lambda x: x and '$' in str(x) if x else False),
-                ]
-                for price_elem in price_selectors:
-                    if price_elem:
-                        price_text = price_elem.get_text(strip=True) if hasattr(price_elem, 'get_text') else str(price_elem).strip()
-                        if price_text:
-                            try:
-                                # Handle price formats efficiently
-                                price_clean = price_text.replace('$', '').replace(',', '').strip()
-                                price_val = int(float(price_clean))
-                                if price_val:
-                                    break
-                            except (ValueError, AttributeError):
-                                continue
+                title = listing["title"]
+                link = listing["link"]
+                price_val = listing["price"]
                 
                 # Early exit if price out of range
                 if price_val and (price_val < min_price or price_val > max_price):
@@ -436,38 +526,26 @@ def check_poshmark(flag_name="poshmark", user_id=None, flag_key=None):
                     continue
                 
                 # Check if new listing
-                if not is_new_listing(link, user_id=user_id):
+                if not is_new_listing(link, user_seen=user_seen):
                     continue
                 
                 # Update seen listings for this user
                 normalized_link = normalize_url(link)
                 with _seen_listings_lock:
-                    seen_listings[user_key][normalized_link] = datetime.now()
-                
-                # Extract image URL
-                image_url = None
-                img_elem = item.find('img')
-                if img_elem:
-                    image_url = img_elem.get('src') or img_elem.get('data-src')
-                    # Make sure it's a full URL (fast path checks)
-                    if image_url:
-                        if not image_url.startswith("http"):
-                            if image_url.startswith('//'):
-                                image_url = 'https:' + image_url
-                            elif image_url.startswith('/'):
-                                image_url = "https://poshmark.com" + image_url
+                    user_seen[normalized_link] = datetime.now()
                 
-                send_discord_message(title, link, price_val, image_url, user_id=user_id)
-                results.append({"title": title, "link": link, "price": price_val, "image": image_url})
+                deliver(title, link, price_val, listing["image"], user_id=user_id)
+                results.append(listing)
             except Exception as e:
                 logger.warning(f"Error parsing a Poshmark listing: {e}")
                 continue
 
         if results:
-            save_seen_listings(user_id=user_id)
+            common_save_seen_listings(user_seen, SITE_NAME, username=user_id)
         else:
             logger.info(f"No new Poshmark listings. Next check in {check_interval}s...")
 
+        remember_response(response)
         debug_scraper_output("Poshmark", results)
         return results
 
@@ -0,0 +1,414 @@
+"""Compact, append-only store for seen listing URLs.
+
+Seen listings used to live in one pretty-printed ``{url: isoformat}`` JSON
+file per site and user that was rewritten in full on every save and parsed
+timestamp by timestamp on every start. This module keeps them in a single
+SQLite table instead:
+
+* URLs are stored as 8-byte hashes (``url_key``) with epoch-second
+  timestamps, keyed by ``(site, scope, url_hash)`` in a ``WITHOUT ROWID``
+  table, so a row is a few dozen bytes;
+* opening a user's view (``SeenListings``) reads nothing up front and
+  ``is_new_listing`` is a primary-key lookup;
+* saving only upserts the URLs marked since the last save;
+* rows older than ``SEEN_TTL_SECONDS`` are compacted away periodically;
+* a per-site ``url_filter.SiteUrlFilter`` shared by all users answers
+  "nobody has seen this URL" without touching the table.
+
+Legacy JSON files are imported once, the first time their view is opened,
+and renamed to ``*.migrated``.
+
+The backend is pluggable: ``SEEN_STORE_BACKEND=memory`` keeps everything in
+process (tests, throwaway runs); any object implementing the
+``MemorySeenBackend`` methods can be installed with ``set_seen_backend``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from scrapers.url_filter import SiteUrlFilter
+from utils import logger
+
+# ======================
+# CONFIGURATION
+# ======================
+SEEN_STORE_BACKEND = os.getenv("SEEN_STORE_BACKEND", "sqlite").lower()
+SEEN_STORE_PATH = os.getenv("SEEN_STORE_PATH", "seen_listings.db")
+# is_new_listing treats anything older than a day as new again, so older
+# rows only matter as a safety margin
+SEEN_TTL_SECONDS = int(os.getenv("SEEN_TTL_SECONDS", str(7 * 86400)))
+COMPACT_INTERVAL_SECONDS = 3600
+
+
+def url_key(url: str) -> int:
+    """8-byte hash of a (normalized) URL, as a signed 64-bit SQLite INTEGER."""
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _to_epoch(value) -> int:
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+# ======================
+# BACKENDS
+# ======================
+class MemorySeenBackend:
+    """In-process backend; also documents the interface every backend implements."""
+
+    def __init__(self):
+        self._data: Dict[Tuple[str, str], Dict[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, site: str, scope: str, key: int) -> Optional[int]:
+        return self._data.get((site, scope), {}).get(key)
+
+    def put_many(self, site: str, scope: str, items: Iterable[Tuple[int, int]]) -> None:
+        with self._lock:
+            self._data.setdefault((site, scope), {}).update(items)
+
+    def delete(self, site: str, scope: str, key: int) -> None:
+        with self._lock:
+            self._data.get((site, scope), {}).pop(key, None)
+
+    def keys(self, site: str, scope: str) -> Iterator[int]:
+        return iter(list(self._data.get((site, scope), {})))
+
+    def count(self, site: str, scope: str) -> int:
+        return len(self._data.get((site, scope), {}))
+
+    def site_keys(self, site: str) -> Iterator[int]:
+        keys = set()
+        for (entry_site, _), entries in list(self._data.items()):
+            if entry_site == site:
+                keys.update(entries)
+        return iter(keys)
+
+    def site_contains(self, site: str, key: int) -> bool:
+        return any(key in entries for (entry_site, _), entries in list(self._data.items()) if entry_site == site)
+
+    def compact(self, cutoff: int) -> int:
+        removed = 0
+        with self._lock:
+            for entries in self._data.values():
+                stale = [key for key, seen_at in entries.items() if seen_at < cutoff]
+                for key in stale:
+                    del entries[key]
+                removed += len(stale)
+        return removed
+
+
+class SqliteSeenBackend:
+    """SQLite backend: one WITHOUT ROWID table shared by all sites and users."""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS seen_listings (
+            site TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            url_hash INTEGER NOT NULL,
+            seen_at INTEGER NOT NULL,
+            PRIMARY KEY (site, scope, url_hash)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(self, path: str = SEEN_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._conn().execute(self._SCHEMA)
+        self._conn().execute("CREATE INDEX IF NOT EXISTS idx_seen_listings_seen_at ON seen_listings(seen_at)")
+        self._conn().execute("CREATE INDEX IF NOT EXISTS idx_seen_listings_site_hash ON seen_listings(site, url_hash)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, site: str, scope: str, key: int) -> Optional[int]:
+        row = self._conn().execute(
+            "SELECT seen_at FROM seen_listings WHERE site = ? AND scope = ? AND url_hash = ?",
+            (site, scope, key),
+        ).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, site: str, scope: str, items: Iterable[Tuple[int, int]]) -> None:
+        rows = [(site, scope, key, seen_at) for key, seen_at in items]
+        if not rows:
+            return
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO seen_listings (site, scope, url_hash, seen_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(site, scope, url_hash) DO UPDATE SET seen_at = excluded.seen_at",
+                    rows,
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, site: str, scope: str, key: int) -> None:
+        with self._write_lock:
+            self._conn().execute(
+                "DELETE FROM seen_listings WHERE site = ? AND scope = ? AND url_hash = ?",
+                (site, scope, key),
+            )
+
+    def keys(self, site: str, scope: str) -> Iterator[int]:
+        cursor = self._conn().execute(
+            "SELECT url_hash FROM seen_listings WHERE site = ? AND scope = ?", (site, scope)
+        )
+        return (row[0] for row in cursor)
+
+    def count(self, site: str, scope: str) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM seen_listings WHERE site = ? AND scope = ?", (site, scope)
+        ).fetchone()[0]
+
+    def site_keys(self, site: str) -> Iterator[int]:
+        cursor = self._conn().execute("SELECT url_hash FROM seen_listings WHERE site = ?", (site,))
+        return (row[0] for row in cursor)
+
+    def site_contains(self, site: str, key: int) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM seen_listings WHERE site = ? AND url_hash = ? LIMIT 1", (site, key)
+        ).fetchone()
+        return row is not None
+
+    def compact(self, cutoff: int) -> int:
+        with self._write_lock:
+            cursor = self._conn().execute("DELETE FROM seen_listings WHERE seen_at < ?", (cutoff,))
+            return cursor.rowcount
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ======================
+# PER-USER VIEW
+# ======================
+class SeenListings(MutableMapping):
+    """
+    Dict-compatible view of one site's seen URLs for one user.
+
+    ``view[url] = datetime.now()`` marks a URL (buffered until ``flush``),
+    ``view.get(url)`` returns the last-seen ``datetime``; ``last_seen_epoch``
+    avoids building ``datetime`` objects on the hot path. Iteration yields URL
+    hashes, since URLs themselves are not stored.
+    """
+
+    def __init__(self, backend, site: str, scope: str, url_filter: Optional[SiteUrlFilter] = None):
+        self.backend = backend
+        self.site = site
+        self.scope = scope
+        self.url_filter = url_filter
+        self._pending: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def last_seen_epoch(self, url: str) -> Optional[int]:
+        key = url_key(url)
+        seen_at = self._pending.get(key)
+        if seen_at is not None:
+            return seen_at
+        if self.url_filter is None:
+            return self.backend.get(self.site, self.scope, key)
+        if not self.url_filter.might_contain(key):
+            # No user has seen this URL; skip the exact lookup
+            return None
+        seen_at = self.backend.get(self.site, self.scope, key)
+        if seen_at is None and self.url_filter.record_unconfirmed_hit():
+            self.url_filter.record_hit_outcome(self.backend.site_contains(self.site, key))
+        return seen_at
+
+    def mark(self, url: str, seen_at=None) -> None:
+        key = url_key(url)
+        with self._lock:
+            self._pending[key] = _to_epoch(seen_at) if seen_at is not None else int(time.time())
+        if self.url_filter is not None:
+            self.url_filter.add(key)
+
+    def flush(self) -> int:
+        """Write URLs marked since the last flush; returns how many were written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            try:
+                self.backend.put_many(self.site, self.scope, pending.items())
+            except Exception:
+                with self._lock:
+                    for key, seen_at in pending.items():
+                        self._pending.setdefault(key, seen_at)
+                raise
+        return len(pending)
+
+    def __getitem__(self, url: str) -> datetime:
+        seen_at = self.last_seen_epoch(url)
+        if seen_at is None:
+            raise KeyError(url)
+        return datetime.fromtimestamp(seen_at)
+
+    def __setitem__(self, url: str, value) -> None:
+        self.mark(url, value)
+
+    def __delitem__(self, url: str) -> None:
+        key = url_key(url)
+        with self._lock:
+            self._pending.pop(key, None)
+        self.backend.delete(self.site, self.scope, key)
+
+    def __contains__(self, url) -> bool:
+        return isinstance(url, str) and self.last_seen_epoch(url) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        self.flush()
+        return self.backend.keys(self.site, self.scope)
+
+    def __len__(self) -> int:
+        self.flush()
+        return self.backend.count(self.site, self.scope)
+
+    def __repr__(self) -> str:
+        return f"SeenListings(site={self.site!r}, scope={self.scope!r}, pending={len(self._pending)})"
+
+
+# ======================
+# STORE ACCESS
+# ======================
+_backend = None
+_backend_lock = threading.Lock()
+_last_compaction = 0.0
+_url_filters: Dict[str, SiteUrlFilter] = {}
+_url_filters_lock = threading.Lock()
+
+
+def get_seen_backend():
+    """Get the process-wide seen-store backend."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if SEEN_STORE_BACKEND == "memory":
+                    _backend = MemorySeenBackend()
+                else:
+                    _backend = SqliteSeenBackend(SEEN_STORE_PATH)
+    return _backend
+
+
+def set_seen_backend(backend) -> None:
+    """Install a backend (e.g. a ``MemorySeenBackend`` in tests)."""
+    global _backend, _last_compaction
+    with _backend_lock:
+        _backend = backend
+        _last_compaction = 0.0
+    with _url_filters_lock:
+        _url_filters.clear()
+
+
+def get_url_filter(site: str) -> SiteUrlFilter:
+    """Get the cross-user URL filter for a site, seeded from the store on first use."""
+    url_filter = _url_filters.get(site)
+    if url_filter is None:
+        with _url_filters_lock:
+            url_filter = _url_filters.get(site)
+            if url_filter is None:
+                url_filter = SiteUrlFilter(site)
+                url_filter.add_many(get_seen_backend().site_keys(site))
+                _url_filters[site] = url_filter
+                logger.debug(f"Seeded {site} URL filter with {url_filter.bloom.count} URLs")
+    return url_filter
+
+
+def get_url_filter_stats(site: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Hit/miss and false-positive stats of the URL filters built so far."""
+    with _url_filters_lock:
+        filters = dict(_url_filters)
+    return {name: f.get_stats() for name, f in filters.items() if site is None or name == site}
+
+
+def compact_seen_listings(ttl_seconds: int = SEEN_TTL_SECONDS) -> int:
+    """Drop seen rows older than the TTL; returns how many were removed."""
+    global _last_compaction
+    _last_compaction = time.time()
+    removed = get_seen_backend().compact(int(_last_compaction) - ttl_seconds)
+    if removed:
+        logger.debug(f"Compacted {removed} expired seen listings")
+    return removed
+
+
+def _migrate_legacy_file(view: SeenListings, legacy_path: Path) -> None:
+    """Import a legacy ``{url: isoformat}`` JSON file into the store once."""
+    try:
+        text = legacy_path.read_text(encoding="utf-8")
+        data = json.loads(text) if text else {}
+        cutoff = time.time() - SEEN_TTL_SECONDS
+        rows = []
+        for url, stamp in data.items():
+            seen_at = datetime.fromisoformat(stamp).timestamp()
+            if seen_at >= cutoff:
+                rows.append((url_key(url), int(seen_at)))
+        view.backend.put_many(view.site, view.scope, rows)
+        if view.url_filter is not None:
+            view.url_filter.add_many(key for key, _ in rows)
+        legacy_path.rename(legacy_path.with_name(legacy_path.name + ".migrated"))
+        logger.info(f"Migrated {len(rows)} seen listings from {legacy_path}")
+    except (json.JSONDecodeError, ValueError, AttributeError) as e:
+        logger.error(f"Invalid legacy seen listings file {legacy_path}: {e}")
+    except Exception as e:
+        logger.error(f"Error migrating seen listings from {legacy_path}: {e}")
+
+
+def open_seen_listings(site: str, scope: str, legacy_file: Optional[str] = None) -> SeenListings:
+    """
+    Open the seen-listings view for one site and user scope.
+
+    Args:
+        site: Scraper site identifier
+        scope: User scope (sanitized username or ``"global"``)
+        legacy_file: JSON file written by the old store, imported if present
+    """
+    view = SeenListings(get_seen_backend(), site, scope, url_filter=get_url_filter(site))
+    if legacy_file:
+        legacy_path = Path(legacy_file)
+        if legacy_path.exists():
+            _migrate_legacy_file(view, legacy_path)
+    if time.time() - _last_compaction >= COMPACT_INTERVAL_SECONDS:
+        try:
+            compact_seen_listings()
+        except Exception as e:
+            logger.error(f"Error compacting seen listings: {e}")
+    return view
+
+
+__all__ = [
+    "MemorySeenBackend",
+    "SeenListings",
+    "SqliteSeenBackend",
+    "compact_seen_listings",
+    "get_seen_backend",
+    "get_url_filter",
+    "get_url_filter_stats",
+    "open_seen_listings",
+    "set_seen_backend",
+    "url_key",
+]
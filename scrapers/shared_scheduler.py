@@ -0,0 +1,473 @@
+"""Shared per-site scrape scheduling.
+
+Rather than running one polling loop per (user, site), every subscribed
+user's ``load_settings()`` is grouped by the query that is actually sent to
+the marketplace: (site, location, radius, keywords). Each distinct query is
+fetched once per interval and the parsed listings are fanned out to every
+user in the group, applying that user's own price bounds and seen-listings
+state. Outbound request volume therefore grows with the number of distinct
+queries instead of the number of users.
+
+Each site's dispatcher is a coroutine on the shared async engine
+(``scrapers.async_engine``); fetches run on its worker pool behind the
+site's concurrency limit.
+
+Usage:
+    from scrapers.shared_scheduler import SharedScrapeScheduler
+
+    scheduler = SharedScrapeScheduler(
+        "craigslist", check_craigslist, send_discord_message, running_flags,
+    )
+    scheduler.subscribe("alice")
+    ...
+    scheduler.unsubscribe("alice")
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils import logger
+from scrapers.async_engine import get_engine
+from scrapers.common import (
+    get_seen_listings_lock,
+    is_new_listing,
+    load_seen_listings,
+    load_settings,
+    normalize_url,
+    save_seen_listings,
+    validate_image_url,
+    validate_listing,
+)
+
+# ======================
+# CONFIGURATION
+# ======================
+SETTINGS_REFRESH_SECONDS = 30   # How often subscriber settings are re-read
+DISPATCH_TICK_SECONDS = 0.5     # Dispatcher wake-up granularity
+DEFAULT_ERROR_COOLDOWN = 60     # Used when no error callback supplies one
+
+QueryKey = Tuple[str, str, int, Tuple[str, ...]]
+
+
+def build_query_key(site_name: str, settings: Dict[str, Any]) -> QueryKey:
+    """
+    Build the dedup key for a user's settings.
+
+    Price bounds and interval are deliberately excluded: the shared fetch uses
+    the widest price range and shortest interval of the group, and each user's
+    own bounds are applied during fan-out.
+
+    Args:
+        site_name: Scraper site identifier
+        settings: Settings dict as returned by ``load_settings``
+
+    Returns:
+        Hashable query key
+    """
+    location = str(settings.get("location") or "").strip().lower()
+    radius = int(settings.get("radius") or 0)
+    keywords = tuple(sorted({k.strip().lower() for k in settings.get("keywords", []) if k.strip()}))
+    return (site_name, location, radius, keywords)
+
+
+def _query_token(key: QueryKey) -> str:
+    """Stable, filesystem-safe identifier used as the shared fetch's "user"."""
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:12]
+    return f"shared-{digest}"
+
+
+@dataclass
+class QueryGroup:
+    """A distinct upstream query and the users subscribed to it."""
+
+    key: QueryKey
+    token: str
+    members: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    next_run: float = 0.0
+    in_flight: bool = False
+    fetch_count: int = 0
+    last_run: Optional[float] = None
+
+    def merged_settings(self) -> Dict[str, Any]:
+        """Settings for the single shared fetch covering every member."""
+        member_settings = list(self.members.values())
+        first = member_settings[0]
+        return {
+            "keywords": list(first["keywords"]),
+            "min_price": min(s["min_price"] for s in member_settings),
+            "max_price": max(s["max_price"] for s in member_settings),
+            "interval": min(s["interval"] for s in member_settings),
+            "location": first.get("location"),
+            "radius": first.get("radius"),
+        }
+
+
+class SharedScrapeScheduler:
+    """Fetch each distinct query once and fan results out to its subscribers."""
+
+    def __init__(
+        self,
+        site_name: str,
+        check_fn: Callable[..., List[Dict[str, Any]]],
+        deliver_fn: Callable[..., Any],
+        running_flags: Dict[str, bool],
+        on_error: Optional[Callable[[str, List[str], Exception], Optional[float]]] = None,
+        batch_fn: Optional[Callable[..., List[Dict[str, Any]]]] = None,
+    ):
+        """
+        Args:
+            site_name: Scraper site identifier
+            check_fn: The site's ``check_<site>`` function; must accept
+                ``settings`` and ``deliver`` keyword arguments
+            deliver_fn: The site's ``send_discord_message`` used per user
+            running_flags: The site module's running flag dict
+            on_error: Optional callback ``(site, user_ids, exc) -> cooldown``
+            batch_fn: Optional bulk writer (``save_listings_batch``); when set,
+                each fetch's deliveries are persisted in one call instead of
+                one ``deliver_fn`` call per user and listing
+        """
+        self.site_name = site_name
+        self.check_fn = check_fn
+        self.deliver_fn = deliver_fn
+        self.running_flags = running_flags
+        self.on_error = on_error
+        self.batch_fn = batch_fn
+
+        self._lock = threading.RLock()
+        self._subscribers: Dict[str, Dict[str, Any]] = {}
+        self._settings_loaded_at: Dict[str, float] = {}
+        self._user_seen: Dict[str, Dict[str, datetime]] = {}
+        self._groups: Dict[QueryKey, QueryGroup] = {}
+        # Store-backed seen view of each group's shared fetch, keyed by token
+        self._group_seen: Dict[str, Any] = {}
+
+        self._engine = get_engine()
+        self._dispatcher = None  # concurrent.futures.Future of the dispatch coroutine
+        self._running = False
+        self._stopped = False
+        # Group fetches in flight; only touched from the engine's event loop
+        self._fetch_tasks: Set[asyncio.Future] = set()
+
+        self._stats = {
+            "fetches": 0,
+            "fetch_errors": 0,
+            "deliveries": 0,
+            "requests_saved": 0,
+        }
+
+    # ======================
+    # SUBSCRIPTIONS
+    # ======================
+    def subscribe(self, user_id: str) -> bool:
+        """Register a user; returns False if already subscribed or stopped."""
+        settings = load_settings(username=user_id)
+        user_seen = load_seen_listings(self.site_name, username=user_id)
+        with self._lock:
+            if self._stopped or user_id in self._subscribers:
+                return False
+            self._subscribers[user_id] = settings
+            self._settings_loaded_at[user_id] = time.time()
+            self._user_seen[user_id] = user_seen
+            self._regroup_locked()
+            self._ensure_running_locked()
+        logger.debug(f"{self.site_name}: subscribed {user_id} to shared scheduler")
+        return True
+
+    def unsubscribe(self, user_id: str) -> bool:
+        """Remove a user; returns False if they were not subscribed."""
+        with self._lock:
+            if user_id not in self._subscribers:
+                return False
+            self._subscribers.pop(user_id, None)
+            self._settings_loaded_at.pop(user_id, None)
+            self._user_seen.pop(user_id, None)
+            self._regroup_locked()
+        logger.debug(f"{self.site_name}: unsubscribed {user_id} from shared scheduler")
+        return True
+
+    def is_subscribed(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._subscribers
+
+    def subscribers(self) -> List[str]:
+        with self._lock:
+            return list(self._subscribers)
+
+    def refresh_user(self, user_id: str) -> None:
+        """Force a settings reload for a user on the next dispatcher tick."""
+        with self._lock:
+            if user_id in self._settings_loaded_at:
+                self._settings_loaded_at[user_id] = 0.0
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Drop all subscribers and stop the dispatcher for good."""
+        with self._lock:
+            self._stopped = True
+            for user_id in list(self._subscribers):
+                self.unsubscribe(user_id)
+            self._running = False
+            dispatcher = self._dispatcher
+        if dispatcher is not None and not dispatcher.done():
+            try:
+                dispatcher.result(timeout=timeout)
+            except Exception:
+                pass
+
+    # ======================
+    # GROUPING
+    # ======================
+    def _regroup_locked(self) -> None:
+        """Rebuild query groups from current subscriber settings, keeping state."""
+        wanted: Dict[QueryKey, Dict[str, Dict[str, Any]]] = {}
+        for user_id, settings in self._subscribers.items():
+            wanted.setdefault(build_query_key(self.site_name, settings), {})[user_id] = settings
+
+        for key in list(self._groups):
+            if key not in wanted:
+                group = self._groups.pop(key)
+                self.running_flags[self._group_flag_key(group)] = False
+                self._group_seen.pop(group.token, None)
+
+        for key, members in wanted.items():
+            group = self._groups.get(key)
+            if group is None:
+                group = QueryGroup(key=key, token=_query_token(key))
+                self._groups[key] = group
+                self.running_flags[self._group_flag_key(group)] = True
+            group.members = members
+
+    def _group_flag_key(self, group: QueryGroup) -> str:
+        return f"{self.site_name}:{group.token}"
+
+    def _refresh_settings(self) -> None:
+        """Reload settings for subscribers whose copy is stale."""
+        now = time.time()
+        with self._lock:
+            stale = [
+                user_id for user_id, loaded_at in self._settings_loaded_at.items()
+                if now - loaded_at >= SETTINGS_REFRESH_SECONDS
+            ]
+        if not stale:
+            return
+
+        refreshed = {user_id: load_settings(username=user_id) for user_id in stale}
+        with self._lock:
+            changed = False
+            for user_id, settings in refreshed.items():
+                if user_id not in self._subscribers:
+                    continue
+                if self._subscribers[user_id] != settings:
+                    self._subscribers[user_id] = settings
+                    changed = True
+                self._settings_loaded_at[user_id] = now
+            if changed:
+                self._regroup_locked()
+
+    # ======================
+    # DISPATCH
+    # ======================
+    def _ensure_running_locked(self) -> None:
+        if self._stopped:
+            return
+        self._running = True
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = self._engine.spawn(self._dispatch_loop())
+
+    async def _dispatch_loop(self) -> None:
+        logger.info(f"Shared {self.site_name} scheduler started")
+        try:
+            while True:
+                with self._lock:
+                    if not self._running or not self._subscribers:
+                        # Cleared under the lock so a subscribe racing this
+                        # exit spawns a fresh loop instead of joining this one
+                        self._running = False
+                        self._dispatcher = None
+                        break
+                try:
+                    await self._engine.run_blocking(None, self._refresh_settings)
+                    now = time.time()
+                    with self._lock:
+                        due = [
+                            group for group in self._groups.values()
+                            if not group.in_flight and group.next_run <= now
+                        ]
+                        for group in due:
+                            group.in_flight = True
+                    for group in due:
+                        task = asyncio.ensure_future(self._engine.run_blocking(self.site_name, self._run_group, group))
+                        self._fetch_tasks.add(task)
+                        task.add_done_callback(self._fetch_tasks.discard)
+                except Exception as e:
+                    logger.error(f"Shared {self.site_name} scheduler dispatch error: {e}")
+                await asyncio.sleep(DISPATCH_TICK_SECONDS)
+        finally:
+            logger.info(f"Shared {self.site_name} scheduler stopped")
+
+    def _run_group(self, group: QueryGroup) -> None:
+        with self._lock:
+            settings = group.merged_settings() if group.members else None
+            member_ids = list(group.members)
+        if settings is None:
+            group.in_flight = False
+            return
+
+        flag_key = self._group_flag_key(group)
+        group_seen = self._group_seen_view(group)
+        collected: List[Dict[str, Any]] = []
+
+        def collect(title, link, price=None, image_url=None, user_id=None):
+            collected.append({"title": title, "link": link, "price": price, "image": image_url})
+
+        cooldown = None
+        try:
+            self.check_fn(
+                self.site_name,
+                user_id=group.token,
+                user_seen=group_seen,
+                flag_key=flag_key,
+                settings=settings,
+                deliver=collect,
+            )
+            with self._lock:
+                self._stats["fetches"] += 1
+                self._stats["requests_saved"] += max(len(member_ids) - 1, 0)
+            if collected:
+                self._fan_out(group, collected)
+        except Exception as e:
+            with self._lock:
+                self._stats["fetch_errors"] += 1
+            logger.error(f"Shared {self.site_name} fetch failed for {group.token}: {e}")
+            if self.on_error:
+                try:
+                    cooldown = self.on_error(self.site_name, member_ids, e)
+                except Exception as callback_error:
+                    logger.debug(f"Shared scheduler error callback failed: {callback_error}")
+            if cooldown is None:
+                cooldown = DEFAULT_ERROR_COOLDOWN
+        finally:
+            with self._lock:
+                group.fetch_count += 1
+                group.last_run = time.time()
+                if cooldown is not None:
+                    group.next_run = group.last_run + cooldown
+                else:
+                    interval = settings["interval"]
+                    group.next_run = group.last_run + random.uniform(interval * 0.9, interval * 1.1)
+                group.in_flight = False
+
+    def _group_seen_view(self, group: QueryGroup):
+        """Seen view for the group's shared fetch, opened from the store on first use."""
+        with self._lock:
+            view = self._group_seen.get(group.token)
+        if view is not None:
+            return view
+        view = load_seen_listings(self.site_name, username=group.token)
+        with self._lock:
+            if self._groups.get(group.key) is not group:
+                # Regrouped away while the view was opening; don't retain it
+                return view
+            return self._group_seen.setdefault(group.token, view)
+
+    def _fan_out(self, group: QueryGroup, listings: Iterable[Dict[str, Any]]) -> None:
+        """Deliver shared results to each member that has not seen them."""
+        with self._lock:
+            members = {
+                user_id: (settings, self._user_seen.get(user_id))
+                for user_id, settings in group.members.items()
+                if user_id in self._subscribers
+            }
+
+        seen_lock = get_seen_listings_lock(self.site_name)
+        deliveries: List[Tuple[str, Dict[str, Any]]] = []
+        for listing in listings:
+            link = listing.get("link")
+            if not link:
+                continue
+            price = listing.get("price")
+            normalized_link = normalize_url(link) or link
+            for user_id, (settings, user_seen) in members.items():
+                if user_seen is None:
+                    continue
+                if price is not None and (price < settings["min_price"] or price > settings["max_price"]):
+                    continue
+                if not is_new_listing(link, user_seen, self.site_name):
+                    continue
+                with seen_lock:
+                    user_seen[normalized_link] = datetime.now()
+                deliveries.append((user_id, listing))
+
+        if self.batch_fn is not None:
+            self._persist_batch(deliveries)
+        else:
+            for user_id, listing in deliveries:
+                self.deliver_fn(
+                    listing.get("title"), listing.get("link"), listing.get("price"),
+                    listing.get("image"), user_id=user_id,
+                )
+
+        updated = {user_id for user_id, _ in deliveries}
+        for user_id in updated:
+            save_seen_listings(members[user_id][1], self.site_name, username=user_id)
+        if deliveries:
+            with self._lock:
+                self._stats["deliveries"] += len(deliveries)
+
+    def _persist_batch(self, deliveries: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Write every delivered listing of one fetch with a single batch call."""
+        page: Dict[str, Dict[str, Any]] = {}
+        for user_id, listing in deliveries:
+            link = listing.get("link")
+            if link in page:
+                continue
+            title, price = listing.get("title"), listing.get("price")
+            is_valid, error = validate_listing(title, link, price)
+            if not is_valid:
+                logger.warning(f"⚠️ Skipping invalid listing: {error}")
+                continue
+            image_url = listing.get("image")
+            if image_url and not validate_image_url(image_url):
+                image_url = None
+            page[link] = {
+                "title": title,
+                "price": price,
+                "link": link,
+                "image_url": image_url,
+                "source": self.site_name,
+                "user_id": user_id,
+            }
+        if not page:
+            return
+
+        try:
+            saved = self.batch_fn(list(page.values()))
+            new_count = sum(1 for row in saved or [] if row.get("is_new"))
+            logger.info(
+                f"📢 {self.site_name}: saved {len(page)} listings ({new_count} new) "
+                f"for {len({user_id for user_id, _ in deliveries})} users"
+            )
+        except Exception as e:
+            logger.error(f"⚠️ Failed to save {self.site_name} listing batch: {e}")
+
+    # ======================
+    # STATS
+    # ======================
+    def get_stats(self) -> Dict[str, Any]:
+        """Return subscriber, query group and fetch counters."""
+        with self._lock:
+            return {
+                "site": self.site_name,
+                "running": bool(self._dispatcher is not None and not self._dispatcher.done()),
+                "subscribers": len(self._subscribers),
+                "distinct_queries": len(self._groups),
+                "fetches_in_flight": len(self._fetch_tasks),
+                **self._stats,
+            }
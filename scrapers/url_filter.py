@@ -0,0 +1,149 @@
+"""Cross-user bloom filter of seen listing URLs.
+
+Every user has their own exact seen log (``scrapers.seen_store``), so the same
+listing URL is looked up once per user. ``SiteUrlFilter`` sits in front of
+those logs with one memory-bounded bloom filter per site over the 8-byte URL
+hashes the seen store already uses:
+
+* a miss means no user has seen the URL, so the exact lookup is skipped;
+* a hit falls through to the exact per-user log. A sample of the hits that
+  log does not confirm (``URL_FILTER_OUTCOME_SAMPLE_RATE``) is classified
+  as a cross-user hit or a false positive, so the real rate can be watched
+  next to the estimated one without an extra site-wide query per hit.
+
+The filter never forgets a URL (no false negatives); once more URLs than
+``URL_FILTER_CAPACITY`` were added its false-positive rate rises above
+``URL_FILTER_ERROR_RATE`` gradually, which ``get_stats`` reports. It is
+rebuilt from the seen store on the next process start.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import random
+import threading
+from typing import Any, Dict, Iterable
+
+# ======================
+# CONFIGURATION
+# ======================
+URL_FILTER_CAPACITY = int(os.getenv("URL_FILTER_CAPACITY", "500000"))
+URL_FILTER_ERROR_RATE = float(os.getenv("URL_FILTER_ERROR_RATE", "0.01"))
+# Fraction of unconfirmed hits checked against the whole site (stats only)
+URL_FILTER_OUTCOME_SAMPLE_RATE = float(os.getenv("URL_FILTER_OUTCOME_SAMPLE_RATE", "0.01"))
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over 64-bit integer keys."""
+
+    def __init__(self, capacity: int = URL_FILTER_CAPACITY, error_rate: float = URL_FILTER_ERROR_RATE):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.num_bits = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 64)
+        self.num_hashes = max(int(round(self.num_bits / self.capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, key: int):
+        # Double hashing on the two halves of the (already uniform) key
+        key &= 0xFFFFFFFFFFFFFFFF
+        h1 = key & 0xFFFFFFFF
+        h2 = (key >> 32) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: int) -> bool:
+        """Add a key; returns False if it was (probably) present already."""
+        added = False
+        with self._lock:
+            for position in self._positions(key):
+                byte, mask = position >> 3, 1 << (position & 7)
+                if not self._bits[byte] & mask:
+                    self._bits[byte] |= mask
+                    added = True
+            if added:
+                self.count += 1
+        return added
+
+    def __contains__(self, key: int) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def estimated_fp_rate(self) -> float:
+        """Expected false-positive rate for the keys added so far."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class SiteUrlFilter:
+    """Bloom filter plus hit/miss counters for one site."""
+
+    def __init__(
+        self,
+        site: str,
+        capacity: int = URL_FILTER_CAPACITY,
+        error_rate: float = URL_FILTER_ERROR_RATE,
+        outcome_sample_rate: float = URL_FILTER_OUTCOME_SAMPLE_RATE,
+    ):
+        self.site = site
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.outcome_sample_rate = outcome_sample_rate
+        self._lock = threading.Lock()
+        self._stats = {
+            "checks": 0, "hits": 0, "misses": 0, "unconfirmed_hits": 0,
+            "cross_user_hits": 0, "false_positives": 0,
+        }
+
+    def might_contain(self, key: int) -> bool:
+        """True if some user may have seen the URL hash; False means none has."""
+        found = key in self.bloom
+        with self._lock:
+            self._stats["checks"] += 1
+            self._stats["hits" if found else "misses"] += 1
+        return found
+
+    def add(self, key: int) -> None:
+        self.bloom.add(key)
+
+    def add_many(self, keys: Iterable[int]) -> None:
+        for key in keys:
+            self.bloom.add(key)
+
+    def record_unconfirmed_hit(self) -> bool:
+        """Count a hit the caller's own log did not confirm; True if it should be classified."""
+        with self._lock:
+            self._stats["unconfirmed_hits"] += 1
+        return random.random() < self.outcome_sample_rate
+
+    def record_hit_outcome(self, seen_by_anyone: bool) -> None:
+        """Classify a sampled unconfirmed hit."""
+        with self._lock:
+            self._stats["cross_user_hits" if seen_by_anyone else "false_positives"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        hits = stats["hits"]
+        sampled = stats["cross_user_hits"] + stats["false_positives"]
+        # Scale the sampled false-positive share up to all unconfirmed hits
+        false_positives = stats["false_positives"] / sampled * stats["unconfirmed_hits"] if sampled else 0.0
+        stats.update({
+            "site": self.site,
+            "urls": self.bloom.count,
+            "capacity": self.bloom.capacity,
+            "memory_bytes": len(self.bloom._bits),
+            "hit_rate": round(hits / stats["checks"], 4) if stats["checks"] else 0.0,
+            "estimated_fp_rate": round(self.bloom.estimated_fp_rate(), 6),
+            "observed_fp_rate": round(false_positives / hits, 6) if hits else 0.0,
+        })
+        return stats
+
+
+__all__ = [
+    "BloomFilter",
+    "SiteUrlFilter",
+    "URL_FILTER_CAPACITY",
+    "URL_FILTER_ERROR_RATE",
+    "URL_FILTER_OUTCOME_SAMPLE_RATE",
+]
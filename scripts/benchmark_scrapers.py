@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark every scraper parse path against recorded responses, offline.
+
+Replays the saved HTML/RSS/JSON responses in tests/fixtures/scrapers
+through each site's parsing code and reports, per corpus entry:
+
+- median time per stage: decode (bytes -> text, where the path needs it),
+  parse (build the DOM / XML tree / JSON document), extract (listing dicts),
+  validate (``validate_listing``) and dedup (``is_new_listing``)
+- listings/sec over the whole pipeline
+- peak traced memory of one pass (tracemalloc)
+
+Use ``--json`` to save a run tagged with the git revision and ``--compare``
+to print the change against a saved run, e.g.
+
+    python scripts/benchmark_scrapers.py --json /tmp/before.json
+    (apply change)
+    python scripts/benchmark_scrapers.py --compare /tmp/before.json
+
+Usage: python scripts/benchmark_scrapers.py [--rounds N] [--site NAME] [--json PATH] [--compare PATH]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from xml.etree import ElementTree as ET
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from lxml import etree
+
+from scrapers import craigslist, ebay, facebook, ksl, mercari, poshmark
+from scrapers.common import is_new_listing, parse_html_fast, validate_listing
+
+FIXTURE_DIR = os.path.join(ROOT, "tests", "fixtures", "scrapers")
+STAGES = ("decode", "parse", "extract", "validate", "dedup")
+
+
+def _decode(content):
+    return content.decode("utf-8")
+
+
+def _posts(module):
+    def extract(tree):
+        return [listing for listing in map(module._post_listing, module._find_posts(tree)) if listing]
+    return extract
+
+
+def _next_data(content):
+    return [json.loads(script) for script in mercari._NEXT_DATA_BYTES_RE.findall(content)]
+
+
+def _next_data_listings(documents):
+    return [listing for document in documents for listing in mercari._extract_listings_from_json(document)]
+
+
+# (site, fixture, decode, parse, extract) - decode is None where the path
+# hands raw bytes straight to the parser
+CORPUS = [
+    ("craigslist", "craigslist_search.html", None, parse_html_fast, _posts(craigslist)),
+    ("craigslist", "craigslist_search.rss", _decode, ET.fromstring, craigslist._rss_listings),
+    ("ebay", "ebay_search.html", None, parse_html_fast, ebay._extract_listings_fast),
+    ("ebay", "ebay_search.rss", _decode, ET.fromstring, ebay._rss_listings),
+    ("ksl", "ksl_search.html", None, parse_html_fast, _posts(ksl)),
+    ("mercari", "mercari_search.html", None, parse_html_fast, mercari._parse_html_results_fast),
+    ("mercari", "mercari_next_data.html", None, _next_data, _next_data_listings),
+    ("mercari", "mercari_search.json", _decode, json.loads, mercari._parse_api_items),
+    ("poshmark", "poshmark_search.html", None, parse_html_fast, poshmark._extract_listings_fast),
+    # Selenium hands over page_source as text, so facebook pays for the decode
+    ("facebook", "facebook_search.html", _decode, parse_html_fast, facebook._extract_anchor_candidates),
+]
+
+
+def run_pipeline(site, content, decode, parse, extract):
+    """Run one pass over a response, returning (listings kept, seconds per stage)."""
+    timings = {}
+    start = time.perf_counter()
+    document = decode(content) if decode else content
+    timings["decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tree = parse(document)
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    listings = extract(tree)
+    timings["extract"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    listings = [l for l in listings if validate_listing(l.get("title"), l.get("link"), l.get("price"))[0]]
+    timings["validate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    seen = {}
+    fresh = []
+    for listing in listings:
+        if is_new_listing(listing["link"], seen, site):
+            seen[listing["link"]] = datetime.now()
+            fresh.append(listing)
+    timings["dedup"] = time.perf_counter() - start
+    return fresh, timings
+
+
+def benchmark_case(site, fixture, decode, parse, extract, rounds):
+    with open(os.path.join(FIXTURE_DIR, fixture), "rb") as handle:
+        content = handle.read()
+
+    listings, _ = run_pipeline(site, content, decode, parse, extract)  # warm-up
+
+    tracemalloc.start()
+    run_pipeline(site, content, decode, parse, extract)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples = {stage: [] for stage in STAGES}
+    totals = []
+    for _ in range(rounds):
+        _, timings = run_pipeline(site, content, decode, parse, extract)
+        for stage in STAGES:
+            samples[stage].append(timings[stage])
+        totals.append(sum(timings.values()))
+
+    total = statistics.median(totals)
+    return {
+        "site": site,
+        "fixture": fixture,
+        "bytes": len(content),
+        "listings": len(listings),
+        "stages_ms": {stage: round(statistics.median(samples[stage]) * 1000, 4) for stage in STAGES},
+        "total_ms": round(total * 1000, 4),
+        "listings_per_sec": round(len(listings) / total, 1) if total else 0.0,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def git_revision():
+    try:
+        rev = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD", "--", "scrapers"], cwd=ROOT)
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{rev}-dirty" if dirty else rev
+
+
+def print_report(results, baseline=None):
+    previous = {entry["fixture"]: entry for entry in (baseline or {}).get("cases", [])}
+    header = f"{'fixture':<24} {'items':>5} " + " ".join(f"{stage:>8}" for stage in STAGES)
+    header += f" {'total ms':>9} {'items/s':>9} {'peak KiB':>9}"
+    if baseline:
+        header += f" {'vs ' + baseline.get('rev', '?'):>12}"
+    print(header)
+    for case in results["cases"]:
+        line = f"{case['fixture']:<24} {case['listings']:>5} "
+        line += " ".join(f"{case['stages_ms'][stage]:>8.3f}" for stage in STAGES)
+        line += f" {case['total_ms']:>9.3f} {case['listings_per_sec']:>9.0f} {case['peak_kib']:>9.1f}"
+        before = previous.get(case["fixture"])
+        if before and before["total_ms"]:
+            line += f" {(case['total_ms'] - before['total_ms']) / before['total_ms']:>+11.1%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--site", action="append", help="only benchmark this site (repeatable)")
+    parser.add_argument("--json", metavar="PATH", help="write the results to PATH")
+    parser.add_argument("--compare", metavar="PATH", help="show total time change against a saved run")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    cases = [case for case in CORPUS if not args.site or case[0] in args.site]
+    results = {
+        "rev": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "lxml": ".".join(map(str, etree.LXML_VERSION)),
+        "rounds": args.rounds,
+        "cases": [benchmark_case(*case, rounds=args.rounds) for case in cases],
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    print(f"rev {results['rev']}, python {results['python']}, lxml {results['lxml']}, "
+          f"{args.rounds} rounds, median ms per stage")
+    print_report(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
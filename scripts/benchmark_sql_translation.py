@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark the SQLite -> PostgreSQL statement translation done on every execute.
+
+Replays every literal SQL string passed to ``execute``/``executemany`` in
+db_enhanced.py through the uncached translator and the memoized one, and
+prints the per-query overhead of each.
+
+Usage: python scripts/benchmark_sql_translation.py [--rounds N]
+"""
+import argparse
+import ast
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_enhanced
+
+
+def collect_statements():
+    """Return the literal SQL statements executed in db_enhanced.py."""
+    with open(db_enhanced.__file__, encoding="utf-8") as source:
+        tree = ast.parse(source.read())
+    statements = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not node.args:
+            continue
+        func = node.func
+        name = getattr(func, "attr", None) or getattr(func, "id", None)
+        if name not in ("execute", "executemany", "_prepare_sql"):
+            continue
+        arg = node.args[0]
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            statements.append(arg.value)
+    return statements
+
+
+def time_per_query(translate, statements, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for statement in statements:
+            translate(statement)
+    elapsed = time.perf_counter() - start
+    return elapsed / (rounds * len(statements)) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    statements = collect_statements()
+    uncached = db_enhanced._translate_sql.__wrapped__
+    db_enhanced._translate_sql.cache_clear()
+
+    before = time_per_query(uncached, statements, args.rounds)
+    after = time_per_query(db_enhanced._translate_sql, statements, args.rounds)
+    info = db_enhanced.get_sql_translation_cache_info()
+
+    print(f"Statements: {len(statements)} distinct call sites x {args.rounds} rounds")
+    print(f"Uncached translation: {before:8.2f} us/query")
+    print(f"Cached translation:   {after:8.2f} us/query ({before / after:.0f}x faster)")
+    print(f"Cache: {info['hits']} hits, {info['misses']} misses, {info['currsize']}/{info['maxsize']} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,50 @@ from functools import wraps
 from flask import flash, redirect, url_for, jsonify, request
 from flask_login import current_user
 import db_enhanced
+from cache_manager import get_cache, request_memo, user_cache_tag
 from subscriptions import SubscriptionManager
 from utils import logger
 
 
+# Resolved tiers are cached briefly across requests; writers invalidate them
+SUBSCRIPTION_CACHE_TTL = 30
+
+
+def _resolved_subscription_key(username):
+    return f"subscription:resolved:{username}"
+
+
+def get_resolved_subscription(username):
+    """
+    Return ``(subscription, tier)`` for ``username``.
+
+    Memoized for the rest of the request and cached for
+    ``SUBSCRIPTION_CACHE_TTL`` seconds under the user's cache tag, so gated
+    requests resolve the subscription once instead of once per check.
+    """
+    def _load():
+        subscription = db_enhanced.get_user_subscription(username)
+        return subscription, subscription.get('tier', 'free')
+
+    def _cached():
+        return get_cache().get_or_set(_resolved_subscription_key(username), _load,
+                                      SUBSCRIPTION_CACHE_TTL, (user_cache_tag(username),))
+
+    subscription, tier = request_memo(_resolved_subscription_key(username), _cached)
+    return dict(subscription), tier
+
+
+def invalidate_subscription_cache(username):
+    """Forget the cached subscription, tier and settings for ``username`` (e.g. after a Stripe webhook)."""
+    get_cache().invalidate_tag(user_cache_tag(username))
+    try:
+        from flask import g, has_app_context
+        if has_app_context():
+            g.get('_request_memo', {}).pop(_resolved_subscription_key(username), None)
+    except ImportError:
+        pass
+
+
 def require_subscription_tier(required_tier):
     """
     Decorator to require a specific subscription tier or higher
@@ -30,8 +70,7 @@ def require_subscription_tier(required_tier):
                 return f(*args, **kwargs)
             
             # Get user's subscription
-            subscription = db_enhanced.get_user_subscription(current_user.id)
-            user_tier = subscription.get('tier', 'free')
+            _, user_tier = get_resolved_subscription(current_user.id)
             
             # Check tier hierarchy
             user_level = tier_hierarchy.get(user_tier, 0)
@@ -74,8 +113,7 @@ def require_feature(feature_name):
                 return f(*args, **kwargs)
             
             # Get user's subscription
-            subscription = db_enhanced.get_user_subscription(current_user.id)
-            user_tier = subscription.get('tier', 'free')
+            _, user_tier = get_resolved_subscription(current_user.id)
             
             # Check if feature is available
             if not SubscriptionManager.can_use_feature(user_tier, feature_name):
@@ -113,8 +151,7 @@ def check_keyword_limit():
                 return f(*args, **kwargs)
             
             # Get user's subscription
-            subscription = db_enhanced.get_user_subscription(current_user.id)
-            user_tier = subscription.get('tier', 'free')
+            _, user_tier = get_resolved_subscription(current_user.id)
             
             # Get keywords from form
             keywords_str = request.form.get('keywords', '')
@@ -162,8 +199,7 @@ def check_refresh_interval():
                 return f(*args, **kwargs)
             
             # Get user's subscription
-            subscription = db_enhanced.get_user_subscription(current_user.id)
-            user_tier = subscription.get('tier', 'free')
+            _, user_tier = get_resolved_subscription(current_user.id)
             
             # Get interval from form (in minutes)
             interval_str = request.form.get('interval', '')
@@ -215,8 +251,7 @@ def check_platform_access():
                 return f(*args, **kwargs)
             
             # Get user's subscription
-            subscription = db_enhanced.get_user_subscription(current_user.id)
-            user_tier = subscription.get('tier', 'free')
+            _, user_tier = get_resolved_subscription(current_user.id)
             
             # Determine which platform is being accessed
             # Check URL path for platform name
@@ -263,8 +298,8 @@ def get_user_tier():
     if hasattr(current_user, 'role') and current_user.role == 'admin':
         return 'pro'
     
-    subscription = db_enhanced.get_user_subscription(current_user.id)
-    return subscription.get('tier', 'free')
+    _, tier = get_resolved_subscription(current_user.id)
+    return tier
 
 
 def get_user_features():
@@ -272,7 +307,7 @@ def get_user_features():
     Helper function to get current user's subscription features
     """
     tier = get_user_tier()
-    features = SubscriptionManager.get_user_tier_features(tier)
+    features = dict(SubscriptionManager.get_user_tier_features(tier))
     
     # Add Poshmark and Mercari feature flags (already in features dict, but ensure they're set)
     if 'poshmark' not in features:
@@ -319,8 +354,7 @@ def add_subscription_context():
                 'is_admin': True
             }
         
-        subscription = db_enhanced.get_user_subscription(current_user.id)
-        tier = subscription.get('tier', 'free')
+        subscription, tier = get_resolved_subscription(current_user.id)
         features = SubscriptionManager.get_user_tier_features(tier)
         
         return {
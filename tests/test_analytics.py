@@ -0,0 +1,176 @@
+import os
+import sys
+import shutil
+import tempfile
+import importlib
+import unittest
+
+
+class AnalyticsTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._temp_dir = tempfile.mkdtemp(prefix="analytics_test_")
+        cls.db_path = os.path.join(cls._temp_dir, "analytics.db")
+        os.environ["DB_FILE"] = cls.db_path
+        if "db_enhanced" in sys.modules:
+            cls.db = importlib.reload(sys.modules["db_enhanced"])
+        else:
+            cls.db = importlib.import_module("db_enhanced")
+        cls.db.close_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            cls.db.close_database()
+        finally:
+            shutil.rmtree(cls._temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.db.init_db()
+        self.db.create_user_db("alice", "alice@botifex.io", "hash")
+
+    def tearDown(self):
+        self.db.close_database()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+
+    def _ingest(self, *listings, user_id="alice"):
+        return self.db.save_listings_batch(list(listings), user_id=user_id, source="craigslist", notify=False)
+
+    def test_price_distribution_equal_width_bins(self):
+        prices = [100, 150, 200, 450, 500, 999, 1000]
+        self._ingest(*[
+            {"title": f"Camaro {i}" if i % 2 else f"Bike {i}", "price": price, "link": f"https://example.com/{i}"}
+            for i, price in enumerate(prices)
+        ])
+        self._ingest({"title": "Other user's Camaro", "price": 50000, "link": "https://example.com/x"}, user_id=None)
+
+        distribution = self.db.get_price_distribution(30, 3, user_id="alice")
+        self.assertEqual([b["count"] for b in distribution], [3, 2, 2])
+        self.assertEqual(distribution[0]["start"], 100)
+        self.assertEqual(distribution[-1]["end"], 1000)
+
+        # Arbitrary bin counts, including bins with nothing in them
+        self.assertEqual([b["count"] for b in self.db.get_price_distribution(30, 9, user_id="alice")],
+                         [2, 1, 0, 1, 1, 0, 0, 0, 2])
+
+        camaros = self.db.get_price_distribution(30, 2, keyword="camaro", user_id="alice")
+        self.assertEqual(sum(b["count"] for b in camaros), 3)
+        self.assertEqual((camaros[0]["start"], camaros[-1]["end"]), (150, 999))
+
+        self.assertEqual(self.db.get_price_distribution(30, 5, keyword="mustang", user_id="alice"), [])
+
+    def test_price_distribution_quantile_and_single_price_bins(self):
+        self._ingest(*[
+            {"title": f"Bike {i}", "price": 10 * (i + 1), "link": f"https://example.com/{i}"}
+            for i in range(100)
+        ])
+        deciles = self.db.get_price_distribution(30, 10, user_id="alice", quantiles=True)
+        self.assertEqual([b["count"] for b in deciles], [10] * 10)
+        self.assertEqual(deciles[0]["end"], 109)
+        self.assertEqual(deciles[4]["end"], 505)
+        self.assertEqual(deciles[-1]["percentile"], 100)
+
+        self.db.create_user_db("bob", "bob@botifex.io", "hash")
+        self._ingest(*[
+            {"title": f"Lamp {i}", "price": 25, "link": f"https://example.com/lamp/{i}"} for i in range(3)
+        ], user_id="bob")
+        self.assertEqual(self.db.get_price_distribution(30, 4, user_id="bob"),
+                         [{"range": "$25", "count": 3, "start": 25, "end": 25}])
+
+    def test_endpoints_read_the_daily_rollup_incrementally(self):
+        self._ingest(
+            {"title": "1969 Camaro SS", "price": 25000, "link": "https://example.com/1"},
+            {"title": "Corvette C3", "price": 4000, "link": "https://example.com/2"},
+            {"title": "Camaro parts", "price": 500, "link": "https://example.com/3"},
+        )
+        self._ingest({"title": "Camaro", "price": 99999, "link": "https://example.com/x"}, user_id=None)
+
+        total, avg, low, high, sources = self.db.get_market_insights(30, user_id="alice")["overall_stats"]
+        self.assertEqual((total, low, high, sources), (3, 500, 25000, 1))
+        self.assertAlmostEqual(avg, 29500 / 3)
+        self.assertEqual(self.db.get_source_comparison(30, user_id="alice")[0][:2], ("craigslist", 3))
+        self.assertEqual([row[:2] for row in self.db.get_keyword_analysis(30, user_id="alice")],
+                         [("camaro", 2), ("corvette", 1)])
+
+        # Only listings past the checkpoint are folded in on the next read
+        self.assertEqual(self.db.refresh_listing_daily_stats(), 0)
+        self._ingest({"title": "Camaro Z28", "price": 31000, "link": "https://example.com/4"})
+        self.assertEqual(self.db.refresh_listing_daily_stats(), 1)
+
+        (date, count, avg, low, high, source), = self.db.get_price_analytics(30, keyword="camaro", user_id="alice")
+        self.assertEqual((count, low, high, source), (3, 500, 31000, "craigslist"))
+        self.assertAlmostEqual(avg, 56500 / 3)
+        self.assertEqual(sum(row[1] for row in self.db.get_hourly_activity(7, user_id="alice")), 4)
+
+        insights = self.db.get_market_insights(30, keyword="camaro", user_id="alice")
+        self.assertEqual(insights["price_distribution"], [
+            {"bucket": "$20K-$30K", "count": 1},
+            {"bucket": "Over $30K", "count": 1},
+            {"bucket": "Under $5K", "count": 1},
+        ])
+        self.assertEqual(insights["top_keywords"], [{"keyword": "camaro", "count": 3, "average_price": avg}])
+
+    def test_listing_committed_below_the_checkpoint_is_folded_once(self):
+        self._ingest(*[
+            {"title": f"Camaro {i}", "price": 1000 * (i + 1), "link": f"https://example.com/{i}"}
+            for i in range(3)
+        ])
+        late_id = self.db.get_max_listing_id() - 1
+
+        # Hold the middle row back, as if its transaction committed after the others
+        with self.db.get_pool().get_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT * FROM listings WHERE id = ?", (late_id,))
+            late_row = c.fetchone()
+            columns = [column[0] for column in c.description]
+            c.execute("DELETE FROM listings WHERE id = ?", (late_id,))
+            conn.commit()
+        self.assertEqual(self.db.refresh_listing_daily_stats(), 2)
+
+        with self.db.get_pool().get_connection() as conn:
+            conn.execute(
+                f"INSERT INTO listings ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                tuple(late_row),
+            )
+            conn.commit()
+        self._ingest({"title": "Camaro Z28", "price": 9000, "link": "https://example.com/new"})
+
+        self.assertEqual(self.db.refresh_listing_daily_stats(), 2)
+        self._ingest({"title": "Camaro RS", "price": 8000, "link": "https://example.com/newer"})
+        self.assertEqual(self.db.refresh_listing_daily_stats(), 1)
+        total = self.db.get_market_insights(30, user_id="alice")["overall_stats"][0]
+        self.assertEqual(total, 5)
+
+    def test_user_keywords_drive_analytics_and_trends(self):
+        self.db.update_setting("keywords", "Bronco, Trans Am", username="alice")
+        self._ingest(
+            {"title": "1978 Ford Bronco", "price": 20000, "link": "https://example.com/1"},
+            {"title": "Bronco and Trans Am pair", "price": 30000, "link": "https://example.com/2"},
+            {"title": "1969 Camaro SS", "price": 25000, "link": "https://example.com/3"},
+        )
+        # Users without configured keywords keep the default car keyword list
+        self._ingest({"title": "1969 Camaro SS", "price": 25000, "link": "https://example.com/x"}, user_id=None)
+
+        self.assertEqual([row[:2] for row in self.db.get_keyword_analysis(30, user_id="alice")],
+                         [("bronco", 2), ("trans am", 1)])
+        trends = {row[1]: row[2:4] for row in self.db.get_keyword_trends(30, user_id="alice")}
+        self.assertEqual(trends, {"bronco": (2, 25000.0), "trans am": (1, 30000.0)})
+
+        # Trends take incremental deltas from newly ingested listings only
+        self.db.save_listing("Bronco II", 4000, "https://example.com/4", source="craigslist", user_id="alice")
+        self.assertEqual(self.db.update_keyword_trends("alice"), 1)
+        self.assertEqual(self.db.update_keyword_trends("alice"), 0)
+        (date, keyword, count, avg_price, source), = self.db.get_keyword_trends(30, keyword="bronco", user_id="alice")
+        self.assertEqual((count, avg_price, source), (3, 18000.0, "craigslist"))
+
+        # Keyword changes apply to listings ingested afterwards
+        self.db.update_setting("keywords", "Camaro", username="alice")
+        self._ingest({"title": "Camaro RS", "price": 15000, "link": "https://example.com/5"})
+        self.assertEqual(self.db.get_keyword_analysis(30, keyword="camaro", user_id="alice")[0][1], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+import os
+import pickle
+import sys
+import time
+import shutil
+import tempfile
+import importlib
+import unittest
+from unittest import mock
+
+import cache_manager
+
+
+class FakeRedis:
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def pipeline(self):
+        return self
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    def sadd(self, key, member):
+        self.store.setdefault(key, set()).add(member)
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        return []
+
+
+class CacheManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = cache_manager.CacheManager(max_entries=4, shards=1)
+
+    def test_evicts_least_recently_used_entry_when_full(self):
+        for key in ("a", "b", "c", "d"):
+            self.cache.set(key, key.upper())
+        self.assertEqual(self.cache.get("a"), "A")  # refresh "a"
+        self.cache.set("e", "E")
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), "A")
+        self.assertEqual(self.cache.get_stats()["evictions"], 1)
+
+    def test_entries_expire_and_zero_ttl_deletes(self):
+        self.cache.set("short", 1, ttl=60)
+        self.cache.set("gone", 2)
+        self.cache.set("gone", None, ttl=0)
+        self.assertIsNone(self.cache.get("gone"))
+
+        with mock.patch("cache_manager.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(self.cache.get("short"))
+        self.assertEqual(self.cache.get_stats()["expirations"], 1)
+
+    def test_tag_invalidation_only_drops_tagged_keys(self):
+        self.cache.set("user:alice", "alice", tags=("user:alice",))
+        self.cache.set("settings:alice", {"k": "v"}, tags=("user:alice",))
+        self.cache.set("user:alice2", "alice2", tags=("user:alice2",))
+
+        self.assertEqual(self.cache.invalidate_tag("user:alice"), 2)
+        self.assertIsNone(self.cache.get("user:alice"))
+        self.assertIsNone(self.cache.get("settings:alice"))
+        self.assertEqual(self.cache.get("user:alice2"), "alice2")
+
+    def test_get_or_set_caches_falsy_results_and_reports_hit_rate(self):
+        loader = mock.Mock(return_value=None)
+        self.assertIsNone(self.cache.get_or_set("missing", loader))
+        self.assertIsNone(self.cache.get_or_set("missing", loader))
+        loader.assert_called_once()
+
+        stats = self.cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_second_tier_is_read_on_local_miss(self):
+        tier = mock.Mock()
+        tier.get.return_value = {"tier": "pro"}
+        cache = cache_manager.CacheManager(max_entries=4, shards=1, second_tier=tier)
+
+        self.assertEqual(cache.get("db:subscription:alice"), {"tier": "pro"})
+        self.assertEqual(cache.get("db:subscription:alice"), {"tier": "pro"})
+        tier.get.assert_called_once_with("db:subscription:alice")
+
+        cache.set("k", 1, ttl=10, tags=("t",))
+        tier.set.assert_called_once_with("k", 1, 10, ("t",))
+        cache.invalidate_tag("t")
+        tier.invalidate_tag.assert_called_once_with("t")
+
+        # Applying another worker's broadcast only touches the local tier
+        cache.invalidate_tag("t", broadcast=False)
+        tier.invalidate_tag.assert_called_once_with("t")
+
+    def test_redis_tier_stores_json_not_pickle(self):
+        store = {}
+        tier = cache_manager.RedisCacheTier()
+        tier._call = lambda operation, handler, default=None: handler(FakeRedis(store))
+
+        tier.set("db:subscription:alice", ("pro", "active", None), 30, ("user:alice",))
+        self.assertEqual(store["cache:db:subscription:alice"], '["pro", "active", null]')
+        self.assertEqual(tier.get("db:subscription:alice"), ["pro", "active", None])
+
+        tier.set("rows", object(), 30)
+        self.assertNotIn("cache:rows", store)
+        # Payloads in the old pickle format are never unpickled
+        store["cache:evil"] = pickle.dumps({"tier": "pro"}).hex()
+        self.assertIs(tier.get("evil"), cache_manager._MISSING)
+
+    def test_tag_invalidations_are_broadcast_to_other_workers(self):
+        import websocket_manager
+
+        published = []
+        with mock.patch.object(websocket_manager, "redis_enabled", True), \
+                mock.patch.object(websocket_manager, "_publish_event", lambda event, payload: published.append((event, payload))):
+            self.cache.invalidate_tag("user:alice")
+            self.cache.invalidate_tag("user:bob", broadcast=False)
+        self.assertEqual(published, [(cache_manager.CACHE_INVALIDATION_EVENT, {"tag": "user:alice"})])
+
+        self.cache.set("db:settings:alice", (("keywords", "Camaro"),), tags=("user:alice",))
+        with mock.patch.object(websocket_manager, "get_cache", return_value=self.cache):
+            websocket_manager._handle_bus_event({"event": "cache.invalidate", "payload": {"tag": "user:alice"}})
+        self.assertIsNone(self.cache.get("db:settings:alice"))
+
+    def test_cached_decorator_keys_on_arguments(self):
+        calls = []
+
+        @cache_manager.cached("test", ttl=60)
+        def double(value, scale=2):
+            calls.append(value)
+            return value * scale
+
+        with mock.patch("cache_manager._cache", self.cache):
+            self.assertEqual(double(2), 4)
+            self.assertEqual(double(2), 4)
+            self.assertEqual(double(2, scale=3), 6)
+        self.assertEqual(calls, [2, 2])
+
+
+class HotReadCacheTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._temp_dir = tempfile.mkdtemp(prefix="hot_read_cache_test_")
+        cls.db_path = os.path.join(cls._temp_dir, "cache.db")
+        os.environ["DB_FILE"] = cls.db_path
+        if "db_enhanced" in sys.modules:
+            cls.db = importlib.reload(sys.modules["db_enhanced"])
+        else:
+            cls.db = importlib.import_module("db_enhanced")
+        cls.db.close_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            cls.db.close_database()
+        finally:
+            shutil.rmtree(cls._temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.db.init_db()
+        self.db.create_user_db("alice", "alice@example.com", "hash")
+
+    def tearDown(self):
+        self.db.close_database()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+
+    def _count_selects(self, table):
+        statements = []
+        for conn in self.db.get_pool().all_connections:
+            conn.set_trace_callback(statements.append)
+        return lambda: sum(1 for sql in statements if f"FROM {table}" in sql and sql.lstrip().upper().startswith("SELECT"))
+
+    def test_user_rows_are_never_cached(self):
+        selects = self._count_selects("users")
+        self.assertEqual(self.db.get_user_by_username("alice")["role"], "user")
+        self.assertEqual(self.db.get_user_by_username("ghost"), {})
+        self.assertEqual(selects(), 2)
+        self.assertFalse([key for key in self.db.get_cache()._shard("db:user:alice").entries if key.startswith("db:user:")])
+
+    def test_missing_subscriptions_are_not_cached(self):
+        selects = self._count_selects("subscriptions")
+        self.assertEqual(self.db.get_user_subscription("alice")["tier"], "free")
+        self.assertEqual(self.db.get_user_subscription("alice")["tier"], "free")
+        self.assertEqual(selects(), 2)
+
+    def test_subscription_and_settings_are_invalidated_by_their_writers(self):
+        self.assertEqual(self.db.get_user_subscription("alice")["tier"], "free")
+        self.db.get_settings("alice")
+        selects = self._count_selects("settings")
+
+        self.db.create_or_update_subscription("alice", "pro")
+        self.assertEqual(self.db.get_user_subscription("alice")["tier"], "pro")
+
+        self.db.update_setting("keywords", "Camaro", "alice")
+        self.assertEqual(self.db.get_settings("alice")["keywords"], "Camaro")
+        self.db.get_settings("alice")
+        self.assertEqual(selects(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import importlib
+import threading
+import unittest
+
+
+class ConnectionPoolSizingTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._temp_dir = tempfile.mkdtemp(prefix="connection_pool_test_")
+        cls.db_path = os.path.join(cls._temp_dir, "pool.db")
+        os.environ["DB_FILE"] = cls.db_path
+        if "db_enhanced" in sys.modules:
+            cls.db = importlib.reload(sys.modules["db_enhanced"])
+        else:
+            cls.db = importlib.import_module("db_enhanced")
+        cls.db.close_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.pool = self.db.DatabaseConnectionPool(self.db_path, pool_size=3, min_size=1, idle_timeout=60)
+
+    def tearDown(self):
+        self.pool.close_all()
+
+    def _hold(self, started, release):
+        with self.pool.get_connection():
+            started.release()
+            release.wait(5)
+
+    def test_grows_lazily_up_to_max_and_counts_exhaustion(self):
+        self.assertEqual(self.pool.stats()["open_connections"], 1)
+
+        started, release = threading.Semaphore(0), threading.Event()
+        holders = [threading.Thread(target=self._hold, args=(started, release)) for _ in range(3)]
+        for thread in holders:
+            thread.start()
+        for _ in holders:
+            self.assertTrue(started.acquire(timeout=5))
+
+        stats = self.pool.stats()
+        self.assertEqual(stats["open_connections"], 3)
+        self.assertEqual(stats["in_use_connections"], 3)
+
+        with self.assertRaises(self.db.DatabaseError):
+            with self.pool.get_connection(timeout=0.05):
+                pass
+        release.set()
+        for thread in holders:
+            thread.join(5)
+
+        stats = self.pool.stats()
+        self.assertEqual(stats["exhaustion_count"], 1)
+        self.assertEqual(stats["peak_connections"], 3)
+        self.assertEqual(stats["idle_connections"], 3)
+
+    def test_close_all_resets_open_count_for_reuse(self):
+        with self.pool.get_connection():
+            with self.pool.get_connection():
+                pass
+        self.assertEqual(self.pool.stats()["open_connections"], 2)
+
+        self.pool.close_all()
+        stats = self.pool.stats()
+        self.assertEqual(stats["open_connections"], 0)
+        self.assertEqual(stats["idle_connections"], 0)
+
+        with self.pool.get_connection() as conn:
+            self.assertEqual(conn.execute("SELECT 1").fetchone()[0], 1)
+            self.assertEqual(self.pool.stats()["in_use_connections"], 1)
+        self.assertEqual(self.pool.stats()["open_connections"], 1)
+
+    def test_waiters_are_served_in_arrival_order(self):
+        self.pool.close_all()
+        self.pool = self.db.DatabaseConnectionPool(self.db_path, pool_size=1, min_size=1)
+        served = []
+        first = self.pool.pool.get(timeout=1)
+
+        def wait_turn(name):
+            with self.pool.get_connection(timeout=5):
+                served.append(name)
+
+        waiters = []
+        for name in ("a", "b", "c"):
+            thread = threading.Thread(target=wait_turn, args=(name,))
+            thread.start()
+            waiters.append(thread)
+            while self.pool.stats()["waiting_requests"] < len(waiters):
+                time.sleep(0.01)
+
+        self.pool.pool.put(first)
+        for thread in waiters:
+            thread.join(5)
+        self.assertEqual(served, ["a", "b", "c"])
+        self.assertEqual(self.pool.stats()["checkouts_waited"], 3)
+
+    def test_idle_connections_are_reaped_down_to_min(self):
+        started, release = threading.Semaphore(0), threading.Event()
+        holders = [threading.Thread(target=self._hold, args=(started, release)) for _ in range(3)]
+        for thread in holders:
+            thread.start()
+        for _ in holders:
+            self.assertTrue(started.acquire(timeout=5))
+        release.set()
+        for thread in holders:
+            thread.join(5)
+        self.assertEqual(len(self.pool.all_connections), 3)
+
+        self.pool.pool.idle_timeout = 0
+        with self.pool.get_connection():
+            pass
+
+        stats = self.pool.stats()
+        self.assertEqual(stats["open_connections"], 1)
+        self.assertEqual(stats["connections_reaped"], 2)
+        self.assertEqual(len(self.pool.all_connections), 1)
+
+    def test_wait_and_hold_times_are_recorded_per_call_site(self):
+        def slow_report():
+            with self.pool.get_connection() as conn:
+                conn.execute("SELECT 1").fetchone()
+                time.sleep(0.03)
+
+        slow_report()
+        slow_report()
+
+        stats = self.pool.stats()
+        self.assertEqual(stats["checkout_wait"]["count"], 2)
+        self.assertEqual(stats["hold_time"]["count"], 2)
+        self.assertGreaterEqual(stats["hold_time"]["max_ms"], 30)
+        top = stats["top_holders"][0]
+        self.assertTrue(top["call_site"].endswith(".slow_report"))
+        self.assertEqual(top["checkouts"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
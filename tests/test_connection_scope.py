@@ -0,0 +1,103 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import importlib
+import unittest
+
+
+class ConnectionScopeTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._temp_dir = tempfile.mkdtemp(prefix="connection_scope_test_")
+        cls.db_path = os.path.join(cls._temp_dir, "scope.db")
+        os.environ["DB_FILE"] = cls.db_path
+        if "db_enhanced" in sys.modules:
+            cls.db = importlib.reload(sys.modules["db_enhanced"])
+        else:
+            cls.db = importlib.import_module("db_enhanced")
+        cls.db.close_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            cls.db.close_database()
+        finally:
+            shutil.rmtree(cls._temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.db.init_db()
+        self.db.create_user_db("scraper", "scraper@example.com", "hash")
+        self.pool = self.db.get_pool()
+        self.checkouts = 0
+        original_get = self.pool.pool.get
+
+        def counting_get(*args, **kwargs):
+            self.checkouts += 1
+            return original_get(*args, **kwargs)
+
+        self.pool.pool.get = counting_get
+
+    def tearDown(self):
+        self.db.close_database()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+
+    def _statements(self):
+        statements = []
+        for conn in self.pool.all_connections:
+            conn.set_trace_callback(statements.append)
+        return statements
+
+    def test_nested_calls_join_the_scope_connection(self):
+        listing = self.db.save_listing("Chevelle SS", 12000, "https://example.com/1", None, "ebay", user_id="scraper")
+        self.assertEqual(listing["title"], "Chevelle SS")
+        self.assertEqual(self.checkouts, 1)
+
+        self.checkouts = 0
+        with self.db.connection_scope() as conn:
+            with self.db.connection_scope() as inner:
+                self.assertIs(inner, conn)
+            self.assertEqual(self.db.get_listing_by_id(listing["id"])["price"], 12000)
+            self.db.log_feed_event("listing_alert", entity_type="listing", entity_id=str(listing["id"]))
+        self.assertEqual(self.checkouts, 1)
+
+        # Outside a scope every call checks out its own connection again
+        self.db.get_listing_by_id(listing["id"])
+        self.assertEqual(self.checkouts, 2)
+
+    def test_health_checks_only_after_idle_time_or_errors(self):
+        statements = self._statements()
+        for _ in range(3):
+            with self.pool.get_connection() as conn:
+                conn.execute("SELECT COUNT(*) FROM listings").fetchone()
+        self.assertNotIn("SELECT 1", statements)
+
+        with self.assertRaises(sqlite3.OperationalError):
+            with self.pool.get_connection() as conn:
+                conn.execute("SELECT * FROM no_such_table")
+        for _ in range(self.pool.pool_size):
+            with self.pool.get_connection():
+                pass
+        self.assertEqual(statements.count("SELECT 1"), 1)
+
+        self.pool.health.idle_seconds = 0
+        with self.pool.get_connection():
+            pass
+        self.assertEqual(statements.count("SELECT 1"), 2)
+
+    def test_unfinished_transactions_are_rolled_back_on_return(self):
+        with self.pool.get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO listings (title, price, link) VALUES ('Nova', 1, 'https://example.com/n')")
+        for conn in self.pool.all_connections:
+            self.assertFalse(conn.in_transaction)
+        with self.pool.get_connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
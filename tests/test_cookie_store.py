@@ -0,0 +1,100 @@
+import time
+from http.cookiejar import LWPCookieJar
+
+import pytest
+import requests
+
+from scrapers import common, cookie_store
+
+
+@pytest.fixture
+def sqlite_store(tmp_path, monkeypatch):
+    backend = cookie_store.SqliteCookieBackend(str(tmp_path / "cookies.db"))
+    store = cookie_store.CookieStore(backend, flush_interval=3600)
+    cookie_store.set_cookie_store(store)
+    monkeypatch.chdir(tmp_path)
+    yield store
+    store.close()
+    backend.close()
+    cookie_store.set_cookie_store(None)
+
+
+def _session(**cookies):
+    session = requests.Session()
+    for name, value in cookies.items():
+        session.cookies.set(name, value, domain=".example.com", path="/")
+    return session
+
+
+def test_saves_are_batched_until_flush(sqlite_store):
+    alice, bob = _session(sid="a1"), _session(sid="b1")
+    for _ in range(20):
+        common._save_session_cookies(alice, "ebay", "alice")
+    common._save_session_cookies(bob, "ebay", "bob")
+    assert sqlite_store.backend.count() == 0
+
+    alice.cookies.set("sid", "a2", domain=".example.com", path="/")
+    assert sqlite_store.flush() == 2
+    assert sqlite_store.backend.count() == 2
+    assert sqlite_store.flush() == 0
+
+    restored = requests.Session()
+    assert common._load_session_cookies(restored, "ebay", "alice") == 1
+    # The jar is snapshotted at flush time, not when it was marked
+    assert restored.cookies.get("sid") == "a2"
+
+    stats = sqlite_store.stats()
+    assert (stats["jars_written"], stats["writes_saved"], stats["pending"]) == (2, 19, 0)
+
+
+def test_expired_cookies_are_dropped_and_session_cookies_kept(sqlite_store):
+    session = _session(sid="live")
+    session.cookies.set("old", "x", domain=".example.com", path="/", expires=int(time.time()) - 60)
+    session.cookies.set("later", "y", domain=".example.com", path="/", expires=int(time.time()) + 3600)
+    common._save_session_cookies(session, "ksl", None)
+    sqlite_store.flush()
+
+    restored = requests.Session()
+    common._load_session_cookies(restored, "ksl", None)
+    assert sorted(cookie.name for cookie in restored.cookies) == ["later", "sid"]
+
+
+def test_delete_drops_pending_writes_and_stored_rows(sqlite_store):
+    session = _session(sid="a1")
+    common._save_session_cookies(session, "mercari", "alice")
+    sqlite_store.flush()
+    common._save_session_cookies(session, "mercari", "alice")
+
+    common._delete_session_cookies("mercari", "alice")
+    assert sqlite_store.flush() == 0
+    assert common._load_session_cookies(requests.Session(), "mercari", "alice") == 0
+
+
+def test_legacy_lwp_file_is_imported_once(sqlite_store, tmp_path):
+    legacy = common._session_cookie_path("poshmark", "carol")
+    legacy.parent.mkdir(parents=True)
+    jar = LWPCookieJar(str(legacy))
+    for cookie in _session(sid="legacy").cookies:
+        jar.set_cookie(cookie)
+    jar.save(ignore_discard=True, ignore_expires=True)
+
+    restored = requests.Session()
+    assert common._load_session_cookies(restored, "poshmark", "carol") == 1
+    assert restored.cookies.get("sid") == "legacy"
+    assert not legacy.exists()
+    assert legacy.with_name(legacy.name + ".migrated").exists()
+    assert common._load_session_cookies(requests.Session(), "poshmark", "carol") == 1
+
+
+def test_zero_interval_writes_synchronously_and_interval_flushes_in_background():
+    backend = cookie_store.MemoryCookieBackend()
+    cookie_store.CookieStore(backend, flush_interval=0).mark_dirty(_session(sid="a").cookies, "ebay", "alice")
+    assert backend.get("ebay", "alice") is not None
+
+    store = cookie_store.CookieStore(backend, flush_interval=0.05)
+    store.mark_dirty(_session(sid="b").cookies, "ebay", "bob")
+    deadline = time.time() + 2
+    while backend.get("ebay", "bob") is None and time.time() < deadline:
+        time.sleep(0.01)
+    store.close()
+    assert backend.get("ebay", "bob") is not None
@@ -0,0 +1,88 @@
+import json
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+import pytest
+
+from scrapers import craigslist, ebay, facebook, ksl, mercari, poshmark
+from scrapers.common import extract_json_ld_items, parse_html_fast
+
+FIXTURES = Path(__file__).parent / "fixtures" / "scrapers"
+
+
+def _fixture(site, page="search"):
+    return (FIXTURES / f"{site}_{page}.html").read_bytes()
+
+
+@pytest.mark.parametrize("module", [ebay, poshmark])
+def test_fast_path_extracts_every_tile(module):
+    listings = module._parse_listings_fast(_fixture(module.SITE_NAME))
+
+    assert len(listings) == 50
+    assert all(listing["link"].startswith("https://") for listing in listings)
+    assert all(isinstance(listing["price"], int) for listing in listings)
+    assert all(listing["image"] for listing in listings)
+
+
+def test_mercari_html_fast_path_reads_item_tiles():
+    content = _fixture("mercari")
+    assert mercari._parse_json_results_fast(content) == []
+
+    listings = mercari._parse_html_results_fast(parse_html_fast(content))
+
+    assert len(listings) == 50
+    assert listings[0]["link"] == "https://www.mercari.com/us/item/m10000000000/"
+    assert listings[0]["price"] is not None
+
+
+@pytest.mark.parametrize("module", [craigslist, ksl])
+def test_lxml_post_strategies_find_results(module):
+    posts = module._find_posts(parse_html_fast(_fixture(module.SITE_NAME)))
+    listings = [module._post_listing(post) for post in posts]
+
+    assert len(listings) == 50
+    assert all(listing and listing["link"].startswith("https://") for listing in listings)
+    assert all(listing["price"] for listing in listings)
+
+
+def test_facebook_anchor_images_come_from_the_page_source():
+    candidates = facebook._parse_listing_anchors(_fixture("facebook").decode("utf-8"))
+    items = [c for c in candidates if "/marketplace/item/" in c["link"]]
+
+    assert len(items) == 50
+    assert all(c["image"].startswith("https://scontent") for c in items)
+    assert all(c["price"] is not None for c in items)
+
+
+def test_json_ld_is_read_from_raw_bytes():
+    payload = {"@type": "Product", "name": "Camaro – SS", "url": "https://example.com/1", "offers": {"price": "3500"}}
+    markup = f'<html><script type="application/ld+json">{json.dumps(payload, ensure_ascii=False)}</script></html>'
+
+    items = extract_json_ld_items(markup.encode("utf-8"))
+
+    assert [item["title"] for item in items] == ["Camaro – SS"]
+    assert extract_json_ld_items(b"<html><p>no scripts</p></html>") == []
+
+
+def test_parse_html_fast_rejects_empty_markup():
+    assert parse_html_fast(b"") is None
+    assert parse_html_fast(None) is None
+
+
+@pytest.mark.parametrize("module", [craigslist, ebay])
+def test_rss_feed_items_become_listings(module):
+    root = ET.fromstring((FIXTURES / f"{module.SITE_NAME}_search.rss").read_text(encoding="utf-8"))
+
+    listings = module._rss_listings(root)
+
+    assert len(listings) == 50
+    assert all(listing["link"].startswith("https://") and listing["price"] for listing in listings)
+
+
+def test_mercari_api_and_next_data_payloads():
+    api = json.loads((FIXTURES / "mercari_search.json").read_text(encoding="utf-8"))
+    assert len(mercari._parse_api_items(api)) == 50
+
+    listings = mercari._parse_json_results_fast(_fixture("mercari", "next_data"))
+    assert len(listings) == 50
+    assert listings[0]["link"].startswith("https://www.mercari.com/us/item/m")
@@ -0,0 +1,21 @@
+from keyword_extraction import KeywordMatcher, get_keyword_matcher, normalize_keywords
+
+
+def test_matcher_finds_every_configured_phrase_once():
+    matcher = KeywordMatcher(["Trans Am", "trans", "Camaro", "am"])
+    assert matcher.phrases == ("am", "camaro", "trans", "trans am")
+    assert matcher.find("1979 Pontiac TRANS AM, not a Camaro") == ["am", "camaro", "trans", "trans am"]
+    assert matcher.find("Transmission only") == ["trans"]
+    assert matcher.find("Corvette") == []
+    assert matcher.find("") == []
+
+
+def test_matcher_escapes_phrases_and_handles_empty_sets():
+    assert KeywordMatcher(["c++", "1/24 scale"]).find("1/24 scale model, c++ book") == ["1/24 scale", "c++"]
+    assert not KeywordMatcher([])
+    assert KeywordMatcher([" ", ""]).find("anything") == []
+
+
+def test_matchers_are_shared_per_phrase_set():
+    assert normalize_keywords("Camaro, nova,camaro") == ("camaro", "nova")
+    assert get_keyword_matcher("nova,Camaro") is get_keyword_matcher(["camaro", "nova"])
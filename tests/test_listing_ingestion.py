@@ -0,0 +1,115 @@
+import os
+import sys
+import shutil
+import tempfile
+import importlib
+import unittest
+
+
+class ListingIngestionTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._temp_dir = tempfile.mkdtemp(prefix="listings_test_")
+        cls.db_path = os.path.join(cls._temp_dir, "listings.db")
+        os.environ["DB_FILE"] = cls.db_path
+        if "db_enhanced" in sys.modules:
+            cls.db = importlib.reload(sys.modules["db_enhanced"])
+        else:
+            cls.db = importlib.import_module("db_enhanced")
+        cls.db.close_database()
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            cls.db.close_database()
+        finally:
+            shutil.rmtree(cls._temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.db.init_db()
+        self.db.create_user_db("scraper", "scraper@example.com", "hash")
+
+    def tearDown(self):
+        self.db.close_database()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+
+    def _count(self, table, where="1=1", params=()):
+        with self.db.get_pool().get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params)
+            return c.fetchone()[0]
+
+    def test_batch_reports_new_rows_and_writes_side_tables(self):
+        page = [
+            {"title": "1969 Camaro SS", "price": 25000, "link": "https://example.com/a", "image": None},
+            {"title": "Corvette C3", "price": 18000, "link": "https://example.com/b"},
+            {"title": "Camaro duplicate", "price": 24000, "link": "https://example.com/a"},
+            {"title": "", "price": 100, "link": "https://example.com/missing-title"},
+        ]
+
+        saved = self.db.save_listings_batch(page, user_id="scraper", source="craigslist", notify=False)
+
+        self.assertEqual([row["link"] for row in saved], ["https://example.com/a", "https://example.com/b"])
+        self.assertTrue(all(row["is_new"] for row in saved))
+        self.assertEqual(saved[0]["title"], "Camaro duplicate")
+        self.assertEqual(self._count("listings"), 2)
+        self.assertEqual(self._count("listing_analytics", "keyword IS NOT NULL"), 2)
+        self.assertEqual(self._count("feed_events", "event_type = ?", ("listing_alert",)), 2)
+
+        second = self.db.save_listings_batch([
+            {"title": "Corvette C3 price drop", "price": 16000, "link": "https://example.com/b"},
+            {"title": "Firebird Trans Am", "price": 9000, "link": "https://example.com/c"},
+        ], source="craigslist", notify=False)
+
+        self.assertEqual({row["link"]: row["is_new"] for row in second}, {
+            "https://example.com/b": False,
+            "https://example.com/c": True,
+        })
+        self.assertEqual(second[0]["id"], saved[1]["id"])
+        self.assertEqual(self.db.get_listing_by_id(saved[1]["id"])["price"], 16000)
+        self.assertEqual(self._count("listings"), 3)
+        self.assertEqual(self._count("feed_events", "event_type = ?", ("listing_alert",)), 3)
+
+    def test_single_save_still_logs_feed_event(self):
+        listing = self.db.save_listing("Chevelle SS", 12000, "https://example.com/d", None, "ebay", user_id="scraper")
+
+        self.assertEqual(listing["title"], "Chevelle SS")
+        self.assertEqual(self._count("feed_events", "entity_id = ?", (str(listing["id"]),)), 1)
+        self.assertEqual(self._count("listing_analytics", "listing_id = ?", (listing["id"],)), 1)
+
+    def test_search_uses_full_text_index(self):
+        self.db.create_user_db("other", "other@example.com", "hash")
+        self.db.save_listings_batch([
+            {"title": "1985 Camaro Z28", "price": 9000, "link": "https://example.com/1"},
+            {"title": "Camaro parts", "price": 100, "link": "https://example.com/2"},
+            {"title": "Z28 wheels", "price": 400, "link": "https://example.com/3"},
+            {"title": "Corvette C4", "price": 8000, "link": "https://example.com/4"},
+        ], user_id="scraper", source="craigslist", notify=False)
+        self.db.save_listings_batch([
+            {"title": "Another Camaro", "price": 7000, "link": "https://example.com/5"},
+        ], user_id="other", source="craigslist", notify=False)
+
+        def titles(keywords):
+            return [row[1] for row in self.db.search_existing_listings(keywords, user_id="scraper")]
+
+        self.assertEqual(sorted(titles("cama")), ["1985 Camaro Z28", "Camaro parts"])
+        self.assertEqual(titles("camaro z28"), ["1985 Camaro Z28"])
+        self.assertEqual(sorted(titles("camaro OR corvette")), ["1985 Camaro Z28", "Camaro parts", "Corvette C4"])
+        self.assertEqual(len(titles(["camaro", "corvette"])), 3)
+        # Ranked by relevance: the denser title comes first
+        self.assertEqual(titles("camaro"), ["Camaro parts", "1985 Camaro Z28"])
+        self.assertEqual(titles("mustang"), [])
+
+        # The index follows title updates
+        self.db.save_listings_batch([
+            {"title": "Mustang GT", "price": 5000, "link": "https://example.com/4"},
+        ], source="craigslist", notify=False)
+        self.assertEqual(titles("mustang"), ["Mustang GT"])
+        self.assertEqual(titles("corvette"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
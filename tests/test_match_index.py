@@ -0,0 +1,97 @@
+from match_index import ListingMatchIndex, tokenize
+
+
+def _user(username):
+    return {
+        "username": username,
+        "email": f"{username}@botifex.io",
+        "phone_number": None,
+        "email_notifications": True,
+        "sms_notifications": False,
+    }
+
+
+class FakeLoader:
+    def __init__(self, data):
+        self.data = data
+        self.calls = []
+
+    def __call__(self, username=None):
+        self.calls.append(username)
+        if username is None:
+            return self.data
+        return {
+            "users": [u for u in self.data["users"] if u["username"] == username],
+            "settings": {k: v for k, v in self.data["settings"].items() if k == username},
+            "saved_searches": [s for s in self.data["saved_searches"] if s["username"] == username],
+            "price_alerts": [a for a in self.data["price_alerts"] if a["username"] == username],
+        }
+
+
+def _index():
+    loader = FakeLoader({
+        "users": [_user("alice"), _user("bob"), _user("carol"), _user("dave")],
+        "settings": {
+            "alice": {"keywords": "Camaro, Trans Am", "min_price": "1000", "max_price": "8000"},
+            "bob": {"keywords": "Mustang", "min_price": "0", "max_price": "50000"},
+            "carol": {"keywords": "Bronco"},
+            "dave": {"keywords": "Impala"},
+        },
+        "saved_searches": [
+            {"id": 1, "username": "carol", "name": "cheap anything", "keywords": "",
+             "min_price": None, "max_price": 2000, "sources": "ebay,ksl"},
+        ],
+        "price_alerts": [
+            {"id": 7, "username": "dave", "keywords": "corvette", "threshold_price": 15000, "alert_type": "under"},
+        ],
+    })
+    return ListingMatchIndex(loader=loader), loader
+
+
+def _names(index, title, price, source="craigslist"):
+    return [user["username"] for user in index.match_users(title, price, source)]
+
+
+def test_matches_only_interested_users():
+    index, _ = _index()
+
+    assert _names(index, "1978 Pontiac Trans Am", 7500) == ["alice"]
+    assert _names(index, "Camaros (two)", 5000) == ["alice"]
+    assert _names(index, "1969 Camaro SS", 25000) == []
+    assert _names(index, "Mustang GT", 25000) == ["bob"]
+    assert _names(index, "Corvette C4", 14999) == ["dave"]
+    assert _names(index, "Corvette C4", 15000) == []
+    assert _names(index, "Bike rack", 150, source="ebay") == ["carol"]
+    assert _names(index, "Bike rack", 150, source="craigslist") == []
+
+
+def test_keywords_match_inside_longer_words_like_a_substring_check():
+    index, _ = _index()
+
+    assert _names(index, "chevycamaro rs", 5000) == ["alice"]
+    assert _names(index, "FordMustangGT", 25000) == ["bob"]
+    assert _names(index, "Transam project", 5000) == []
+
+
+def test_invalidated_user_is_rebuilt_alone():
+    index, loader = _index()
+    assert _names(index, "Mustang GT", 25000) == ["bob"]
+
+    loader.data["settings"]["bob"]["keywords"] = "Chevelle"
+    index.invalidate_user("bob")
+
+    assert _names(index, "Mustang GT", 25000) == []
+    assert _names(index, "Chevelle SS", 25000) == ["bob"]
+    assert loader.calls == [None, "bob"]
+    assert index.get_stats()["user_rebuilds"] == 1
+
+
+def test_candidates_are_limited_to_the_title_tokens():
+    index, _ = _index()
+    index.match("Mustang GT", 25000)
+    # Only bob's subscription sits under "mustang" in that price bucket
+    assert index.get_stats()["candidates"] == 1
+
+
+def test_tokenize_lowercases_alphanumerics():
+    assert tokenize("1969 Camaro SS/RS!") == ["1969", "camaro", "ss", "rs"]
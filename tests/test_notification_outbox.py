@@ -0,0 +1,141 @@
+import os
+import sys
+import shutil
+import smtplib
+import tempfile
+import importlib
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+
+class FakeSMTP:
+    def __init__(self, fail_for=()):
+        self.sent = []
+        self.fail_for = set(fail_for)
+
+    def send_message(self, msg):
+        if msg['To'] in self.fail_for:
+            raise smtplib.SMTPDataError(451, b"try again later")
+        self.sent.append(msg['To'])
+
+
+class NotificationOutboxTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._temp_dir = tempfile.mkdtemp(prefix="outbox_test_")
+        cls.db_path = os.path.join(cls._temp_dir, "outbox.db")
+        os.environ["DB_FILE"] = cls.db_path
+        if "db_enhanced" in sys.modules:
+            cls.db = importlib.reload(sys.modules["db_enhanced"])
+        else:
+            cls.db = importlib.import_module("db_enhanced")
+        cls.db.close_database()
+        cls.worker = importlib.import_module("notification_worker")
+        cls.match_index = importlib.import_module("match_index")
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            cls.db.close_database()
+        finally:
+            shutil.rmtree(cls._temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.match_index._index = None
+        self.db.init_db()
+        self.db.create_user_db("alice", "alice@botifex.io", "hash")
+        self.db.create_user_db("bob", "bob@botifex.io", "hash")
+
+    def tearDown(self):
+        self.db.close_database()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+
+    def _statuses(self):
+        with self.db.get_pool().get_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT recipient, status, attempts FROM notification_outbox ORDER BY id")
+            return c.fetchall()
+
+    def _run_dispatcher(self, server):
+        connections = []
+
+        @contextmanager
+        def fake_connection():
+            connections.append(server)
+            yield server
+
+        dispatcher = self.worker.NotificationDispatcher(worker_count=1, batch_size=50)
+        with mock.patch.object(self.worker, "smtp_connection", fake_connection), \
+                mock.patch.object(self.worker, "is_email_configured", lambda: True):
+            dispatcher.run_once()
+        return dispatcher, connections
+
+    def test_batch_ingest_queues_notifications_in_outbox(self):
+        saved = self.db.save_listings_batch([
+            {"title": "Camaro", "price": 5000, "link": "https://example.com/1"},
+            {"title": "Corvette", "price": 9000, "link": "https://example.com/2"},
+        ], source="ebay")
+        self.assertEqual(len(saved), 2)
+
+        rows = self._statuses()
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(status == "pending" for _, status, _ in rows))
+
+        # Re-ingesting the same page does not queue anything new
+        self.db.save_listings_batch([{"title": "Camaro", "price": 4500, "link": "https://example.com/1"}], source="ebay")
+        self.assertEqual(len(self._statuses()), 4)
+
+    def test_only_matching_users_are_queued(self):
+        self.db.update_setting("keywords", "Mustang", "bob")
+        self.db.create_price_alert("bob", "corvette", 10000, "under")
+
+        self.db.save_listings_batch([
+            {"title": "Camaro", "price": 5000, "link": "https://example.com/1"},
+            {"title": "Corvette", "price": 9000, "link": "https://example.com/2"},
+            {"title": "Corvette", "price": 19000, "link": "https://example.com/3"},
+        ], source="ebay")
+
+        with self.db.get_pool().get_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT username, link FROM notification_outbox ORDER BY username, link")
+            queued = c.fetchall()
+        self.assertEqual(queued, [
+            ("alice", "https://example.com/1"),
+            ("alice", "https://example.com/2"),
+            ("alice", "https://example.com/3"),
+            ("bob", "https://example.com/2"),
+        ])
+
+    def test_worker_sends_batch_over_one_connection_and_backs_off_failures(self):
+        self.db.save_listings_batch([
+            {"title": "Camaro", "price": 5000, "link": "https://example.com/1"},
+            {"title": "Corvette", "price": 9000, "link": "https://example.com/2"},
+        ], source="ebay")
+
+        server = FakeSMTP(fail_for={"bob@botifex.io"})
+        dispatcher, connections = self._run_dispatcher(server)
+
+        self.assertEqual(len(connections), 1)
+        self.assertEqual(sorted(server.sent), ["alice@botifex.io", "alice@botifex.io"])
+        statuses = self._statuses()
+        self.assertEqual(sorted(s for r, s, _ in statuses if r == "alice@botifex.io"), ["sent", "sent"])
+        self.assertEqual(sorted(s for r, s, _ in statuses if r == "bob@botifex.io"), ["pending", "pending"])
+        self.assertEqual(dispatcher.get_stats()["retried"], 2)
+
+        # Failed rows are not due again until their backoff expires
+        self.assertEqual(self.db.claim_notification_batch("email"), [])
+        stats = self.db.get_notification_outbox_stats()
+        self.assertEqual((stats["sent"], stats["pending"]), (2, 2))
+
+    def test_retry_delay_grows_exponentially_and_caps(self):
+        self.assertEqual(self.worker.retry_delay(1), self.worker.BACKOFF_BASE_SECONDS)
+        self.assertEqual(self.worker.retry_delay(3), self.worker.BACKOFF_BASE_SECONDS * 4)
+        self.assertEqual(self.worker.retry_delay(50), self.worker.BACKOFF_MAX_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
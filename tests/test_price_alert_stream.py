@@ -0,0 +1,105 @@
+import os
+import sys
+import shutil
+import tempfile
+import importlib
+import unittest
+
+
+class PriceAlertStreamTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._temp_dir = tempfile.mkdtemp(prefix="price_alert_test_")
+        cls.db_path = os.path.join(cls._temp_dir, "alerts.db")
+        os.environ["DB_FILE"] = cls.db_path
+        if "db_enhanced" in sys.modules:
+            cls.db = importlib.reload(sys.modules["db_enhanced"])
+        else:
+            cls.db = importlib.import_module("db_enhanced")
+        cls.db.close_database()
+        cls.stream_module = importlib.import_module("price_alert_stream")
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            cls.db.close_database()
+        finally:
+            shutil.rmtree(cls._temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.db.init_db()
+        for username in ("alice", "bob", "carol"):
+            self.db.create_user_db(username, f"{username}@botifex.io", "hash")
+
+    def tearDown(self):
+        self.db.close_database()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+
+    def _ingest(self, *listings):
+        return self.db.save_listings_batch(list(listings), source="craigslist", notify=False)
+
+    @staticmethod
+    def _fired(triggered):
+        return sorted((t["username"], t["listing"]["link"]) for t in triggered)
+
+    def test_new_listings_fire_alerts_once_and_resume_after_restart(self):
+        self.db.create_price_alert("alice", "camaro", 10000, "under")
+        self._ingest({"title": "Old Camaro", "price": 5000, "link": "https://example.com/history"})
+
+        stream = self.stream_module.PriceAlertStream()
+        # A fresh checkpoint starts at the newest listing instead of replaying history
+        self.assertEqual(stream.catch_up(), 0)
+
+        self._ingest(
+            {"title": "1985 Camaro", "price": 9000, "link": "https://example.com/1"},
+            {"title": "1995 Camaro", "price": 12000, "link": "https://example.com/2"},
+        )
+        fired = []
+        stream.evaluate = self._recording(stream.evaluate, fired)
+        stream.run_once()
+        self.assertEqual(self._fired(fired), [("alice", "https://example.com/1")])
+        self.assertIsNotNone(self.db.get_price_alerts("alice")[0]["last_triggered"])
+
+        # Listings ingested while no stream is running are caught up on restart
+        self.db.create_price_alert("bob", "corvette", 20000, "under")
+        self._ingest({"title": "Corvette C4", "price": 15000, "link": "https://example.com/3"})
+        restarted = self.stream_module.PriceAlertStream()
+        fired.clear()
+        restarted.evaluate = self._recording(restarted.evaluate, fired)
+        restarted.catch_up()
+        self.assertEqual(self._fired(fired), [("bob", "https://example.com/3")])
+        self.assertEqual(
+            self.db.get_worker_checkpoint(self.stream_module.CHECKPOINT_NAME),
+            self.db.get_max_listing_id(),
+        )
+
+    def test_repriced_listing_is_evaluated_from_publish(self):
+        stream = self.stream_module.PriceAlertStream()
+        stream.catch_up()
+        self._ingest({"title": "1995 Camaro", "price": 12000, "link": "https://example.com/2"})
+        stream.run_once()
+
+        self.db.create_price_alert("carol", "camaro", 10000, "under")
+        saved = self._ingest({"title": "1995 Camaro", "price": 8000, "link": "https://example.com/2"})
+        self.assertFalse(saved[0]["is_new"])
+
+        stream.publish(saved)
+        fired = []
+        stream.evaluate = self._recording(stream.evaluate, fired)
+        stream.run_once()
+        self.assertEqual(self._fired(fired), [("carol", "https://example.com/2")])
+
+    @staticmethod
+    def _recording(evaluate, fired):
+        def wrapper(listings):
+            result = evaluate(listings)
+            fired.extend(result)
+            return result
+        return wrapper
+
+
+if __name__ == "__main__":
+    unittest.main()
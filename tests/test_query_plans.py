@@ -0,0 +1,157 @@
+"""Query-plan regression suite for the analytics endpoints.
+
+Seeds a synthetic listings table (``QUERY_PLAN_ROWS`` rows, 50,000 by
+default), runs every analytics query and fails when SQLite plans a full
+scan of ``listings``, ``listing_analytics`` or the ``listing_daily_stats``
+rollup for any statement, or reads ``listings`` through a secondary index
+that does not cover the query.
+
+The default is already large enough for ANALYZE to produce the same plans
+as at production scale. Run with ``QUERY_PLAN_ROWS=1000000`` (as CI should)
+to check the full-size table.
+"""
+
+import os
+import re
+import sys
+import shutil
+import sqlite3
+import tempfile
+import importlib
+import unittest
+from datetime import datetime, timedelta
+
+ROWS = int(os.getenv("QUERY_PLAN_ROWS", "50000"))
+USERS = 2000
+SOURCES = ("craigslist", "ebay", "facebook", "ksl", "mercari", "poshmark")
+KEYWORDS = ("camaro", "corvette", "mustang", "firebird", "nova", "gto")
+
+# "SCAN l" / "SCAN listings" without an index is a full table scan
+FULL_SCAN = re.compile(r"^SCAN (listings|listing_analytics|listing_daily_stats|l|la)\b(?!.*USING (COVERING )?INDEX)")
+# Secondary-index reads of listings must be answered from the index alone
+NON_COVERING = re.compile(r"^SEARCH (listings|l) USING INDEX ")
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._temp_dir = tempfile.mkdtemp(prefix="query_plan_test_")
+        cls.db_path = os.path.join(cls._temp_dir, "plans.db")
+        os.environ["DB_FILE"] = cls.db_path
+        if "db_enhanced" in sys.modules:
+            cls.db = importlib.reload(sys.modules["db_enhanced"])
+        else:
+            cls.db = importlib.import_module("db_enhanced")
+        cls.db.close_database()
+        cls.db.init_db()
+        cls._seed()
+        # Backfill the daily rollup up front; incremental refreshes are checked below
+        cls.db.refresh_listing_daily_stats()
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            cls.db.close_database()
+        finally:
+            shutil.rmtree(cls._temp_dir, ignore_errors=True)
+
+    @classmethod
+    def _seed(cls):
+        now = datetime.now()
+        conn = sqlite3.connect(cls.db_path)
+        try:
+            # Bulk-load without the FTS trigger; title search is not under test here
+            conn.execute("DROP TRIGGER IF EXISTS listings_fts_ai")
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO listings (id, title, price, link, source, created_at, user_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        i,
+                        f"{KEYWORDS[i % len(KEYWORDS)]} {i}",
+                        1000 + (i * 37) % 50000,
+                        f"https://example.com/{i}",
+                        SOURCES[i % len(SOURCES)],
+                        (now - timedelta(minutes=i % 525600)).isoformat(sep=" "),
+                        f"user{i % USERS}",
+                    )
+                    for i in range(1, ROWS + 1)
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO listing_analytics (listing_id, keyword, category, price_range, source, created_at) "
+                "VALUES (?, ?, 'classic_car', 'mid', ?, ?)",
+                (
+                    (
+                        i,
+                        KEYWORDS[i % len(KEYWORDS)],
+                        SOURCES[i % len(SOURCES)],
+                        (now - timedelta(minutes=i % 525600)).isoformat(sep=" "),
+                    )
+                    for i in range(1, ROWS + 1, 3)
+                ),
+            )
+            conn.execute("COMMIT")
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+
+    def _plans_for(self, call):
+        """Run ``call`` and return ``(sql, plan details)`` for every statement it ran."""
+        statements = []
+        connections = list(self.db.get_pool().all_connections)
+        for conn in connections:
+            conn.set_trace_callback(statements.append)
+        try:
+            call()
+        finally:
+            for conn in connections:
+                conn.set_trace_callback(None)
+
+        plans = []
+        with self.db.get_pool().get_connection() as conn:
+            for sql in dict.fromkeys(statements):
+                if not re.search(r"\b(listings|listing_analytics|listing_daily_stats)\b", sql) or not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                    continue
+                details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+                plans.append((sql, details))
+        self.assertTrue(plans, "no analytics statements were captured")
+        return plans
+
+    def _assert_indexed(self, call):
+        for sql, details in self._plans_for(call):
+            bad = [detail for detail in details if FULL_SCAN.search(detail) or NON_COVERING.search(detail)]
+            self.assertFalse(bad, f"unindexed access {bad} in plan {details} for:\n{sql}")
+
+    def test_analytics_queries_use_indexes(self):
+        db, user = self.db, "user7"
+        calls = {
+            "price_analytics": lambda: db.get_price_analytics(30, user_id=user),
+            "price_analytics_source": lambda: db.get_price_analytics(30, source="ebay", user_id=user),
+            "price_analytics_keyword": lambda: db.get_price_analytics(30, keyword="camaro", user_id=user),
+            "price_analytics_both": lambda: db.get_price_analytics(30, source="ebay", keyword="camaro", user_id=user),
+            "source_comparison": lambda: db.get_source_comparison(30, user_id=user),
+            "source_comparison_keyword": lambda: db.get_source_comparison(30, keyword="camaro", user_id=user),
+            "keyword_analysis": lambda: db.get_keyword_analysis(30, user_id=user),
+            "keyword_analysis_keyword": lambda: db.get_keyword_analysis(30, keyword="camaro", user_id=user),
+            "hourly_activity": lambda: db.get_hourly_activity(7, user_id=user),
+            "hourly_activity_keyword": lambda: db.get_hourly_activity(7, keyword="camaro", user_id=user),
+            "market_insights": lambda: db.get_market_insights(30, user_id=user),
+            "market_insights_keyword": lambda: db.get_market_insights(30, keyword="camaro", user_id=user),
+            "price_distribution": lambda: db.get_price_distribution(30, 10, user_id=user),
+            "price_distribution_keyword": lambda: db.get_price_distribution(30, 10, keyword="camaro", user_id=user),
+            "daily_stats_refresh": lambda: (
+                db.save_listings_batch([
+                    {"title": f"camaro late {i}", "price": 9000 + i, "link": f"https://example.com/late/{i}"}
+                    for i in range(20)
+                ], user_id=user, source="ebay", notify=False),
+                db.refresh_listing_daily_stats(),
+            ),
+        }
+        for name, call in calls.items():
+            with self.subTest(name):
+                self._assert_indexed(call)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest import mock
+
+import rate_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class InMemoryRateLimitBackendTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.backend = rate_limiter.InMemoryRateLimitBackend(clock=self.clock, sweep_interval=30)
+
+    def test_allows_burst_up_to_limit_then_refills_over_window(self):
+        results = [self.backend.hit("alice", "api", 3, 1) for _ in range(4)]
+        self.assertEqual(results, [(True, 2), (True, 1), (True, 0), (False, 0)])
+
+        # One token comes back every 20 seconds for 3 requests per minute
+        self.clock.now += 20
+        self.assertEqual(self.backend.hit("alice", "api", 3, 1), (True, 0))
+        self.assertEqual(self.backend.hit("alice", "api", 3, 1), (False, 0))
+
+        self.clock.now += 120
+        self.assertEqual(self.backend.hit("alice", "api", 3, 1), (True, 2))
+
+    def test_buckets_are_per_user_and_endpoint(self):
+        self.assertTrue(self.backend.hit("alice", "api", 1, 1)[0])
+        self.assertFalse(self.backend.hit("alice", "api", 1, 1)[0])
+        self.assertTrue(self.backend.hit("alice", "scraper", 1, 1)[0])
+        self.assertTrue(self.backend.hit("bob", "api", 1, 1)[0])
+
+        self.backend.reset("alice")
+        self.assertTrue(self.backend.hit("alice", "api", 1, 1)[0])
+        self.assertFalse(self.backend.hit("bob", "api", 1, 1)[0])
+
+    def test_idle_buckets_are_swept(self):
+        self.backend.hit("alice", "api", 5, 1)
+        self.clock.now += 90
+        self.backend.hit("bob", "api", 5, 1)
+        self.assertEqual(set(self.backend._buckets), {("bob", "api")})
+
+
+class BackendSelectionTestCase(unittest.TestCase):
+    def test_long_windows_use_the_database(self):
+        self.assertIs(rate_limiter.get_rate_limit_backend(60), rate_limiter._database_backend)
+        self.assertIs(rate_limiter.get_rate_limit_backend(5), rate_limiter._database_backend)
+
+    def test_short_windows_stay_in_process_without_redis(self):
+        with mock.patch("websocket_manager.redis_enabled", False):
+            self.assertIs(rate_limiter.get_rate_limit_backend(1), rate_limiter._memory_backend)
+        with mock.patch("websocket_manager.redis_enabled", True):
+            self.assertIs(rate_limiter.get_rate_limit_backend(1), rate_limiter._shared_backend)
+
+    def test_redis_backend_falls_back_when_redis_is_unavailable(self):
+        fallback = mock.Mock()
+        fallback.hit.return_value = (True, 4)
+        backend = rate_limiter.RedisRateLimitBackend(fallback)
+        with mock.patch("websocket_manager._with_redis", return_value=None):
+            self.assertEqual(backend.hit("alice", "api", 5, 1), (True, 4))
+        with mock.patch("websocket_manager._with_redis", return_value=6):
+            self.assertEqual(backend.hit("alice", "api", 5, 1), (False, 0))
+        fallback.hit.assert_called_once_with("alice", "api", 5, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from scrapers import common
+
+
+class _FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, **kwargs):
+        self.requests.append((url, kwargs.get("headers", {})))
+        return self.responses.pop(0)
+
+
+def _response(status_code=200, body=b"<html><li>Camaro $3500</li></html>", headers=None):
+    return SimpleNamespace(
+        status_code=status_code,
+        content=body if status_code != 304 else b"",
+        text=body.decode() if status_code != 304 else "",
+        headers=headers or {},
+    )
+
+
+class ResponseFingerprintCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        common.get_response_cache().clear()
+        blocking = mock.MagicMock()
+        blocking.build_headers.return_value = {"User-Agent": "test"}
+        blocking.pre_request_wait.return_value = 0
+        blocking.simulate_reading_time.return_value = 0
+        patches = [
+            mock.patch.object(common, "anti_blocking", blocking),
+            mock.patch.object(common, "_save_session_cookies"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _fetch(self, session, url="https://boise.craigslist.org/search/sss?query=camaro&min_price=0"):
+        response, _ = common.make_request_with_cascade(
+            url, "craigslist", session=session, username="alice", validate_response=False,
+        )
+        return response
+
+    def test_key_ignores_parameter_order_and_cache_busters(self):
+        cache = common.get_response_cache()
+        self.assertEqual(
+            cache.key("mercari", "https://m.com/search?b=2&a=1&_=123", "alice"),
+            cache.key("mercari", "https://m.com/search?a=1&_=987&b=2", "alice"),
+        )
+        self.assertNotEqual(
+            cache.key("mercari", "https://m.com/search?a=1", "alice"),
+            cache.key("mercari", "https://m.com/search?a=1", "bob"),
+        )
+
+    def test_not_modified_reply_to_validators_is_unchanged(self):
+        session = _FakeSession([
+            _response(headers={"ETag": '"v1"', "Last-Modified": "Wed, 14 Oct 2026 10:00:00 GMT"}),
+            _response(status_code=304),
+        ])
+
+        first = self._fetch(session)
+        self.assertFalse(common.response_unchanged(first))
+        common.remember_response(first)
+
+        second = self._fetch(session, url="https://boise.craigslist.org/search/sss?min_price=0&query=camaro")
+        headers = session.requests[1][1]
+        self.assertEqual(headers["If-None-Match"], '"v1"')
+        self.assertEqual(headers["If-Modified-Since"], "Wed, 14 Oct 2026 10:00:00 GMT")
+        self.assertTrue(common.response_unchanged(second))
+
+    def test_identical_body_is_unchanged_only_after_it_was_processed(self):
+        first_body = b'<html><script nonce="a1">x</script><li>Camaro $3500</li></html>'
+        same_body = b'<html><script nonce="b2">x</script>\n  <li>Camaro $3500</li></html>'
+        session = _FakeSession([_response(body=first_body), _response(body=same_body),
+                                _response(body=same_body), _response(body=b"<li>Camaro $3000</li>")])
+
+        # Nothing is remembered while the first page was never fully processed
+        self.assertFalse(common.response_unchanged(self._fetch(session)))
+        second = self._fetch(session)
+        self.assertFalse(common.response_unchanged(second))
+        common.remember_response(second)
+
+        self.assertTrue(common.response_unchanged(self._fetch(session)))
+        self.assertFalse(common.response_unchanged(self._fetch(session)))
+        stats = common.get_response_cache().stats()
+        self.assertEqual((stats["unchanged"], stats["changed"]), (1, 3))
+
+    def test_responses_without_fingerprint_are_never_skipped(self):
+        self.assertFalse(common.response_unchanged(_response()))
+        self.assertFalse(common.response_unchanged(mock.Mock()))
+
+
+if __name__ == "__main__":
+    unittest.main()
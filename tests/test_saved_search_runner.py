@@ -0,0 +1,131 @@
+import os
+import sys
+import shutil
+import tempfile
+import importlib
+import unittest
+
+
+class SavedSearchRunnerTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._temp_dir = tempfile.mkdtemp(prefix="saved_search_test_")
+        cls.db_path = os.path.join(cls._temp_dir, "searches.db")
+        os.environ["DB_FILE"] = cls.db_path
+        if "db_enhanced" in sys.modules:
+            cls.db = importlib.reload(sys.modules["db_enhanced"])
+        else:
+            cls.db = importlib.import_module("db_enhanced")
+        cls.db.close_database()
+        cls.runner_module = importlib.import_module("saved_search_runner")
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            cls.db.close_database()
+        finally:
+            shutil.rmtree(cls._temp_dir, ignore_errors=True)
+
+    def setUp(self):
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        self.db.init_db()
+        for username in ("alice", "bob"):
+            self.db.create_user_db(username, f"{username}@botifex.io", "hash")
+
+    def tearDown(self):
+        self.db.close_database()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+
+    def _ingest(self, *listings):
+        return self.db.save_listings_batch(list(listings), source="craigslist", notify=False)
+
+    def test_shared_delta_and_high_water_marks(self):
+        self._ingest(
+            {"title": "1985 Camaro", "price": 9000, "link": "https://example.com/1"},
+            {"title": "1995 Camaro", "price": 12000, "link": "https://example.com/2"},
+            {"title": "Corvette C4", "price": 8000, "link": "https://example.com/3"},
+        )
+        alice_camaro = self.db.create_saved_search("alice", "Cheap Camaro", keywords="camaro", max_price=10000)
+        self.db.create_saved_search("bob", "Camaro", keywords=" Camaro", max_price=10000)
+        self.db.create_saved_search("alice", "Vette", keywords="corvette")
+
+        reported = []
+        runner = self.runner_module.SavedSearchRunner(search_interval_seconds=0)
+        runner._report = lambda search, results: reported.append((search["name"], [r["id"] for r in results]))
+
+        stats = runner.run_cycle()
+        self.assertEqual(stats, {"searches": 3, "criteria": 2, "listings": 3, "results": 3})
+        self.assertEqual(sorted(name for name, _ in reported), ["Camaro", "Cheap Camaro", "Vette"])
+        head = self.db.get_max_listing_id()
+        self.assertTrue(all(s["last_listing_id"] == head for s in self.db.get_all_saved_searches()))
+
+        # Nothing new: nothing scanned, nothing reported
+        reported.clear()
+        stats = runner.run_cycle()
+        self.assertEqual((stats["listings"], stats["results"]), (0, 0))
+
+        # Only the new listing is scanned, once for both identical searches
+        self._ingest({"title": "Camaro Z28", "price": 7000, "link": "https://example.com/4"})
+        stats = runner.run_cycle()
+        self.assertEqual((stats["listings"], stats["results"]), (1, 2))
+        self.assertEqual(sorted(name for name, _ in reported), ["Camaro", "Cheap Camaro"])
+
+        # A search run recently is not due again
+        hourly = self.runner_module.SavedSearchRunner()
+        self.assertEqual(hourly.run_cycle()["searches"], 0)
+        self.assertIsNotNone(self.db.get_saved_search_by_id(alice_camaro)["last_run"])
+
+    def test_late_committed_listing_below_the_mark_is_reported_once(self):
+        self._ingest(
+            {"title": "1985 Camaro", "price": 9000, "link": "https://example.com/1"},
+            {"title": "1995 Camaro", "price": 9500, "link": "https://example.com/2"},
+            {"title": "Camaro Z28", "price": 7000, "link": "https://example.com/3"},
+        )
+        self.db.create_saved_search("alice", "Camaro", keywords="camaro")
+        late_id = self.db.get_max_listing_id() - 1
+
+        # The middle row is not visible yet, as if its transaction had not committed
+        get_listings_after = self.db.get_listings_after
+        hidden = {late_id}
+        self.db.get_listings_after = lambda after, limit: [
+            listing for listing in get_listings_after(after, limit) if listing["id"] not in hidden
+        ]
+        self.addCleanup(setattr, self.db, "get_listings_after", get_listings_after)
+
+        reported = []
+        runner = self.runner_module.SavedSearchRunner(search_interval_seconds=0)
+        runner._report = lambda search, results: reported.append([r["id"] for r in results])
+
+        runner.run_cycle()
+        self.assertEqual(len(reported[0]), 2)
+        self.assertNotIn(late_id, reported[0])
+
+        hidden.clear()
+        reported.clear()
+        runner.run_cycle()
+        self.assertEqual(reported, [[late_id]])
+
+        reported.clear()
+        runner.run_cycle()
+        self.assertEqual(reported, [])
+
+    def test_notification_goes_out_for_the_newest_result(self):
+        self._ingest(
+            {"title": "1985 Camaro", "price": 9000, "link": "https://example.com/1"},
+            {"title": "1995 Camaro", "price": 9500, "link": "https://example.com/2"},
+        )
+        self.db.create_saved_search("alice", "Camaro", keywords="camaro", notify_new=True)
+        queued = []
+        enqueue = self.db.enqueue_listing_notification
+        self.db.enqueue_listing_notification = lambda username, listing: queued.append(listing["link"])
+        self.addCleanup(setattr, self.db, "enqueue_listing_notification", enqueue)
+
+        self.runner_module.SavedSearchRunner(search_interval_seconds=0).run_cycle()
+
+        self.assertEqual(queued, ["https://example.com/2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
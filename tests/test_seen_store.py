@@ -0,0 +1,83 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from scrapers import common, seen_store
+
+
+@pytest.fixture
+def sqlite_store(tmp_path, monkeypatch):
+    backend = seen_store.SqliteSeenBackend(str(tmp_path / "seen.db"))
+    seen_store.set_seen_backend(backend)
+    monkeypatch.chdir(tmp_path)
+    yield backend
+    backend.close()
+    seen_store.set_seen_backend(None)
+
+
+def test_marks_persist_across_loads_and_only_pending_rows_are_written(sqlite_store):
+    link = "https://example.com/item/1?utm_source=feed"
+    seen = common.load_seen_listings("craigslist", username="alice")
+    assert common.is_new_listing(link, seen, "craigslist")
+
+    seen[common.normalize_url(link)] = datetime.now()
+    assert not common.is_new_listing(link, seen, "craigslist")
+    assert sqlite_store.count("craigslist", "alice") == 0
+    common.save_seen_listings(seen, "craigslist", username="alice")
+    assert sqlite_store.count("craigslist", "alice") == 1
+    assert seen.flush() == 0
+
+    reloaded = common.load_seen_listings("craigslist", username="alice")
+    assert not common.is_new_listing(link, reloaded, "craigslist")
+    # Scoped per user and per site
+    assert common.is_new_listing(link, common.load_seen_listings("craigslist", username="bob"), "craigslist")
+    assert common.is_new_listing(link, common.load_seen_listings("ebay", username="alice"), "ebay")
+
+    # Seen more than a day ago counts as new again
+    reloaded[common.normalize_url(link)] = datetime.now() - timedelta(days=2)
+    assert common.is_new_listing(link, reloaded, "craigslist")
+
+
+def test_legacy_json_is_imported_once_and_expired_rows_compacted(sqlite_store, tmp_path):
+    fresh = (datetime.now() - timedelta(hours=1)).isoformat()
+    stale = (datetime.now() - timedelta(days=30)).isoformat()
+    legacy = tmp_path / "ebay_carol_seen.json"
+    legacy.write_text(json.dumps({"https://example.com/a": fresh, "https://example.com/b": stale}))
+
+    seen = common.load_seen_listings("ebay", username="carol")
+    assert not legacy.exists()
+    assert (tmp_path / "ebay_carol_seen.json.migrated").exists()
+    assert "https://example.com/a" in seen
+    assert "https://example.com/b" not in seen
+    assert len(seen) == 1
+
+    old = int(time.time()) - seen_store.SEEN_TTL_SECONDS - 60
+    sqlite_store.put_many("ebay", "carol", [(seen_store.url_key("https://example.com/old"), old)])
+    assert seen_store.compact_seen_listings() == 1
+    assert len(seen) == 1
+
+
+def test_plain_dicts_are_still_accepted(sqlite_store):
+    seen = {"https://example.com/x": datetime.now()}
+    assert not common.is_new_listing("https://example.com/x", seen, "ksl")
+    common.save_seen_listings(seen, "ksl")
+    assert "https://example.com/x" in common.load_seen_listings("ksl")
+
+
+def test_scraper_defaults_are_store_backed_views(sqlite_store, monkeypatch):
+    from scrapers import poshmark
+
+    monkeypatch.setattr(poshmark, "seen_listings", {})
+    link = "https://poshmark.com/listing/camaro-1"
+    assert poshmark.is_new_listing(link, user_id="alice")
+
+    user_seen = poshmark._user_seen("alice")
+    assert isinstance(user_seen, seen_store.SeenListings)
+    user_seen[poshmark.normalize_url(link)] = datetime.now()
+    poshmark.save_seen_listings(user_id="alice")
+
+    assert sqlite_store.count("poshmark", "alice") == 1
+    assert user_seen.flush() == 0
+    assert not poshmark.is_new_listing(link, user_id="alice")
@@ -0,0 +1,82 @@
+import threading
+import unittest
+from unittest import mock
+
+from scrapers import common
+
+
+class SessionPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.warm_ups = []
+
+        def warm_up(session, site_name, initialize_url):
+            self.warm_ups.append(site_name)
+            if site_name == "slow":
+                self.started.set()
+                self.release.wait(5)
+            return True
+
+        patches = [
+            mock.patch.object(common, "_warm_up_session", side_effect=warm_up),
+            mock.patch.object(common, "_load_session_cookies"),
+            mock.patch.object(common, "_save_session_cookies"),
+            mock.patch.object(common, "_delete_session_cookies"),
+            mock.patch.object(common.time, "sleep"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        for site in ("slow", "fast"):
+            self.addCleanup(common.clear_session, site, username="alice")
+        self.addCleanup(self.release.set)
+
+    def _in_thread(self, results, site):
+        thread = threading.Thread(
+            target=lambda: results.append(common.get_session(site, "https://example.com/", username="alice"))
+        )
+        thread.start()
+        return thread
+
+    def test_slow_warm_up_does_not_block_other_keys(self):
+        slow = []
+        thread = self._in_thread(slow, "slow")
+        self.assertTrue(self.started.wait(2))
+
+        fast = []
+        self._in_thread(fast, "fast").join(2)
+        self.assertEqual(len(fast), 1, "fast session waited on the slow warm-up")
+        self.assertEqual(slow, [])
+
+        self.release.set()
+        thread.join(2)
+        self.assertEqual(len(slow), 1)
+
+    def test_concurrent_callers_share_one_creation(self):
+        results = []
+        threads = [self._in_thread(results, "slow") for _ in range(4)]
+        self.assertTrue(self.started.wait(2))
+        self.release.set()
+        for thread in threads:
+            thread.join(2)
+
+        self.assertEqual(self.warm_ups, ["slow"])
+        self.assertEqual(len({id(session) for session in results}), 1)
+
+    def test_stats_report_reuse_and_creation_latency(self):
+        before = common.get_session_pool_stats()
+        self.release.set()
+        first = common.get_session("fast", "https://example.com/", username="alice")
+        self.assertIs(common.get_session("fast", username="alice"), first)
+        self.assertIsNot(common.reset_session("fast", username="alice"), first)
+
+        stats = common.get_session_pool_stats()
+        self.assertEqual(stats["created"] - before["created"], 2)
+        self.assertEqual(stats["reused"] - before["reused"], 1)
+        self.assertGreaterEqual(stats["max_creation_ms"], 0)
+        self.assertTrue(0 < stats["reuse_ratio"] < 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+
+from scrapers import shared_scheduler
+from scrapers.async_engine import AsyncScrapeEngine
+from scrapers.shared_scheduler import SharedScrapeScheduler, build_query_key
+
+
+def _settings(keywords, min_price=0, max_price=50000, location="boise", interval=60):
+    return {
+        "keywords": keywords,
+        "min_price": min_price,
+        "max_price": max_price,
+        "interval": interval,
+        "location": location,
+        "radius": 50,
+    }
+
+
+def _make_scheduler(monkeypatch, user_settings, listings):
+    monkeypatch.setattr(shared_scheduler, "load_settings", lambda username=None: user_settings[username])
+    monkeypatch.setattr(shared_scheduler, "load_seen_listings", lambda site, username=None: {})
+    monkeypatch.setattr(shared_scheduler, "save_seen_listings", lambda *args, **kwargs: None)
+    monkeypatch.setattr(SharedScrapeScheduler, "_ensure_running_locked", lambda self: None)
+
+    fetches = []
+    delivered = []
+    seen_views = []
+
+    def check(flag_name, user_id=None, user_seen=None, flag_key=None, settings=None, deliver=None):
+        fetches.append(settings)
+        seen_views.append(user_seen)
+        for item in listings:
+            deliver(item["title"], item["link"], item["price"], None, user_id=user_id)
+        return listings
+
+    def deliver(title, link, price=None, image_url=None, user_id=None):
+        delivered.append((user_id, link))
+
+    scheduler = SharedScrapeScheduler("craigslist", check, deliver, {})
+    scheduler.seen_views = seen_views
+    return scheduler, fetches, delivered
+
+
+def test_identical_queries_are_fetched_once_and_fanned_out(monkeypatch):
+    users = {
+        "alice": _settings(["Camaro"], max_price=5000),
+        "bob": _settings(["camaro "], min_price=1000, max_price=20000),
+    }
+    listings = [
+        {"title": "1990 Camaro", "link": "https://boise.craigslist.org/cto/d/1.html", "price": 4000},
+        {"title": "1999 Camaro", "link": "https://boise.craigslist.org/cto/d/2.html", "price": 15000},
+    ]
+    scheduler, fetches, delivered = _make_scheduler(monkeypatch, users, listings)
+
+    scheduler.subscribe("alice")
+    scheduler.subscribe("bob")
+    assert scheduler.get_stats()["distinct_queries"] == 1
+
+    group = next(iter(scheduler._groups.values()))
+    scheduler._run_group(group)
+
+    assert len(fetches) == 1
+    assert fetches[0]["min_price"] == 0
+    assert fetches[0]["max_price"] == 20000
+    assert sorted(delivered) == [
+        ("alice", "https://boise.craigslist.org/cto/d/1.html"),
+        ("bob", "https://boise.craigslist.org/cto/d/1.html"),
+        ("bob", "https://boise.craigslist.org/cto/d/2.html"),
+    ]
+
+    # A second pass over the same results delivers nothing new.
+    delivered.clear()
+    scheduler._run_group(group)
+    assert delivered == []
+
+
+def test_distinct_queries_get_separate_groups(monkeypatch):
+    users = {
+        "alice": _settings(["Camaro"]),
+        "bob": _settings(["Corvette"]),
+        "carol": _settings(["Camaro"], location="Seattle"),
+    }
+    scheduler, _, _ = _make_scheduler(monkeypatch, users, [])
+
+    for user_id in users:
+        scheduler.subscribe(user_id)
+    assert scheduler.get_stats()["distinct_queries"] == 3
+
+    scheduler.unsubscribe("bob")
+    assert scheduler.get_stats()["distinct_queries"] == 2
+    assert not scheduler.is_subscribed("bob")
+
+
+def test_group_seen_view_is_reused_and_released_with_the_group(monkeypatch):
+    users = {"alice": _settings(["Camaro"])}
+    scheduler, _, _ = _make_scheduler(monkeypatch, users, [])
+    opened = []
+    monkeypatch.setattr(shared_scheduler, "load_seen_listings", lambda site, username=None: opened.append(username) or {})
+
+    scheduler.subscribe("alice")
+    group = next(iter(scheduler._groups.values()))
+    scheduler._run_group(group)
+    scheduler._run_group(group)
+
+    assert opened.count(group.token) == 1
+    assert scheduler.seen_views[0] is scheduler.seen_views[1]
+
+    scheduler.unsubscribe("alice")
+    assert scheduler._group_seen == {}
+
+
+def test_stopped_scheduler_does_not_restart(monkeypatch):
+    scheduler, _, _ = _make_scheduler(monkeypatch, {"alice": _settings(["Camaro"])}, [])
+    monkeypatch.undo()
+    monkeypatch.setattr(shared_scheduler, "load_settings", lambda username=None: _settings(["Camaro"]))
+    monkeypatch.setattr(shared_scheduler, "load_seen_listings", lambda site, username=None: {})
+    spawned = []
+    monkeypatch.setattr(scheduler._engine, "spawn", lambda coro: spawned.append(coro.close()))
+
+    scheduler.stop()
+
+    assert not scheduler.subscribe("alice")
+    assert spawned == []
+    assert scheduler.get_stats()["subscribers"] == 0
+
+
+def test_query_key_ignores_price_and_keyword_order():
+    a = build_query_key("ebay", _settings(["Firebird", "Camaro"], max_price=1000))
+    b = build_query_key("ebay", _settings(["camaro", "firebird"], max_price=9000))
+    assert a == b
+
+
+def test_async_engine_bounds_per_site_concurrency():
+    engine = AsyncScrapeEngine({"craigslist": 2, "default": 1})
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def fetch():
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+
+    async def run_many():
+        await asyncio.gather(*(engine.run_blocking("craigslist", fetch) for _ in range(8)))
+
+    try:
+        engine.spawn(run_many()).result(timeout=5)
+        assert state["peak"] == 2
+        assert engine.get_stats()["completed"]["craigslist"] == 8
+    finally:
+        engine.shutdown()
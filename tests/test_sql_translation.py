@@ -0,0 +1,46 @@
+import unittest
+
+import db_enhanced
+
+
+class SqlTranslationTestCase(unittest.TestCase):
+    def setUp(self):
+        db_enhanced._translate_sql.cache_clear()
+
+    def test_translates_sqlite_dialect(self):
+        translate = db_enhanced._translate_sql
+        self.assertEqual(
+            translate("SELECT * FROM listings WHERE title = '?' AND id = ?"),
+            "SELECT * FROM listings WHERE title = '?' AND id = %s",
+        )
+        self.assertEqual(
+            translate("INSERT OR IGNORE INTO seen (url) VALUES (?)"),
+            "INSERT INTO seen (url) VALUES (%s) ON CONFLICT DO NOTHING",
+        )
+        self.assertEqual(
+            translate("ALTER TABLE users ADD COLUMN score REAL DEFAULT 0"),
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS score DOUBLE PRECISION DEFAULT 0",
+        )
+        self.assertEqual(
+            translate("CREATE TABLE t (id INTEGER PRIMARY KEY AUTOINCREMENT, at DATETIME, ok BOOLEAN DEFAULT 1)"),
+            "CREATE TABLE t (id SERIAL PRIMARY KEY, at TIMESTAMP, ok BOOLEAN DEFAULT TRUE)",
+        )
+
+    def test_repeated_statements_are_translated_once(self):
+        statement = "SELECT id FROM users WHERE username = ?"
+        for _ in range(5):
+            db_enhanced._translate_sql(statement)
+        info = db_enhanced.get_sql_translation_cache_info()
+        self.assertEqual(info["misses"], 1)
+        self.assertEqual(info["hits"], 4)
+
+    def test_sqlite_statements_pass_through_untouched(self):
+        if db_enhanced.USE_POSTGRES:
+            self.skipTest("PostgreSQL is configured")
+        statement = "SELECT id FROM users WHERE username = ?"
+        self.assertIs(db_enhanced._prepare_sql(statement), statement)
+        self.assertEqual(db_enhanced.get_sql_translation_cache_info()["currsize"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
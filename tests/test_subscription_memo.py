@@ -0,0 +1,54 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from flask import Flask
+
+import cache_manager
+import subscription_middleware
+
+
+class SubscriptionMemoTestCase(unittest.TestCase):
+    def setUp(self):
+        cache_manager.get_cache().clear()
+        self.app = Flask(__name__)
+        self.user = SimpleNamespace(id="alice", is_authenticated=True, role="user")
+        self.lookups = mock.Mock(return_value={"tier": "pro", "status": "active"})
+        patches = [
+            mock.patch.object(subscription_middleware, "current_user", self.user),
+            mock.patch.object(subscription_middleware.db_enhanced, "get_user_subscription", self.lookups),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_tier_is_resolved_once_per_request(self):
+        with self.app.test_request_context("/api/listings"):
+            self.assertEqual(subscription_middleware.get_user_tier(), "pro")
+            self.assertTrue(subscription_middleware.can_access_feature("analytics"))
+            context = subscription_middleware.add_subscription_context()
+            self.assertEqual(context["user_tier"], "pro")
+        self.assertEqual(self.lookups.call_count, 1)
+
+        # Later requests are served from the short-TTL cache
+        with self.app.test_request_context("/api/listings"):
+            self.assertEqual(subscription_middleware.get_user_tier(), "pro")
+        self.assertEqual(self.lookups.call_count, 1)
+
+    def test_invalidation_reloads_the_subscription(self):
+        with self.app.test_request_context("/webhook/stripe"):
+            self.assertEqual(subscription_middleware.get_user_tier(), "pro")
+            self.lookups.return_value = {"tier": "free", "status": "active"}
+            subscription_middleware.invalidate_subscription_cache("alice")
+            self.assertEqual(subscription_middleware.get_user_tier(), "free")
+        self.assertEqual(self.lookups.call_count, 2)
+
+    def test_feature_sets_are_not_shared_mutable_state(self):
+        with self.app.test_request_context("/"):
+            features = subscription_middleware.get_user_features()
+            features["max_keywords"] = "mutated"
+            self.assertNotEqual(subscription_middleware.get_user_features()["max_keywords"], "mutated")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from scrapers import common, seen_store
+from scrapers.url_filter import BloomFilter
+
+
+class CountingBackend(seen_store.MemorySeenBackend):
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def get(self, site, scope, key):
+        self.lookups += 1
+        return super().get(site, scope, key)
+
+
+@pytest.fixture
+def backend():
+    backend = CountingBackend()
+    seen_store.set_seen_backend(backend)
+    yield backend
+    seen_store.set_seen_backend(None)
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_fp_rate():
+    rng = random.Random(7)
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    added = [rng.getrandbits(64) - 2 ** 63 for _ in range(5000)]
+    for key in added:
+        bloom.add(key)
+    assert all(key in bloom for key in added)
+
+    probes = [rng.getrandbits(64) for _ in range(20000)]
+    observed = sum(1 for key in probes if key in bloom) / len(probes)
+    assert observed < 0.02
+    assert bloom.estimated_fp_rate() == pytest.approx(0.01, rel=0.2)
+
+
+def test_filter_skips_exact_lookups_and_classifies_hits(backend, monkeypatch):
+    monkeypatch.setattr(seen_store.get_url_filter("craigslist"), "outcome_sample_rate", 1.0)
+    alice = common.load_seen_listings("craigslist", username="alice")
+    bob = common.load_seen_listings("craigslist", username="bob")
+
+    # Nobody has seen it: answered by the filter alone
+    assert common.is_new_listing("https://example.com/1", alice, "craigslist")
+    assert backend.lookups == 0
+
+    alice["https://example.com/1"] = 1_900_000_000
+    common.save_seen_listings(alice, "craigslist", username="alice")
+
+    # Seen by another user: the hit falls through to bob's exact log
+    assert common.is_new_listing("https://example.com/1", bob, "craigslist")
+    assert backend.lookups == 1
+
+    stats = seen_store.get_url_filter_stats("craigslist")["craigslist"]
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["unconfirmed_hits"] == 1
+    assert stats["cross_user_hits"] == 1
+    assert stats["false_positives"] == 0
+    assert stats["urls"] == 1
+
+
+def test_filter_is_seeded_from_the_store(backend):
+    backend.put_many("ebay", "carol", [(seen_store.url_key("https://example.com/2"), 1_900_000_000)])
+    carol = common.load_seen_listings("ebay", username="carol")
+    assert "https://example.com/2" in carol
+    assert seen_store.get_url_filter_stats("ebay")["ebay"]["urls"] == 1
+
+
+def test_unsampled_hits_skip_the_site_wide_lookup(backend, monkeypatch):
+    monkeypatch.setattr(seen_store.get_url_filter("ksl"), "outcome_sample_rate", 0.0)
+    site_lookups = []
+    monkeypatch.setattr(backend, "site_contains", lambda site, key: site_lookups.append(key) or True)
+    alice = common.load_seen_listings("ksl", username="alice")
+    alice["https://example.com/3"] = 1_900_000_000
+    common.save_seen_listings(alice, "ksl", username="alice")
+
+    bob = common.load_seen_listings("ksl", username="bob")
+    assert common.is_new_listing("https://example.com/3", bob, "ksl")
+
+    stats = seen_store.get_url_filter_stats("ksl")["ksl"]
+    assert site_lookups == []
+    assert (stats["unconfirmed_hits"], stats["cross_user_hits"], stats["false_positives"]) == (1, 0, 0)
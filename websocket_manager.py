@@ -18,6 +18,7 @@ from flask_login import current_user
 from flask_socketio import SocketIO, emit, join_room, leave_room, rooms
 from utils import logger
 import db_enhanced
+from cache_manager import CACHE_INVALIDATION_EVENT, get_cache
 from observability import log_event, log_alert
 
 try:  # Optional dependency; realtime features gracefully degrade without Redis
@@ -780,6 +781,10 @@ def _handle_bus_event(event: Dict[str, Any]) -> None:
     elif event_type == "scraper.status":
         if isinstance(payload, dict):
             broadcast_scraper_status(payload, from_bus=True)
+    elif event_type == CACHE_INVALIDATION_EVENT:
+        tag = payload.get("tag")
+        if tag:
+            get_cache().invalidate_tag(tag, broadcast=False)
     elif event_type == "system.message":
         broadcast_system_message(
             payload.get("message", ""),